@@ -0,0 +1,4 @@
+# Celery app dimuat bersama Django agar @shared_task terikat ke app erp_alfa (broker dari settings)
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
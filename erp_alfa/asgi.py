@@ -17,14 +17,20 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'erp_alfa.settings')
 django.setup() 
 
 # Import setelah DJANGO_SETTINGS_MODULE diatur dan Django setup
+from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
-# import fullfilment.routing # REMOVED: File sudah dihapus
 
+django_asgi_app = get_asgi_application()
 
+import fullfilment.routing  # noqa: E402 (butuh app registry yang sudah siap)
+
+# Jalankan dengan: daphne -b 0.0.0.0 -p 8001 erp_alfa.asgi:application
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    # "websocket": URLRouter(
-    #     fullfilment.routing.websocket_urlpatterns
-    # ), # REMOVED: WebSocket routing sudah tidak diperlukan
+    "http": django_asgi_app,
+    # Live update picking / ready to print / station scan (fullfilment/live_updates.py)
+    "websocket": AllowedHostsOriginValidator(
+        AuthMiddlewareStack(URLRouter(fullfilment.routing.websocket_urlpatterns))
+    ),
 })
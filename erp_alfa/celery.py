@@ -6,6 +6,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'erp_alfa.settings')
 app = Celery('erp_alfa')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+# erp_alfa bukan app di INSTALLED_APPS: task export laporan (erp_alfa/tasks.py)
+app.autodiscover_tasks(['erp_alfa'])
 
 @app.task(bind=True)
 def debug_task(self):
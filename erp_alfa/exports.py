@@ -0,0 +1,275 @@
+"""
+Engine export laporan Excel / CSV (dipakai fullfilment, purchasing, inventory, products).
+
+Setiap laporan adalah builder `builder(params) -> ExportSpec` di modul exports.py app-nya.
+params adalah dict string dari query string (harus bisa di-serialize JSON untuk Celery).
+
+- rows() mengembalikan iterator baris (dict hasil .values() / .iterator()), dibaca sekali jalan;
+  data relasi di-prefetch oleh builder (subquery / dict per id), bukan query per baris.
+- Excel ditulis dengan XlsxWriter mode constant_memory (baris langsung di-flush ke file
+  sementara) lalu dikirim dengan FileResponse; CSV di-stream lewat StreamingHttpResponse.
+- Lebar kolom dihitung dari header + WIDTH_SAMPLE_ROWS baris pertama, bukan scan ulang semua sel.
+- export_response(): jika jumlah baris > EXPORT_ASYNC_ROWS, export dijalankan di Celery
+  (erp_alfa.tasks.export_report_task) dan user diarahkan ke halaman status yang menampilkan link
+  download setelah file selesai. Progress disimpan di cache per task_id (seperti import order).
+"""
+import csv
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+EXPORT_ASYNC_ROWS = 20000
+WIDTH_SAMPLE_ROWS = 500
+MAX_COLUMN_WIDTH = 50
+PROGRESS_EVERY = 5000
+PROGRESS_TIMEOUT = 60 * 60 * 24
+EXPORT_FILE_TTL = 60 * 60 * 24
+EXPORT_DIR = 'exports'
+
+CSV_BOM = '\ufeff'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+HEADER_COLOR = '#366092'
+
+# value: nama key di baris (dict) atau callable(row); kind 'number' rata kanan
+Column = namedtuple('Column', ['header', 'value', 'kind'], defaults=('text',))
+
+ExportSpec = namedtuple('ExportSpec', [
+    'filename',      # tanpa ekstensi
+    'sheet_name',
+    'columns',
+    'rows',          # callable -> iterator baris
+    'count',         # callable -> jumlah baris (untuk keputusan async dan progress)
+    'title_lines',   # baris judul di atas header (hanya Excel)
+    'footer',        # callable -> list nilai baris total (atau None), dipanggil setelah rows habis
+], defaults=((), None))
+
+
+def _cell(column, row):
+    value = column.value(row) if callable(column.value) else row.get(column.value)
+    return '' if value is None else value
+
+
+def iter_values(spec):
+    """Baris export sebagai list nilai per kolom (dengan nomor urut jika kolom value == '#')."""
+    columns = spec.columns
+    for number, row in enumerate(spec.rows(), 1):
+        yield [number if column.value == '#' else _cell(column, row) for column in columns]
+
+
+def sample_widths(columns, sample):
+    widths = []
+    for index, column in enumerate(columns):
+        longest = max([len(str(values[index])) for values in sample] + [len(column.header)])
+        widths.append(min(longest + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+def write_xlsx(target, spec, progress=None):
+    """Tulis spec ke target (path / file object) dengan XlsxWriter constant_memory. Return jumlah baris."""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(target, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(spec.sheet_name[:31])
+    title_format = workbook.add_format({'bold': True, 'font_size': 14, 'align': 'center'})
+    info_format = workbook.add_format({'bold': True})
+    header_format = workbook.add_format({
+        'bold': True, 'font_color': '#FFFFFF', 'bg_color': HEADER_COLOR, 'border': 1,
+        'align': 'center', 'valign': 'vcenter',
+    })
+    text_format = workbook.add_format({'border': 1})
+    number_format = workbook.add_format({'border': 1, 'align': 'right'})
+    total_format = workbook.add_format({'bold': True, 'border': 1})
+    formats = [number_format if column.kind == 'number' else text_format for column in spec.columns]
+
+    # constant_memory: baris harus ditulis berurutan, lebar kolom dari sampel di awal
+    values = iter_values(spec)
+    sample = list(islice(values, WIDTH_SAMPLE_ROWS))
+    for index, width in enumerate(sample_widths(spec.columns, sample)):
+        worksheet.set_column(index, index, width)
+
+    row = 0
+    for index, line in enumerate(spec.title_lines):
+        if index == 0 and len(spec.columns) > 1:
+            worksheet.merge_range(row, 0, row, len(spec.columns) - 1, line, title_format)
+        else:
+            worksheet.write(row, 0, line, title_format if index == 0 else info_format)
+        row += 1
+    if spec.title_lines:
+        row += 1
+
+    for col, column in enumerate(spec.columns):
+        worksheet.write(row, col, column.header, header_format)
+    row += 1
+
+    written = 0
+    for line in chain(sample, values):
+        for col, value in enumerate(line):
+            worksheet.write(row, col, value, formats[col])
+        row += 1
+        written += 1
+        if progress and written % PROGRESS_EVERY == 0:
+            progress(written)
+
+    footer = spec.footer() if spec.footer else None
+    if footer:
+        for col, value in enumerate(footer):
+            if value not in (None, ''):
+                worksheet.write(row, col, value, total_format)
+    workbook.close()
+    return written
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(spec):
+    """Baris CSV (string) untuk StreamingHttpResponse; diawali BOM agar Excel membaca UTF-8."""
+    writer = csv.writer(_Echo())
+    yield CSV_BOM + writer.writerow([column.header for column in spec.columns])
+    for line in iter_values(spec):
+        yield writer.writerow(line)
+    footer = spec.footer() if spec.footer else None
+    if footer:
+        yield writer.writerow(footer)
+
+
+def write_csv(output, spec, progress=None):
+    """Tulis spec sebagai CSV ke file text terbuka. Return jumlah baris."""
+    output.write(CSV_BOM)
+    writer = csv.writer(output)
+    writer.writerow([column.header for column in spec.columns])
+    written = 0
+    for line in iter_values(spec):
+        writer.writerow(line)
+        written += 1
+        if progress and written % PROGRESS_EVERY == 0:
+            progress(written)
+    footer = spec.footer() if spec.footer else None
+    if footer:
+        writer.writerow(footer)
+    return written
+
+
+def xlsx_response(spec):
+    output = tempfile.TemporaryFile()
+    write_xlsx(output, spec)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=f'{spec.filename}.xlsx', content_type=XLSX_CONTENT_TYPE)
+
+
+def csv_response(spec):
+    response = StreamingHttpResponse(iter_csv(spec), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{spec.filename}.csv"'
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Export di background (Celery)
+# ---------------------------------------------------------------------------
+
+def _progress_key(task_id):
+    return f'report_export_progress_{task_id}'
+
+
+def set_export_progress(task_id, **data):
+    current = cache.get(_progress_key(task_id)) or {}
+    current.update(data)
+    cache.set(_progress_key(task_id), current, PROGRESS_TIMEOUT)
+
+
+def get_export_progress(task_id):
+    return cache.get(_progress_key(task_id))
+
+
+def export_path(task_id, fmt):
+    return os.path.join(settings.MEDIA_ROOT, EXPORT_DIR, f'{task_id}.{fmt}')
+
+
+def _cleanup_exports(now=None):
+    """Hapus file export yang lebih tua dari EXPORT_FILE_TTL."""
+    directory = os.path.join(settings.MEDIA_ROOT, EXPORT_DIR)
+    now = now or time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) > EXPORT_FILE_TTL:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def run_export(builder, params, fmt, task_id):
+    """Tulis export ke MEDIA_ROOT/exports/<task_id>.<fmt> sambil mengupdate progress."""
+    spec = import_string(builder)(params)
+    total = spec.count()
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, EXPORT_DIR), exist_ok=True)
+    _cleanup_exports()
+    set_export_progress(task_id, status='running', rows=0, total=total)
+
+    def progress(rows):
+        set_export_progress(task_id, rows=rows)
+
+    path = export_path(task_id, fmt)
+    if fmt == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            rows = write_csv(output, spec, progress)
+    else:
+        rows = write_xlsx(path, spec, progress)
+    set_export_progress(task_id, status='done', rows=rows, file_name=f'{spec.filename}.{fmt}')
+    return {'rows': rows, 'file_name': f'{spec.filename}.{fmt}'}
+
+
+def export_response(request, builder, params=None):
+    """
+    Response export untuk view: CSV jika ?format=csv, selain itu Excel. Export besar
+    (> EXPORT_ASYNC_ROWS baris) dijalankan di Celery dan user melihat halaman status.
+    """
+    from .tasks import export_report_task
+
+    params = dict(params if params is not None else request.GET.items())
+    fmt = 'csv' if params.pop('format', '') == 'csv' else 'xlsx'
+    spec = import_string(builder)(params)
+
+    total = spec.count()
+    if total > EXPORT_ASYNC_ROWS:
+        task_id = str(uuid.uuid4())
+        set_export_progress(task_id, status='queued', rows=0, total=total, user_id=request.user.id,
+                            file_name=f'{spec.filename}.{fmt}')
+        try:
+            export_report_task.delay(builder, params, fmt, task_id)
+        except Exception:
+            # Broker tidak tersedia: tetap kirim file langsung (streaming)
+            logger.error(
+                "Broker Celery tidak dapat dihubungi (cek CELERY_BROKER_URL), export %s dijalankan sinkron", builder,
+                exc_info=True,
+            )
+            cache.delete(_progress_key(task_id))
+        else:
+            return render(request, 'export_status.html', {
+                'task_id': task_id,
+                'file_name': f'{spec.filename}.{fmt}',
+                'total': total,
+                'status_url': reverse('export_status'),
+                'download_url': reverse('export_download', args=[task_id]),
+            })
+
+    return csv_response(spec) if fmt == 'csv' else xlsx_response(spec)
@@ -0,0 +1,290 @@
+"""
+Instrumentasi hot path (view scan fulfillment dan endpoint lain yang perlu dipantau).
+
+Pemakaian:
+
+    @instrument_view('picking.update_barcode')
+    def update_barcode_picklist(request, nama_batch):
+        with span('resolve_barcode'):
+            product = resolve_product(barcode)
+
+instrument_view mencatat per request: durasi total, jumlah query dan waktu query database
+(lewat connection.execute_wrapper), serta durasi setiap span di dalam view. Semua nilai
+masuk ke histogram in-process (bucket geometris, ukuran tetap) dengan key
+"<nama endpoint> <METHOD>".
+
+Histogram per proses di-publish ke cache Django paling lama setiap PUBLISH_INTERVAL detik
+sehingga api_hotpath_stats dan command `hotpath_stats` bisa menggabungkan data dari
+semua worker (bucket yang sama bisa langsung dijumlahkan).
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+# Bucket geometris: 0.01 .. ~1e6 dengan rasio 1.1 (error relatif maksimal ~10%)
+BUCKET_MIN = 0.01
+BUCKET_RATIO = 1.1
+BUCKET_COUNT = 195
+
+PUBLISH_INTERVAL = 10.0
+SNAPSHOT_TIMEOUT = 60 * 60
+PROCESS_INDEX_KEY = 'hotpath:processes'
+SNAPSHOT_KEY_PREFIX = 'hotpath:snapshot:'
+
+METRIC_TOTAL = 'total_ms'
+METRIC_DB_TIME = 'db_ms'
+METRIC_DB_QUERIES = 'db_queries'
+PHASE_PREFIX = 'phase:'
+
+_current = contextvars.ContextVar('hotpath_request', default=None)
+
+
+def _enabled():
+    return getattr(settings, 'HOTPATH_INSTRUMENTATION', True)
+
+
+def _bucket_index(value):
+    if value <= BUCKET_MIN:
+        return 0
+    index = int(math.log(value / BUCKET_MIN, BUCKET_RATIO)) + 1
+    return min(index, BUCKET_COUNT - 1)
+
+
+def _bucket_upper(index):
+    return BUCKET_MIN * (BUCKET_RATIO ** index)
+
+
+class Histogram:
+    """Histogram bucket tetap; aman digabung antar proses dengan menjumlahkan bucket."""
+
+    __slots__ = ('buckets', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        index = _bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, data):
+        for index, count in data['buckets'].items():
+            index = int(index)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += data['count']
+        self.total += data['total']
+        if data['min'] is not None:
+            self.min = data['min'] if self.min is None else min(self.min, data['min'])
+        if data['max'] is not None:
+            self.max = data['max'] if self.max is None else max(self.max, data['max'])
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        target = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                # Batas atas bucket, dibatasi nilai min/max yang benar-benar teramati
+                return max(self.min, min(_bucket_upper(index), self.max))
+        return self.max
+
+    def to_dict(self):
+        return {
+            'buckets': dict(self.buckets), 'count': self.count, 'total': self.total,
+            'min': self.min, 'max': self.max,
+        }
+
+    def summary(self, integer=False):
+        rounder = _floor if integer else _round
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': rounder(self.percentile(50)),
+            'p95': rounder(self.percentile(95)),
+            'p99': rounder(self.percentile(99)),
+            'max': rounder(self.max),
+        }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def _floor(value):
+    # Metrik bilangan bulat (jumlah query): batas atas bucket dibulatkan ke bawah
+    return math.floor(value) if value is not None else None
+
+
+class HistogramStore:
+    """Histogram per endpoint per metrik untuk satu proses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._published_at = 0.0
+
+    def record(self, endpoint, metric, value):
+        with self._lock:
+            metrics = self._data.setdefault(endpoint, {})
+            histogram = metrics.get(metric)
+            if histogram is None:
+                histogram = metrics[metric] = Histogram()
+            histogram.record(value)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                endpoint: {metric: histogram.to_dict() for metric, histogram in metrics.items()}
+                for endpoint, metrics in self._data.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._data = {}
+
+    def maybe_publish(self):
+        now = time.monotonic()
+        if now - self._published_at < PUBLISH_INTERVAL:
+            return
+        self._published_at = now
+        publish_snapshot()
+
+
+store = HistogramStore()
+
+
+class _RequestTimings:
+    __slots__ = ('endpoint', 'db_queries', 'db_time', 'phases')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.phases = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+
+
+@contextmanager
+def span(name):
+    """Ukur satu fase di dalam view yang sedang di-instrument (tanpa efek di luar request)."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases.append((name, (time.perf_counter() - start) * 1000))
+
+
+def instrument_view(name=None):
+    """Decorator view: durasi total, query DB (jumlah & waktu) dan span per request."""
+    def decorator(view_func):
+        endpoint_name = name or f'{view_func.__module__}.{view_func.__name__}'
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not _enabled() or _current.get() is not None:
+                return view_func(request, *args, **kwargs)
+
+            timings = _RequestTimings(f'{endpoint_name} {request.method}')
+            token = _current.set(timings)
+            start = time.perf_counter()
+            try:
+                with connection.execute_wrapper(timings):
+                    return view_func(request, *args, **kwargs)
+            finally:
+                total = (time.perf_counter() - start) * 1000
+                _current.reset(token)
+                _record(timings, total)
+        return _wrapped_view
+    return decorator
+
+
+def _record(timings, total_ms):
+    endpoint = timings.endpoint
+    store.record(endpoint, METRIC_TOTAL, total_ms)
+    store.record(endpoint, METRIC_DB_TIME, timings.db_time * 1000)
+    store.record(endpoint, METRIC_DB_QUERIES, timings.db_queries)
+    for phase, duration in timings.phases:
+        store.record(endpoint, PHASE_PREFIX + phase, duration)
+    try:
+        store.maybe_publish()
+    except Exception:
+        # Cache mati tidak boleh menggagalkan request
+        pass
+
+
+def publish_snapshot():
+    """Simpan histogram proses ini ke cache agar bisa digabung dengan worker lain."""
+    pid = os.getpid()
+    cache.set(f'{SNAPSHOT_KEY_PREFIX}{pid}', store.to_dict(), SNAPSHOT_TIMEOUT)
+    processes = cache.get(PROCESS_INDEX_KEY) or {}
+    processes[pid] = time.time()
+    cutoff = time.time() - SNAPSHOT_TIMEOUT
+    processes = {p: ts for p, ts in processes.items() if ts >= cutoff}
+    cache.set(PROCESS_INDEX_KEY, processes, SNAPSHOT_TIMEOUT)
+
+
+def collect_histograms(include_shared=True):
+    """Gabungkan histogram proses ini dengan snapshot worker lain di cache."""
+    snapshots = {os.getpid(): store.to_dict()}
+    if include_shared:
+        processes = cache.get(PROCESS_INDEX_KEY) or {}
+        keys = [f'{SNAPSHOT_KEY_PREFIX}{pid}' for pid in processes if pid != os.getpid()]
+        for key, snapshot in cache.get_many(keys).items():
+            snapshots[key] = snapshot
+
+    merged = {}
+    for snapshot in snapshots.values():
+        for endpoint, metrics in snapshot.items():
+            target = merged.setdefault(endpoint, {})
+            for metric, data in metrics.items():
+                target.setdefault(metric, Histogram()).merge(data)
+    return merged, len(snapshots)
+
+
+def get_hotpath_stats(include_shared=True):
+    """Ringkasan p50/p95/p99 per endpoint: {endpoint: {metric: summary}}."""
+    merged, process_count = collect_histograms(include_shared)
+    endpoints = {
+        endpoint: {
+            metric: histogram.summary(integer=metric == METRIC_DB_QUERIES)
+            for metric, histogram in sorted(metrics.items())
+        }
+        for endpoint, metrics in sorted(merged.items())
+    }
+    return {'processes': process_count, 'endpoints': endpoints}
+
+
+def reset_hotpath_stats():
+    """Kosongkan histogram proses ini dan semua snapshot di cache."""
+    store.reset()
+    processes = cache.get(PROCESS_INDEX_KEY) or {}
+    cache.delete_many([f'{SNAPSHOT_KEY_PREFIX}{pid}' for pid in processes])
+    cache.delete(PROCESS_INDEX_KEY)
@@ -0,0 +1,167 @@
+"""
+Backend query untuk API list berukuran besar (purchase payment, purchase tax invoice).
+
+- keyset_page(): satu halaman urut (sort field, pk) mulai setelah cursor - biaya per halaman
+  konstan, tidak tergantung posisi halaman seperti OFFSET. Tanpa cursor (lompat halaman)
+  dipakai OFFSET. NULL diurutkan sebagai nilai terbesar (default PostgreSQL) sehingga index
+  btree biasa (field, id) terpakai dua arah.
+- encode_cursor() / decode_cursor(): cursor opaque (base64 JSON) berisi nilai sort + pk.
+- cached_value(): hasil count / statistik disimpan di cache per namespace + signature filter.
+  invalidate_list_cache(namespace) menaikkan generasi namespace (dipanggil signal model);
+  CACHE_TIMEOUT sebagai jaring pengaman untuk perubahan yang tidak lewat signal.
+"""
+import base64
+import hashlib
+import json
+import logging
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'list_query:'
+CACHE_TIMEOUT = 300
+SORT_ALIAS = 'list_sort_value'
+MAX_PAGE_SIZE = 500
+
+ListPage = namedtuple('ListPage', ['rows', 'next_cursor'])
+
+
+# ---------------------------------------------------------------------------
+# Cursor
+# ---------------------------------------------------------------------------
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['dec', str(value)]
+    return ['v', value]
+
+
+def _load_value(tagged):
+    tag, value = tagged
+    if value is None:
+        return None
+    if tag == 'dt':
+        return datetime.fromisoformat(value)
+    if tag == 'd':
+        return date.fromisoformat(value)
+    if tag == 'dec':
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(sort_field, value, pk):
+    raw = json.dumps([sort_field, _dump_value(value), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_field):
+    """Return (nilai sort, pk) atau None jika cursor tidak valid / dibuat untuk sort lain."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        field, tagged, pk = json.loads(raw)
+        if field != sort_field:
+            return None
+        return _load_value(tagged), int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Keyset pagination
+# ---------------------------------------------------------------------------
+
+def _after(value, pk, descending):
+    """Q baris sesudah (value, pk) untuk urutan (field ASC NULLS LAST | DESC NULLS FIRST, pk)."""
+    if descending:
+        if value is None:
+            return Q(**{f'{SORT_ALIAS}__isnull': False}) | Q(**{f'{SORT_ALIAS}__isnull': True, 'pk__lt': pk})
+        return Q(**{f'{SORT_ALIAS}__lt': value}) | Q(**{SORT_ALIAS: value, 'pk__lt': pk})
+    if value is None:
+        return Q(**{f'{SORT_ALIAS}__isnull': True, 'pk__gt': pk})
+    return (
+        Q(**{f'{SORT_ALIAS}__gt': value}) | Q(**{SORT_ALIAS: value, 'pk__gt': pk}) |
+        Q(**{f'{SORT_ALIAS}__isnull': True})
+    )
+
+
+def order_for_keyset(queryset, sort_field, descending=False):
+    """Queryset beranotasi nilai sort dan terurut (sort field, pk)."""
+    queryset = queryset.annotate(**{SORT_ALIAS: F(sort_field)})
+    if descending:
+        return queryset.order_by(F(SORT_ALIAS).desc(nulls_first=True), '-pk')
+    return queryset.order_by(F(SORT_ALIAS).asc(nulls_last=True), 'pk')
+
+
+def keyset_page(queryset, sort_field, descending=False, cursor=None, length=50, offset=0):
+    """
+    Satu halaman queryset urut sort_field (lookup boleh lewat relasi one-to-one/FK, bukan
+    reverse FK) + pk. cursor dari halaman sebelumnya; tanpa cursor dipakai offset.
+    Return ListPage(rows, next_cursor); next_cursor None jika halaman terakhir.
+    """
+    length = min(max(int(length), 1), MAX_PAGE_SIZE)
+    queryset = order_for_keyset(queryset, sort_field, descending)
+    position = decode_cursor(cursor, sort_field) if cursor else None
+    if position:
+        queryset = queryset.filter(_after(position[0], position[1], descending))
+    elif offset:
+        queryset = queryset[max(int(offset), 0):]
+    rows = list(queryset[:length + 1])
+    next_cursor = None
+    if len(rows) > length:
+        last = rows[length - 1]
+        next_cursor = encode_cursor(sort_field, getattr(last, SORT_ALIAS), last.pk)
+    return ListPage(rows[:length], next_cursor)
+
+
+# ---------------------------------------------------------------------------
+# Cache count / statistik per signature filter
+# ---------------------------------------------------------------------------
+
+def _generation_key(namespace):
+    return f'{CACHE_PREFIX}{namespace}:generation'
+
+
+def _generation(namespace):
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, None)
+        generation = cache.get(key) or 1
+    return generation
+
+
+def filter_signature(filters):
+    """Digest stabil dari dict filter (nilai kosong diabaikan)."""
+    normalized = {key: str(value) for key, value in filters.items() if value not in (None, '')}
+    return hashlib.md5(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+def cached_value(namespace, name, filters, compute):
+    """Nilai compute() (count / dict statistik) dari cache untuk namespace + filter."""
+    key = f'{CACHE_PREFIX}{namespace}:{_generation(namespace)}:{name}:{filter_signature(filters)}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, CACHE_TIMEOUT)
+    return value
+
+
+def invalidate_list_cache(*namespaces):
+    """Naikkan generasi namespace sehingga seluruh count/statistik lama tidak terpakai."""
+    for namespace in namespaces:
+        key = _generation_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _generation(namespace) + 1, None)
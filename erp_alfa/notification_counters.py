@@ -0,0 +1,224 @@
+"""
+Badge counter service untuk notifikasi menu (putaway, opname, batch, return, print, purchasing).
+
+Setiap counter disimpan di cache dengan key masing-masing dan di-invalidate oleh signal
+post_save/post_delete model terkait (lihat receiver di inventory/fullfilment/purchasing models).
+Context processor dan api_notification_counts membaca dari service ini, sehingga render
+halaman tidak menjalankan query badge selama cache masih hangat.
+
+Statistik hit/miss dan waktu recompute per counter disimpan per proses dan bisa dilihat
+lewat get_counter_stats() (ditampilkan di api_notification_counts dengan ?stats=1 untuk staff).
+"""
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'notification_counter:'
+# TTL sebagai jaring pengaman untuk perubahan yang tidak lewat signal (queryset.update)
+CACHE_TIMEOUT = 300
+
+
+def _regular_putaway():
+    from inventory.models import Stock
+    summary = Stock.objects.filter(quantity_putaway__gt=0).aggregate(
+        total_items=Count('product'),
+        total_quantity=Sum('quantity_putaway')
+    )
+    return {
+        'regular_putaway_count': summary['total_items'] or 0,
+        'putaway_quantity': summary['total_quantity'] or 0,
+    }
+
+
+def _transfer_putaway():
+    from inventory.models import RakTransferSession
+    return RakTransferSession.objects.filter(status='ready_for_putaway', mode='transfer_putaway').count()
+
+
+def _opname_queue():
+    from inventory.models import OpnameQueue
+    return OpnameQueue.objects.filter(status='pending').count()
+
+
+def _batch_open():
+    from fullfilment.models import BatchList
+    return BatchList.objects.filter(status_batch='open').count()
+
+
+def _return_session_open():
+    from fullfilment.models import ReturnSession
+    return ReturnSession.objects.filter(status='open').count()
+
+
+def _return_sku_pending_putaway():
+    from fullfilment.models import ReturnItem
+    return ReturnItem.objects.filter(
+        session__status='open',
+        putaway_status__in=['pending', 'partial']
+    ).values('product').distinct().count()
+
+
+def _ready_to_print_not_handed_over():
+    from fullfilment.models import ReadyToPrint
+    return ReadyToPrint.objects.filter(status_print='printed', handed_over_at__isnull=True).count()
+
+
+def _purchase_verify_pending():
+    from purchasing.models import Purchase
+    return Purchase.objects.filter(status='received').count()
+
+
+def _purchase_taxinvoice_pending():
+    from purchasing.models import Purchase
+    return Purchase.objects.filter(
+        status='verified',
+        has_tax_invoice=True
+    ).exclude(
+        tax_invoice__status__in=['received', 'verified']
+    ).count()
+
+
+def _purchase_payment_unpaid():
+    from purchasing.models import PurchasePayment
+    return PurchasePayment.objects.filter(status__in=['unpaid', 'partial', 'overdue']).count()
+
+
+# nama counter -> (fungsi hitung, model 'app_label.ModelName' yang mempengaruhi counter)
+COUNTERS = {
+    'regular_putaway': (_regular_putaway, ['inventory.Stock']),
+    'transfer_putaway_count': (_transfer_putaway, ['inventory.RakTransferSession']),
+    'opname_queue_count': (_opname_queue, ['inventory.OpnameQueue']),
+    'batch_open_count': (_batch_open, ['fullfilment.BatchList']),
+    'return_session_open_count': (_return_session_open, ['fullfilment.ReturnSession']),
+    'return_sku_pending_putaway': (_return_sku_pending_putaway, ['fullfilment.ReturnSession', 'fullfilment.ReturnItem']),
+    'ready_to_print_not_handed_over': (_ready_to_print_not_handed_over, ['fullfilment.ReadyToPrint']),
+    'purchase_verify_pending_count': (_purchase_verify_pending, ['purchasing.Purchase']),
+    'purchase_taxinvoice_pending_count': (_purchase_taxinvoice_pending, ['purchasing.Purchase', 'purchasing.PurchaseTaxInvoice']),
+    'purchase_payment_unpaid_count': (_purchase_payment_unpaid, ['purchasing.PurchasePayment']),
+}
+
+COUNTERS_BY_MODEL = {}
+for _name, (_func, _models) in COUNTERS.items():
+    for _label in _models:
+        COUNTERS_BY_MODEL.setdefault(_label, []).append(_name)
+
+EMPTY_COUNTS = {
+    'putaway_count': 0,
+    'putaway_quantity': 0,
+    'regular_putaway_count': 0,
+    'transfer_putaway_count': 0,
+    'opname_queue_count': 0,
+    'batch_open_count': 0,
+    'return_session_open_count': 0,
+    'return_sku_pending_putaway': 0,
+    'ready_to_print_not_handed_over': 0,
+    'purchase_verify_pending_count': 0,
+    'purchase_taxinvoice_pending_count': 0,
+    'purchase_payment_unpaid_count': 0,
+}
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _record(name, hit, elapsed_ms=None):
+    with _stats_lock:
+        stat = _stats.setdefault(name, {'hits': 0, 'misses': 0, 'recompute_ms_total': 0.0, 'recompute_ms_max': 0.0, 'recompute_ms_last': 0.0})
+        if hit:
+            stat['hits'] += 1
+            return
+        stat['misses'] += 1
+        stat['recompute_ms_total'] += elapsed_ms
+        stat['recompute_ms_last'] = elapsed_ms
+        stat['recompute_ms_max'] = max(stat['recompute_ms_max'], elapsed_ms)
+
+
+def _cache_key(name):
+    return f'{CACHE_PREFIX}{name}'
+
+
+def get_counters(names=None):
+    """
+    Ambil nilai counter dari cache; counter yang belum ada dihitung ulang dan disimpan.
+    Return (dict {nama: nilai}, jumlah counter yang dihitung ulang).
+    """
+    names = list(names or COUNTERS)
+    keys = {_cache_key(name): name for name in names}
+    cached = cache.get_many(list(keys))
+
+    values = {}
+    to_store = {}
+    for key, name in keys.items():
+        if key in cached:
+            values[name] = cached[key]
+            _record(name, hit=True)
+            continue
+        start = time.perf_counter()
+        values[name] = COUNTERS[name][0]()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _record(name, hit=False, elapsed_ms=elapsed_ms)
+        logger.debug("Recompute badge counter %s: %.2f ms", name, elapsed_ms)
+        to_store[key] = values[name]
+
+    if to_store:
+        cache.set_many(to_store, CACHE_TIMEOUT)
+    return values, len(to_store)
+
+
+def get_notification_counts():
+    """Dict badge counts untuk template/API (nama key sama dengan context processor lama)."""
+    values, _ = get_counters()
+    return build_notification_counts(values)
+
+
+def build_notification_counts(values):
+    """Susun dict badge counts dari hasil get_counters()."""
+    counts = dict(EMPTY_COUNTS)
+    counts.update(values['regular_putaway'])
+    for name, value in values.items():
+        if name != 'regular_putaway':
+            counts[name] = value
+    counts['putaway_count'] = counts['regular_putaway_count'] + counts['transfer_putaway_count']
+    return counts
+
+
+def invalidate_counters(names=None):
+    """Hapus cache counter tertentu (atau semua counter)."""
+    cache.delete_many([_cache_key(name) for name in (names or COUNTERS)])
+
+
+def invalidate_for_model(model):
+    """Invalidate counter yang dipengaruhi model (class atau instance)."""
+    names = COUNTERS_BY_MODEL.get(model._meta.label)
+    if names:
+        invalidate_counters(names)
+
+
+def get_counter_stats():
+    """Statistik hit rate dan waktu recompute per counter (per proses)."""
+    with _stats_lock:
+        snapshot = {name: dict(stat) for name, stat in _stats.items()}
+    total_hits = sum(stat['hits'] for stat in snapshot.values())
+    total_lookups = total_hits + sum(stat['misses'] for stat in snapshot.values())
+    for stat in snapshot.values():
+        lookups = stat['hits'] + stat['misses']
+        stat['hit_rate'] = round(stat['hits'] / lookups, 4) if lookups else 0.0
+        stat['recompute_ms_avg'] = round(stat['recompute_ms_total'] / stat['misses'], 2) if stat['misses'] else 0.0
+        stat['recompute_ms_total'] = round(stat['recompute_ms_total'], 2)
+        stat['recompute_ms_max'] = round(stat['recompute_ms_max'], 2)
+        stat['recompute_ms_last'] = round(stat['recompute_ms_last'], 2)
+    return {
+        'hit_rate': round(total_hits / total_lookups, 4) if total_lookups else 0.0,
+        'lookups': total_lookups,
+        'counters': snapshot,
+    }
+
+
+def reset_counter_stats():
+    with _stats_lock:
+        _stats.clear()
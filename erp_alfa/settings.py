@@ -42,6 +42,7 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # runserver lewat ASGI (WebSocket live update), harus sebelum staticfiles
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -59,7 +60,7 @@ INSTALLED_APPS = [
     'django_tables2',
     'django_filters',
     'django_extensions',
-    # 'channels',
+    'channels',
 ]
 
 MIDDLEWARE = [
@@ -176,6 +177,27 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Result backend (redis) tidak retry 20x saat broker mati: .delay() di view cepat gagal
+# dan jatuh ke fallback sinkron (dicatat sebagai error), bukan menahan request ~20 detik
+CELERY_RESULT_BACKEND_TRANSPORT_OPTIONS = {
+    'retry_policy': {'max_retries': 2, 'interval_start': 0, 'interval_step': 0.2, 'interval_max': 0.5},
+}
+
+# Cache: in-memory untuk development, Redis untuk produksi agar cache (badge counter,
+# barcode resolver, progress import) dibagi antar worker web dan Celery
+if DEBUG:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://127.0.0.1:6379/1",
+        }
+    }
 
 LOGGING = {
     'version': 1,
@@ -0,0 +1,17 @@
+import logging
+
+from celery import shared_task
+
+from .exports import run_export, set_export_progress
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def export_report_task(builder, params, fmt, task_id):
+    try:
+        return run_export(builder, params, fmt, task_id)
+    except Exception as e:
+        logger.exception("Export %s gagal", builder)
+        set_export_progress(task_id, status='error', error=str(e))
+        raise
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from erp_alfa import celery_app
+
+
+class CeleryAppTest(SimpleTestCase):
+    """Task @shared_task harus terikat ke app erp_alfa (broker dari settings), bukan default app Celery."""
+
+    def test_shared_tasks_use_configured_app(self):
+        from erp_alfa.tasks import export_report_task
+        from orders.tasks import import_orders_task
+        from products.tasks import import_products_task
+        from purchasing.tasks import verify_purchases_task
+
+        self.assertEqual(celery_app.main, 'erp_alfa')
+        self.assertEqual(celery_app.conf.broker_url, settings.CELERY_BROKER_URL)
+        for task in (import_orders_task, import_products_task, verify_purchases_task, export_report_task):
+            with self.subTest(task=task.name):
+                self.assertIs(task.app, celery_app)
+                self.assertIn(task.name, celery_app.tasks)
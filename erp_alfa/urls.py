@@ -26,7 +26,9 @@ from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 import os
 from django.contrib.auth.decorators import login_required
-from .views import home, CustomLoginView, api_notification_counts, favicon
+from .views import (
+    home, CustomLoginView, api_notification_counts, api_hotpath_stats, favicon, api_export_status, export_download,
+)
 from .mobile_views import mobile_home
 from accounts import views as account_views
 
@@ -45,6 +47,9 @@ urlpatterns = [
     path('logout/', account_views.custom_logout, name='logout'),
     path('accounts/', include('accounts.urls')),
     path('api/notification-counts/', api_notification_counts, name='api_notification_counts'),
+    path('api/hotpath-stats/', api_hotpath_stats, name='api_hotpath_stats'),
+    path('api/export-status/', api_export_status, name='export_status'),
+    path('exports/<uuid:task_id>/download/', export_download, name='export_download'),
 ]
 
 # Serve static and media files during development
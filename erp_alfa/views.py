@@ -1,22 +1,29 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Count, Sum, Q
-from django.core.cache import cache
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
 from django.views.static import serve
 from django.conf import settings
-from inventory.models import Stock, OpnameQueue
-from fullfilment.models import BatchList, ReturnSession, ReturnItem, ReadyToPrint
+from .notification_counters import (
+    EMPTY_COUNTS, build_notification_counts, get_counter_stats, get_counters,
+    invalidate_counters, invalidate_for_model,
+)
+from .instrumentation import get_hotpath_stats, reset_hotpath_stats
+from .exports import export_path, get_export_progress
 import re
 import time
 import os
 from django.contrib.auth import views as auth_views
+from django.contrib.auth.decorators import login_required
 
-def invalidate_notification_cache():
+def invalidate_notification_cache(model=None):
     """
     Invalidate notification counts cache
-    Dipanggil ketika ada perubahan data yang mempengaruhi notification counts
+    Dipanggil ketika ada perubahan data yang mempengaruhi notification counts.
+    Jika model diberikan, hanya counter yang dipengaruhi model tersebut yang dihapus.
     """
-    cache.delete('notification_counts')
+    if model is None:
+        invalidate_counters()
+    else:
+        invalidate_for_model(model)
 
 class CustomLoginView(auth_views.LoginView):
     template_name = 'registration/login.html'
@@ -57,129 +64,77 @@ def favicon(request):
 def api_notification_counts(request):
     """
     API endpoint untuk mendapatkan jumlah notifikasi
-    Digunakan untuk auto-refresh notification counts di frontend
+    Digunakan untuk auto-refresh notification counts di frontend.
+    Staff bisa menambahkan ?stats=1 untuk melihat hit rate dan waktu recompute per counter.
     """
     start_time = time.time()
-    
-    # Cache key untuk notification counts
-    cache_key = 'notification_counts'
-    cache_timeout = 30  # 30 detik cache
-    
-    # Coba ambil dari cache dulu
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        cached_data['cached'] = True  # Mark as cached response
-        cached_data['response_time'] = round((time.time() - start_time) * 1000, 2)  # ms
-        return JsonResponse(cached_data)
-    
+
     try:
-        from inventory.models import RakTransferSession
-        
-        # Jumlah produk yang perlu di-putaway (regular putaway)
-        putaway_summary = Stock.objects.filter(quantity_putaway__gt=0).aggregate(
-            total_items=Count('product'),
-            total_quantity=Sum('quantity_putaway')
-        )
-        regular_putaway_count = putaway_summary['total_items'] or 0
-        regular_putaway_quantity = putaway_summary['total_quantity'] or 0
-        
-        # Jumlah transfer rak yang siap putaway
-        transfer_putaway_count = RakTransferSession.objects.filter(
-            status='ready_for_putaway', 
-            mode='transfer_putaway'
-        ).count()
-        
-        # Total putaway count (regular + transfer)
-        total_putaway_count = regular_putaway_count + transfer_putaway_count
-        total_putaway_quantity = regular_putaway_quantity
-        
-        # Jumlah opname queue yang pending
-        opname_queue_count = OpnameQueue.objects.filter(status='pending').count()
-        
-        # Jumlah batch yang open
-        batch_open_count = BatchList.objects.filter(status_batch='open').count()
-        
-        # Return List badges
-        # Jumlah session return yang masih open
-        return_session_open_count = ReturnSession.objects.filter(status='open').count()
-        
-        # Jumlah SKU dalam session yang belum di putaway
-        return_sku_pending_putaway = ReturnItem.objects.filter(
-            session__status='open',
-            putaway_status__in=['pending', 'partial']
-        ).values('product').distinct().count()
-        
-        # Ready to Print List badges
-        # Jumlah order yang sudah di-print tapi belum diserahkan
-        ready_to_print_not_handed_over = ReadyToPrint.objects.filter(
-            status_print='printed',
-            handed_over_at__isnull=True
-        ).count()
-        
-        # Purchase Verify badges
-        # Jumlah purchase yang sudah received tapi belum di-verify
-        from purchasing.models import Purchase, PurchasePayment, PurchaseTaxInvoice
-        purchase_verify_pending_count = Purchase.objects.filter(status='received').count()
-        
-        # Purchase Tax Invoice badges
-        # Jumlah purchase yang sudah verified tapi has_tax_invoice=True dan belum ada tax invoice
-        purchase_taxinvoice_pending_count = Purchase.objects.filter(
-            status='verified',
-            has_tax_invoice=True
-        ).exclude(
-            tax_invoice__status__in=['received', 'verified']
-        ).count()
-        
-        # Purchase Payment badges
-        # Jumlah payment yang belum lunas (unpaid, partial, overdue)
-        purchase_payment_unpaid_count = PurchasePayment.objects.filter(
-            status__in=['unpaid', 'partial', 'overdue']
-        ).count()
-        
-        response_data = {
+        values, recomputed = get_counters()
+        response_data = build_notification_counts(values)
+        response_data.update({
             'success': True,
-            'putaway_count': total_putaway_count,  # Total dari regular + transfer
-            'putaway_quantity': total_putaway_quantity,
-            'regular_putaway_count': regular_putaway_count,
-            'transfer_putaway_count': transfer_putaway_count,
-            'opname_queue_count': opname_queue_count,
-            'batch_open_count': batch_open_count,
-            'return_session_open_count': return_session_open_count,
-            'return_sku_pending_putaway': return_sku_pending_putaway,
-            'ready_to_print_not_handed_over': ready_to_print_not_handed_over,
-            'purchase_verify_pending_count': purchase_verify_pending_count,
-            'purchase_taxinvoice_pending_count': purchase_taxinvoice_pending_count,
-            'purchase_payment_unpaid_count': purchase_payment_unpaid_count,
-            'cached': False,
+            'cached': recomputed == 0,
+            'recomputed': recomputed,
             'response_time': round((time.time() - start_time) * 1000, 2)  # ms
-        }
-        
-        # Simpan ke cache
-        cache.set(cache_key, response_data, cache_timeout)
-        
+        })
+        if request.GET.get('stats') and request.user.is_staff:
+            response_data['stats'] = get_counter_stats()
         return JsonResponse(response_data)
-        
+
     except Exception as e:
-        error_data = {
+        error_data = dict(EMPTY_COUNTS)
+        error_data.update({
             'success': False,
             'error': str(e),
-            'putaway_count': 0,
-            'putaway_quantity': 0,
-            'regular_putaway_count': 0,
-            'transfer_putaway_count': 0,
-            'opname_queue_count': 0,
-            'batch_open_count': 0,
-            'return_session_open_count': 0,
-            'return_sku_pending_putaway': 0,
-            'ready_to_print_not_handed_over': 0,
-            'purchase_verify_pending_count': 0,
-            'purchase_taxinvoice_pending_count': 0,
-            'purchase_payment_unpaid_count': 0,
             'cached': False,
             'response_time': round((time.time() - start_time) * 1000, 2)  # ms
-        }
-        
-        # Cache error response juga untuk menghindari spam
-        cache.set(cache_key, error_data, 60)  # Cache error lebih lama
-        
+        })
         return JsonResponse(error_data, status=500)
+
+
+@login_required
+def api_hotpath_stats(request):
+    """
+    Statistik latency hot path (p50/p95/p99 per endpoint, durasi per fase, query DB per request).
+    Hanya untuk staff. ?local=1 hanya menampilkan proses yang melayani request ini,
+    POST ?reset=1 mengosongkan semua histogram.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Hanya untuk staff.'}, status=403)
+
+    if request.method == 'POST' and request.GET.get('reset'):
+        reset_hotpath_stats()
+        return JsonResponse({'success': True, 'reset': True})
+
+    stats = get_hotpath_stats(include_shared=not request.GET.get('local'))
+    stats['success'] = True
+    return JsonResponse(stats)
+
+
+def _export_owned(request, progress):
+    return progress is not None and (progress.get('user_id') == request.user.id or request.user.is_superuser)
+
+
+@login_required
+def api_export_status(request):
+    """Status export laporan di background (erp_alfa.exports) berdasarkan task_id."""
+    task_id = request.GET.get('task_id', '')
+    progress = get_export_progress(task_id)
+    if not _export_owned(request, progress):
+        return JsonResponse({'status': 'unknown', 'task_id': task_id}, status=404)
+    data = {key: value for key, value in progress.items() if key != 'user_id'}
+    return JsonResponse({**data, 'task_id': task_id})
+
+
+@login_required
+def export_download(request, task_id):
+    """Download file hasil export background (hanya user yang memulai export)."""
+    progress = get_export_progress(task_id)
+    if not _export_owned(request, progress) or progress.get('status') != 'done':
+        raise Http404('Export tidak ditemukan')
+    file_name = progress['file_name']
+    path = export_path(task_id, file_name.rsplit('.', 1)[-1])
+    if not os.path.exists(path):
+        raise Http404('File export sudah kedaluwarsa')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=file_name)
@@ -0,0 +1,208 @@
+"""
+Posting jurnal massal: banyak JournalEntry beserta item disimpan sekaligus (verifikasi
+purchase, pembayaran end-of-day, upload faktur pajak).
+
+- get_account(): chart of accounts dari cache lokal per proses, dimuat sekali per generasi.
+  Signal Account/AccountType (models.py) menaikkan generasi di cache Django setelah commit,
+  proses lain memuat ulang paling lama GENERATION_CHECK_INTERVAL detik kemudian. Akun yang
+  belum ada dibuat seperti get_or_create_account_by_code lama.
+- JournalBatch: add() mengumpulkan entry + item (divalidasi balance), commit() menyimpan
+  seluruhnya dalam satu transaksi:
+  1. nomor entry dipesan per blok prefix dari DocumentSequence, bertanggal hari ini
+     (timezone.localdate(), sama dengan create_journal_entry_number lama), bukan entry_date
+  2. JournalEntry dan JournalEntryItem di-bulk_create
+  3. saldo AccountPeriodBalance diterapkan sekali (bulk_create tidak memicu signal saldo)
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger_balances import apply_deltas, as_date
+from .models import Account, AccountType, JournalEntry, JournalEntryItem
+from .sequences import document_numbers
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'journal_batch:accounts:generation'
+GENERATION_CHECK_INTERVAL = 5.0
+BULK_BATCH_SIZE = 1000
+ZERO = Decimal('0')
+
+JournalLine = namedtuple('JournalLine', ['account', 'debit', 'credit', 'description'])
+
+_lock = threading.Lock()
+_accounts = {}
+_accounts_generation = None
+_generation_checked_at = 0.0
+
+
+# ---------------------------------------------------------------------------
+# Cache chart of accounts
+# ---------------------------------------------------------------------------
+
+def _shared_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY) or 1
+    return generation
+
+
+def _cached_accounts():
+    """{code: Account} aktif untuk generasi saat ini; dimuat ulang jika generasi berubah."""
+    global _accounts, _accounts_generation, _generation_checked_at
+    now = time.monotonic()
+    if _accounts_generation is not None and now - _generation_checked_at < GENERATION_CHECK_INTERVAL:
+        return _accounts
+    generation = _shared_generation()
+    if generation != _accounts_generation:
+        accounts = {account.code: account for account in Account.objects.select_related('account_type')}
+        with _lock:
+            _accounts = accounts
+            _accounts_generation = generation
+    _generation_checked_at = now
+    return _accounts
+
+
+def invalidate_account_cache():
+    """Naikkan generasi sehingga cache chart of accounts di seluruh proses dimuat ulang."""
+    global _accounts, _accounts_generation, _generation_checked_at
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, _shared_generation() + 1, None)
+        generation = cache.get(GENERATION_KEY)
+    with _lock:
+        _accounts = {}
+        _accounts_generation = None
+        _generation_checked_at = 0.0
+    return generation
+
+
+def get_account(code, name, account_type_code, balance_type):
+    """
+    Akun berdasarkan kode dari cache; jika belum ada dibuat (is_system) dengan AccountType
+    account_type_code. Akun baru tidak dimasukkan cache sampai transaksi commit (signal).
+    """
+    account = _cached_accounts().get(code)
+    if account is not None:
+        return account
+
+    account_type, _ = AccountType.objects.get_or_create(
+        code=account_type_code,
+        defaults={
+            'name': account_type_code,
+            'type': 'ASSET' if account_type_code.startswith('1') else
+                    'LIABILITY' if account_type_code.startswith('2') else 'EXPENSE'
+        }
+    )
+    account, _ = Account.objects.get_or_create(
+        code=code,
+        defaults={
+            'name': name,
+            'account_type': account_type,
+            'balance_type': balance_type,
+            'is_system': True
+        }
+    )
+    return account
+
+
+# ---------------------------------------------------------------------------
+# Batch posting
+# ---------------------------------------------------------------------------
+
+class JournalBatch:
+    """
+    Kumpulan journal entry yang disimpan sekaligus.
+
+        batch = JournalBatch(user)
+        batch.add('PV', tanggal, 'Verifikasi ...', [JournalLine(akun, 1000, 0, ''), ...], purchase.nomor_purchase, purchase)
+        entries = batch.commit()
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self._pending = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, prefix, entry_date, description, lines, reference=None, related_object=None, user=None,
+            status='posted'):
+        """
+        Tambah satu entry. lines: iterable JournalLine / (account, debit, credit, description);
+        baris nol dilewati, total debit harus sama dengan credit. Return JournalEntry (belum
+        tersimpan; entry_number dan pk terisi setelah commit).
+        """
+        user = user or self.user
+        items = []
+        for account, debit, credit, item_description in lines:
+            debit = Decimal(str(debit or 0))
+            credit = Decimal(str(credit or 0))
+            if debit < 0 or credit < 0:
+                raise ValueError(f"Debit/credit tidak boleh negatif ({account.code})")
+            if not debit and not credit:
+                continue
+            items.append(JournalEntryItem(account=account, debit=debit, credit=credit, description=item_description))
+        if not items:
+            raise ValueError(f"Journal entry '{description}' tidak punya item")
+        total_debit = sum((item.debit for item in items), ZERO)
+        total_credit = sum((item.credit for item in items), ZERO)
+        if total_debit != total_credit:
+            raise ValueError(f"Journal entry '{description}' tidak balance (debit {total_debit} != credit {total_credit})")
+
+        posted = status == 'posted'
+        entry = JournalEntry(
+            entry_date=as_date(entry_date or timezone.localdate()),
+            reference=reference,
+            description=description,
+            status=status,
+            content_type=ContentType.objects.get_for_model(related_object) if related_object is not None else None,
+            object_id=related_object.pk if related_object is not None else None,
+            created_by=user,
+            posted_by=user if posted else None,
+            posted_at=timezone.now() if posted else None,
+        )
+        self._pending.append((prefix, entry, items))
+        return entry
+
+    def commit(self):
+        """Simpan seluruh entry dalam satu transaksi. Return list JournalEntry tersimpan (urut add)."""
+        if not self._pending:
+            return []
+        pending, self._pending = self._pending, []
+
+        by_prefix = defaultdict(list)
+        for prefix, entry, _ in pending:
+            by_prefix[prefix].append(entry)
+
+        with transaction.atomic():
+            # Urut prefix agar urutan lock counter sama antar transaksi.
+            tanggal = timezone.localdate()
+            for prefix, entries in sorted(by_prefix.items()):
+                numbers = document_numbers(prefix, len(entries), JournalEntry, 'entry_number', tanggal)
+                for entry, number in zip(entries, numbers):
+                    entry.entry_number = number
+
+            entries = JournalEntry.objects.bulk_create([entry for _, entry, _ in pending], batch_size=BULK_BATCH_SIZE)
+            items = []
+            deltas = []
+            for (_, entry, entry_items) in pending:
+                for item in entry_items:
+                    item.journal_entry = entry
+                    items.append(item)
+                    if entry.status == 'posted':
+                        deltas.append((item.account_id, entry.entry_date, item.debit, item.credit))
+            JournalEntryItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+            apply_deltas(deltas)
+
+        logger.info("JournalBatch: %s entry, %s item", len(entries), len(items))
+        return entries
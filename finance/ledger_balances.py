@@ -0,0 +1,296 @@
+"""
+Engine agregasi saldo buku besar: AccountPeriodBalance (total debit/credit item jurnal posted
+per akun per hari dan per bulan).
+
+- apply_deltas(): terapkan perubahan (akun, tanggal, debit, credit) ke baris harian dan bulanan
+  dalam transaksi yang sama. Dipanggil signal JournalEntry/JournalEntryItem (models.py).
+- account_totals(): total debit/credit per akun untuk rentang tanggal dalam satu query grouped:
+  bulan penuh dari baris bulanan, sisa hari di awal/akhir rentang dari baris harian.
+- account_tree() / roll_up(): hierarki Account.parent; total akun induk = total sendiri +
+  seluruh turunannya.
+- report_rows(): baris laporan (neraca saldo, laba rugi, neraca) per akun aktif.
+- rebuild_account_balances(): bangun ulang penuh dari JournalEntryItem (command
+  rebuild_account_balances, migrasi backfill).
+- find_balance_drift(): bandingkan tabel saldo dengan jumlah mentah JournalEntryItem
+  (command check_account_balances).
+
+Saldo hanya menghitung entry berstatus posted (definisi laporan sebelumnya): entry yang
+di-reverse keluar dari saldo dan entry reversal-nya masuk.
+"""
+import logging
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Account, AccountPeriodBalance, JournalEntry, JournalEntryItem
+
+logger = logging.getLogger(__name__)
+
+DAILY = AccountPeriodBalance.PERIOD_DAILY
+MONTHLY = AccountPeriodBalance.PERIOD_MONTHLY
+ZERO = Decimal('0')
+REBUILD_BATCH_SIZE = 1000
+
+ReportRow = namedtuple('ReportRow', [
+    'account', 'debit', 'credit', 'balance', 'total_debit', 'total_credit', 'total_balance', 'level', 'is_group',
+])
+BalanceDrift = namedtuple('BalanceDrift', ['checked', 'mismatched', 'samples'])
+
+
+def as_date(value):
+    """entry_date bisa berupa date, datetime (default timezone.now) atau string ISO dari form."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _month_start(tanggal):
+    return tanggal.replace(day=1)
+
+
+def _next_month(tanggal):
+    return (tanggal.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def signed_balance(balance_type, debit, credit):
+    """Saldo sesuai tipe saldo normal akun."""
+    return debit - credit if balance_type == 'DEBIT' else credit - debit
+
+
+# ---------------------------------------------------------------------------
+# Pemeliharaan inkremental
+# ---------------------------------------------------------------------------
+
+def posted_entry_date(entry_id):
+    """entry_date jika entry berstatus posted, None jika tidak (atau sudah tidak ada)."""
+    row = JournalEntry.objects.filter(pk=entry_id).values_list('status', 'entry_date').first()
+    return row[1] if row and row[0] == 'posted' else None
+
+
+def entry_deltas(entry_id, tanggal, sign):
+    """Delta seluruh item entry pada tanggal, sign 1 (tambah) / -1 (kurang)."""
+    return [
+        (account_id, tanggal, debit * sign, credit * sign)
+        for account_id, debit, credit in
+        JournalEntryItem.objects.filter(journal_entry_id=entry_id).values_list('account_id', 'debit', 'credit')
+    ]
+
+
+def apply_deltas(deltas):
+    """
+    Terapkan delta (account_id, tanggal, debit, credit) ke baris harian dan bulanan.
+    Baris yang belum ada dibuat lalu di-update F() urut key agar tidak deadlock antar transaksi.
+    Return jumlah baris yang berubah.
+    """
+    changes = defaultdict(lambda: [ZERO, ZERO])
+    for account_id, tanggal, debit, credit in deltas:
+        tanggal = as_date(tanggal)
+        for period, period_start in ((DAILY, tanggal), (MONTHLY, _month_start(tanggal))):
+            change = changes[(account_id, period, period_start)]
+            change[0] += Decimal(str(debit or 0))
+            change[1] += Decimal(str(credit or 0))
+    changes = {key: change for key, change in changes.items() if change[0] or change[1]}
+    if not changes:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        AccountPeriodBalance.objects.bulk_create([
+            AccountPeriodBalance(account_id=account_id, period=period, period_start=period_start)
+            for account_id, period, period_start in changes
+        ], ignore_conflicts=True)
+        for (account_id, period, period_start), (debit, credit) in sorted(changes.items()):
+            AccountPeriodBalance.objects.filter(
+                account_id=account_id, period=period, period_start=period_start,
+            ).update(debit=F('debit') + debit, credit=F('credit') + credit, updated_at=now)
+    return len(changes)
+
+
+# ---------------------------------------------------------------------------
+# Query laporan
+# ---------------------------------------------------------------------------
+
+def _period_filter(date_from=None, date_to=None):
+    """
+    Q baris AccountPeriodBalance yang menutup [date_from, date_to] tepat sekali: bulan yang
+    seluruhnya di dalam rentang dari baris bulanan, hari di bulan terpotong dari baris harian.
+    """
+    # Bulan penuh: period_start >= lower dan < upper
+    lower = None if date_from is None else (date_from if date_from.day == 1 else _next_month(date_from))
+    upper = None if date_to is None else _month_start(date_to + timedelta(days=1))
+
+    if lower is not None and upper is not None and lower >= upper:
+        days = Q(period=DAILY, period_start__gte=date_from, period_start__lte=date_to)
+        return days
+
+    months = Q(period=MONTHLY)
+    if lower is not None:
+        months &= Q(period_start__gte=lower)
+    if upper is not None:
+        months &= Q(period_start__lt=upper)
+    query = months
+    if date_from is not None and date_from < lower:
+        query |= Q(period=DAILY, period_start__gte=date_from, period_start__lt=lower)
+    if date_to is not None and upper <= date_to:
+        query |= Q(period=DAILY, period_start__gte=upper, period_start__lte=date_to)
+    return query
+
+
+def account_totals(date_from=None, date_to=None, account_ids=None):
+    """{account_id: (debit, credit)} item posted dengan entry_date di rentang, satu query grouped."""
+    rows = AccountPeriodBalance.objects.filter(_period_filter(date_from, date_to))
+    if account_ids is not None:
+        rows = rows.filter(account_id__in=account_ids)
+    return {
+        row['account_id']: (row['debit'] or ZERO, row['credit'] or ZERO)
+        for row in rows.values('account_id').annotate(debit=Sum('debit'), credit=Sum('credit')).order_by()
+    }
+
+
+def account_balance(account, date_to=None):
+    """Saldo satu akun (tanpa turunan) sampai date_to (None = seluruh periode)."""
+    debit, credit = account_totals(None, date_to, [account.pk]).get(account.pk, (ZERO, ZERO))
+    return signed_balance(account.balance_type, debit, credit)
+
+
+def account_tree():
+    """{account_id: Account} seluruh akun (account_type ter-join) untuk roll-up hierarki."""
+    return {account.pk: account for account in Account.objects.select_related('account_type')}
+
+
+def roll_up(totals, accounts):
+    """
+    Total hierarkis: {account_id: (debit, credit)} akun + seluruh turunannya lewat parent.
+    accounts dari account_tree(); parent melingkar dihentikan.
+    """
+    rolled = defaultdict(lambda: [ZERO, ZERO])
+    for account_id, (debit, credit) in totals.items():
+        seen = set()
+        current = account_id
+        while current is not None and current not in seen:
+            seen.add(current)
+            rolled[current][0] += debit
+            rolled[current][1] += credit
+            account = accounts.get(current)
+            current = account.parent_id if account else None
+    return {account_id: tuple(value) for account_id, value in rolled.items()}
+
+
+def _level(account, accounts):
+    level, seen = 0, {account.pk}
+    while account.parent_id and account.parent_id not in seen and account.parent_id in accounts:
+        seen.add(account.parent_id)
+        account = accounts[account.parent_id]
+        level += 1
+    return level
+
+
+def report_rows(date_from=None, date_to=None, types=None):
+    """
+    Baris laporan akun aktif (urut kode) yang punya mutasi sendiri atau dari turunannya:
+    ReportRow(account, debit, credit, balance [akun sendiri], total_debit, total_credit,
+    total_balance [termasuk turunan], level, is_group). types: filter AccountType.type.
+    """
+    accounts = account_tree()
+    totals = account_totals(date_from, date_to)
+    rolled = roll_up(totals, accounts)
+    has_children = {account.parent_id for account in accounts.values() if account.parent_id}
+
+    rows = []
+    for account_id, (total_debit, total_credit) in rolled.items():
+        account = accounts.get(account_id)
+        if account is None or not account.is_active:
+            continue
+        if types is not None and account.account_type.type not in types:
+            continue
+        debit, credit = totals.get(account_id, (ZERO, ZERO))
+        rows.append(ReportRow(
+            account, debit, credit, signed_balance(account.balance_type, debit, credit),
+            total_debit, total_credit, signed_balance(account.balance_type, total_debit, total_credit),
+            _level(account, accounts), account_id in has_children,
+        ))
+    rows.sort(key=lambda row: row.account.code)
+    return rows
+
+
+def balances_by_type(date_from=None, date_to=None):
+    """{AccountType.type: total saldo akun aktif (tanpa double count turunan)}."""
+    result = defaultdict(lambda: ZERO)
+    for row in report_rows(date_from, date_to):
+        result[row.account.account_type.type] += row.balance
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Rebuild dan pengecekan konsistensi
+# ---------------------------------------------------------------------------
+
+def _posted_items():
+    return JournalEntryItem.objects.filter(journal_entry__status='posted')
+
+
+def compute_period_balances():
+    """Hitung penuh dari JournalEntryItem: {(account_id, period, period_start): (debit, credit)}."""
+    expected = {}
+    daily = (
+        _posted_items().values('account_id', 'journal_entry__entry_date')
+        .annotate(debit=Sum('debit'), credit=Sum('credit')).order_by()
+    )
+    for row in daily:
+        expected[(row['account_id'], DAILY, row['journal_entry__entry_date'])] = (row['debit'], row['credit'])
+    monthly = (
+        _posted_items().annotate(bulan=TruncMonth('journal_entry__entry_date')).values('account_id', 'bulan')
+        .annotate(debit=Sum('debit'), credit=Sum('credit')).order_by()
+    )
+    for row in monthly:
+        expected[(row['account_id'], MONTHLY, as_date(row['bulan']))] = (row['debit'], row['credit'])
+    return {key: value for key, value in expected.items() if value[0] or value[1]}
+
+
+def rebuild_account_balances():
+    """
+    Bangun ulang seluruh AccountPeriodBalance dari JournalEntryItem posted (satu transaksi).
+    Return jumlah baris.
+    """
+    expected = compute_period_balances()
+    with transaction.atomic():
+        AccountPeriodBalance.objects.all().delete()
+        AccountPeriodBalance.objects.bulk_create([
+            AccountPeriodBalance(
+                account_id=account_id, period=period, period_start=period_start, debit=debit, credit=credit,
+            )
+            for (account_id, period, period_start), (debit, credit) in expected.items()
+        ], batch_size=REBUILD_BATCH_SIZE)
+    logger.info("rebuild_account_balances: %s baris saldo periode", len(expected))
+    return len(expected)
+
+
+def find_balance_drift(sample_limit=20):
+    """
+    Bandingkan AccountPeriodBalance dengan jumlah mentah JournalEntryItem posted.
+    Return BalanceDrift(checked, mismatched, samples); samples berisi
+    (account_id, period, period_start, tersimpan, seharusnya). Baris nol dianggap tidak ada.
+    """
+    expected = compute_period_balances()
+    stored = {
+        (account_id, period, period_start): (debit, credit)
+        for account_id, period, period_start, debit, credit in
+        AccountPeriodBalance.objects.values_list('account_id', 'period', 'period_start', 'debit', 'credit')
+        if debit or credit
+    }
+    keys = set(expected) | set(stored)
+    mismatched = 0
+    samples = []
+    for key in sorted(keys):
+        if expected.get(key) != stored.get(key):
+            mismatched += 1
+            if len(samples) < sample_limit:
+                samples.append((*key, stored.get(key), expected.get(key)))
+    return BalanceDrift(len(keys), mismatched, samples)
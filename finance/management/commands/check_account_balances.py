@@ -0,0 +1,43 @@
+"""
+Management command untuk membandingkan AccountPeriodBalance inkremental dengan jumlah mentah
+debit/credit JournalEntryItem posted (per akun per hari dan per bulan).
+
+Usage:
+    python manage.py check_account_balances            # laporan drift, exit error jika ada
+    python manage.py check_account_balances --verbose  # tampilkan contoh perbedaan
+    python manage.py check_account_balances --fix      # rebuild penuh jika drift
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.ledger_balances import find_balance_drift, rebuild_account_balances
+
+
+class Command(BaseCommand):
+    help = 'Consistency check saldo akun per periode vs jumlah JournalEntryItem'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rebuild penuh jika ada drift')
+        parser.add_argument('--verbose', action='store_true', help='Tampilkan contoh perbedaan')
+        parser.add_argument('--samples', type=int, default=20, help='Jumlah contoh perbedaan yang disimpan')
+
+    def handle(self, *args, **options):
+        drift = find_balance_drift(sample_limit=options['samples'])
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Baris saldo dicek    : {drift.checked}")
+        self.stdout.write(f"Baris berbeda        : {drift.mismatched}")
+        if options.get('verbose'):
+            for account_id, period, period_start, stored, expected in drift.samples:
+                self.stdout.write(f"    akun {account_id} {period} {period_start}: {stored!r} → seharusnya {expected!r}")
+
+        if drift.mismatched and options.get('fix'):
+            rows = rebuild_account_balances()
+            self.stdout.write(f"  → {rows} baris saldo dibangun ulang")
+            drift = find_balance_drift(sample_limit=options['samples'])
+
+        self.stdout.write("=" * 60)
+        if drift.mismatched:
+            raise CommandError(f"{drift.mismatched} baris saldo drift")
+        self.stdout.write(self.style.SUCCESS(f"✓ {drift.checked} baris saldo konsisten"))
+        self.stdout.write("=" * 60)
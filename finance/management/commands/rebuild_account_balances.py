@@ -0,0 +1,34 @@
+"""
+Management command untuk membangun ulang AccountPeriodBalance (saldo akun harian/bulanan)
+dari JournalEntryItem posted.
+
+Usage:
+    python manage.py rebuild_account_balances          # rebuild penuh
+    python manage.py rebuild_account_balances --check  # rebuild lalu cek konsistensi
+
+Jalankan di luar jam posting jurnal: posting yang terjadi selama rebuild bisa tertimpa
+(cek ulang dengan check_account_balances).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.ledger_balances import find_balance_drift, rebuild_account_balances
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang saldo akun per periode (AccountPeriodBalance) dari jurnal posted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Cek konsistensi setelah rebuild')
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "=" * 60)
+        rows = rebuild_account_balances()
+        self.stdout.write(self.style.SUCCESS(f"✓ {rows} baris saldo periode dibangun ulang"))
+
+        if options.get('check'):
+            drift = find_balance_drift()
+            if drift.mismatched:
+                raise CommandError(f"{drift.mismatched} dari {drift.checked} baris saldo tidak konsisten")
+            self.stdout.write(self.style.SUCCESS(f"✓ {drift.checked} baris konsisten dengan JournalEntryItem"))
+        self.stdout.write("=" * 60)
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:21
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_period_balances(apps, schema_editor):
+    # Saldo awal dari jurnal posted yang sudah ada (sama dengan ledger_balances.rebuild_account_balances)
+    JournalEntryItem = apps.get_model('finance', 'JournalEntryItem')
+    AccountPeriodBalance = apps.get_model('finance', 'AccountPeriodBalance')
+    rows = (
+        JournalEntryItem.objects.filter(journal_entry__status='posted')
+        .values('account_id', 'journal_entry__entry_date')
+        .annotate(debit=Sum('debit'), credit=Sum('credit')).order_by()
+    )
+    balances = {}
+    for row in rows:
+        tanggal = row['journal_entry__entry_date']
+        for key in ((row['account_id'], 'day', tanggal), (row['account_id'], 'month', tanggal.replace(day=1))):
+            debit, credit = balances.get(key, (Decimal('0'), Decimal('0')))
+            balances[key] = (debit + row['debit'], credit + row['credit'])
+    AccountPeriodBalance.objects.bulk_create([
+        AccountPeriodBalance(account_id=account_id, period=period, period_start=period_start, debit=debit, credit=credit)
+        for (account_id, period, period_start), (debit, credit) in balances.items()
+        if debit or credit
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Harian'), ('month', 'Bulanan')], max_length=5)),
+                ('period_start', models.DateField(help_text='Tanggal (harian) atau tanggal 1 bulan (bulanan)')),
+                ('debit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18)),
+                ('credit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='finance.account')),
+            ],
+            options={
+                'verbose_name': 'Account Period Balance',
+                'verbose_name_plural': 'Account Period Balances',
+                'ordering': ['account', 'period', 'period_start'],
+                'indexes': [models.Index(fields=['period', 'period_start'], name='acct_period_start_idx')],
+                'unique_together': {('account', 'period', 'period_start')},
+            },
+        ),
+        migrations.RunPython(backfill_period_balances, migrations.RunPython.noop),
+    ]
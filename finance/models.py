@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator
@@ -71,25 +73,9 @@ class Account(models.Model):
     
     @property
     def current_balance(self):
-        """Hitung saldo akun saat ini"""
-        from django.db.models import Sum, Q
-        
-        # Hitung total debit dan credit
-        debit_total = self.journal_items.filter(
-            journal_entry__status='posted',
-            debit__gt=0
-        ).aggregate(Sum('debit'))['debit__sum'] or Decimal('0')
-        
-        credit_total = self.journal_items.filter(
-            journal_entry__status='posted',
-            credit__gt=0
-        ).aggregate(Sum('credit'))['credit__sum'] or Decimal('0')
-        
-        # Tentukan saldo berdasarkan balance_type
-        if self.balance_type == 'DEBIT':
-            return debit_total - credit_total
-        else:
-            return credit_total - debit_total
+        """Hitung saldo akun saat ini (dari AccountPeriodBalance, satu query)"""
+        from .ledger_balances import account_balance
+        return account_balance(self)
     
     @property
     def formatted_balance(self):
@@ -154,19 +140,9 @@ class JournalEntry(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.entry_number:
-            # Auto-generate entry number
-            date_str = timezone.now().strftime('%Y%m%d')
-            last_entry = JournalEntry.objects.filter(
-                entry_number__startswith=f'JE-{date_str}'
-            ).order_by('-entry_number').first()
-            
-            if last_entry:
-                last_id = int(last_entry.entry_number.split('-')[-1])
-                new_id = last_id + 1
-            else:
-                new_id = 1
-            
-            self.entry_number = f"JE-{date_str}-{new_id:04d}"
+            # Auto-generate entry number (counter DocumentSequence, aman untuk posting paralel)
+            from .sequences import journal_entry_number
+            self.entry_number = journal_entry_number('JE')
         
         super().save(*args, **kwargs)
     
@@ -268,6 +244,59 @@ class JournalEntryItem(models.Model):
             raise ValidationError("Tidak boleh debit dan credit keduanya > 0")
 
 
+class AccountPeriodBalance(models.Model):
+    """
+    Total debit/credit item jurnal posted per akun per periode (harian dan bulanan).
+    Dipelihara signal JournalEntry/JournalEntryItem (ledger_balances.apply_deltas) dan
+    dibangun ulang oleh command rebuild_account_balances.
+    """
+    PERIOD_DAILY = 'day'
+    PERIOD_MONTHLY = 'month'
+    PERIOD_CHOICES = [
+        (PERIOD_DAILY, 'Harian'),
+        (PERIOD_MONTHLY, 'Bulanan'),
+    ]
+    
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='period_balances')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="Tanggal (harian) atau tanggal 1 bulan (bulanan)")
+    debit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'))
+    credit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['account', 'period', 'period_start']
+        verbose_name = 'Account Period Balance'
+        verbose_name_plural = 'Account Period Balances'
+        unique_together = ('account', 'period', 'period_start')
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='acct_period_start_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account.code} - {self.period} {self.period_start} - D:{self.debit} C:{self.credit}"
+
+
+class DocumentSequence(models.Model):
+    """
+    Counter nomor dokumen per prefix per periode (tanggal). last_value = nomor terakhir yang
+    sudah dipesan; dinaikkan atomik oleh finance.sequences.reserve.
+    """
+    prefix = models.CharField(max_length=20)
+    period = models.CharField(max_length=10, blank=True, default='', help_text="Tanggal ISO (counter harian) atau kosong")
+    last_value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['prefix', 'period']
+        verbose_name = 'Document Sequence'
+        verbose_name_plural = 'Document Sequences'
+        unique_together = ('prefix', 'period')
+    
+    def __str__(self):
+        return f"{self.prefix} {self.period} = {self.last_value}"
+
+
 class CashFlow(models.Model):
     """Cash Flow - Arus Kas"""
     CATEGORY_CHOICES = [
@@ -518,3 +547,79 @@ class FinanceSettings(models.Model):
     
     def __str__(self):
         return f"{self.key} = {self.value}"
+
+
+# ==================== LEDGER BALANCE SIGNALS ====================
+
+@receiver(pre_save, sender=JournalEntry)
+def remember_journal_entry_state(sender, instance, **kwargs):
+    """Simpan status/tanggal lama untuk menghitung perpindahan saldo di post_save."""
+    instance._ledger_previous = None
+    if instance.pk:
+        instance._ledger_previous = (
+            JournalEntry.objects.filter(pk=instance.pk).values_list('status', 'entry_date').first()
+        )
+
+
+@receiver(post_save, sender=JournalEntry)
+def sync_balances_on_entry_save(sender, instance, **kwargs):
+    """
+    Entry menjadi posted -> item ditambahkan ke saldo; keluar dari posted (reversed/cancelled/
+    draft) -> item dikurangkan; tetap posted tapi entry_date berubah -> saldo dipindah.
+    """
+    from .ledger_balances import apply_deltas, as_date, entry_deltas
+    previous = getattr(instance, '_ledger_previous', None)
+    was_posted = bool(previous) and previous[0] == 'posted'
+    is_posted = instance.status == 'posted'
+    new_date = as_date(instance.entry_date)
+    deltas = []
+    if was_posted and (not is_posted or previous[1] != new_date):
+        deltas += entry_deltas(instance.pk, previous[1], -1)
+    if is_posted and (not was_posted or previous[1] != new_date):
+        deltas += entry_deltas(instance.pk, new_date, 1)
+    apply_deltas(deltas)
+
+
+@receiver(pre_save, sender=JournalEntryItem)
+def remember_journal_item_state(sender, instance, **kwargs):
+    instance._ledger_previous = None
+    if instance.pk:
+        instance._ledger_previous = (
+            JournalEntryItem.objects.filter(pk=instance.pk)
+            .values_list('account_id', 'debit', 'credit', 'journal_entry_id').first()
+        )
+
+
+@receiver(post_save, sender=JournalEntryItem)
+def sync_balances_on_item_save(sender, instance, **kwargs):
+    """Item entry posted yang dibuat/diubah: selisih nilai lama dan baru diterapkan ke saldo."""
+    from .ledger_balances import apply_deltas, posted_entry_date
+    deltas = []
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous:
+        account_id, debit, credit, entry_id = previous
+        tanggal = posted_entry_date(entry_id)
+        if tanggal:
+            deltas.append((account_id, tanggal, -debit, -credit))
+    tanggal = posted_entry_date(instance.journal_entry_id)
+    if tanggal:
+        deltas.append((instance.account_id, tanggal, instance.debit, instance.credit))
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=JournalEntryItem)
+def sync_balances_on_item_delete(sender, instance, **kwargs):
+    from .ledger_balances import apply_deltas, posted_entry_date
+    tanggal = posted_entry_date(instance.journal_entry_id)
+    if tanggal:
+        apply_deltas([(instance.account_id, tanggal, -instance.debit, -instance.credit)])
+
+
+# ==================== CHART OF ACCOUNTS CACHE ====================
+
+@receiver([post_save, post_delete], sender=Account)
+@receiver([post_save, post_delete], sender=AccountType)
+def invalidate_account_cache_on_change(sender, instance, **kwargs):
+    """Cache akun journal_batch dimuat ulang setelah perubahan chart of accounts commit."""
+    from .journal_batch import invalidate_account_cache
+    transaction.on_commit(invalidate_account_cache)
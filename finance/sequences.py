@@ -0,0 +1,101 @@
+"""
+Penomoran dokumen (journal entry, PO, purchase, inbound) dari counter DocumentSequence per
+prefix per hari.
+
+- reserve(): naikkan counter sebanyak count secara atomik (UPDATE last_value = last_value + n,
+  baris ter-lock sampai transaksi selesai) dan return nilai terakhir blok. Tidak ada lagi
+  query startswith + order_by desc per nomor, sehingga posting paralel tidak menghasilkan
+  nomor kembar.
+- document_number() / document_numbers(): nomor terformat PREFIX-YYYYMMDD-0001, satu atau
+  satu blok sekaligus (import massal).
+- preview_document_number(): perkiraan nomor berikutnya untuk mengisi form (tidak memesan,
+  counter tidak berubah); nomor sebenarnya dipesan saat dokumen disimpan.
+
+Counter baru (prefix/hari pertama kali dipakai) diawali nomor terbesar yang sudah ada di
+tabel dokumen untuk hari itu, sehingga aman dipasang di tengah hari. Counter dipesan dalam
+transaksi pemanggil: jika transaksi rollback nomor ikut kembali (tidak bolong), konsekuensinya
+dokumen dengan prefix/hari yang sama menunggu transaksi sebelumnya selesai.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentSequence, JournalEntry
+
+logger = logging.getLogger(__name__)
+
+
+def _bump(prefix, period, count):
+    return DocumentSequence.objects.filter(prefix=prefix, period=period).update(
+        last_value=F('last_value') + count, updated_at=timezone.now(),
+    )
+
+
+def reserve(prefix, period='', count=1, seed=None):
+    """
+    Pesan count nomor berurutan untuk (prefix, period). Return nilai terakhir; blok yang
+    dipesan adalah last - count + 1 .. last. seed: callable nilai awal counter baru.
+    """
+    if count < 1:
+        raise ValueError("count harus >= 1")
+    with transaction.atomic():
+        if not _bump(prefix, period, count):
+            start = seed() if seed else 0
+            DocumentSequence.objects.bulk_create(
+                [DocumentSequence(prefix=prefix, period=period, last_value=start)], ignore_conflicts=True,
+            )
+            _bump(prefix, period, count)
+        return DocumentSequence.objects.filter(prefix=prefix, period=period).values_list('last_value', flat=True).get()
+
+
+def _head(prefix, tanggal, separator, date_format):
+    return f"{prefix}{separator}{tanggal.strftime(date_format)}{separator}"
+
+
+def _existing_max(model, field, head):
+    """Nomor urut terbesar dokumen yang sudah ada dengan awalan head (untuk counter baru)."""
+    if model is None:
+        return 0
+    highest = 0
+    for value in model._base_manager.filter(**{f'{field}__startswith': head}).values_list(field, flat=True):
+        suffix = value[len(head):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
+
+
+def document_numbers(prefix, count, model=None, field=None, tanggal=None, width=4,
+                     separator='-', date_format='%Y%m%d'):
+    """
+    Pesan count nomor dokumen sekaligus (satu UPDATE) untuk tanggal (default hari ini, lokal).
+    model/field: tabel dokumen untuk nilai awal counter baru. Return list nomor terurut.
+    """
+    tanggal = tanggal or timezone.localdate()
+    head = _head(prefix, tanggal, separator, date_format)
+    last = reserve(prefix, tanggal.isoformat(), count, seed=lambda: _existing_max(model, field, head))
+    return [f"{head}{value:0{width}d}" for value in range(last - count + 1, last + 1)]
+
+
+def document_number(prefix, model=None, field=None, tanggal=None, width=4, separator='-', date_format='%Y%m%d'):
+    """Satu nomor dokumen, contoh document_number('PO', PurchaseOrder, 'nomor_po') -> PO-20250101-0001."""
+    return document_numbers(prefix, 1, model, field, tanggal, width, separator, date_format)[0]
+
+
+def preview_document_number(prefix, model=None, field=None, tanggal=None, width=4, separator='-',
+                            date_format='%Y%m%d'):
+    """Nomor berikutnya (counter + 1) tanpa memesan; bisa berbeda dengan nomor saat disimpan."""
+    tanggal = tanggal or timezone.localdate()
+    head = _head(prefix, tanggal, separator, date_format)
+    last = DocumentSequence.objects.filter(prefix=prefix, period=tanggal.isoformat()).values_list(
+        'last_value', flat=True
+    ).first()
+    if last is None:
+        last = _existing_max(model, field, head)
+    return f"{head}{last + 1:0{width}d}"
+
+
+def journal_entry_number(prefix='JE', tanggal=None):
+    """Nomor JournalEntry PREFIX-YYYYMMDD-NNNN."""
+    return document_number(prefix, JournalEntry, 'entry_number', tanggal)
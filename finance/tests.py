@@ -1,3 +1,238 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .journal_batch import JournalBatch, JournalLine
+from .ledger_balances import _period_filter, account_totals, find_balance_drift
+from .models import Account, AccountPeriodBalance, AccountType, DocumentSequence, JournalEntry, JournalEntryItem
+from .sequences import document_number, document_numbers, preview_document_number
+
+
+class DocumentSequenceTest(TestCase):
+    """Nomor dokumen dari counter DocumentSequence."""
+
+    TANGGAL = date(2025, 1, 15)
+
+    def test_block_continues_counter(self):
+        self.assertEqual(document_number('TS', tanggal=self.TANGGAL), 'TS-20250115-0001')
+        self.assertEqual(
+            document_numbers('TS', 3, tanggal=self.TANGGAL),
+            ['TS-20250115-0002', 'TS-20250115-0003', 'TS-20250115-0004'],
+        )
+        self.assertEqual(preview_document_number('TS', tanggal=self.TANGGAL), 'TS-20250115-0005')
+        self.assertEqual(DocumentSequence.objects.get(prefix='TS', period='2025-01-15').last_value, 4)
+
+    def test_counter_per_day(self):
+        document_numbers('TS', 2, tanggal=self.TANGGAL)
+        self.assertEqual(document_number('TS', tanggal=date(2025, 1, 16)), 'TS-20250116-0001')
+
+
+class DocumentSequenceConcurrencyTest(TransactionTestCase):
+    """Beberapa proses memesan nomor secara paralel: tidak boleh ada nomor kembar atau bolong."""
+
+    WORKERS = 6
+    ROUNDS = 10
+    BLOCK = 3
+    TANGGAL = date(2025, 1, 15)
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Database test SQLite in-memory (shared cache) langsung menolak writer paralel
+            self.skipTest('Butuh database yang mendukung koneksi paralel (PostgreSQL / SQLite file)')
+
+    def _reserve_concurrently(self, count):
+        numbers = []
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker():
+            local = []
+            try:
+                barrier.wait()
+                for _ in range(self.ROUNDS):
+                    try:
+                        local.extend(document_numbers('TC', count, tanggal=self.TANGGAL))
+                    except Exception as e:
+                        errors.append(repr(e))
+            finally:
+                with lock:
+                    numbers.extend(local)
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return numbers, errors
+
+    def _assert_contiguous(self, numbers, total):
+        self.assertEqual(len(numbers), total)
+        self.assertEqual(len(set(numbers)), total)
+        self.assertEqual(sorted(numbers), [f'TC-20250115-{value:04d}' for value in range(1, total + 1)])
+        self.assertEqual(DocumentSequence.objects.get(prefix='TC', period='2025-01-15').last_value, total)
+
+    def test_single_numbers(self):
+        numbers, errors = self._reserve_concurrently(1)
+        self.assertEqual(errors, [])
+        self._assert_contiguous(numbers, self.WORKERS * self.ROUNDS)
+
+    def test_number_blocks(self):
+        numbers, errors = self._reserve_concurrently(self.BLOCK)
+        self.assertEqual(errors, [])
+        self._assert_contiguous(numbers, self.WORKERS * self.ROUNDS * self.BLOCK)
+
+
+class LedgerBalanceTestMixin:
+    def _accounts(self):
+        asset = AccountType.objects.create(code='T1', name='Aset', type='ASSET')
+        liability = AccountType.objects.create(code='T2', name='Kewajiban', type='LIABILITY')
+        self.kas = Account.objects.create(code='T1-1000', name='Kas', account_type=asset, balance_type='DEBIT')
+        self.hutang = Account.objects.create(code='T2-1000', name='Hutang', account_type=liability, balance_type='CREDIT')
+
+    def _entry(self, tanggal, amount, status='posted'):
+        entry = JournalEntry.objects.create(entry_date=tanggal, description='Test', status=status)
+        JournalEntryItem.objects.create(journal_entry=entry, account=self.kas, debit=amount, credit=0)
+        JournalEntryItem.objects.create(journal_entry=entry, account=self.hutang, debit=0, credit=amount)
+        return entry
+
+    def _raw_totals(self, date_from=None, date_to=None):
+        """Total langsung dari JournalEntryItem posted (pembanding tabel saldo)."""
+        items = JournalEntryItem.objects.filter(journal_entry__status='posted')
+        if date_from is not None:
+            items = items.filter(journal_entry__entry_date__gte=date_from)
+        if date_to is not None:
+            items = items.filter(journal_entry__entry_date__lte=date_to)
+        totals = {}
+        for account_id, debit, credit in items.values_list('account_id', 'debit', 'credit'):
+            current = totals.get(account_id, (Decimal('0'), Decimal('0')))
+            totals[account_id] = (current[0] + debit, current[1] + credit)
+        return totals
+
+    def assertNoDrift(self):
+        drift = find_balance_drift()
+        self.assertEqual(drift.mismatched, 0, drift.samples)
+
+
+class LedgerBalanceSignalTest(LedgerBalanceTestMixin, TestCase):
+    """AccountPeriodBalance dipelihara signal JournalEntry/JournalEntryItem dan JournalBatch."""
+
+    def setUp(self):
+        self._accounts()
+
+    def test_post_draft_entry(self):
+        entry = self._entry(date(2025, 1, 10), Decimal('100'), status='draft')
+        self.assertFalse(AccountPeriodBalance.objects.exists())
+        entry.post(user=None)
+        self.assertEqual(account_totals()[self.kas.pk], (Decimal('100'), Decimal('0')))
+        self.assertNoDrift()
+
+    def test_edit_item_and_entry_date(self):
+        entry = self._entry(date(2025, 1, 10), Decimal('100'))
+        for item in entry.items.all():
+            item.debit, item.credit = item.debit * 2, item.credit * 2
+            item.save()
+        self.assertNoDrift()
+        entry.entry_date = date(2025, 2, 3)
+        entry.save()
+        self.assertEqual(account_totals(date(2025, 2, 1), date(2025, 2, 28))[self.kas.pk], (Decimal('200'), Decimal('0')))
+        # Baris saldo Januari tetap ada dengan nilai nol
+        self.assertEqual(account_totals(date(2025, 1, 1), date(2025, 1, 31))[self.kas.pk], (Decimal('0'), Decimal('0')))
+        self.assertNoDrift()
+
+    def test_delete_item_and_entry(self):
+        entry = self._entry(date(2025, 1, 10), Decimal('100'))
+        other = self._entry(date(2025, 1, 11), Decimal('50'))
+        entry.items.filter(account=self.hutang).delete()
+        self.assertNoDrift()
+        entry.delete()
+        self.assertNoDrift()
+        self.assertEqual(account_totals()[self.kas.pk], (Decimal('50'), Decimal('0')))
+        other.delete()
+        self.assertNoDrift()
+        self.assertEqual(account_totals()[self.kas.pk], (Decimal('0'), Decimal('0')))
+
+    def test_reverse_entry(self):
+        entry = self._entry(date(2025, 1, 10), Decimal('100'))
+        reversal = entry.reverse(user=None)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'reversed')
+        self.assertEqual(account_totals()[self.kas.pk], (Decimal('0'), Decimal('100')))
+        self.assertEqual(account_totals(reversal.entry_date, reversal.entry_date)[self.hutang.pk], (Decimal('100'), Decimal('0')))
+        self.assertNoDrift()
+
+    def test_journal_batch_commit(self):
+        batch = JournalBatch()
+        batch.add('TB', date(2025, 1, 31), 'Batch 1', [
+            JournalLine(self.kas, 70, 0, ''), JournalLine(self.hutang, 0, 70, ''),
+        ])
+        batch.add('TB', date(2025, 2, 1), 'Batch 2', [
+            JournalLine(self.kas, 30, 0, ''), JournalLine(self.hutang, 0, 30, ''),
+        ])
+        batch.add('TB', date(2025, 2, 2), 'Batch draft', [
+            JournalLine(self.kas, 5, 0, ''), JournalLine(self.hutang, 0, 5, ''),
+        ], status='draft')
+        entries = batch.commit()
+
+        head = f"TB-{timezone.localdate():%Y%m%d}-"
+        self.assertEqual([entry.entry_number for entry in entries], [f'{head}0001', f'{head}0002', f'{head}0003'])
+        self.assertEqual(account_totals()[self.kas.pk], (Decimal('100'), Decimal('0')))
+        self.assertNoDrift()
+
+
+class PeriodFilterTest(LedgerBalanceTestMixin, TestCase):
+    """Rentang tanggal dibaca dari baris bulanan + harian tanpa hitung ganda."""
+
+    def setUp(self):
+        self._accounts()
+        # Satu entry per tanggal dengan nominal berbeda agar hitung ganda/terlewat terlihat
+        self.dates = [
+            date(2024, 12, 31), date(2025, 1, 1), date(2025, 1, 15), date(2025, 1, 31),
+            date(2025, 2, 1), date(2025, 2, 14), date(2025, 2, 28), date(2025, 3, 1),
+            date(2025, 3, 10), date(2025, 3, 31), date(2025, 4, 1),
+        ]
+        for index, tanggal in enumerate(self.dates):
+            self._entry(tanggal, Decimal(2 ** index))
+
+    def test_ranges_match_raw_items(self):
+        ranges = [
+            (None, None),
+            (date(2025, 1, 1), date(2025, 3, 31)),     # bulan penuh
+            (date(2025, 1, 15), date(2025, 3, 10)),    # mulai dan selesai di tengah bulan
+            (date(2025, 1, 15), date(2025, 2, 28)),    # mulai di tengah, selesai akhir bulan
+            (date(2025, 2, 1), date(2025, 3, 10)),     # mulai awal bulan, selesai di tengah
+            (date(2025, 1, 2), date(2025, 1, 30)),     # di dalam satu bulan
+            (date(2025, 1, 31), date(2025, 2, 1)),     # melewati batas bulan
+            (date(2024, 12, 31), date(2025, 1, 1)),    # melewati batas tahun
+            (date(2025, 2, 14), date(2025, 2, 14)),    # satu hari
+            (None, date(2025, 2, 14)),
+            (date(2025, 2, 14), None),
+            (None, date(2025, 2, 28)),
+            (date(2025, 3, 1), None),
+        ]
+        for date_from, date_to in ranges:
+            with self.subTest(date_from=date_from, date_to=date_to):
+                self.assertEqual(account_totals(date_from, date_to), self._raw_totals(date_from, date_to))
+
+    def test_every_day_boundary(self):
+        # Semua pasangan awal/akhir di sekitar setiap tanggal entry
+        edges = sorted({tanggal + timedelta(days=delta) for tanggal in self.dates for delta in (-1, 0, 1)})
+        for date_from in edges:
+            for date_to in edges:
+                if date_to < date_from:
+                    continue
+                self.assertEqual(
+                    account_totals(date_from, date_to), self._raw_totals(date_from, date_to),
+                    f'{date_from} .. {date_to}',
+                )
+
+    def test_full_month_uses_monthly_rows(self):
+        rows = AccountPeriodBalance.objects.filter(_period_filter(date(2025, 2, 1), date(2025, 2, 28)))
+        self.assertEqual(set(rows.values_list('period', flat=True)), {AccountPeriodBalance.PERIOD_MONTHLY})
+        rows = AccountPeriodBalance.objects.filter(_period_filter(date(2025, 2, 2), date(2025, 2, 27)))
+        self.assertEqual(set(rows.values_list('period', flat=True)), {AccountPeriodBalance.PERIOD_DAILY})
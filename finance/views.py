@@ -14,6 +14,7 @@ from .models import (
     AccountType, Account, JournalEntry, JournalEntryItem,
     CashFlow, Budget, FinancialReport, FinanceSettings
 )
+from .ledger_balances import account_totals, balances_by_type, report_rows
 # from .forms import AccountTypeForm, AccountForm, JournalEntryForm
 
 
@@ -27,38 +28,16 @@ def finance_dashboard(request):
     today = timezone.now().date()
     month_start = today.replace(day=1)
     
-    # Calculate balances from journal entries instead of using current_balance property
-    from django.db.models import Sum, Q
-    
-    # Total Assets (calculate from journal entries)
-    asset_accounts = Account.objects.filter(account_type__type='ASSET', is_active=True)
-    total_assets = Decimal('0')
-    for account in asset_accounts:
-        total_assets += account.current_balance
-    
-    # Total Liabilities
-    liability_accounts = Account.objects.filter(account_type__type='LIABILITY', is_active=True)
-    total_liabilities = Decimal('0')
-    for account in liability_accounts:
-        total_liabilities += account.current_balance
-    
-    # Total Equity
-    equity_accounts = Account.objects.filter(account_type__type='EQUITY', is_active=True)
-    total_equity = Decimal('0')
-    for account in equity_accounts:
-        total_equity += account.current_balance
-    
-    # Revenue this month
-    revenue_accounts = Account.objects.filter(account_type__type='REVENUE', is_active=True)
-    revenue_this_month = Decimal('0')
-    for account in revenue_accounts:
-        revenue_this_month += account.current_balance
-    
-    # Expense this month
-    expense_accounts = Account.objects.filter(account_type__type='EXPENSE', is_active=True)
-    expense_this_month = Decimal('0')
-    for account in expense_accounts:
-        expense_this_month += account.current_balance
+    # Saldo per tipe akun dari AccountPeriodBalance (satu query grouped)
+    type_balances = balances_by_type()
+    total_assets = type_balances['ASSET']
+    total_liabilities = type_balances['LIABILITY']
+    total_equity = type_balances['EQUITY']
+    
+    # Revenue & Expense this month (entry_date bulan berjalan)
+    month_balances = balances_by_type(month_start, today)
+    revenue_this_month = month_balances['REVENUE']
+    expense_this_month = month_balances['EXPENSE']
     
     # Net Income
     net_income = revenue_this_month - expense_this_month
@@ -177,13 +156,8 @@ def chart_of_accounts(request):
     total_accounts = all_accounts.count()
     active_accounts = all_accounts.filter(is_active=True).count()
     
-    # Calculate total balance
-    total_balance = 0
-    for account in all_accounts:
-        if account.balance_type == 'DEBIT':
-            total_balance += float(account.current_balance or 0)
-        else:
-            total_balance -= float(account.current_balance or 0)
+    # Calculate total balance (debit - credit seluruh akun, satu query grouped)
+    total_balance = sum(float(debit - credit) for debit, credit in account_totals().values())
     
     context = {
         'accounts_by_type': accounts_by_type,
@@ -573,156 +547,92 @@ def financial_reports(request):
     return render(request, 'finance/financial_reports.html', context)
 
 
+def _report_date(value, default):
+    """Tanggal dari query string (YYYY-MM-DD); tidak valid -> default."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else default
+    except ValueError:
+        return default
+
+
 @login_required
 def trial_balance(request):
     """Trial Balance Report"""
     
     # Get date range
-    date_to = request.GET.get('date_to', timezone.now().date().isoformat())
-    
-    # Get all active accounts
-    accounts = Account.objects.filter(is_active=True).order_by('code')
+    date_to = _report_date(request.GET.get('date_to'), timezone.now().date())
     
     trial_balance_data = []
     total_debit = Decimal('0')
     total_credit = Decimal('0')
     
-    for account in accounts:
-        # Get balance up to date_to
-        debit_total = JournalEntryItem.objects.filter(
-            account=account,
-            journal_entry__status='posted',
-            journal_entry__entry_date__lte=date_to,
-            debit__gt=0
-        ).aggregate(total=Sum('debit'))['total'] or Decimal('0')
-        
-        credit_total = JournalEntryItem.objects.filter(
-            account=account,
-            journal_entry__status='posted',
-            journal_entry__entry_date__lte=date_to,
-            credit__gt=0
-        ).aggregate(total=Sum('credit'))['total'] or Decimal('0')
-        
-        # Calculate balance
-        if account.balance_type == 'DEBIT':
-            balance = debit_total - credit_total
-        else:
-            balance = credit_total - debit_total
-        
-        if balance != 0:  # Only show accounts with balance
+    # Saldo akun sendiri (akun posting), satu query grouped ke AccountPeriodBalance
+    for row in report_rows(date_to=date_to):
+        if row.balance != 0:  # Only show accounts with balance
             trial_balance_data.append({
-                'account': account,
-                'debit': balance if account.balance_type == 'DEBIT' else Decimal('0'),
-                'credit': balance if account.balance_type == 'CREDIT' else Decimal('0'),
+                'account': row.account,
+                'debit': row.balance if row.account.balance_type == 'DEBIT' else Decimal('0'),
+                'credit': row.balance if row.account.balance_type == 'CREDIT' else Decimal('0'),
             })
             
-            if account.balance_type == 'DEBIT':
-                total_debit += balance
+            if row.account.balance_type == 'DEBIT':
+                total_debit += row.balance
             else:
-                total_credit += balance
+                total_credit += row.balance
     
     context = {
         'trial_balance_data': trial_balance_data,
         'total_debit': total_debit,
         'total_credit': total_credit,
-        'date_to': date_to,
+        'date_to': date_to.isoformat(),
     }
     
     return render(request, 'finance/trial_balance.html', context)
 
 
+def _report_section(rows, account_type, amount):
+    """
+    Detail satu bagian laporan: akun dengan amount(total termasuk turunan) > 0, akun induk
+    ditandai is_group. Total bagian = jumlah amount akun sendiri (tidak double count).
+    """
+    details = []
+    total = Decimal('0')
+    for row in rows:
+        if row.account.account_type.type != account_type:
+            continue
+        own, rolled = amount(row.debit, row.credit), amount(row.total_debit, row.total_credit)
+        if rolled > 0:
+            details.append({'account': row.account, 'amount': rolled, 'level': row.level, 'is_group': row.is_group})
+        total += own
+    return details, total
+
+
 @login_required
 def profit_loss_statement(request):
     """Profit & Loss Statement"""
     
     # Get date range
-    date_from = request.GET.get('date_from', timezone.now().date().replace(day=1).isoformat())
-    date_to = request.GET.get('date_to', timezone.now().date().isoformat())
-    
-    # Revenue
-    revenue_accounts = Account.objects.filter(
-        account_type__type='REVENUE',
-        is_active=True
-    ).order_by('code')
-    
-    revenue_total = Decimal('0')
-    revenue_details = []
-    
-    for account in revenue_accounts:
-        credit_total = JournalEntryItem.objects.filter(
-            account=account,
-            journal_entry__status='posted',
-            journal_entry__entry_date__gte=date_from,
-            journal_entry__entry_date__lte=date_to,
-            credit__gt=0
-        ).aggregate(total=Sum('credit'))['total'] or Decimal('0')
-        
-        if credit_total > 0:
-            revenue_details.append({
-                'account': account,
-                'amount': credit_total
-            })
-            revenue_total += credit_total
-    
-    # Cost of Sales
-    cos_accounts = Account.objects.filter(
-        account_type__type='COST_OF_SALES',
-        is_active=True
-    ).order_by('code')
+    today = timezone.now().date()
+    date_from = _report_date(request.GET.get('date_from'), today.replace(day=1))
+    date_to = _report_date(request.GET.get('date_to'), today)
     
-    cos_total = Decimal('0')
-    cos_details = []
+    rows = report_rows(date_from, date_to, types={'REVENUE', 'COST_OF_SALES', 'EXPENSE'})
     
-    for account in cos_accounts:
-        debit_total = JournalEntryItem.objects.filter(
-            account=account,
-            journal_entry__status='posted',
-            journal_entry__entry_date__gte=date_from,
-            journal_entry__entry_date__lte=date_to,
-            debit__gt=0
-        ).aggregate(total=Sum('debit'))['total'] or Decimal('0')
-        
-        if debit_total > 0:
-            cos_details.append({
-                'account': account,
-                'amount': debit_total
-            })
-            cos_total += debit_total
+    # Revenue (credit), Cost of Sales dan Expenses (debit)
+    revenue_details, revenue_total = _report_section(rows, 'REVENUE', lambda debit, credit: credit)
+    cos_details, cos_total = _report_section(rows, 'COST_OF_SALES', lambda debit, credit: debit)
     
     # Gross Profit
     gross_profit = revenue_total - cos_total
     
-    # Expenses
-    expense_accounts = Account.objects.filter(
-        account_type__type='EXPENSE',
-        is_active=True
-    ).order_by('code')
-    
-    expense_total = Decimal('0')
-    expense_details = []
-    
-    for account in expense_accounts:
-        debit_total = JournalEntryItem.objects.filter(
-            account=account,
-            journal_entry__status='posted',
-            journal_entry__entry_date__gte=date_from,
-            journal_entry__entry_date__lte=date_to,
-            debit__gt=0
-        ).aggregate(total=Sum('debit'))['total'] or Decimal('0')
-        
-        if debit_total > 0:
-            expense_details.append({
-                'account': account,
-                'amount': debit_total
-            })
-            expense_total += debit_total
+    expense_details, expense_total = _report_section(rows, 'EXPENSE', lambda debit, credit: debit)
     
     # Net Income
     net_income = gross_profit - expense_total
     
     context = {
-        'date_from': date_from,
-        'date_to': date_to,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
         'revenue_details': revenue_details,
         'revenue_total': revenue_total,
         'cos_details': cos_details,
@@ -736,72 +646,38 @@ def profit_loss_statement(request):
     return render(request, 'finance/profit_loss_statement.html', context)
 
 
+def _balance_section(rows, account_type):
+    """Detail neraca: saldo termasuk turunan != 0; total = jumlah saldo akun sendiri."""
+    details = []
+    total = Decimal('0')
+    for row in rows:
+        if row.account.account_type.type != account_type:
+            continue
+        if row.total_balance != 0:
+            details.append({
+                'account': row.account, 'balance': row.total_balance, 'level': row.level, 'is_group': row.is_group,
+            })
+        total += row.balance
+    return details, total
+
+
 @login_required
 def balance_sheet(request):
     """Balance Sheet"""
     
-    # Get date
-    date = request.GET.get('date', timezone.now().date().isoformat())
-    
-    # Assets
-    asset_accounts = Account.objects.filter(
-        account_type__type='ASSET',
-        is_active=True
-    ).order_by('code')
+    # Get date (saldo per tanggal, bukan saldo saat ini)
+    date = _report_date(request.GET.get('date'), timezone.now().date())
     
-    assets_total = Decimal('0')
-    assets_details = []
-    
-    for account in asset_accounts:
-        balance = account.current_balance
-        if balance != 0:
-            assets_details.append({
-                'account': account,
-                'balance': balance
-            })
-            assets_total += balance
-    
-    # Liabilities
-    liability_accounts = Account.objects.filter(
-        account_type__type='LIABILITY',
-        is_active=True
-    ).order_by('code')
-    
-    liabilities_total = Decimal('0')
-    liabilities_details = []
-    
-    for account in liability_accounts:
-        balance = account.current_balance
-        if balance != 0:
-            liabilities_details.append({
-                'account': account,
-                'balance': balance
-            })
-            liabilities_total += balance
-    
-    # Equity
-    equity_accounts = Account.objects.filter(
-        account_type__type='EQUITY',
-        is_active=True
-    ).order_by('code')
-    
-    equity_total = Decimal('0')
-    equity_details = []
-    
-    for account in equity_accounts:
-        balance = account.current_balance
-        if balance != 0:
-            equity_details.append({
-                'account': account,
-                'balance': balance
-            })
-            equity_total += balance
+    rows = report_rows(date_to=date, types={'ASSET', 'LIABILITY', 'EQUITY'})
+    assets_details, assets_total = _balance_section(rows, 'ASSET')
+    liabilities_details, liabilities_total = _balance_section(rows, 'LIABILITY')
+    equity_details, equity_total = _balance_section(rows, 'EQUITY')
     
     # Total Liabilities & Equity
     total_liabilities_equity = liabilities_total + equity_total
     
     context = {
-        'date': date,
+        'date': date.isoformat(),
         'assets_details': assets_details,
         'assets_total': assets_total,
         'liabilities_details': liabilities_details,
@@ -0,0 +1,189 @@
+"""
+Engine alokasi stok ke order (greedy, all-or-nothing per order).
+
+Dipakai oleh generatebatch_check_stock (urutan FIFO) dan ReadyToPrint
+(calculate_and_sync_ready_to_print, urutan SAT dulu lalu id_pesanan).
+
+Baris order dimuat sebagai array NumPy lalu:
+1. baris (order, produk) yang sama dijumlahkan,
+2. produk yang total kebutuhannya <= stok ("tidak rebutan") tidak pernah menggagalkan
+   order manapun, sehingga order yang hanya berisi produk seperti itu langsung siap,
+3. hanya baris produk rebutan yang dialokasikan berurutan sesuai prioritas order.
+
+Hasilnya sama persis dengan loop greedy per order, tetapi loop Python hanya menyentuh
+order yang benar-benar berebut stok.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+SAT_ORDER_TYPE = '1'
+STATUS_CUKUP = 'cukup'
+STATUS_TIDAK_CUKUP = 'tidak cukup'
+DELETE_CHUNK_SIZE = 5000
+
+StockCheckResult = namedtuple('StockCheckResult', ['result', 'check_stock_per_row', 'cukup_ids', 'tidak_cukup_ids'])
+
+
+def _factorize(values):
+    """Kode integer per nilai (urut kemunculan pertama) + daftar nilai unik; None tetap None."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    uniques = np.asarray(uniques, dtype=object)
+    uniques[pd.isna(uniques)] = None
+    return codes.astype(np.int64), uniques.tolist()
+
+
+def allocate_arrays(order_codes, order_rank, product_ids, quantities, available_stock):
+    """
+    Alokasi greedy berbasis array.
+
+    order_codes: kode order per baris (0..n_order-1)
+    order_rank: posisi proses per order (lebih kecil diproses lebih dulu, unik)
+    product_ids: product_id per baris (0 untuk baris tanpa produk)
+    quantities: jumlah per baris
+    available_stock: dict {product_id: qty}
+
+    Return (array bool siap per order, dict sisa stok per produk).
+    """
+    order_rank = np.asarray(order_rank, dtype=np.int64)
+    ready = np.ones(len(order_rank), dtype=bool)
+    with_product = product_ids > 0
+    codes = order_codes[with_product]
+    pids = product_ids[with_product]
+    qty = quantities[with_product]
+    if not len(pids):
+        return ready, dict(available_stock)
+
+    product_keys, pidx = np.unique(pids, return_inverse=True)
+    product_count = len(product_keys)
+    stock = np.fromiter(
+        (available_stock.get(int(pid), 0) for pid in product_keys), dtype=np.int64, count=product_count
+    )
+
+    # Kebutuhan per (order, produk)
+    pair_keys, pair_inverse = np.unique(codes * product_count + pidx, return_inverse=True)
+    need = np.zeros(len(pair_keys), dtype=np.int64)
+    np.add.at(need, pair_inverse, qty)
+    need_order = pair_keys // product_count
+    need_product = pair_keys % product_count
+
+    demand = np.zeros(product_count, dtype=np.int64)
+    np.add.at(demand, need_product, need)
+    has_negative = np.zeros(product_count, dtype=bool)
+    has_negative[need_product[need < 0]] = True
+    # Produk tidak rebutan: stok cukup untuk semua order sekaligus (dan tidak ada qty negatif)
+    contended = (demand > stock) | has_negative
+
+    contended_rows = np.flatnonzero(contended[need_product])
+    if len(contended_rows):
+        rows = contended_rows[np.argsort(order_rank[need_order[contended_rows]], kind='stable')]
+        row_orders = need_order[rows]
+        boundaries = np.flatnonzero(np.diff(row_orders)) + 1
+        starts = np.concatenate(([0], boundaries)).tolist()
+        ends = np.concatenate((boundaries, [len(rows)])).tolist()
+        group_orders = row_orders[starts].tolist()
+        row_products = need_product[rows].tolist()
+        row_needs = need[rows].tolist()
+        running = stock.tolist()
+        for order, start, end in zip(group_orders, starts, ends):
+            products = row_products[start:end]
+            needs = row_needs[start:end]
+            if all(running[p] >= q for p, q in zip(products, needs)):
+                for p, q in zip(products, needs):
+                    running[p] -= q
+            else:
+                ready[order] = False
+
+    consumed = np.zeros(product_count, dtype=np.int64)
+    ready_rows = ready[need_order]
+    np.add.at(consumed, need_product[ready_rows], need[ready_rows])
+    running_stock = dict(available_stock)
+    running_stock.update(zip(product_keys.tolist(), (stock - consumed).tolist()))
+    return ready, running_stock
+
+
+def _line_arrays(product_ids, quantities):
+    products = np.fromiter((pid or 0 for pid in product_ids), dtype=np.int64, count=len(product_ids))
+    qty = np.fromiter((q or 0 for q in quantities), dtype=np.int64, count=len(quantities))
+    return products, qty
+
+
+def allocate_orders(order_lines, available_stock):
+    """
+    Alokasi greedy SAT-first untuk ReadyToPrint.
+
+    order_lines: iterable (id_pesanan, product_id, jumlah, order_type).
+    available_stock: dict {product_id: qty} stok yang bisa dialokasikan.
+
+    Order SAT (order_type '1') dipenuhi terlebih dahulu, lalu order lainnya, masing-masing
+    urut id_pesanan. Sebuah order siap jika seluruh kebutuhannya tercukupi stok berjalan.
+    Return (list id_pesanan yang siap, dict sisa stok per produk).
+    """
+    order_lines = list(order_lines)
+    if not order_lines:
+        return [], dict(available_stock)
+    ids, product_ids, quantities, order_types = zip(*order_lines)
+
+    # Unit alokasi = (id_pesanan, SAT?) seperti pengelompokan needs_sat/needs_other
+    id_codes, id_values = _factorize(ids)
+    is_sat = np.fromiter((t == SAT_ORDER_TYPE for t in order_types), dtype=bool, count=len(order_types))
+    unit_keys, unit_codes = np.unique(id_codes * 2 + is_sat, return_inverse=True)
+    unit_ids = [id_values[key // 2] for key in unit_keys.tolist()]
+    unit_sat = (unit_keys % 2 == 1).tolist()
+
+    processing = sorted(
+        range(len(unit_ids)),
+        key=lambda i: (not unit_sat[i], unit_ids[i] is None, unit_ids[i] or ''),
+    )
+    rank = np.empty(len(unit_ids), dtype=np.int64)
+    rank[processing] = np.arange(len(unit_ids))
+
+    products, qty = _line_arrays(product_ids, quantities)
+    ready, running_stock = allocate_arrays(unit_codes.astype(np.int64), rank, products, qty, available_stock)
+    return [unit_ids[i] for i in processing if ready[i]], running_stock
+
+
+def check_order_stock(rows, available_stock):
+    """
+    Cek kecukupan stok FIFO untuk generate batch.
+
+    rows: list (pk, id_pesanan, product_id, jumlah) urut pk; order diproses sesuai
+    kemunculan pertamanya. Return StockCheckResult.
+    """
+    if not rows:
+        return StockCheckResult({}, {}, [], [])
+    pks, ids, product_ids, quantities = zip(*rows)
+    order_codes, order_ids = _factorize(ids)
+    products, qty = _line_arrays(product_ids, quantities)
+    ready, _ = allocate_arrays(order_codes, np.arange(len(order_ids)), products, qty, available_stock)
+
+    status = np.where(ready, STATUS_CUKUP, STATUS_TIDAK_CUKUP).astype(object)
+    result = dict(zip(order_ids, status.tolist()))
+    per_row = dict(zip(pks, status[order_codes].tolist()))
+    order_ids = np.asarray(order_ids, dtype=object)
+    return StockCheckResult(result, per_row, order_ids[ready].tolist(), order_ids[~ready].tolist())
+
+
+def sync_id_table(model, id_pesanan_list):
+    """
+    Samakan isi tabel id_pesanan (OrderCukup/OrderTidakCukup) dengan id_pesanan_list:
+    hanya baris yang hilang yang di-insert dan baris yang tidak berlaku (atau duplikat)
+    yang dihapus. Return (jumlah ditambah, jumlah dihapus).
+    """
+    wanted = set(id_pesanan_list)
+    keep = {}
+    stale_pks = []
+    for pk, id_pesanan in model.objects.order_by('pk').values_list('pk', 'id_pesanan').iterator(chunk_size=10000):
+        if id_pesanan in wanted and id_pesanan not in keep:
+            keep[id_pesanan] = pk
+        else:
+            stale_pks.append(pk)
+
+    with transaction.atomic():
+        for start in range(0, len(stale_pks), DELETE_CHUNK_SIZE):
+            model.objects.filter(pk__in=stale_pks[start:start + DELETE_CHUNK_SIZE]).delete()
+        new_rows = [model(id_pesanan=id_pesanan) for id_pesanan in wanted if id_pesanan not in keep]
+        model.objects.bulk_create(new_rows, batch_size=2000)
+    return len(new_rows), len(stale_pks)
@@ -0,0 +1,193 @@
+"""
+Batch metrics engine untuk halaman batch list dan dashboard fulfillment.
+
+Semua ringkasan per batch (SKU completed, over stock, SKU gantung, order gantung,
+ready to print, printed, packed, shipped) dihitung dengan beberapa query GROUP BY
+sekaligus untuk banyak batch, bukan 8-12 query per batch. Jumlah query konstan
+berapapun jumlah batch yang dihitung.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from orders.models import Order, OrderHandoverHistory, OrderPackingHistory
+from .models import BatchItem, BatchItemLog, BatchList, ReadyToPrint
+
+
+METRIC_DEFAULTS = {
+    'total_sku': 0,
+    'sku_completed': 0,
+    'over_stock_count': 0,
+    'total_jumlah': 0,
+    'total_jumlah_ambil': 0,
+    'unallocated_sku': 0,
+    'total_orders': 0,
+    'orders_to_pick': 0,
+    'orders_printed': 0,
+    'orders_gantung': 0,
+}
+
+EXTRA_DEFAULTS = {
+    'packed_orders': 0,
+    'shipped_orders': 0,
+    'last_activity': None,
+}
+
+
+def _scope(queryset, field, values):
+    """Batasi queryset ke sekumpulan batch, atau semua batch jika values None."""
+    if values is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': values})
+
+
+def compute_batch_metrics(batches=None, extras=False):
+    """
+    Hitung metrics untuk banyak batch sekaligus.
+
+    `batches` boleh berupa queryset/list BatchList, atau None untuk semua batch.
+    Return dict {batch_id: metrics}. Jika `extras=True`, ikut dihitung jumlah order
+    packed, shipped dan waktu aktivitas picking terakhir (dipakai dashboard).
+    """
+    if batches is None:
+        batch_rows = list(BatchList.objects.values_list('id', 'nama_batch'))
+        batch_ids = None
+        batch_names = None
+    else:
+        batch_rows = [(b.id, b.nama_batch) for b in batches]
+        batch_ids = [row[0] for row in batch_rows]
+        batch_names = list({row[1] for row in batch_rows})
+
+    ids_by_name = defaultdict(list)
+    metrics = {}
+    for batch_id, nama_batch in batch_rows:
+        ids_by_name[nama_batch].append(batch_id)
+        metrics[batch_id] = dict(METRIC_DEFAULTS, **(EXTRA_DEFAULTS if extras else {}))
+
+    if not metrics:
+        return metrics
+
+    def assign_by_name(rows, key):
+        for nama_batch, value in rows:
+            for batch_id in ids_by_name.get(nama_batch, ()):
+                metrics[batch_id][key] = value or 0
+
+    # 1. Ringkasan BatchItem per batch
+    item_rows = _scope(BatchItem.objects, 'batchlist_id', batch_ids).values('batchlist_id').annotate(
+        total_sku=Count('id'),
+        sku_completed=Count('id', filter=Q(jumlah_ambil__gte=F('jumlah'))),
+        over_stock_count=Count('id', filter=Q(jumlah_ambil__gt=F('jumlah'))),
+        total_jumlah=Coalesce(Sum('jumlah'), 0),
+        total_jumlah_ambil=Coalesce(Sum('jumlah_ambil'), 0),
+    ).order_by()
+    for row in item_rows:
+        batch_id = row.pop('batchlist_id')
+        if batch_id in metrics:
+            metrics[batch_id].update(row)
+
+    # 2. SKU gantung: produk dengan total jumlah_ambil > kebutuhan order ReadyToPrint di batch yang sama
+    needed_subquery = Order.objects.filter(
+        nama_batch=OuterRef('batchlist__nama_batch'),
+        product_id=OuterRef('product_id'),
+        id_pesanan__in=ReadyToPrint.objects.filter(
+            batchlist_id=OuterRef(OuterRef('batchlist_id'))
+        ).values('id_pesanan'),
+    ).order_by().values('product_id').annotate(total=Sum('jumlah')).values('total')
+
+    unallocated_rows = _scope(BatchItem.objects, 'batchlist_id', batch_ids).values(
+        'batchlist_id', 'batchlist__nama_batch', 'product_id'
+    ).annotate(
+        total_picked=Sum('jumlah_ambil'),
+        total_needed=Coalesce(Subquery(needed_subquery), Value(0)),
+    ).filter(total_picked__gt=F('total_needed')).order_by()
+    for row in unallocated_rows:
+        if row['batchlist_id'] in metrics:
+            metrics[row['batchlist_id']]['unallocated_sku'] += 1
+
+    # 3. Total order unik per batch (exclude parent bundle)
+    order_rows = _scope(Order.objects, 'nama_batch', batch_names).exclude(status_bundle='Y').filter(
+        nama_batch__isnull=False
+    ).values('nama_batch').annotate(total=Count('id_pesanan', distinct=True)).order_by()
+    assign_by_name(((row['nama_batch'], row['total']) for row in order_rows), 'total_orders')
+
+    # 4. ReadyToPrint dan printed per batch
+    rtp_rows = _scope(ReadyToPrint.objects, 'batchlist_id', batch_ids).values('batchlist_id').annotate(
+        total=Count('id_pesanan', distinct=True),
+        printed=Count('id_pesanan', distinct=True, filter=Q(printed_at__isnull=False)),
+    ).order_by()
+    for row in rtp_rows:
+        if row['batchlist_id'] in metrics:
+            metrics[row['batchlist_id']]['orders_to_pick'] = row['total']
+            metrics[row['batchlist_id']]['orders_printed'] = row['printed']
+
+    # 5. Order gantung: order di batch yang belum masuk ReadyToPrint batch tersebut
+    in_rtp = ReadyToPrint.objects.filter(
+        id_pesanan=OuterRef('id_pesanan'),
+        batchlist__nama_batch=OuterRef('nama_batch'),
+    )
+    gantung_rows = _scope(Order.objects, 'nama_batch', batch_names).exclude(status_bundle='Y').filter(
+        nama_batch__isnull=False
+    ).exclude(Exists(in_rtp)).values('nama_batch').annotate(
+        total=Count('id_pesanan', distinct=True)
+    ).order_by()
+    assign_by_name(((row['nama_batch'], row['total']) for row in gantung_rows), 'orders_gantung')
+
+    if extras:
+        # 6. Order packed dan shipped per batch
+        packed_rows = _scope(OrderPackingHistory.objects, 'order__nama_batch', batch_names).values(
+            'order__nama_batch'
+        ).annotate(total=Count('order__id_pesanan', distinct=True)).order_by()
+        assign_by_name(((row['order__nama_batch'], row['total']) for row in packed_rows), 'packed_orders')
+
+        shipped_rows = _scope(OrderHandoverHistory.objects, 'order__nama_batch', batch_names).values(
+            'order__nama_batch'
+        ).annotate(total=Count('order__id_pesanan', distinct=True)).order_by()
+        assign_by_name(((row['order__nama_batch'], row['total']) for row in shipped_rows), 'shipped_orders')
+
+        # 7. Aktivitas picking terakhir per batch
+        activity_rows = _scope(BatchItemLog.objects, 'batch_id', batch_ids).values('batch_id').annotate(
+            last=Max('waktu')
+        ).order_by()
+        for row in activity_rows:
+            if row['batch_id'] in metrics:
+                metrics[row['batch_id']]['last_activity'] = row['last']
+
+    return metrics
+
+
+def get_sku_not_found_map(batch_names):
+    """
+    Versi set-based dari utils.get_sku_not_found untuk banyak batch sekaligus.
+    Return dict {nama_batch: sorted list sku}.
+    """
+    result = defaultdict(set)
+    rows = Order.objects.filter(
+        nama_batch__in=batch_names, product_id__isnull=True
+    ).exclude(status_bundle='Y').values_list('nama_batch', 'sku').distinct().order_by()
+    for nama_batch, sku in rows:
+        result[nama_batch].add(sku)
+    return {nama_batch: sorted(skus) for nama_batch, skus in result.items()}
+
+
+def summarize_metrics(metrics, batch_ids=None):
+    """Jumlahkan metrics beberapa batch (atau semua batch di `metrics`) menjadi satu ringkasan."""
+    summary = dict(METRIC_DEFAULTS)
+    for batch_id, values in metrics.items():
+        if batch_ids is not None and batch_id not in batch_ids:
+            continue
+        for key in METRIC_DEFAULTS:
+            summary[key] += values.get(key) or 0
+    return summary
+
+
+def format_status_pengambilan(values):
+    """Format kolom status pengambilan: persentase jumlah_ambil vs jumlah."""
+    if not values['total_sku']:
+        return "No Items"
+    total_jumlah = values['total_jumlah']
+    total_jumlah_ambil = values['total_jumlah_ambil']
+    if total_jumlah > 0:
+        percentage = min(100, (total_jumlah_ambil / total_jumlah) * 100)
+        return f"{percentage:.0f}% ({total_jumlah_ambil}/{total_jumlah})"
+    return "0% (0/0)"
@@ -0,0 +1,216 @@
+"""
+Settlement stok batch saat close / re-open (dipakai fullfilment.views dan inventory.views).
+
+close_batch_settlement():
+1. batch di-lock (select_for_update) lalu divalidasi dengan query grouped: order belum
+   ready to pick, unallocated stock (total jumlah_ambil vs kebutuhan order ready to print
+   per produk, satu query masing-masing), order yang belum printed.
+2. close_count naik, status 'closed'.
+3. Stock seluruh produk yang di-pick di-lock sekali (select_for_update urut pk),
+   quantity_locked dikurangi total jumlah_ambil (bulk_update), StockCardEntry close_batch
+   dan BatchSettlement di-bulk_create.
+
+reopen_batch_settlement() membalik settlement close terakhir (quantity_locked ditambah,
+StockCardEntry reopen_batch) lalu menyinkronkan ReadyToPrint.
+
+Idempotensi memakai key BatchSettlement (batch, close_count, product, tipe), bukan teks notes
+StockCardEntry: produk yang sudah punya settlement untuk key yang sama dilewati.
+"""
+import logging
+from collections import namedtuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventory.models import Stock, StockCardEntry
+from orders.models import Order, OrderHeader
+from products.models import Product
+from .models import BatchItem, BatchList, BatchSettlement, ReadyToPrint
+from .readytoprint_logic import refresh_ready_to_print
+
+logger = logging.getLogger(__name__)
+
+SettlementResult = namedtuple('SettlementResult', ['success', 'error', 'batch', 'processed', 'missing_skus'])
+
+UNPRINTED_SAMPLE_SIZE = 5
+
+
+def _failed(batch, error):
+    return SettlementResult(False, error, batch, 0, [])
+
+
+def _picked_totals(batch):
+    """{product_id: total jumlah_ambil} item batch yang sudah di-pick (jumlah_ambil != 0)."""
+    return {
+        row['product_id']: row['total']
+        for row in BatchItem.objects.filter(batchlist=batch, product__isnull=False).exclude(jumlah_ambil=0)
+        .values('product_id').annotate(total=Sum('jumlah_ambil')).order_by()
+    }
+
+
+def validate_close(batch):
+    """Return pesan error jika batch belum boleh di-close, None jika valid."""
+    if batch.status_batch == 'closed':
+        return f"Batch '{batch.nama_batch}' sudah berstatus closed!"
+
+    ready_ids = ReadyToPrint.objects.filter(batchlist=batch).values('id_pesanan')
+    not_ready = OrderHeader.objects.filter(nama_batch=batch.nama_batch).exclude(id_pesanan__in=ready_ids).count()
+    if not_ready:
+        return (
+            f"Batch '{batch.nama_batch}' tidak bisa ditutup karena masih ada {not_ready} order "
+            f"yang belum ready to pick!"
+        )
+
+    # Unallocated stock: total di-pick per produk melebihi kebutuhan order ready to print
+    picked = {
+        row['product_id']: row['total_picked']
+        for row in BatchItem.objects.filter(batchlist=batch).values('product_id')
+        .annotate(total_picked=Sum('jumlah_ambil')).order_by()
+    }
+    needed = {
+        row['product_id']: row['total_needed']
+        for row in Order.objects.filter(nama_batch=batch.nama_batch, id_pesanan__in=ready_ids)
+        .values('product_id').annotate(total_needed=Sum('jumlah')).order_by()
+    }
+    unallocated = {
+        product_id: (picked_qty or 0) - (needed.get(product_id) or 0)
+        for product_id, picked_qty in picked.items()
+        if (picked_qty or 0) - (needed.get(product_id) or 0) > 0
+    }
+    if unallocated:
+        skus = dict(Product.objects.filter(id__in=unallocated).values_list('id', 'sku'))
+        product_list = ', '.join(f"{skus.get(pid)} ({qty} qty)" for pid, qty in unallocated.items())
+        return (
+            f"Batch '{batch.nama_batch}' tidak bisa ditutup karena masih ada unallocated stock: {product_list}"
+        )
+
+    # Status order kosong, NULL, pending atau lainnya: semua yang bukan printed
+    unprinted = Order.objects.filter(nama_batch=batch.nama_batch).exclude(status_order='printed')
+    sample = list(unprinted.values_list('id_pesanan', 'status_order')[:UNPRINTED_SAMPLE_SIZE + 1])
+    if sample:
+        total = unprinted.count() if len(sample) > UNPRINTED_SAMPLE_SIZE else len(sample)
+        order_list = [f"{id_pesanan} ({status or 'kosong'})" for id_pesanan, status in sample[:UNPRINTED_SAMPLE_SIZE]]
+        if total > UNPRINTED_SAMPLE_SIZE:
+            order_list.append(f"... dan {total - UNPRINTED_SAMPLE_SIZE} order lainnya")
+        return (
+            f"Batch '{batch.nama_batch}' tidak bisa ditutup karena masih ada {total} order yang belum di print! "
+            f"Contoh: {', '.join(order_list)}"
+        )
+    return None
+
+
+def _settle(batch, tipe, user):
+    """
+    Terapkan settlement tipe ('close' / 'reopen') untuk close_count batch saat ini.
+    Return (jumlah produk diproses, sku tanpa Stock).
+    """
+    totals = _picked_totals(batch)
+    if not totals:
+        return 0, []
+    done = set(
+        BatchSettlement.objects.filter(batchlist=batch, close_count=batch.close_count, tipe=tipe)
+        .values_list('product_id', flat=True)
+    )
+    totals = {product_id: total for product_id, total in totals.items() if product_id not in done}
+
+    # Satu lock untuk seluruh Stock, urut pk agar tidak deadlock dengan transaksi lain
+    stocks = list(Stock.objects.select_for_update().filter(product_id__in=totals).order_by('pk'))
+    missing = set(totals) - {stock.product_id for stock in stocks}
+    missing_skus = sorted(Product.objects.filter(id__in=missing).values_list('sku', flat=True)) if missing else []
+
+    batch_type = ContentType.objects.get_for_model(BatchList)
+    entries = []
+    for stock in stocks:
+        total = totals[stock.product_id]
+        if tipe == 'close':
+            stock.quantity_locked = max(0, stock.quantity_locked - total)
+            entries.append(StockCardEntry(
+                product_id=stock.product_id,
+                tipe_pergerakan='close_batch',
+                qty=-total,  # Pengurangan quantity (negatif)
+                qty_awal=stock.quantity + total,  # Stock awal (quantity + jumlah_ambil)
+                qty_akhir=stock.quantity,  # Stock akhir (quantity saat ini)
+                notes=f'Close Batch ke-{batch.close_count} dari batch {batch.nama_batch}',
+                user=user,
+                content_type=batch_type,
+                object_id=batch.pk,
+            ))
+        else:
+            stock.quantity_locked += total
+            entries.append(StockCardEntry(
+                product_id=stock.product_id,
+                tipe_pergerakan='reopen_batch',
+                qty=total,
+                qty_awal=stock.quantity,
+                qty_akhir=stock.quantity + total,
+                notes=f'Re-Open Batch (close ke-{batch.close_count}) dari batch {batch.nama_batch}',
+                user=user,
+                content_type=batch_type,
+                object_id=batch.pk,
+            ))
+    if not stocks:
+        return 0, missing_skus
+
+    Stock.objects.bulk_update(stocks, ['quantity_locked'], batch_size=1000)
+    entries = StockCardEntry.objects.bulk_create(entries, batch_size=1000)
+    BatchSettlement.objects.bulk_create([
+        BatchSettlement(
+            batchlist=batch, close_count=batch.close_count, product_id=entry.product_id, tipe=tipe,
+            qty=entry.qty, stock_card_entry_id=entry.pk, user=user,
+        )
+        for entry in entries
+    ], batch_size=1000)
+    return len(stocks), missing_skus
+
+
+def _invalidate_stock_counters():
+    # bulk_update tidak memicu signal post_save Stock
+    try:
+        from erp_alfa.views import invalidate_notification_cache
+        invalidate_notification_cache(Stock)
+    except ImportError:
+        pass
+
+
+def close_batch_settlement(batch_id, user=None):
+    """Validasi dan close batch. Return SettlementResult."""
+    with transaction.atomic():
+        batch = BatchList.objects.select_for_update().filter(pk=batch_id).first()
+        if batch is None:
+            return _failed(None, 'Batch tidak ditemukan')
+        error = validate_close(batch)
+        if error:
+            return _failed(batch, error)
+
+        batch.close_count += 1
+        batch.status_batch = 'closed'
+        batch.completed_at = timezone.now()
+        batch.save(update_fields=['status_batch', 'completed_at', 'close_count'])
+
+        processed, missing_skus = _settle(batch, 'close', user)
+    _invalidate_stock_counters()
+    logger.info("close batch %s ke-%s: %s produk", batch.nama_batch, batch.close_count, processed)
+    return SettlementResult(True, None, batch, processed, missing_skus)
+
+
+def reopen_batch_settlement(batch_id, user=None):
+    """Re-open batch closed: balik settlement close terakhir. Return SettlementResult."""
+    with transaction.atomic():
+        batch = BatchList.objects.select_for_update().filter(pk=batch_id).first()
+        if batch is None:
+            return _failed(None, 'Batch tidak ditemukan')
+        if batch.status_batch != 'closed':
+            return _failed(batch, "Hanya batch yang berstatus 'closed' yang bisa di Re-Open.")
+
+        batch.status_batch = 'open'
+        batch.save(update_fields=['status_batch'])
+
+        processed, missing_skus = _settle(batch, 'reopen', user)
+
+        # Sinkronkan ReadyToPrint: hanya produk/order yang berubah selama batch closed yang dihitung ulang
+        refresh_ready_to_print(batch)
+    _invalidate_stock_counters()
+    logger.info("reopen batch %s (close ke-%s): %s produk", batch.nama_batch, batch.close_count, processed)
+    return SettlementResult(True, None, batch, processed, missing_skus)
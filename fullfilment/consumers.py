@@ -0,0 +1,70 @@
+"""
+WebSocket consumer live update (lihat fullfilment/live_updates.py).
+
+Client connect ke ws/live/?topic=batch:B001&topic=station:packing. Hanya user login (session,
+AuthMiddlewareStack di erp_alfa/asgi.py). Event yang masuk selama COALESCE_WINDOW digabung per
+(topic, kind, key) lalu dikirim sebagai satu frame:
+
+    {"type": "events", "events": [{"topic": ..., "kind": ..., "key": ..., "data": {...}}, ...]}
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .live_updates import COALESCE_WINDOW, group_name, parse_topics
+
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_NO_TOPIC = 4400
+
+
+class LiveUpdateConsumer(AsyncJsonWebsocketConsumer):
+    coalesce_window = COALESCE_WINDOW
+
+    async def connect(self):
+        self.live_groups = []
+        self._pending = {}
+        self._flush_task = None
+
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        query = parse_qs(self.scope.get('query_string', b'').decode('utf-8', 'ignore'))
+        self.topics = parse_topics(query.get('topic', []))
+        if not self.topics:
+            await self.close(code=CLOSE_NO_TOPIC)
+            return
+
+        for topic in self.topics:
+            group = group_name(topic)
+            await self.channel_layer.group_add(group, self.channel_name)
+            self.live_groups.append(group)
+        await self.accept()
+        await self.send_json({'type': 'subscribed', 'topics': self.topics})
+
+    async def disconnect(self, code):
+        for group in self.live_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def live_event(self, event):
+        self._pending[(event['topic'], event['kind'], event['key'])] = event
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.coalesce_window)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        if pending:
+            await self.send_json({'type': 'events', 'events': [
+                {'topic': e['topic'], 'kind': e['kind'], 'key': e['key'], 'data': e['data']}
+                for e in pending.values()
+            ]})
@@ -12,6 +12,7 @@ from .models import (
 )
 from orders.models import Order, OrderPackingHistory, OrderHandoverHistory
 from inventory.models import Stock
+from .batch_metrics import compute_batch_metrics, summarize_metrics
 
 @login_required
 def dashboard(request):
@@ -21,57 +22,42 @@ def dashboard(request):
     now = timezone.now().astimezone(jakarta_tz)
     
     # Filter untuk batch yang masih open
-    open_batches = BatchList.objects.filter(status_batch='open')
+    open_batches = list(BatchList.objects.filter(status_batch='open'))
+    # Metrics semua batch open dihitung sekali, dipakai ulang oleh semua section
+    batch_metrics = compute_batch_metrics(open_batches, extras=True)
     
     # Get all statistics in one go
     context = {
-        'dashboard_stats': get_main_statistics(open_batches),
-        'status_stats': get_status_statistics(open_batches),
-        'batch_performance': get_batch_performance(open_batches),
+        'dashboard_stats': get_main_statistics(open_batches, batch_metrics),
+        'status_stats': get_status_statistics(open_batches, batch_metrics),
+        'batch_performance': get_batch_performance(open_batches, batch_metrics),
         'recent_activities': get_recent_activities(),
-        'daily_progress': get_daily_progress(),
-        'top_batches': get_top_performing_batches(open_batches),
-        'alerts': get_alerts_and_issues(open_batches),
+        'daily_progress': get_daily_progress(batch_metrics),
+        'top_batches': get_top_performing_batches(open_batches, batch_metrics),
+        'alerts': get_alerts_and_issues(open_batches, batch_metrics),
         'current_time': now,
-        'open_batches_count': open_batches.count(),
+        'open_batches_count': len(open_batches),
     }
     
     return render(request, 'fullfilment/dashboard.html', context)
 
-def get_main_statistics(open_batches):
+def get_main_statistics(open_batches, batch_metrics=None):
     """Mendapatkan statistik utama dashboard"""
-    batch_names = list(open_batches.values_list('nama_batch', flat=True))
+    if batch_metrics is None:
+        batch_metrics = compute_batch_metrics(open_batches, extras=True)
+    summary = summarize_metrics(batch_metrics)
     
-    # Total orders di semua batch open
-    total_orders = Order.objects.filter(
-        nama_batch__in=batch_names
-    ).exclude(status_bundle='Y').values('id_pesanan').distinct().count()
+    # Total orders, ready to pick dan printed di semua batch open
+    total_orders = summary['total_orders']
+    total_ready_to_pick = summary['orders_to_pick']
+    total_printed = summary['orders_printed']
     
-    # Orders ready to pick
-    total_ready_to_pick = ReadyToPrint.objects.filter(
-        batchlist__in=open_batches
-    ).values('id_pesanan').distinct().count()
+    # Orders picked (batch yang punya BatchItemLog - ketika user melakukan picking)
+    total_picked = sum(1 for values in batch_metrics.values() if values['last_activity'])
     
-    # Orders printed
-    total_printed = ReadyToPrint.objects.filter(
-        batchlist__in=open_batches,
-        printed_at__isnull=False
-    ).values('id_pesanan').distinct().count()
-    
-    # Orders picked (dari BatchItemLog - ketika user melakukan picking)
-    total_picked = BatchItemLog.objects.filter(
-        batch__in=open_batches
-    ).values('batch__nama_batch').distinct().count()
-    
-    # Orders packed (ada di OrderPackingHistory)
-    total_packed = OrderPackingHistory.objects.filter(
-        order__nama_batch__in=batch_names
-    ).values('order__id_pesanan').distinct().count()
-    
-    # Orders shipped (ada di OrderHandoverHistory)
-    total_shipped = OrderHandoverHistory.objects.filter(
-        order__nama_batch__in=batch_names
-    ).values('order__id_pesanan').distinct().count()
+    # Orders packed (OrderPackingHistory) dan shipped (OrderHandoverHistory)
+    total_packed = sum(values['packed_orders'] for values in batch_metrics.values())
+    total_shipped = sum(values['shipped_orders'] for values in batch_metrics.values())
     
     # Orders cancelled hari ini
     total_cancelled = OrderCancelLog.objects.filter(
@@ -94,9 +80,9 @@ def get_main_statistics(open_batches):
         'total_returned': total_returned,
     }
 
-def get_status_statistics(open_batches):
+def get_status_statistics(open_batches, batch_metrics=None):
     """Mendapatkan statistik berdasarkan status order"""
-    stats = get_main_statistics(open_batches)
+    stats = get_main_statistics(open_batches, batch_metrics)
     total_orders = stats['total_orders']
     
     if total_orders == 0:
@@ -117,40 +103,21 @@ def get_status_statistics(open_batches):
         'shipped_pct': round((stats['total_shipped'] / total_orders) * 100, 1) if total_orders > 0 else 0,
     }
 
-def get_batch_performance(open_batches):
+def get_batch_performance(open_batches, batch_metrics=None):
     """Mendapatkan performa batch"""
+    if batch_metrics is None:
+        batch_metrics = compute_batch_metrics(open_batches, extras=True)
     batch_stats = []
     
     for batch in open_batches:
-        # Total items di batch
-        total_items = BatchItem.objects.filter(batchlist=batch).count()
-        
-        # Items yang sudah diambil
-        picked_items = BatchItem.objects.filter(
-            batchlist=batch,
-            jumlah_ambil__gte=F('jumlah')
-        ).count()
-        
-        # Total orders di batch
-        total_orders = Order.objects.filter(
-            nama_batch=batch.nama_batch
-        ).exclude(status_bundle='Y').values('id_pesanan').distinct().count()
-        
-        # Orders yang sudah printed
-        printed_orders = ReadyToPrint.objects.filter(
-            batchlist=batch,
-            printed_at__isnull=False
-        ).values('id_pesanan').distinct().count()
-        
-        # Orders yang sudah picked
-        picked_orders = OrderPackingHistory.objects.filter(
-            order__nama_batch=batch.nama_batch
-        ).values('order__id_pesanan').distinct().count()
-        
-        # Orders yang sudah shipped
-        shipped_orders = OrderHandoverHistory.objects.filter(
-            order__nama_batch=batch.nama_batch
-        ).values('order__id_pesanan').distinct().count()
+        values = batch_metrics[batch.id]
+        total_items = values['total_sku']
+        picked_items = values['sku_completed']
+        total_orders = values['total_orders']
+        printed_orders = values['orders_printed']
+        # Orders yang sudah picked (ada di OrderPackingHistory)
+        picked_orders = values['packed_orders']
+        shipped_orders = values['shipped_orders']
         
         # Hitung progress percentage
         item_progress = round((picked_items / total_items * 100) if total_items > 0 else 0, 1)
@@ -228,13 +195,13 @@ def get_recent_activities():
     activities.sort(key=lambda x: x['time'], reverse=True)
     return activities[:12]
 
-def get_daily_progress():
+def get_daily_progress(batch_metrics=None):
     """Mendapatkan progress harian"""
     today = timezone.now().date()
     yesterday = today - timedelta(days=1)
     
     # Progress hari ini
-    today_stats = get_main_statistics(BatchList.objects.filter(status_batch='open'))
+    today_stats = get_main_statistics(BatchList.objects.filter(status_batch='open'), batch_metrics)
     
     # Progress kemarin
     yesterday_orders = Order.objects.filter(
@@ -257,9 +224,9 @@ def get_daily_progress():
         'growth_rate': growth_rate
     }
 
-def get_top_performing_batches(open_batches):
+def get_top_performing_batches(open_batches, batch_metrics=None):
     """Mendapatkan batch dengan performa terbaik"""
-    batch_performance = get_batch_performance(open_batches)
+    batch_performance = get_batch_performance(open_batches, batch_metrics)
     top_batches = batch_performance[:5]
     
     # Tambahkan ranking
@@ -280,20 +247,17 @@ def get_rank_icon(rank):
     }
     return icons.get(rank, 'bi-star text-muted')
 
-def get_alerts_and_issues(open_batches):
+def get_alerts_and_issues(open_batches, batch_metrics=None):
     """Mendapatkan alert dan issues"""
+    if batch_metrics is None:
+        batch_metrics = compute_batch_metrics(open_batches, extras=True)
     alerts = []
     
     # Batch dengan progress rendah
     low_progress_batches = []
     for batch in open_batches:
-        total_orders = Order.objects.filter(
-            nama_batch=batch.nama_batch
-        ).exclude(status_bundle='Y').values('id_pesanan').distinct().count()
-        
-        shipped_orders = OrderHandoverHistory.objects.filter(
-            order__nama_batch=batch.nama_batch
-        ).values('order__id_pesanan').distinct().count()
+        total_orders = batch_metrics[batch.id]['total_orders']
+        shipped_orders = batch_metrics[batch.id]['shipped_orders']
         
         if total_orders > 0:
             progress = (shipped_orders / total_orders) * 100
@@ -317,17 +281,15 @@ def get_alerts_and_issues(open_batches):
     # Batch yang sudah lama tidak ada aktivitas
     inactive_batches = []
     for batch in open_batches:
-        last_activity = BatchItemLog.objects.filter(
-            batch=batch
-        ).order_by('-waktu').first()
+        last_activity = batch_metrics[batch.id]['last_activity']
         
         if last_activity:
-            hours_since_activity = (timezone.now() - last_activity.waktu).total_seconds() / 3600
+            hours_since_activity = (timezone.now() - last_activity).total_seconds() / 3600
             if hours_since_activity > 24:
                 inactive_batches.append({
                     'batch': batch,
                     'hours_inactive': round(hours_since_activity, 1),
-                    'last_activity': last_activity.waktu
+                    'last_activity': last_activity
                 })
     
     if inactive_batches:
@@ -341,19 +303,20 @@ def get_alerts_and_issues(open_batches):
     
     # Stock issues
     stock_alerts = []
-    for batch in open_batches:
-        batch_items = BatchItem.objects.filter(batchlist=batch)
-        for item in batch_items:
-            if item.product:
-                stock = Stock.objects.filter(product=item.product).first()
-                if stock and stock.quantity_ready_virtual < item.jumlah:
-                    stock_alerts.append({
-                        'batch': batch,
-                        'product': item.product,
-                        'required': item.jumlah,
-                        'available': stock.quantity_ready_virtual,
-                        'shortage': item.jumlah - stock.quantity_ready_virtual
-                    })
+    short_items = BatchItem.objects.filter(
+        batchlist__in=open_batches,
+        product__stock__isnull=False,
+    ).annotate(
+        available=F('product__stock__quantity') - F('product__stock__quantity_locked')
+    ).filter(available__lt=F('jumlah')).select_related('batchlist', 'product').order_by('id')
+    for item in short_items:
+        stock_alerts.append({
+            'batch': item.batchlist,
+            'product': item.product,
+            'required': item.jumlah,
+            'available': item.available,
+            'shortage': item.jumlah - item.available
+        })
     
     if stock_alerts:
         alerts.append({
@@ -368,11 +331,12 @@ def get_alerts_and_issues(open_batches):
 
 def get_dashboard_api_data(request):
     """API endpoint untuk data dashboard (untuk AJAX refresh)"""
-    open_batches = BatchList.objects.filter(status_batch='open')
+    open_batches = list(BatchList.objects.filter(status_batch='open'))
+    batch_metrics = compute_batch_metrics(open_batches, extras=True)
     
     return {
-        'main_stats': get_main_statistics(open_batches),
-        'status_stats': get_status_statistics(open_batches),
-        'alerts_count': len(get_alerts_and_issues(open_batches)),
+        'main_stats': get_main_statistics(open_batches, batch_metrics),
+        'status_stats': get_status_statistics(open_batches, batch_metrics),
+        'alerts_count': len(get_alerts_and_issues(open_batches, batch_metrics)),
         'last_updated': timezone.now().isoformat()
     }
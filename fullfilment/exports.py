@@ -0,0 +1,76 @@
+"""
+Builder export laporan fullfilment (lihat erp_alfa/exports.py).
+"""
+from datetime import datetime
+
+import pytz
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from erp_alfa.exports import Column, ExportSpec
+from orders.models import OrderPackingHistory, OrderShippingHistory
+
+JAKARTA_TZ = pytz.timezone('Asia/Jakarta')
+
+
+def _selected_date(value):
+    if value:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return timezone.now().astimezone(JAKARTA_TZ).date()
+
+
+def _waktu_ship(row):
+    waktu = row['waktu_ship']
+    return waktu.astimezone(JAKARTA_TZ).strftime('%d-%m-%Y %H:%M:%S') if waktu else 'N/A'
+
+
+def _or_na(key):
+    return lambda row: row[key] if row[key] is not None else 'N/A'
+
+
+def _order_field(key):
+    """Field order; 'N/A' jika history tidak punya order."""
+    return lambda row: row[key] if row['order_id'] is not None else 'N/A'
+
+
+def shipping_report(params):
+    """Laporan shipping per tanggal (opsional per kurir); packer dari history packing pertama order."""
+    selected_date = _selected_date(params.get('date', ''))
+    courier_name = params.get('courier', '')
+
+    queryset = OrderShippingHistory.objects.filter(waktu_ship__date=selected_date)
+    if courier_name:
+        queryset = queryset.filter(order__kurir=courier_name)
+
+    # Packer: satu subquery per baris di SQL yang sama (bukan query OrderPackingHistory per baris)
+    packer = OrderPackingHistory.objects.filter(order_id=OuterRef('order_id')).order_by('pk').values(
+        'user__username',
+    )[:1]
+    rows = queryset.annotate(packer=Subquery(packer)).order_by('pk').values(
+        'waktu_ship', 'order_id', 'order__id_pesanan', 'order__nama_toko', 'order__kurir', 'order__awb_no_tracking',
+        'user__username', 'packer',
+    )
+
+    filename = f"shipping_report_{selected_date.strftime('%Y%m%d')}"
+    if courier_name:
+        filename += f"_{courier_name.replace(' ', '_')}"
+
+    return ExportSpec(
+        filename=filename,
+        sheet_name=f"Shipping Report {selected_date.strftime('%d-%m-%Y')}",
+        columns=[
+            Column('No', '#', 'number'),
+            Column('Order ID', _order_field('order__id_pesanan')),
+            Column('Nama Toko', _order_field('order__nama_toko')),
+            Column('Kurir', _order_field('order__kurir')),
+            Column('User Shipper', _or_na('user__username')),
+            Column('User Packer', _or_na('packer')),
+            Column('Waktu Ship', _waktu_ship),
+            Column('AWB/Tracking', _order_field('order__awb_no_tracking')),
+        ],
+        rows=lambda: rows.iterator(chunk_size=2000),
+        count=queryset.count,
+    )
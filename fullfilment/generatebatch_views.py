@@ -122,71 +122,26 @@ from django.views.decorators.http import require_POST, require_GET
 @login_required
 @permission_required('fullfilment.change_generatebatch', raise_exception=True)
 def generatebatch_check_stock(request):
-    from collections import defaultdict
     from orders.models import OrderCukup, OrderTidakCukup, Order
     from inventory.models import Stock
-    # Hapus semua data lama
-    OrderCukup.objects.all().delete()
-    OrderTidakCukup.objects.all().delete()
-    orders = Order.objects.filter(status__iexact='Lunas').filter(Q(nama_batch__isnull=True) | Q(nama_batch='')).select_related('product')
+    from .allocation import check_order_stock, sync_id_table
+    orders = Order.objects.filter(status__iexact='Lunas').filter(Q(nama_batch__isnull=True) | Q(nama_batch=''))
     f = GenerateBatchOrderFilter(request.GET, queryset=orders)
-    qs = f.qs
-    pesanan_map = defaultdict(list)
-    for o in qs:
-        pesanan_map[o.id_pesanan].append(o)
-    all_skus = set(o.sku for o in qs if o.sku)
-    all_product_ids = set()
-    for o in qs:
-        if o.product_id:
-            all_product_ids.add(o.product_id)
-    stock_map = {s.product_id: s.quantity for s in Stock.objects.filter(product_id__in=all_product_ids)}
-    quantity_left = stock_map.copy()
-    result = {}
-    cukup_count = 0
-    tidak_cukup_count = 0
-    check_stock_per_row = {}
-    # Gunakan set untuk unique id_pesanan
-    ordercukup_ids = set()
-    ordertidakcukup_ids = set()
-    for id_pesanan, items in pesanan_map.items():
-        product_jumlah = defaultdict(int)
-        for o in items:
-            if o.product_id:
-                product_jumlah[o.product_id] += o.jumlah
-        cukup = True
-        for product_id, total_jumlah in product_jumlah.items():
-            if quantity_left.get(product_id, 0) < total_jumlah:
-                cukup = False
-                break
-        if cukup:
-            for product_id, total_jumlah in product_jumlah.items():
-                quantity_left[product_id] -= total_jumlah
-            result[id_pesanan] = 'cukup'
-            cukup_count += 1
-            ordercukup_ids.add(id_pesanan)
-            for o in items:
-                check_stock_per_row[o.pk] = 'cukup'
-        else:
-            result[id_pesanan] = 'tidak cukup'
-            tidak_cukup_count += 1
-            ordertidakcukup_ids.add(id_pesanan)
-            for o in items:
-                check_stock_per_row[o.pk] = 'tidak cukup'
-    # Bulk insert hasil baru, hanya unique id_pesanan
-    from orders.models import OrderCukup, OrderTidakCukup
-    ordercukup_bulk = [OrderCukup(id_pesanan=pid) for pid in ordercukup_ids]
-    ordertidakcukup_bulk = [OrderTidakCukup(id_pesanan=pid) for pid in ordertidakcukup_ids]
-    if ordercukup_bulk:
-        OrderCukup.objects.bulk_create(ordercukup_bulk)
-    if ordertidakcukup_bulk:
-        OrderTidakCukup.objects.bulk_create(ordertidakcukup_bulk)
+    # Satu pass values_list, urut id (FIFO)
+    rows = list(f.qs.order_by('id').values_list('id', 'id_pesanan', 'product_id', 'jumlah'))
+    product_ids = {row[2] for row in rows if row[2]}
+    stock_map = dict(Stock.objects.filter(product_id__in=product_ids).values_list('product_id', 'quantity'))
+    check = check_order_stock(rows, stock_map)
+    # Update tabel hasil berdasarkan selisih, bukan hapus semua lalu insert ulang
+    sync_id_table(OrderCukup, check.cukup_ids)
+    sync_id_table(OrderTidakCukup, check.tidak_cukup_ids)
     return JsonResponse({
-        'result': result,
-        'check_stock_per_row': check_stock_per_row,
+        'result': check.result,
+        'check_stock_per_row': check.check_stock_per_row,
         'summary': {
-            'stock_cukup': cukup_count,
-            'stock_tidak_cukup': tidak_cukup_count,
-            'total': len(pesanan_map)
+            'stock_cukup': len(check.cukup_ids),
+            'stock_tidak_cukup': len(check.tidak_cukup_ids),
+            'total': len(check.result)
         }
     })
 
@@ -211,6 +166,7 @@ def generatebatch_update_batchlist(request):
         
         from fullfilment.models import BatchList, BatchItem
         from orders.models import OrderCukup, OrderTidakCukup, Order
+        from orders.order_headers import refresh_order_headers
         from inventory.models import Stock
         from products.models import Product
         
@@ -257,6 +213,7 @@ def generatebatch_update_batchlist(request):
                 with connection.cursor() as cursor:
                     cursor.execute(sql, params)
                     updated = cursor.rowcount
+                refresh_order_headers(id_pesanan_pilih)
                 
                 orders_to_batch = Order.objects.filter(id_pesanan__in=id_pesanan_pilih)
 
@@ -0,0 +1,122 @@
+"""
+Live update (WebSocket, Django Channels) untuk halaman picking, ready to print, dashboard dan
+list station scan.
+
+Topik yang bisa di-subscribe client (consumers.LiveUpdateConsumer, ws/live/?topic=...):
+- batch:<nama_batch>                   progres pick per item dan perubahan ready to print batch
+- readytoprint                         perubahan ready to print semua batch (dashboard)
+- station:packing / station:shipping   delta leaderboard, aktivitas terakhir, total order
+
+publish() dipanggil dari kode sync (view / service) dan baru dikirim ke channel layer setelah
+transaksi commit. Setiap event punya key; consumer menggabungkan event dengan key sama selama
+COALESCE_WINDOW detik (nilai terakhir menang) lalu mengirim satu frame berisi semua event,
+sehingga scan beruntun tidak membanjiri client.
+
+Gagal kirim (channel layer tidak dikonfigurasi / Redis mati) hanya di-log: scan tidak boleh
+gagal karena live update.
+"""
+import hashlib
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = 0.5
+MAX_TOPICS = 10
+MAX_TOPIC_LENGTH = 120
+STATIC_TOPICS = frozenset(['readytoprint', 'station:packing', 'station:shipping'])
+EVENT_TYPE = 'live.event'
+
+
+def batch_topic(nama_batch):
+    return f'batch:{nama_batch}'
+
+
+def station_topic(station):
+    return f'station:{station}'
+
+
+def valid_topic(topic):
+    if not topic or len(topic) > MAX_TOPIC_LENGTH:
+        return False
+    return topic in STATIC_TOPICS or (topic.startswith('batch:') and len(topic) > len('batch:'))
+
+
+def parse_topics(values):
+    """Topik valid dan unik dari parameter query (urutan dipertahankan, maks MAX_TOPICS)."""
+    topics = []
+    for value in values:
+        topic = (value or '').strip()
+        if valid_topic(topic) and topic not in topics:
+            topics.append(topic)
+    return topics[:MAX_TOPICS]
+
+
+def group_name(topic):
+    """Nama group channel layer (ASCII, < 100 karakter) untuk topik apa pun, termasuk nama batch bebas."""
+    return f"live.{hashlib.md5(topic.encode('utf-8')).hexdigest()}"
+
+
+def build_event(topic, kind, key, data):
+    return {'type': EVENT_TYPE, 'topic': topic, 'kind': kind, 'key': str(key), 'data': data}
+
+
+def send_event(event):
+    """Kirim event ke group topik sekarang juga (dipanggil setelah commit)."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(group_name(event['topic']), event)
+    except Exception:
+        logger.warning("Live update %s/%s gagal dikirim", event['topic'], event['kind'], exc_info=True)
+
+
+def publish(topic, kind, key, data):
+    """
+    Jadwalkan event live update setelah transaksi commit. data harus bisa diserialisasi
+    msgpack (tanggal sebagai string ISO).
+    """
+    event = build_event(topic, kind, key, data)
+    transaction.on_commit(lambda: send_event(event))
+
+
+# ---------------------------------------------------------------------------
+# Event domain
+# ---------------------------------------------------------------------------
+
+def publish_pick_progress(nama_batch, sku, barcode, jumlah_ambil, jumlah, status_ambil):
+    """Progres pick satu item batch (update_barcode, update_barcode_to_rak, update_manual)."""
+    publish(batch_topic(nama_batch), 'pick', sku or barcode, {
+        'sku': sku,
+        'main_barcode': barcode,
+        'jumlah_ambil': jumlah_ambil,
+        'jumlah': jumlah,
+        'status_ambil': status_ambil,
+    })
+
+
+def publish_ready_to_print(nama_batch, added, removed):
+    """Order masuk/keluar ReadyToPrint sebuah batch."""
+    data = {'nama_batch': nama_batch, 'added': added, 'removed': removed}
+    publish(batch_topic(nama_batch), 'readytoprint', nama_batch, data)
+    publish('readytoprint', 'readytoprint', nama_batch, data)
+
+
+def publish_station_scan(station, username, total, recent, totals):
+    """
+    Delta station scan: total user (leaderboard), snapshot aktivitas terakhir dan total
+    order batch (None jika tidak ada di cache).
+    """
+    topic = station_topic(station)
+    publish(topic, 'leaderboard', username, {'username': username, 'total': total})
+    if recent is not None:
+        publish(topic, 'recent', 'recent', {'recent': [
+            {'waktu': row[0].isoformat(), 'id_pesanan': row[1], 'kurir': row[2], 'username': row[3]}
+            for row in recent
+        ]})
+    if totals is not None:
+        publish(topic, 'totals', 'totals', totals)
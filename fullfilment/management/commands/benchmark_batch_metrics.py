@@ -0,0 +1,98 @@
+"""
+Management command untuk benchmark batch metrics engine.
+
+Seed N batch dummy (beserta BatchItem, Order dan ReadyToPrint) di dalam transaksi
+yang di-rollback, lalu ukur jumlah query dan waktu compute_batch_metrics untuk
+setiap N. Jumlah query harus konstan berapapun jumlah batch.
+
+Usage: python manage.py benchmark_batch_metrics --sizes 10 100 1000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from fullfilment.batch_metrics import compute_batch_metrics, summarize_metrics
+from fullfilment.models import BatchItem, BatchList, ReadyToPrint
+from orders.models import Order
+from products.models import Product
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query count batch metrics engine untuk N batch (data dummy, di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500],
+                            help='Jumlah batch yang di-seed untuk setiap putaran')
+        parser.add_argument('--skus', type=int, default=5, help='Jumlah SKU per batch')
+        parser.add_argument('--orders', type=int, default=10, help='Jumlah order per batch')
+
+    def handle(self, *args, **options):
+        results = []
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._seed(size, options['skus'], options['orders'])
+                    results.append(self._measure(size))
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Batches':>10} {'Queries':>10} {'Time (ms)':>12}")
+        for size, queries, elapsed in results:
+            self.stdout.write(f"{size:>10} {queries:>10} {elapsed * 1000:>12.1f}")
+        self.stdout.write("=" * 60)
+
+        query_counts = {queries for _, queries, _ in results}
+        if len(query_counts) > 1:
+            raise CommandError(f"Jumlah query tidak konstan: {sorted(query_counts)}")
+        self.stdout.write(self.style.SUCCESS("✓ Jumlah query konstan untuk semua ukuran batch"))
+
+    def _seed(self, size, skus, orders):
+        products = Product.objects.bulk_create([
+            Product(sku=f'BENCH-SKU-{i}', barcode=f'BENCH-BC-{i}', nama_produk=f'Bench Product {i}')
+            for i in range(skus)
+        ])
+        batches = BatchList.objects.bulk_create([
+            BatchList(nama_batch=f'BENCH-BATCH-{n}', status_batch='open' if n % 2 else 'closed')
+            for n in range(size)
+        ])
+
+        batch_items = []
+        order_rows = []
+        rtp_rows = []
+        for batch in batches:
+            for i, product in enumerate(products):
+                batch_items.append(BatchItem(
+                    batchlist=batch, product=product, jumlah=orders,
+                    jumlah_ambil=orders - (i % 3), status_ambil='pending',
+                ))
+            for o in range(orders):
+                id_pesanan = f'{batch.nama_batch}-ORD-{o}'
+                order_rows.append(Order(
+                    id_pesanan=id_pesanan, sku=products[o % skus].sku, product=products[o % skus],
+                    jumlah=1, nama_batch=batch.nama_batch,
+                ))
+                if o % 2 == 0:
+                    rtp_rows.append(ReadyToPrint(id_pesanan=id_pesanan, batchlist=batch))
+
+        BatchItem.objects.bulk_create(batch_items, batch_size=2000)
+        Order.objects.bulk_create(order_rows, batch_size=2000)
+        ReadyToPrint.objects.bulk_create(rtp_rows, batch_size=2000)
+
+    def _measure(self, size):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            metrics = compute_batch_metrics()
+            open_ids = set(BatchList.objects.filter(status_batch='open').values_list('id', flat=True))
+            summarize_metrics(metrics, open_ids)
+            summarize_metrics(metrics)
+            elapsed = time.perf_counter() - start
+        return size, len(ctx.captured_queries), elapsed
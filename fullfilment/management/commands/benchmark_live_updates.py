@@ -0,0 +1,168 @@
+"""
+Management command untuk load test live update (WebSocket ws/live/, fullfilment/consumers.py).
+
+Menjalankan N subscriber LiveUpdateConsumer secara in-process (WebsocketCommunicator) di atas
+InMemoryChannelLayer, tanpa daphne / Redis. Setiap subscriber berlangganan satu topik batch
+(dibagi rata ke --batches batch) dan station:packing. Event dikirim dengan laju --rate per detik:
+~90% progres pick (key = sku, --skus sku per batch), sisanya delta leaderboard station.
+
+Yang diukur:
+- connect: waktu handshake + join group per subscriber (p50/p99)
+- delivery: waktu dari group_send sampai frame diterima client (p50/p99), termasuk COALESCE_WINDOW
+- coalescing: event fan-out (tanpa penggabungan) vs frame dan event yang benar-benar dikirim
+
+Usage: python manage.py benchmark_live_updates --subscribers 500 --events 2000
+"""
+
+import asyncio
+import random
+import time
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from fullfilment.consumers import LiveUpdateConsumer
+from fullfilment.live_updates import batch_topic, build_event, group_name, station_topic
+from fullfilment.routing import websocket_urlpatterns
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': 100000}}}
+
+
+class _BenchUser:
+    is_authenticated = True
+    username = 'bench'
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Load test live update WebSocket: subscriber simulasi di InMemoryChannelLayer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=500, help='Jumlah client WebSocket simulasi')
+        parser.add_argument('--events', type=int, default=2000, help='Jumlah event yang dikirim')
+        parser.add_argument('--batches', type=int, default=20, help='Jumlah topik batch')
+        parser.add_argument('--skus', type=int, default=50, help='Jumlah sku (key) berbeda per batch')
+        parser.add_argument('--rate', type=int, default=500, help='Event per detik')
+        parser.add_argument('--window', type=float, default=None, help='Override COALESCE_WINDOW (detik)')
+
+    def handle(self, *args, **options):
+        original_window = LiveUpdateConsumer.coalesce_window
+        if options['window'] is not None:
+            LiveUpdateConsumer.coalesce_window = options['window']
+        try:
+            with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER):
+                stats = asyncio.run(self._run(options))
+        finally:
+            LiveUpdateConsumer.coalesce_window = original_window
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Metrik':<16} {'Samples':>10} {'p50 (ms)':>12} {'p99 (ms)':>12}")
+        for metric in ('connect', 'delivery'):
+            timings = stats[metric]
+            self.stdout.write(
+                f"{metric:<16} {len(timings):>10} {_percentile(timings, 50):>12.1f} {_percentile(timings, 99):>12.1f}"
+            )
+        self.stdout.write("-" * 60)
+        self.stdout.write(f"Subscriber        : {options['subscribers']}")
+        self.stdout.write(f"Event dikirim     : {options['events']} dalam {stats['publish_seconds']:.2f} detik")
+        self.stdout.write(f"Event fan-out     : {stats['fanout']}")
+        self.stdout.write(f"Event terkirim    : {stats['delivered']}")
+        self.stdout.write(f"Frame terkirim    : {stats['frames']}")
+        if stats['frames']:
+            self.stdout.write(f"Coalescing        : {stats['fanout'] / stats['frames']:.1f} event fan-out per frame")
+        self.stdout.write("=" * 60)
+        missing = stats['expected_keys'] - len(stats['received_keys'])
+        if missing:
+            self.stdout.write(self.style.ERROR(f"✗ {missing} (subscriber, key) tidak pernah sampai"))
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    async def _run(self, options):
+        rng = random.Random(42)
+        application = URLRouter(websocket_urlpatterns)
+        layer = get_channel_layer()
+        batches = [f'BENCH-LIVE-{i:03d}' for i in range(max(options['batches'], 1))]
+
+        self.stdout.write(f"Connect {options['subscribers']} subscriber...")
+        subscriber_batches = [batches[i % len(batches)] for i in range(options['subscribers'])]
+        connected = await asyncio.gather(*(self._connect(application, nama) for nama in subscriber_batches))
+        communicators = [communicator for communicator, _ in connected]
+        stats = {
+            'connect': [elapsed for _, elapsed in connected],
+            'delivery': [], 'frames': 0, 'delivered': 0, 'fanout': 0, 'received_keys': set(),
+        }
+        per_batch = {nama: subscriber_batches.count(nama) for nama in batches}
+
+        receivers = [
+            asyncio.ensure_future(self._receive(index, communicator, stats))
+            for index, communicator in enumerate(communicators)
+        ]
+
+        self.stdout.write(f"Kirim {options['events']} event ({options['rate']}/detik)...")
+        interval = 1.0 / max(options['rate'], 1)
+        last_keys = set()
+        start = time.perf_counter()
+        for i in range(options['events']):
+            if rng.random() < 0.9:
+                nama = rng.choice(batches)
+                sku = f'SKU-{rng.randrange(options["skus"]):04d}'
+                topic = batch_topic(nama)
+                event = build_event(topic, 'pick', sku, {'sku': sku, 'jumlah_ambil': i, 'sent_at': time.perf_counter()})
+                stats['fanout'] += per_batch[nama]
+            else:
+                username = f'user{rng.randrange(20):02d}'
+                topic = station_topic('packing')
+                event = build_event(topic, 'leaderboard', username, {
+                    'username': username, 'total': i, 'sent_at': time.perf_counter(),
+                })
+                stats['fanout'] += len(communicators)
+            last_keys.add((topic, event['kind'], event['key']))
+            await layer.group_send(group_name(topic), event)
+            await asyncio.sleep(max(0.0, start + (i + 1) * interval - time.perf_counter()))
+        stats['publish_seconds'] = time.perf_counter() - start
+
+        # Tunggu flush terakhir setiap consumer
+        await asyncio.sleep(LiveUpdateConsumer.coalesce_window * 3 + 0.5)
+        for receiver in receivers:
+            receiver.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
+
+        # Setiap subscriber harus menerima setiap key yang di-publish ke topiknya minimal sekali
+        stats['expected_keys'] = sum(
+            len(communicators) if topic.startswith('station:') else per_batch[topic[len('batch:'):]]
+            for topic, _, _ in last_keys
+        )
+        return stats
+
+    async def _connect(self, application, nama_batch):
+        path = f'/ws/live/?topic={batch_topic(nama_batch)}&topic={station_topic("packing")}'
+        communicator = WebsocketCommunicator(application, path)
+        communicator.scope['user'] = _BenchUser()
+        start = time.perf_counter()
+        accepted, _ = await communicator.connect(timeout=30)
+        if not accepted:
+            raise RuntimeError(f'Subscriber {nama_batch} ditolak')
+        await communicator.receive_json_from(timeout=30)  # {'type': 'subscribed'}
+        return communicator, (time.perf_counter() - start) * 1000
+
+    async def _receive(self, index, communicator, stats):
+        while True:
+            frame = await communicator.receive_json_from(timeout=3600)
+            received_at = time.perf_counter()
+            if frame.get('type') != 'events':
+                continue
+            stats['frames'] += 1
+            stats['delivered'] += len(frame['events'])
+            for event in frame['events']:
+                stats['delivery'].append((received_at - event['data']['sent_at']) * 1000)
+                stats['received_keys'].add((index, event['topic'], event['kind'], event['key']))
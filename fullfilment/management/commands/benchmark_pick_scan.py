@@ -0,0 +1,177 @@
+"""
+Management command untuk concurrency check dan benchmark pick scan.
+
+Seed satu batch dummy, lalu N thread picker (masing-masing dengan koneksi database
+sendiri) melakukan scan acak pada SKU yang sama-sama diperebutkan. Dijalankan dua kali:
+- legacy: read-modify-write seperti update_barcode_picklist lama (batchitem.save())
+- atomic: fullfilment.pick_scan.apply_pick_scan
+
+Setelah setiap putaran dicek: jumlah_ambil per item harus sama dengan jumlah scan yang
+sukses, pengurangan Stock harus sama, dan jumlah BatchItemLog harus sama. Data dummy
+dihapus setelah selesai.
+
+Usage: python manage.py benchmark_pick_scan --pickers 8 --skus 5 --qty 200
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from fullfilment import pick_scan
+from fullfilment.models import BatchItem, BatchItemLog, BatchList
+from inventory.models import Stock
+from products.models import Product
+
+STOCK_QTY = 1000000
+
+
+def _legacy_scan(batch, product_id):
+    """Alur lama: baca BatchItem & Stock, ubah di Python, lalu save()."""
+    batchitem = BatchItem.objects.filter(batchlist=batch, product_id=product_id).first()
+    if not batchitem or batchitem.status_ambil == 'completed' or batchitem.jumlah_ambil >= batchitem.jumlah:
+        return False
+    batchitem.jumlah_ambil += 1
+    stock = Stock.objects.filter(product_id=product_id).first()
+    if stock:
+        stock.quantity -= 1
+        stock.quantity_locked -= 1
+        stock.save(update_fields=['quantity', 'quantity_locked'])
+    if batchitem.jumlah_ambil >= batchitem.jumlah:
+        batchitem.status_ambil = 'completed'
+        batchitem.completed_at = timezone.now()
+    batchitem.save()
+    BatchItemLog.objects.create(
+        waktu=timezone.now(), batch=batch, product_id=product_id, jumlah_input=1, jumlah_ambil=batchitem.jumlah_ambil
+    )
+    return True
+
+
+def _atomic_scan(batch, product_id):
+    return pick_scan.apply_pick_scan(batch, product_id).status == pick_scan.PICKED
+
+
+class Command(BaseCommand):
+    help = 'Concurrency check (lost update) dan scans/sec pick scan lama vs atomic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pickers', type=int, default=8, help='Jumlah picker (thread) paralel')
+        parser.add_argument('--skus', type=int, default=5, help='Jumlah SKU di batch')
+        parser.add_argument('--qty', type=int, default=200, help='Jumlah yang harus diambil per SKU')
+        parser.add_argument('--overscan', type=float, default=1.2,
+                            help='Total scan = qty * skus * overscan (sebagian scan harus ditolak)')
+
+    def handle(self, *args, **options):
+        results = []
+        failed = False
+        for mode, scan_fn in (('legacy', _legacy_scan), ('atomic', _atomic_scan)):
+            batch, products = self._seed(mode, options['skus'], options['qty'])
+            try:
+                elapsed, success_by_product, errors = self._run(batch, products, scan_fn, options)
+                problems = self._verify(batch, products, success_by_product)
+                total = sum(success_by_product.values())
+                results.append((mode, total, elapsed, len(errors), problems))
+                if mode == 'atomic' and (problems or errors):
+                    failed = True
+            finally:
+                self._cleanup(batch, products)
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Mode':<8} {'Scans OK':>10} {'Scans/sec':>12} {'Errors':>8} {'Lost/mismatch':>14}")
+        for mode, total, elapsed, errors, problems in results:
+            rate = total / elapsed if elapsed else 0
+            self.stdout.write(f"{mode:<8} {total:>10} {rate:>12.1f} {errors:>8} {len(problems):>14}")
+        self.stdout.write("=" * 60)
+        for mode, _, _, _, problems in results:
+            for problem in problems[:10]:
+                marker = self.style.ERROR('✗') if mode == 'atomic' else self.style.WARNING('⚠')
+                self.stdout.write(f"{marker} [{mode}] {problem}")
+
+        if failed:
+            raise CommandError("Pick scan atomic tidak konsisten")
+        self.stdout.write(self.style.SUCCESS("✓ Tidak ada lost update pada pick scan atomic"))
+
+    def _seed(self, mode, skus, qty):
+        suffix = f'{mode}-{int(time.time() * 1000)}'
+        batch = BatchList.objects.create(nama_batch=f'BENCH-PICK-{suffix}', status_batch='open')
+        products = Product.objects.bulk_create([
+            Product(sku=f'BENCH-PICK-{suffix}-{i}', barcode=f'BENCHPICK{suffix}{i}', nama_produk=f'Bench Pick {i}')
+            for i in range(skus)
+        ])
+        BatchItem.objects.bulk_create([
+            BatchItem(batchlist=batch, product=p, jumlah=qty, jumlah_ambil=0, status_ambil='pending')
+            for p in products
+        ])
+        Stock.objects.bulk_create([
+            Stock(product=p, quantity=STOCK_QTY, quantity_locked=STOCK_QTY) for p in products
+        ])
+        return batch, products
+
+    def _run(self, batch, products, scan_fn, options):
+        total_scans = int(options['qty'] * len(products) * options['overscan'])
+        rng = random.Random(7)
+        plan = [rng.choice(products).id for _ in range(total_scans)]
+        chunks = [plan[i::options['pickers']] for i in range(options['pickers'])]
+        success = Counter()
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['pickers'])
+
+        def picker(product_ids):
+            local = Counter()
+            try:
+                barrier.wait()
+                for product_id in product_ids:
+                    try:
+                        if scan_fn(batch, product_id):
+                            local[product_id] += 1
+                    except Exception as e:
+                        with lock:
+                            errors.append(str(e))
+            finally:
+                with lock:
+                    success.update(local)
+                connection.close()
+
+        threads = [threading.Thread(target=picker, args=(chunk,)) for chunk in chunks]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, success, errors
+
+    def _verify(self, batch, products, success_by_product):
+        problems = []
+        items = {row['product_id']: row for row in BatchItem.objects.filter(batchlist=batch).values(
+            'product_id', 'jumlah', 'jumlah_ambil', 'status_ambil'
+        )}
+        stocks = dict(Stock.objects.filter(product__in=products).values_list('product_id', 'quantity'))
+        logs = dict(BatchItemLog.objects.filter(batch=batch).values('product_id').annotate(
+            total=Sum('jumlah_input')
+        ).values_list('product_id', 'total'))
+        for product in products:
+            item = items[product.id]
+            ok = success_by_product.get(product.id, 0)
+            if item['jumlah_ambil'] != ok:
+                problems.append(f"{product.sku}: jumlah_ambil={item['jumlah_ambil']} tetapi scan sukses={ok}")
+            if item['jumlah_ambil'] > item['jumlah']:
+                problems.append(f"{product.sku}: jumlah_ambil {item['jumlah_ambil']} > jumlah {item['jumlah']}")
+            if STOCK_QTY - stocks.get(product.id, STOCK_QTY) != ok:
+                problems.append(f"{product.sku}: stok berkurang {STOCK_QTY - stocks.get(product.id, STOCK_QTY)}, scan sukses={ok}")
+            if logs.get(product.id, 0) != ok:
+                problems.append(f"{product.sku}: BatchItemLog={logs.get(product.id, 0)}, scan sukses={ok}")
+        return problems
+
+    def _cleanup(self, batch, products):
+        with transaction.atomic():
+            BatchItemLog.objects.filter(batch=batch).delete()
+            BatchItem.objects.filter(batchlist=batch).delete()
+            Stock.objects.filter(product__in=products).delete()
+            batch.delete()
+            Product.objects.filter(id__in=[p.id for p in products]).delete()
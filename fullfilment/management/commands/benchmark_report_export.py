@@ -0,0 +1,176 @@
+"""
+Management command untuk regression benchmark export laporan (fullfilment.exports.shipping_report).
+
+Seed N order dummy + history packing / shipping hari ini di dalam transaksi yang di-rollback,
+lalu bandingkan:
+- legacy: openpyxl cell per cell dengan border per cell, query OrderPackingHistory per baris
+  untuk packer, lalu scan ulang semua sel untuk lebar kolom, disimpan ke BytesIO
+- engine-csv / engine-xlsx: erp_alfa.exports (values().iterator(), packer via subquery,
+  CSV streaming / XlsxWriter constant_memory ke file sementara)
+
+Per mode diukur waktu, jumlah query, puncak heap Python (tracemalloc, pass terpisah) dan peak RSS
+proses. Peak RSS tidak bisa di-reset, jadi mode dijalankan dari yang paling hemat memori;
+kolom "RSS +" adalah kenaikan peak RSS oleh mode tersebut.
+
+Usage: python manage.py benchmark_report_export --rows 100000
+"""
+
+import io
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from erp_alfa.exports import iter_csv, write_xlsx
+from fullfilment.exports import shipping_report
+from orders.models import Order, OrderPackingHistory, OrderShippingHistory
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _legacy_export(queryset):
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook()
+    ws = wb.active
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    side = Side(style='thin')
+    border = Border(left=side, right=side, top=side, bottom=side)
+    headers = ['No', 'Order ID', 'Nama Toko', 'Kurir', 'User Shipper', 'User Packer', 'Waktu Ship', 'AWB/Tracking']
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.border = border
+    for idx, history in enumerate(queryset.select_related('order', 'user'), 2):
+        user_packer = 'N/A'
+        if history.order:
+            packing_history = OrderPackingHistory.objects.filter(order=history.order).first()
+            if packing_history and packing_history.user:
+                user_packer = packing_history.user.username
+        values = [
+            idx - 1, history.order.id_pesanan, history.order.nama_toko, history.order.kurir,
+            history.user.username if history.user else 'N/A', user_packer,
+            history.waktu_ship.strftime('%d-%m-%Y %H:%M:%S'), history.order.awb_no_tracking,
+        ]
+        for col, value in enumerate(values, 1):
+            ws.cell(row=idx, column=col, value=value).border = border
+    for col in range(1, len(headers) + 1):
+        column_letter = get_column_letter(col)
+        max_length = 0
+        for row in range(1, ws.max_row + 1):
+            cell_value = ws[f"{column_letter}{row}"].value
+            if cell_value:
+                max_length = max(max_length, len(str(cell_value)))
+        ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
+    output = io.BytesIO()
+    wb.save(output)
+    return len(output.getvalue())
+
+
+def _engine_csv(spec):
+    return sum(len(line.encode('utf-8')) for line in iter_csv(spec))
+
+
+def _engine_xlsx(spec):
+    with tempfile.TemporaryFile() as output:
+        write_xlsx(output, spec)
+        return output.tell()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark waktu dan memori export laporan shipping: legacy openpyxl vs engine streaming (di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Jumlah baris shipping dummy')
+        parser.add_argument('--skip-legacy', action='store_true', help='Lewati mode legacy (lambat, N+1 query)')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                self._seed(options['rows'])
+                results = self._measure(options['skip_legacy'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write("\n" + "=" * 78)
+        self.stdout.write(
+            f"{'Mode':<14} {'Waktu (s)':>10} {'Query':>8} {'Heap (MB)':>10} {'RSS (MB)':>10} {'RSS + (MB)':>11} {'File (KB)':>10}"
+        )
+        for mode, elapsed, queries, heap, rss, rss_delta, size in results:
+            self.stdout.write(
+                f"{mode:<14} {elapsed:>10.2f} {queries:>8} {heap:>10.1f} {rss:>10.1f} {rss_delta:>11.1f} {size / 1024:>10.0f}"
+            )
+        self.stdout.write("=" * 78)
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    def _seed(self, count):
+        self.stdout.write(f"Seeding {count} order + history packing/shipping dummy...")
+        User = get_user_model()
+        users = [User.objects.create(username=f'bench-export-{i}') for i in range(5)]
+        for start in range(0, count, 5000):
+            orders = Order.objects.bulk_create([
+                Order(
+                    id_pesanan=f'BENCH-EXP-{i:08d}', awb_no_tracking=f'BEAWB{i:010d}', sku='BENCH-SKU', jumlah=1,
+                    status='Lunas', status_order='shipped', kurir=('JNE', 'SPX', 'J&T')[i % 3], nama_toko='Toko Bench',
+                )
+                for i in range(start, min(start + 5000, count))
+            ])
+            OrderPackingHistory.objects.bulk_create(
+                [OrderPackingHistory(order=order, user=users[i % 5]) for i, order in enumerate(orders)]
+            )
+            OrderShippingHistory.objects.bulk_create(
+                [OrderShippingHistory(order=order, user=users[(i + 1) % 5]) for i, order in enumerate(orders)]
+            )
+
+    def _run(self, mode, func):
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        rss_before = _peak_rss_mb()
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            size = func()
+            elapsed = time.perf_counter() - start
+        rss = _peak_rss_mb()
+
+        tracemalloc.start()
+        func()
+        heap = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+        self.stdout.write(f"{mode}: {elapsed:.2f}s")
+        return mode, elapsed, queries[0], heap, rss, rss - rss_before, size
+
+    def _measure(self, skip_legacy):
+        results = [
+            self._run('engine-csv', lambda: _engine_csv(shipping_report({}))),
+            self._run('engine-xlsx', lambda: _engine_xlsx(shipping_report({}))),
+        ]
+        if not skip_legacy:
+            # Baris yang sama dengan builder: history shipping hari ini
+            queryset = OrderShippingHistory.objects.filter(waktu_ship__date=timezone.localdate())
+            results.append(self._run('legacy', lambda: _legacy_export(queryset)))
+        return results
@@ -0,0 +1,132 @@
+"""
+Management command untuk regression benchmark lookup scan order (packing / shipping).
+
+Seed N baris order dummy (1-4 baris per id_pesanan, satu AWB per pesanan) di dalam
+transaksi yang di-rollback, lalu ukur latency p50/p99 per scan untuk:
+- legacy: filter id_pesanan__iexact | awb_no_tracking__iexact, lalu exists() + first() + iterasi
+- resolver cold: orders.scan_keys tanpa LRU (index fungsional UPPER)
+- resolver warm: orders.scan_keys dengan LRU terisi (lookup exact id_pesanan)
+Separuh scan memakai AWB, sepertiganya huruf kecil / spasi di ujung seperti input scanner.
+
+Usage: python manage.py benchmark_scan_lookup --lines 2000000 --samples 5000
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from orders.models import Order
+from orders.scan_keys import invalidate_scan_keys, resolve_scan_lines, warm_scan_keys
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency p50/p99 lookup scan order id_pesanan/AWB (data dummy, di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=2000000, help='Jumlah baris order dummy')
+        parser.add_argument('--samples', type=int, default=5000, help='Jumlah scan per mode')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                keys = self._seed(options['lines'])
+                results = self._measure(keys, options['samples'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            # Mapping order dummy tidak boleh tertinggal di LRU setelah rollback
+            invalidate_scan_keys()
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Mode':<16} {'Samples':>10} {'p50 (us)':>12} {'p99 (us)':>12}")
+        for mode, timings in results:
+            self.stdout.write(
+                f"{mode:<16} {len(timings):>10} {_percentile(timings, 50):>12.1f} {_percentile(timings, 99):>12.1f}"
+            )
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    def _seed(self, count):
+        self.stdout.write(f"Seeding {count} baris order dummy...")
+        rng = random.Random(42)
+        keys = []
+        batch = []
+        created = 0
+        order_no = 0
+        while created < count:
+            id_pesanan = f'BENCH-SCAN-{order_no:08d}'
+            awb = f'BSAWB{order_no:010d}'
+            keys.append((id_pesanan, awb))
+            for line in range(min(rng.randint(1, 4), count - created)):
+                batch.append(Order(
+                    id_pesanan=id_pesanan, awb_no_tracking=awb, sku=f'BENCH-SKU-{line}', jumlah=1,
+                    status='Lunas', status_order='picked',
+                ))
+                created += 1
+            order_no += 1
+            if len(batch) >= 5000:
+                Order.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Order.objects.bulk_create(batch)
+        invalidate_scan_keys()
+        return keys
+
+    def _scan_inputs(self, keys, samples, rng):
+        inputs = []
+        for i in range(samples):
+            id_pesanan, awb = rng.choice(keys)
+            value = awb if i % 2 else id_pesanan
+            inputs.append(value.lower() + ' ' if i % 3 == 0 else value)
+        return inputs
+
+    def _legacy(self, scan_input):
+        scan_input = scan_input.strip()
+        orders = Order.objects.filter(Q(id_pesanan__iexact=scan_input) | Q(awb_no_tracking__iexact=scan_input))
+        if not orders.exists():
+            return []
+        orders.first()
+        return list(orders)
+
+    def _run(self, inputs, func):
+        timings = []
+        misses = 0
+        for scan_input in inputs:
+            start = time.perf_counter()
+            lines = func(scan_input)
+            timings.append((time.perf_counter() - start) * 1e6)
+            if not lines:
+                misses += 1
+        if misses:
+            self.stdout.write(self.style.ERROR(f"✗ {misses} scan tidak ter-resolve"))
+        return timings
+
+    def _measure(self, keys, samples):
+        rng = random.Random(7)
+        inputs = self._scan_inputs(keys, samples, rng)
+
+        legacy = self._run(inputs, self._legacy)
+
+        invalidate_scan_keys()
+        cold = self._run(inputs, resolve_scan_lines)
+
+        self.stdout.write(f"Warm LRU: {warm_scan_keys()} key")
+        warm_inputs = self._scan_inputs(keys, samples, rng)
+        warm = self._run(warm_inputs, resolve_scan_lines)
+
+        return [('legacy', legacy), ('resolver-cold', cold), ('resolver-warm', warm)]
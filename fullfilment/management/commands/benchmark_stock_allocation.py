@@ -0,0 +1,211 @@
+"""
+Management command untuk benchmark engine alokasi stok (generatebatch_check_stock & ReadyToPrint).
+
+Membuat N baris order sintetis (1-4 baris per order, sebagian SAT) dengan stok yang
+sengaja rebutan, lalu membandingkan hasil dan waktu:
+- loop dict lama generatebatch_check_stock (FIFO) vs check_order_stock
+- allocate_orders lama (SAT-first) vs allocation.allocate_orders
+
+Dengan --db, baris order juga di-seed ke database (transaksi di-rollback) dan seluruh alur
+view diukur: alur lama (hapus semua, iterasi queryset model, insert ulang) vs alur baru
+(load values_list, alokasi array, sync OrderCukup/OrderTidakCukup berdasarkan selisih).
+
+Usage: python manage.py benchmark_stock_allocation --lines 100000 --products 5000 [--db]
+"""
+
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from fullfilment.allocation import allocate_orders, check_order_stock, sync_id_table
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _legacy_check_stock(rows, stock_map):
+    """Loop lama generatebatch_check_stock."""
+    pesanan_map = defaultdict(list)
+    for row in rows:
+        pesanan_map[row[1]].append(row)
+    quantity_left = stock_map.copy()
+    result = {}
+    for id_pesanan, items in pesanan_map.items():
+        product_jumlah = defaultdict(int)
+        for _, _, product_id, jumlah in items:
+            if product_id:
+                product_jumlah[product_id] += jumlah
+        cukup = True
+        for product_id, total_jumlah in product_jumlah.items():
+            if quantity_left.get(product_id, 0) < total_jumlah:
+                cukup = False
+                break
+        if cukup:
+            for product_id, total_jumlah in product_jumlah.items():
+                quantity_left[product_id] -= total_jumlah
+        result[id_pesanan] = 'cukup' if cukup else 'tidak cukup'
+    return result
+
+
+def _legacy_allocate_orders(order_lines, available_stock):
+    """allocate_orders lama (dict per order, SAT-first)."""
+    needs_sat = defaultdict(lambda: defaultdict(int))
+    needs_other = defaultdict(lambda: defaultdict(int))
+    for id_pesanan, product_id, jumlah, order_type in order_lines:
+        needs = needs_sat if order_type == '1' else needs_other
+        order_needs = needs[id_pesanan]
+        if product_id:
+            order_needs[product_id] += jumlah
+    running_stock = defaultdict(int, available_stock)
+    ready_ids = []
+    for needs in (needs_sat, needs_other):
+        for id_pesanan in sorted(needs, key=lambda value: (value is None, value or '')):
+            order_needs = needs[id_pesanan]
+            if all(running_stock[pid] >= qty for pid, qty in order_needs.items()):
+                for pid, qty in order_needs.items():
+                    running_stock[pid] -= qty
+                ready_ids.append(id_pesanan)
+    return ready_ids, dict(running_stock)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark alokasi stok lama vs engine array (data sintetis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=100000, help='Jumlah baris order')
+        parser.add_argument('--products', type=int, default=5000, help='Jumlah produk')
+        parser.add_argument('--contention', type=float, default=0.3,
+                            help='Perkiraan porsi produk yang stoknya kurang dari total kebutuhan')
+        parser.add_argument('--db', action='store_true', help='Ukur juga alur view dengan data di database')
+
+    def handle(self, *args, **options):
+        rows, order_lines, stock_map = self._generate(options['lines'], options['products'], options['contention'])
+        self.stdout.write(f"{len(rows)} baris, {len({r[1] for r in rows})} order, {len(stock_map)} produk")
+
+        results = []
+        start = time.perf_counter()
+        legacy_check = _legacy_check_stock(rows, stock_map)
+        results.append(('check_stock lama', time.perf_counter() - start))
+        start = time.perf_counter()
+        new_check = check_order_stock(rows, stock_map)
+        results.append(('check_order_stock', time.perf_counter() - start))
+
+        start = time.perf_counter()
+        legacy_ready, legacy_running = _legacy_allocate_orders(order_lines, stock_map)
+        results.append(('allocate lama', time.perf_counter() - start))
+        start = time.perf_counter()
+        new_ready, new_running = allocate_orders(order_lines, stock_map)
+        results.append(('allocate array', time.perf_counter() - start))
+
+        if options['db']:
+            results.extend(self._measure_db(rows, stock_map))
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Tahap':<24} {'Waktu (ms)':>12}")
+        for label, elapsed in results:
+            self.stdout.write(f"{label:<24} {elapsed * 1000:>12.1f}")
+        self.stdout.write("=" * 60)
+
+        mismatches = []
+        if legacy_check != new_check.result:
+            diff = [k for k in legacy_check if legacy_check[k] != new_check.result.get(k)]
+            mismatches.append(f"check_stock berbeda untuk {len(diff)} order")
+        if legacy_ready != new_ready:
+            mismatches.append("urutan/daftar order siap ReadyToPrint berbeda")
+        if any(new_running.get(pid, 0) != qty for pid, qty in legacy_running.items()):
+            mismatches.append("sisa stok ReadyToPrint berbeda")
+        for message in mismatches:
+            self.stdout.write(self.style.ERROR(f"✗ {message}"))
+        if mismatches:
+            raise CommandError("Hasil engine array tidak sama dengan algoritma lama")
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Hasil identik: {len(new_check.cukup_ids)} cukup, {len(new_check.tidak_cukup_ids)} tidak cukup, "
+            f"{len(new_ready)} siap print"
+        ))
+
+    def _generate(self, line_count, product_count, contention):
+        rng = random.Random(11)
+        demand = defaultdict(int)
+        rows = []
+        order_lines = []
+        order_no = 0
+        while len(rows) < line_count:
+            order_no += 1
+            id_pesanan = f'BENCH-ALLOC-{order_no:07d}'
+            order_type = '1' if rng.random() < 0.4 else rng.choice(['2', '3', '4'])
+            for _ in range(min(rng.choice([1, 1, 1, 2, 2, 3, 4]), line_count - len(rows))):
+                product_id = rng.randint(1, product_count) if rng.random() > 0.01 else None
+                jumlah = rng.choice([1, 1, 1, 2, 3])
+                if product_id:
+                    demand[product_id] += jumlah
+                rows.append((len(rows) + 1, id_pesanan, product_id, jumlah))
+                order_lines.append((id_pesanan, product_id, jumlah, order_type))
+        stock_map = {}
+        for product_id in range(1, product_count + 1):
+            need = demand.get(product_id, 0)
+            if rng.random() < contention:
+                stock_map[product_id] = rng.randint(0, max(need - 1, 0))
+            else:
+                stock_map[product_id] = need + rng.randint(0, 5)
+        return rows, order_lines, stock_map
+
+    def _measure_db(self, rows, stock_map):
+        from inventory.models import Stock
+        from orders.models import Order, OrderCukup, OrderTidakCukup
+        from products.models import Product
+
+        timings = []
+        try:
+            with transaction.atomic():
+                products = Product.objects.bulk_create([
+                    Product(sku=f'BENCH-ALLOC-{pid}', barcode=f'BENCHALLOC{pid}', nama_produk=f'Bench Alloc {pid}')
+                    for pid in stock_map
+                ], batch_size=5000)
+                product_map = {pid: product.id for pid, product in zip(stock_map, products)}
+                Stock.objects.bulk_create([
+                    Stock(product_id=product_map[pid], quantity=qty) for pid, qty in stock_map.items()
+                ], batch_size=5000)
+                Order.objects.bulk_create([
+                    Order(id_pesanan=id_pesanan, product_id=product_map.get(pid), jumlah=jumlah, status='Lunas')
+                    for _, id_pesanan, pid, jumlah in rows
+                ], batch_size=5000)
+                queryset = Order.objects.filter(id_pesanan__startswith='BENCH-ALLOC-')
+
+                start = time.perf_counter()
+                legacy = self._legacy_view_flow(queryset.select_related('product'), Stock, OrderCukup, OrderTidakCukup)
+                timings.append(('view lama (db)', time.perf_counter() - start))
+
+                start = time.perf_counter()
+                loaded = list(queryset.order_by('id').values_list('id', 'id_pesanan', 'product_id', 'jumlah'))
+                loaded_products = {row[2] for row in loaded if row[2]}
+                db_stock = dict(Stock.objects.filter(product_id__in=loaded_products).values_list('product_id', 'quantity'))
+                check = check_order_stock(loaded, db_stock)
+                sync_id_table(OrderCukup, check.cukup_ids)
+                sync_id_table(OrderTidakCukup, check.tidak_cukup_ids)
+                timings.append(('view baru (db)', time.perf_counter() - start))
+
+                if legacy != check.result:
+                    self.stdout.write(self.style.ERROR("✗ Hasil view lama dan baru berbeda"))
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return timings
+
+    def _legacy_view_flow(self, qs, Stock, OrderCukup, OrderTidakCukup):
+        """Alur lama generatebatch_check_stock terhadap queryset."""
+        OrderCukup.objects.all().delete()
+        OrderTidakCukup.objects.all().delete()
+        pesanan_map = defaultdict(list)
+        for o in qs:
+            pesanan_map[o.id_pesanan].append(o)
+        all_product_ids = {o.product_id for o in qs if o.product_id}
+        stock_map = {s.product_id: s.quantity for s in Stock.objects.filter(product_id__in=all_product_ids)}
+        rows = [(0, id_pesanan, o.product_id, o.jumlah) for id_pesanan, items in pesanan_map.items() for o in items]
+        result = _legacy_check_stock(rows, stock_map)
+        OrderCukup.objects.bulk_create([OrderCukup(id_pesanan=k) for k, v in result.items() if v == 'cukup'])
+        OrderTidakCukup.objects.bulk_create([OrderTidakCukup(id_pesanan=k) for k, v in result.items() if v != 'cukup'])
+        return result
@@ -0,0 +1,54 @@
+"""
+Management command untuk membandingkan hasil incremental ReadyToPrint dengan full algorithm.
+
+Usage:
+    python manage.py check_ready_to_print               # semua batch open
+    python manage.py check_ready_to_print --batch NAMA  # satu batch
+    python manage.py check_ready_to_print --fix         # full recompute batch yang tidak konsisten
+"""
+
+from django.core.management.base import BaseCommand
+
+from fullfilment.models import BatchList
+from fullfilment.readytoprint_logic import calculate_and_sync_ready_to_print, check_ready_to_print_consistency
+
+
+class Command(BaseCommand):
+    help = 'Consistency check ReadyToPrint incremental vs full recompute'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=str, help='Cek satu batch saja (nama_batch)')
+        parser.add_argument('--fix', action='store_true', help='Full recompute batch yang tidak konsisten')
+        parser.add_argument('--verbose', action='store_true', help='Tampilkan id_pesanan yang berbeda')
+
+    def handle(self, *args, **options):
+        if options.get('batch'):
+            batches = BatchList.objects.filter(nama_batch=options['batch'])
+        else:
+            batches = BatchList.objects.filter(status_batch='open')
+
+        checked = 0
+        inconsistent = 0
+        for batch in batches:
+            checked += 1
+            result = check_ready_to_print_consistency(batch)
+            if not result['missing'] and not result['unexpected']:
+                continue
+
+            inconsistent += 1
+            self.stdout.write(self.style.WARNING(
+                f"  {batch.nama_batch}: missing={len(result['missing'])}, unexpected={len(result['unexpected'])}"
+            ))
+            if options.get('verbose'):
+                self.stdout.write(f"    missing: {', '.join(result['missing'])}")
+                self.stdout.write(f"    unexpected: {', '.join(result['unexpected'])}")
+            if options.get('fix'):
+                calculate_and_sync_ready_to_print(batch)
+                self.stdout.write(f"    → full recompute {batch.nama_batch}")
+
+        self.stdout.write("\n" + "=" * 60)
+        if inconsistent:
+            self.stdout.write(self.style.ERROR(f"✗ {inconsistent} dari {checked} batch tidak konsisten"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ {checked} batch konsisten"))
+        self.stdout.write("=" * 60)
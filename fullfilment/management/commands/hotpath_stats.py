@@ -0,0 +1,72 @@
+"""
+Management command untuk menampilkan latency hot path per endpoint.
+
+Membaca snapshot histogram yang di-publish worker web ke cache (lihat
+erp_alfa.instrumentation) lalu mencetak p50/p95/p99 durasi total, waktu & jumlah query
+database, dan (dengan --phases) durasi per span.
+
+Catatan: dengan LocMemCache (DEBUG) cache tidak dibagi antar proses, jadi command ini
+hanya melihat data jika cache memakai Redis. Gunakan /api/hotpath-stats/ untuk development.
+
+Usage: python manage.py hotpath_stats [--endpoint picking] [--phases] [--reset]
+"""
+
+from django.core.management.base import BaseCommand
+
+from erp_alfa.instrumentation import (
+    METRIC_DB_QUERIES, METRIC_DB_TIME, METRIC_TOTAL, PHASE_PREFIX, get_hotpath_stats, reset_hotpath_stats,
+)
+
+
+def _fmt(value):
+    return f"{value:.2f}" if value is not None else '-'
+
+
+class Command(BaseCommand):
+    help = 'Tampilkan p50/p95/p99 latency hot path per endpoint dari semua worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', type=str, default='', help='Filter nama endpoint (substring)')
+        parser.add_argument('--phases', action='store_true', help='Tampilkan durasi per span/fase')
+        parser.add_argument('--reset', action='store_true', help='Kosongkan semua histogram setelah ditampilkan')
+
+    def handle(self, *args, **options):
+        stats = get_hotpath_stats()
+        endpoints = {
+            name: metrics for name, metrics in stats['endpoints'].items()
+            if options['endpoint'] in name
+        }
+
+        if not endpoints:
+            self.stdout.write(self.style.WARNING("⚠ Belum ada data hot path di cache"))
+            return
+
+        self.stdout.write("\n" + "=" * 100)
+        self.stdout.write(f"Proses: {stats['processes']}")
+        self.stdout.write(
+            f"{'Endpoint':<44} {'Count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'DB q p50':>9} {'DB ms p95':>10}"
+        )
+        self.stdout.write("-" * 100)
+        for name, metrics in endpoints.items():
+            total = metrics.get(METRIC_TOTAL, {})
+            queries = metrics.get(METRIC_DB_QUERIES, {})
+            db_time = metrics.get(METRIC_DB_TIME, {})
+            self.stdout.write(
+                f"{name:<44} {total.get('count', 0):>7} {_fmt(total.get('p50')):>9} {_fmt(total.get('p95')):>9} "
+                f"{_fmt(total.get('p99')):>9} {_fmt(queries.get('p50')):>9} {_fmt(db_time.get('p95')):>10}"
+            )
+            if options['phases']:
+                for metric, summary in metrics.items():
+                    if not metric.startswith(PHASE_PREFIX):
+                        continue
+                    phase = '  └ ' + metric[len(PHASE_PREFIX):]
+                    self.stdout.write(
+                        f"{phase:<44} {summary['count']:>7} {_fmt(summary['p50']):>9} {_fmt(summary['p95']):>9} "
+                        f"{_fmt(summary['p99']):>9}"
+                    )
+        self.stdout.write("=" * 100)
+
+        if options['reset']:
+            reset_hotpath_stats()
+            self.stdout.write(self.style.SUCCESS("✓ Histogram hot path dikosongkan"))
@@ -0,0 +1,27 @@
+"""
+Management command untuk membangun ulang StationDailyCounter (leaderboard scan packing /
+shipping) dari OrderPackingHistory / OrderShippingHistory.
+
+Usage:
+    python manage.py rebuild_station_counters            # hari ini
+    python manage.py rebuild_station_counters --days 30  # 30 hari terakhir
+
+Scan yang terjadi selama rebuild bisa tertimpa; jalankan di luar jam operasional station.
+"""
+
+from django.core.management.base import BaseCommand
+
+from fullfilment.station_metrics import rebuild_station_counters
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang counter harian station scan packing/shipping dari history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1, help='Jumlah hari terakhir (termasuk hari ini)')
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "=" * 60)
+        rows = rebuild_station_counters(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"✓ {rows} baris counter station dibangun ulang"))
+        self.stdout.write("=" * 60)
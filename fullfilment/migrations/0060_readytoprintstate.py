@@ -0,0 +1,30 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fullfilment', '0059_alter_batchlist_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadyToPrintState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('picked_stock', models.JSONField(blank=True, default=dict)),
+                ('running_stock', models.JSONField(blank=True, default=dict)),
+                ('order_signature', models.CharField(blank=True, default='', max_length=255)),
+                ('last_full_sync', models.DateTimeField(blank=True, null=True)),
+                ('last_incremental_sync', models.DateTimeField(blank=True, null=True)),
+                ('batchlist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ready_to_print_state', to='fullfilment.batchlist')),
+            ],
+            options={
+                'verbose_name': 'Ready To Print State',
+                'verbose_name_plural': 'Ready To Print States',
+            },
+        ),
+    ]
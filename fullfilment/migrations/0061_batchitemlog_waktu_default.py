@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fullfilment', '0060_readytoprintstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='batchitemlog',
+            name='waktu',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fullfilment', '0061_batchitemlog_waktu_default'),
+        ('orders', '0011_orderheader'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordercancellog',
+            name='order_header',
+            field=models.ForeignObject(from_fields=['order_id_scanned'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='orders.orderheader', to_fields=['id_pesanan']),
+        ),
+        migrations.AddField(
+            model_name='readytoprint',
+            name='order_header',
+            field=models.ForeignObject(from_fields=['id_pesanan'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='orders.orderheader', to_fields=['id_pesanan']),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fullfilment', '0062_order_header_relation'),
+        ('inventory', '0038_stockbalancesnapshot_stockcard_indexes'),
+        ('products', '0021_product_search_trgm_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchSettlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('close_count', models.IntegerField()),
+                ('tipe', models.CharField(choices=[('close', 'Close Batch'), ('reopen', 'Re-Open Batch')], max_length=10)),
+                ('qty', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('batchlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='settlements', to='fullfilment.batchlist')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='products.product')),
+                ('stock_card_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.stockcardentry')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Batch Settlement',
+                'verbose_name_plural': 'Batch Settlements',
+                'unique_together': {('batchlist', 'close_count', 'product', 'tipe')},
+            },
+        ),
+    ]
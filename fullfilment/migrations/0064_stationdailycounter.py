@@ -0,0 +1,59 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_today(apps, schema_editor):
+    """Counter hari ini dari history agar leaderboard tidak kosong setelah deploy."""
+    StationDailyCounter = apps.get_model('fullfilment', 'StationDailyCounter')
+    tanggal = timezone.localdate()
+    counters = []
+    for station, model_name, time_field in (
+        ('packing', 'OrderPackingHistory', 'waktu_pack'),
+        ('shipping', 'OrderShippingHistory', 'waktu_ship'),
+    ):
+        rows = apps.get_model('orders', model_name).objects.filter(
+            **{f'{time_field}__date': tanggal}, user__isnull=False,
+        ).annotate(tanggal=TruncDate(time_field)).values('tanggal', 'user_id').annotate(
+            total=Count('order__id_pesanan', distinct=True),
+            first_scan_at=Min(time_field),
+            last_scan_at=Max(time_field),
+        ).order_by()
+        counters += [StationDailyCounter(station=station, **row) for row in rows]
+    StationDailyCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fullfilment', '0063_batchsettlement'),
+        ('orders', '0013_order_scan_key_upper_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationDailyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('station', models.CharField(choices=[('packing', 'Packing'), ('shipping', 'Shipping')], max_length=20)),
+                ('tanggal', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('first_scan_at', models.DateTimeField(blank=True, null=True)),
+                ('last_scan_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='station_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Station Daily Counter',
+                'verbose_name_plural': 'Station Daily Counters',
+                'indexes': [models.Index(fields=['station', 'tanggal', '-total'], name='station_counter_rank_idx')],
+                'unique_together': {('station', 'tanggal', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_today, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.postgres.fields import JSONField
 from django.utils import timezone
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.db.models import F, Sum, OuterRef, Subquery, Min, Window
 from django.db.models.functions import Coalesce, RowNumber
@@ -143,12 +145,40 @@ class ReadyToPrint(models.Model):
     handed_over_at = models.DateTimeField(null=True, blank=True)
     printed_via = models.CharField(max_length=20, null=True, blank=True, help_text="Metode pencetakan (e.g., SAT, PRIO, MIX)")
     printed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='printed_orders')
+    # Relasi virtual (tanpa kolom) ke header order, untuk join order_type/status dalam satu query
+    order_header = models.ForeignObject(
+        'orders.OrderHeader', on_delete=models.DO_NOTHING, from_fields=['id_pesanan'], to_fields=['id_pesanan'],
+        null=True, related_name='+',
+    )
 
     def __str__(self):
         return f"{self.id_pesanan} - {self.status_print}"
 
+class ReadyToPrintState(models.Model):
+    """
+    State alokasi ready-to-print per batch untuk incremental allocator.
+
+    picked_stock menyimpan snapshot total jumlah_ambil per produk saat sinkronisasi terakhir,
+    running_stock menyimpan sisa stok per produk setelah alokasi, dan order_signature adalah
+    ringkasan agregat order di batch untuk mendeteksi perubahan order di luar hook.
+    """
+    batchlist = models.OneToOneField(BatchList, on_delete=models.CASCADE, related_name='ready_to_print_state')
+    picked_stock = models.JSONField(default=dict, blank=True)
+    running_stock = models.JSONField(default=dict, blank=True)
+    order_signature = models.CharField(max_length=255, blank=True, default='')
+    last_full_sync = models.DateTimeField(null=True, blank=True)
+    last_incremental_sync = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Ready To Print State"
+        verbose_name_plural = "Ready To Print States"
+
+    def __str__(self):
+        return f"RTP state {self.batchlist.nama_batch}"
+
 class BatchItemLog(models.Model):
-    waktu = models.DateTimeField(auto_now_add=True)
+    # default (bukan auto_now_add) agar waktu scan tetap benar saat log di-bulk_create belakangan
+    waktu = models.DateTimeField(default=timezone.now)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     batch = models.ForeignKey('BatchList', on_delete=models.CASCADE)
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE)
@@ -163,6 +193,62 @@ class BatchItemLog(models.Model):
     def __str__(self):
         return f"{self.waktu} - {self.user} - {self.batch} - {self.product} - {self.jumlah_ambil}"
 
+class BatchSettlement(models.Model):
+    """
+    Catatan settlement stok per produk saat batch di-close / di-reopen (batch_settlement).
+    Key (batchlist, close_count, product, tipe) unik: settlement yang sama tidak pernah
+    diterapkan dua kali ke Stock.quantity_locked.
+    """
+    TIPE_CHOICES = [
+        ('close', 'Close Batch'),
+        ('reopen', 'Re-Open Batch'),
+    ]
+
+    batchlist = models.ForeignKey(BatchList, on_delete=models.CASCADE, related_name='settlements')
+    close_count = models.IntegerField()
+    product = models.ForeignKey('products.Product', on_delete=models.PROTECT)
+    tipe = models.CharField(max_length=10, choices=TIPE_CHOICES)
+    qty = models.IntegerField()
+    stock_card_entry = models.ForeignKey('inventory.StockCardEntry', on_delete=models.SET_NULL, null=True, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Batch Settlement"
+        verbose_name_plural = "Batch Settlements"
+        unique_together = ('batchlist', 'close_count', 'product', 'tipe')
+
+    def __str__(self):
+        return f"{self.batchlist.nama_batch} #{self.close_count} {self.tipe} - {self.product} ({self.qty})"
+
+class StationDailyCounter(models.Model):
+    """
+    Jumlah pesanan (id_pesanan unik) yang berhasil di-scan per user per hari per station.
+    Dinaikkan fullfilment.station_metrics.record_scan; sumber leaderboard scan packing/shipping.
+    """
+    STATION_CHOICES = [
+        ('packing', 'Packing'),
+        ('shipping', 'Shipping'),
+    ]
+
+    station = models.CharField(max_length=20, choices=STATION_CHOICES)
+    tanggal = models.DateField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='station_counters')
+    total = models.PositiveIntegerField(default=0)
+    first_scan_at = models.DateTimeField(null=True, blank=True)
+    last_scan_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Station Daily Counter"
+        verbose_name_plural = "Station Daily Counters"
+        unique_together = ('station', 'tanggal', 'user')
+        indexes = [
+            models.Index(fields=['station', 'tanggal', '-total'], name='station_counter_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.station} {self.tanggal} {self.user_id} = {self.total}"
+
 # NEW MODEL: OrderCancelLog
 class OrderCancelLog(models.Model):
     order_id_scanned = models.CharField(max_length=255, db_index=True, help_text="ID Pesanan atau AWB yang discan")
@@ -171,6 +257,11 @@ class OrderCancelLog(models.Model):
     status_pembayaran_at_scan = models.CharField(max_length=50, blank=True, null=True, help_text="Status Pembayaran Order saat discan")
     status_fulfillment_at_scan = models.CharField(max_length=50, blank=True, null=True, help_text="Status Fulfillment Order saat discan")
     status_retur = models.CharField(max_length=1, default='N', help_text="Status retur: N=Belum diproses, Y=Sudah diproses retur")
+    # Relasi virtual (tanpa kolom) ke header order yang discan (jika yang discan id_pesanan)
+    order_header = models.ForeignObject(
+        'orders.OrderHeader', on_delete=models.DO_NOTHING, from_fields=['order_id_scanned'], to_fields=['id_pesanan'],
+        null=True, related_name='+',
+    )
 
     class Meta:
         verbose_name = "Order Cancel Log"
@@ -253,3 +344,17 @@ class ReturnSourceLog(models.Model):
         if self.session:
             parts.append(f"Session {self.session.kode}")
         return f"{' & '.join(parts)} - {self.qty}"
+
+
+@receiver([post_save, post_delete], sender=ReturnSession)
+@receiver([post_save, post_delete], sender=ReturnItem)
+@receiver([post_save, post_delete], sender=ReadyToPrint)
+def invalidate_notification_cache_on_fullfilment_change(sender, instance, **kwargs):
+    """
+    Invalidate badge counter return list dan ready to print ketika datanya berubah
+    """
+    try:
+        from erp_alfa.views import invalidate_notification_cache
+        invalidate_notification_cache(sender)
+    except ImportError:
+        pass  # Ignore if function not available
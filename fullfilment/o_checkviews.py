@@ -6,6 +6,8 @@ from django.views.decorators.http import require_POST
 from django.shortcuts import render
 import json
 from products.models import Product
+from products.barcode_resolver import resolve_product
+from erp_alfa.instrumentation import instrument_view
 
 def orders_scan(request):
     table_rows = None
@@ -40,6 +42,7 @@ def orders_scan(request):
         'order_id': order_id,
     })
 
+@instrument_view('orderscan.scan_barcode')
 @csrf_exempt
 @require_POST
 def scan_barcode_order_scan(request):
@@ -49,9 +52,8 @@ def scan_barcode_order_scan(request):
         barcode = data.get('barcode')
         if not order_id or not barcode:
             return JsonResponse({'success': False, 'error': 'Order ID dan barcode wajib diisi.'})
-        try:
-            product = Product.objects.get(barcode=barcode)
-        except Product.DoesNotExist:
+        product = resolve_product(barcode)
+        if not product:
             return JsonResponse({'success': False, 'error': 'Barcode tidak ditemukan di master produk.'})
         try:
             order = Order.objects.get(id_pesanan=order_id, product_id=product.id)
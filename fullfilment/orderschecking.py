@@ -5,8 +5,11 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.db.models import F
 from orders.models import Order, OrderPackingHistory
+from orders.order_headers import refresh_order_headers
 from .models import ReadyToPrint, OrdersCheckingHistory
 from products.models import Product  # Pastikan import model Product
+from products.barcode_resolver import resolve_product
+from erp_alfa.instrumentation import instrument_view
 from django.views.decorators.csrf import ensure_csrf_cookie
 import json
 from django.db import transaction
@@ -136,6 +139,7 @@ def orders_checking(request, order_id=None):
     return render(request, template, context)
 
 
+@instrument_view('orderschecking.scan_barcode')
 def orders_checking_scan_barcode(request, order_id):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid method.'}, status=405)
@@ -145,9 +149,8 @@ def orders_checking_scan_barcode(request, order_id):
         if not barcode:
             return JsonResponse({'success': False, 'error': 'Barcode required.'})
         # Cari product dengan barcode
-        try:
-            product = Product.objects.get(barcode=barcode)
-        except Product.DoesNotExist:
+        product = resolve_product(barcode)
+        if not product:
             return JsonResponse({'success': False, 'error': 'Barcode tidak ditemukan.'})
         # Cari order yang sesuai TANPA filter status_bundle
         try:
@@ -235,6 +238,7 @@ def orders_checking_scan_barcode(request, order_id):
         # hanya flag 'all_order_completed' yang dihapus dari respons.
         if not pending.exists() and completed.exists():
             Order.objects.filter(id_pesanan=order_id).update(status_order='picked')
+            refresh_order_headers([order_id])
 
         return JsonResponse({
             'success': True,
@@ -295,6 +299,7 @@ def orders_checking_history(request):
     return render(request, 'fullfilment/scanpicking_history.html', context)
 
 
+@instrument_view('orderschecking.update_by_click_view')
 @csrf_exempt # Pastikan ini HANYA untuk development, gunakan CSRF token di produksi
 @require_POST
 def update_by_click_view(request, order_id):
@@ -367,6 +372,7 @@ def update_by_click_view(request, order_id):
             all_order_completed = False
             if not pending.exists() and completed.exists():
                 Order.objects.filter(id_pesanan=order_id).update(status_order='picked')
+                refresh_order_headers([order_id])
                 all_order_completed = True
 
             return JsonResponse({
@@ -404,6 +410,7 @@ def build_rows_for_clickpicking(order_id):
     return list(pending_orders), list(completed_orders)
 
 
+@instrument_view('orderschecking.update_by_click')
 @require_POST
 @csrf_exempt
 def update_by_click(request, order_id): # order_id here is Order.id_pesanan (from URL)
@@ -500,6 +507,7 @@ def update_by_click(request, order_id): # order_id here is Order.id_pesanan (fro
             all_order_completed = False
             if not pending.exists() and completed.exists():
                 Order.objects.filter(id_pesanan=order_id).update(status_order='picked')
+                refresh_order_headers([order_id])
                 all_order_completed = True
 
             return JsonResponse({
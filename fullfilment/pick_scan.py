@@ -0,0 +1,125 @@
+"""
+Pick scan service untuk batch picking.
+
+Setiap scan menaikkan jumlah_ambil BatchItem dengan satu UPDATE bersyarat
+(jumlah_ambil + qty <= jumlah dan belum completed) yang langsung mengembalikan nilai
+baru (UPDATE ... RETURNING), lalu mengurangi Stock dengan F() di transaksi yang sama.
+Tidak ada read-modify-write di Python sehingga dua picker yang scan SKU yang sama
+tidak saling menimpa.
+
+BatchItemLog ditulis di transaksi scan yang sama: jika insert log gagal, increment
+dan pengurangan stok ikut di-rollback sehingga log audit tidak pernah hilang.
+"""
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from inventory.models import Stock
+from .models import BatchItem, BatchItemLog
+
+PICKED = 'picked'
+ALREADY_COMPLETED = 'already_completed'
+QUANTITY_FULL = 'quantity_full'
+NOT_FOUND = 'not_found'
+
+PickScanResult = namedtuple(
+    'PickScanResult',
+    ['status', 'batchitem_id', 'jumlah_ambil', 'jumlah', 'status_ambil', 'completed_at', 'completed_by_id'],
+)
+
+_RETURNING_VENDORS = ('postgresql', 'sqlite')
+
+
+def _increment_returning(batch_id, product_id, qty, user_id, now):
+    """UPDATE bersyarat dengan RETURNING (PostgreSQL / SQLite >= 3.35)."""
+    table = connection.ops.quote_name(BatchItem._meta.db_table)
+    sql = f"""
+        UPDATE {table}
+        SET jumlah_ambil = jumlah_ambil + %s,
+            last_updated = %s,
+            status_ambil = CASE WHEN jumlah_ambil + %s >= jumlah THEN 'completed' ELSE status_ambil END,
+            completed_at = CASE WHEN jumlah_ambil + %s >= jumlah THEN %s ELSE completed_at END,
+            completed_by_id = CASE WHEN jumlah_ambil + %s >= jumlah THEN COALESCE(%s, completed_by_id) ELSE completed_by_id END
+        WHERE id = (
+            SELECT id FROM {table} WHERE batchlist_id = %s AND product_id = %s ORDER BY id LIMIT 1
+        )
+          AND status_ambil <> 'completed'
+          AND jumlah_ambil + %s <= jumlah
+        RETURNING id, jumlah_ambil, jumlah, status_ambil, completed_by_id
+    """
+    db_now = connection.ops.adapt_datetimefield_value(now)
+    params = [qty, db_now, qty, qty, db_now, qty, user_id, batch_id, product_id, qty]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    item_id, jumlah_ambil, jumlah, status_ambil, completed_by_id = row
+    completed_at = now if status_ambil == 'completed' else None
+    return item_id, jumlah_ambil, jumlah, status_ambil, completed_at, completed_by_id
+
+
+def _increment_orm(batch_id, product_id, qty, user_id, now):
+    """Fallback untuk database tanpa UPDATE ... RETURNING: update bersyarat lalu baca ulang baris yang terkunci."""
+    item_id = BatchItem.objects.filter(batchlist_id=batch_id, product_id=product_id).order_by('id').values_list(
+        'id', flat=True
+    ).first()
+    if item_id is None:
+        return None
+    completes = Q(jumlah_ambil__gte=F('jumlah') - qty)
+    changes = {
+        'jumlah_ambil': F('jumlah_ambil') + qty,
+        'last_updated': now,
+        'status_ambil': Case(When(completes, then=Value('completed')), default=F('status_ambil')),
+        'completed_at': Case(When(completes, then=Value(now)), default=F('completed_at')),
+    }
+    if user_id:
+        changes['completed_by_id'] = Case(When(completes, then=Value(user_id)), default=F('completed_by_id'))
+    updated = BatchItem.objects.filter(
+        id=item_id, jumlah_ambil__lte=F('jumlah') - qty
+    ).exclude(status_ambil='completed').update(**changes)
+    if not updated:
+        return None
+    return BatchItem.objects.filter(id=item_id).values_list(
+        'id', 'jumlah_ambil', 'jumlah', 'status_ambil', 'completed_at', 'completed_by_id'
+    ).first()
+
+
+def apply_pick_scan(batch, product_id, user=None, qty=1):
+    """
+    Catat hasil scan picking untuk satu produk di batch.
+
+    Return PickScanResult dengan status:
+    - PICKED: jumlah_ambil bertambah (nilai baru ada di result), Stock sudah dikurangi
+    - ALREADY_COMPLETED: item sudah completed sebelumnya
+    - QUANTITY_FULL: jumlah_ambil sudah sama dengan jumlah
+    - NOT_FOUND: produk tidak ada di batch
+    """
+    user_id = user.id if user is not None and user.is_authenticated else None
+    now = timezone.now()
+    increment = _increment_returning if connection.vendor in _RETURNING_VENDORS else _increment_orm
+
+    with transaction.atomic():
+        row = increment(batch.id, product_id, qty, user_id, now)
+        if row is None:
+            current = BatchItem.objects.filter(batchlist=batch, product_id=product_id).order_by('id').values_list(
+                'id', 'jumlah_ambil', 'jumlah', 'status_ambil', 'completed_at', 'completed_by_id'
+            ).first()
+            if current is None:
+                return PickScanResult(NOT_FOUND, None, None, None, None, None, None)
+            status = ALREADY_COMPLETED if current[3] == 'completed' else QUANTITY_FULL
+            return PickScanResult(status, *current)
+
+        Stock.objects.filter(product_id=product_id).update(
+            quantity=F('quantity') - qty,
+            quantity_locked=F('quantity_locked') - qty,
+        )
+        BatchItemLog.objects.create(
+            waktu=now, user_id=user_id, batch_id=batch.id, product_id=product_id,
+            jumlah_input=qty, jumlah_ambil=row[1],
+        )
+
+    return PickScanResult(PICKED, *row)
+
@@ -1,79 +1,64 @@
+import logging
 from collections import defaultdict
-from .models import BatchList, BatchItem, ReadyToPrint
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .allocation import allocate_orders
+from .live_updates import publish_ready_to_print
+from .models import BatchList, BatchItem, ReadyToPrint, ReadyToPrintState
 from orders.models import Order
-from django.db.models import Q
 
+logger = logging.getLogger(__name__)
+
+CANCELLED_Q = Q(status__icontains='batal') | Q(status__icontains='cancel')
+
+
+def _active_lines(batchlist):
+    """Queryset baris order aktif (bukan batal/cancel) di batch."""
+    return Order.objects.filter(nama_batch=batchlist.nama_batch).exclude(CANCELLED_Q)
 
-def calculate_and_sync_ready_to_print(batchlist: BatchList):
-    """
-    Menghitung order mana saja dalam sebuah batch yang siap untuk di-pick
-    berdasarkan stok yang tersedia dan menyinkronkan hasilnya ke model ReadyToPrint.
 
-    Fungsi ini menerapkan sistem prioritas: order SAT dipenuhi terlebih dahulu.
+def _line_tuples(queryset):
+    return list(queryset.values_list('id_pesanan', 'product_id', 'jumlah', 'order_type'))
+
+
+def _picked_stock(batchlist, product_ids=None):
+    """Total jumlah_ambil per produk dari BatchItem batch."""
+    queryset = BatchItem.objects.filter(batchlist=batchlist, product_id__isnull=False)
+    if product_ids is not None:
+        queryset = queryset.filter(product_id__in=product_ids)
+    rows = queryset.values('product_id').annotate(total=Sum('jumlah_ambil')).order_by()
+    return {row['product_id']: row['total'] or 0 for row in rows}
+
+
+def _order_signature(batchlist):
+    """Ringkasan agregat order batch; berubah jika ada order masuk/keluar/batal/diedit."""
+    summary = Order.objects.filter(nama_batch=batchlist.nama_batch).aggregate(
+        lines=Count('id'),
+        qty=Sum('jumlah'),
+        ids=Sum('id'),
+        products=Sum('product_id'),
+        cancelled=Count('id', filter=CANCELLED_Q),
+        sat=Count('id', filter=Q(order_type='1')),
+    )
+    return ':'.join(str(summary[key] or 0) for key in ('lines', 'qty', 'ids', 'products', 'cancelled', 'sat'))
+
+
+def _apply_ready_ids(batchlist, new_ids, scope_ids=None):
     """
-    if not batchlist:
-        return
+    Sinkronkan hasil alokasi ke tabel ReadyToPrint.
+    Jika scope_ids diberikan, hanya entri dengan id_pesanan di scope yang dibandingkan.
+    """
+    current = ReadyToPrint.objects.filter(batchlist=batchlist)
+    if scope_ids is not None:
+        current = current.filter(id_pesanan__in=scope_ids)
+    current_ids = set(current.values_list('id_pesanan', flat=True))
+    new_ids = set(new_ids)
 
-    # 1. Ambil semua order, kecualikan yang dibatalkan, dan pisahkan berdasarkan prioritas (SAT vs lainnya)
-    all_orders_in_batch = Order.objects.filter(nama_batch=batchlist.nama_batch).exclude(
-        Q(status__icontains='batal') | Q(status__icontains='cancel')
-    ).order_by('id')
-    sat_orders = all_orders_in_batch.filter(order_type='1')
-    other_orders = all_orders_in_batch.exclude(order_type='1')
-
-    # 2. Hitung total stok yang sudah diambil (picked) dari BatchItem
-    batchitems = BatchItem.objects.filter(batchlist=batchlist)
-    available_stock = defaultdict(int)
-    for bi in batchitems:
-        if bi.product_id:
-            available_stock[bi.product_id] += bi.jumlah_ambil
-    
-    # Siapkan list untuk menampung ID yang siap dan stok berjalan untuk simulasi
-    ready_to_pick_ids_list = []
-    running_stock = available_stock.copy()
-
-    # 3. PROSES PRIORITAS: Coba penuhi semua order SAT terlebih dahulu
-    orders_per_pesanan_sat = defaultdict(list)
-    for o in sat_orders:
-        orders_per_pesanan_sat[o.id_pesanan].append(o)
-    
-    for id_pesanan, order_items in sorted(orders_per_pesanan_sat.items()):
-        order_needs = defaultdict(int)
-        for item in order_items:
-            if item.product_id:
-                order_needs[item.product_id] += item.jumlah
-        
-        can_fulfill = all(running_stock.get(pid, 0) >= j_needed for pid, j_needed in order_needs.items())
-        
-        if can_fulfill:
-            for pid, j_needed in order_needs.items():
-                running_stock[pid] -= j_needed
-            ready_to_pick_ids_list.append(id_pesanan)
-
-    # 4. PROSES REGULER: Gunakan sisa stok untuk order lainnya dengan urutan FIFO
-    orders_per_pesanan_other = defaultdict(list)
-    for o in other_orders:
-        orders_per_pesanan_other[o.id_pesanan].append(o)
-
-    for id_pesanan, order_items in sorted(orders_per_pesanan_other.items()):
-        order_needs = defaultdict(int)
-        for item in order_items:
-            if item.product_id:
-                order_needs[item.product_id] += item.jumlah
-        
-        can_fulfill = all(running_stock.get(pid, 0) >= j_needed for pid, j_needed in order_needs.items())
-        
-        if can_fulfill:
-            for pid, j_needed in order_needs.items():
-                running_stock[pid] -= j_needed
-            ready_to_pick_ids_list.append(id_pesanan)
-
-    # 5. Sinkronisasi hasil perhitungan ke tabel ReadyToPrint
-    current_rtp_ids = set(ReadyToPrint.objects.filter(batchlist=batchlist).values_list('id_pesanan', flat=True))
-    new_rtp_ids = set(ready_to_pick_ids_list)
-
-    ids_to_add = new_rtp_ids - current_rtp_ids
-    ids_to_remove = current_rtp_ids - new_rtp_ids
+    ids_to_add = new_ids - current_ids
+    ids_to_remove = current_ids - new_ids
 
     if ids_to_remove:
         # Hanya hapus entri ReadyToPrint yang BELUM dicetak
@@ -84,12 +69,163 @@ def calculate_and_sync_ready_to_print(batchlist: BatchList):
         new_entries = [ReadyToPrint(batchlist=batchlist, id_pesanan=idp, status_print='pending') for idp in ids_to_add]
         ReadyToPrint.objects.bulk_create(new_entries, ignore_conflicts=True)
 
-    # Debug: Print untuk melihat apa yang terjadi
-    print(f"DEBUG: Batch {batchlist.nama_batch}")
-    print(f"DEBUG: Total orders in batch: {len(all_orders_in_batch)}")
-    print(f"DEBUG: Available stock: {dict(available_stock)}")
-    print(f"DEBUG: Ready to pick IDs: {ready_to_pick_ids_list}")
-    print(f"DEBUG: Current RTP IDs: {current_rtp_ids}")
-    print(f"DEBUG: New RTP IDs: {new_rtp_ids}")
-    print(f"DEBUG: IDs to add: {ids_to_add}")
-    print(f"DEBUG: IDs to remove: {ids_to_remove}") 
\ No newline at end of file
+    if ids_to_add or ids_to_remove:
+        publish_ready_to_print(batchlist.nama_batch, len(ids_to_add), len(ids_to_remove))
+    return ids_to_add, ids_to_remove
+
+
+def _lock_state(batchlist):
+    ReadyToPrintState.objects.get_or_create(batchlist=batchlist)
+    return ReadyToPrintState.objects.select_for_update().get(batchlist=batchlist)
+
+
+def calculate_and_sync_ready_to_print(batchlist: BatchList):
+    """
+    Menghitung order mana saja dalam sebuah batch yang siap untuk di-pick
+    berdasarkan stok yang tersedia dan menyinkronkan hasilnya ke model ReadyToPrint.
+
+    Ini adalah full recompute: seluruh order dan BatchItem batch dimuat ulang. Dipakai
+    saat state belum ada atau order berubah di luar hook, dan sebagai pembanding
+    consistency checker. Fungsi ini menerapkan sistem prioritas: order SAT dipenuhi terlebih dahulu.
+    """
+    if not batchlist:
+        return
+
+    with transaction.atomic():
+        state = _lock_state(batchlist)
+        picked_stock = _picked_stock(batchlist)
+        ready_ids, running_stock = allocate_orders(_line_tuples(_active_lines(batchlist)), picked_stock)
+        ids_to_add, ids_to_remove = _apply_ready_ids(batchlist, ready_ids)
+
+        state.picked_stock = {str(pid): qty for pid, qty in picked_stock.items()}
+        state.running_stock = {str(pid): qty for pid, qty in running_stock.items()}
+        state.order_signature = _order_signature(batchlist)
+        state.last_full_sync = timezone.now()
+        state.save()
+
+    logger.debug(
+        "RTP full sync %s: %s ready, +%s/-%s",
+        batchlist.nama_batch, len(ready_ids), len(ids_to_add), len(ids_to_remove),
+    )
+
+
+def _component_lines(batchlist, product_ids=(), id_pesanan_list=()):
+    """
+    Muat baris order yang terhubung (lewat produk yang sama) dengan produk/order awal.
+
+    Alokasi greedy pada satu komponen produk-order tidak mempengaruhi komponen lain, sehingga
+    hasil alokasi komponen sama persis dengan hasil full recompute untuk order-order tersebut.
+    """
+    active = _active_lines(batchlist)
+    product_ids = {pid for pid in product_ids if pid}
+    order_ids = set(id_pesanan_list)
+
+    while True:
+        if product_ids:
+            order_ids |= set(
+                active.filter(product_id__in=product_ids).values_list('id_pesanan', flat=True).distinct()
+            )
+        lines = _line_tuples(active.filter(id_pesanan__in=order_ids))
+        new_product_ids = {line[1] for line in lines if line[1]} - product_ids
+        if not new_product_ids:
+            break
+        product_ids |= new_product_ids
+
+    return lines, product_ids, order_ids
+
+
+def sync_ready_to_print_incremental(batchlist, product_ids=(), id_pesanan_list=()):
+    """
+    Hitung ulang alokasi hanya untuk order yang terdampak perubahan stok produk
+    (product_ids) atau perubahan order (id_pesanan_list), lalu sinkronkan ReadyToPrint.
+    """
+    if not batchlist or not (product_ids or id_pesanan_list):
+        return
+
+    with transaction.atomic():
+        state = _lock_state(batchlist)
+        lines, component_products, component_orders = _component_lines(batchlist, product_ids, id_pesanan_list)
+        picked_stock = _picked_stock(batchlist, component_products)
+        ready_ids, running_stock = allocate_orders(lines, picked_stock)
+        ids_to_add, ids_to_remove = _apply_ready_ids(batchlist, ready_ids, scope_ids=component_orders)
+
+        for pid in component_products:
+            state.picked_stock[str(pid)] = picked_stock.get(pid, 0)
+            state.running_stock[str(pid)] = running_stock.get(pid, 0)
+        if id_pesanan_list:
+            state.order_signature = _order_signature(batchlist)
+        state.last_incremental_sync = timezone.now()
+        state.save()
+
+    logger.debug(
+        "RTP incremental sync %s: %s produk, %s order, +%s/-%s",
+        batchlist.nama_batch, len(component_products), len(component_orders), len(ids_to_add), len(ids_to_remove),
+    )
+
+
+def refresh_ready_to_print(batchlist):
+    """
+    Pastikan state ReadyToPrint batch up to date sebelum dibaca halaman.
+
+    - State belum ada atau order batch berubah di luar hook: full recompute.
+    - jumlah_ambil BatchItem berubah: incremental hanya untuk produk yang berubah.
+    - Tidak ada perubahan: tidak ada perhitungan, cukup baca tabel ReadyToPrint.
+    """
+    if not batchlist:
+        return
+
+    state = ReadyToPrintState.objects.filter(batchlist=batchlist).first()
+    if state is None or state.order_signature != _order_signature(batchlist):
+        calculate_and_sync_ready_to_print(batchlist)
+        return
+
+    picked_stock = _picked_stock(batchlist)
+    snapshot = {int(pid): qty for pid, qty in state.picked_stock.items()}
+    changed_products = {
+        pid for pid in set(picked_stock) | set(snapshot)
+        if picked_stock.get(pid, 0) != snapshot.get(pid, 0)
+    }
+    if changed_products:
+        sync_ready_to_print_incremental(batchlist, product_ids=changed_products)
+
+
+def sync_ready_to_print_orders(nama_batch, id_pesanan_list):
+    """
+    Hook untuk perubahan order (cancel, erase, transfer) di sebuah batch.
+    Hanya order tersebut dan order yang berbagi produk dengannya yang dihitung ulang.
+    """
+    if not nama_batch or not id_pesanan_list:
+        return
+    batchlist = BatchList.objects.filter(nama_batch=nama_batch).first()
+    if not batchlist:
+        return
+    # Produk dari order terdampak (termasuk yang baru saja batal/keluar dari batch)
+    product_ids = set(
+        Order.objects.filter(id_pesanan__in=id_pesanan_list, product_id__isnull=False)
+        .values_list('product_id', flat=True)
+    )
+    sync_ready_to_print_incremental(batchlist, product_ids=product_ids, id_pesanan_list=id_pesanan_list)
+
+
+def check_ready_to_print_consistency(batchlist):
+    """
+    Bandingkan isi ReadyToPrint (hasil incremental) dengan hasil full algorithm tanpa menulis.
+
+    Return dict berisi id_pesanan yang seharusnya siap tapi belum ada di ReadyToPrint (missing)
+    dan entri belum dicetak yang seharusnya tidak siap (unexpected).
+    """
+    ready_ids, _ = allocate_orders(_line_tuples(_active_lines(batchlist)), _picked_stock(batchlist))
+    expected = set(ready_ids)
+    current = set(ReadyToPrint.objects.filter(batchlist=batchlist).values_list('id_pesanan', flat=True))
+    unprinted = set(
+        ReadyToPrint.objects.filter(batchlist=batchlist, printed_at__isnull=True).values_list('id_pesanan', flat=True)
+    )
+    # Order yang sudah punya ReadyToPrint di batch lain tidak bisa ditambahkan (id_pesanan unik)
+    elsewhere = set(
+        ReadyToPrint.objects.filter(id_pesanan__in=expected - current).exclude(batchlist=batchlist)
+        .values_list('id_pesanan', flat=True)
+    )
+    return {
+        'missing': sorted(expected - current - elsewhere, key=str),
+        'unexpected': sorted(unprinted - expected, key=str),
+    }
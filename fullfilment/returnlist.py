@@ -5,6 +5,8 @@ from .models import ReturnSession, OrderCancelLog, BatchList, BatchItem, ReturnI
 from orders.models import Order, OrderShippingHistory # Tambahkan OrderShippingHistory
 from inventory.models import Stock, StockCardEntry # Tambahkan Stock dan StockCardEntry
 from products.models import Product, ProductExtraBarcode # Tambahkan Product dan ProductExtraBarcode
+from products.barcode_resolver import resolve_product
+from erp_alfa.instrumentation import instrument_view
 from django.db.models import Count, Q, F, Window, OuterRef, Subquery, Sum, Min, Case, When, Value, IntegerField, BooleanField # Tambahkan Sum, Min, OuterRef, Subquery, Case, When, Value, IntegerField, BooleanField
 from django.db.models.functions import RowNumber
 
@@ -70,18 +72,14 @@ def returnlist_dashboard(request):
         id_pesanan__in=order_ids_in_user_log_and_pending_return
     ).order_by('id_pesanan', '-id').distinct('id_pesanan')
 
-    # Subquery to get the status_retur from the Order model for OrderCancelLog
-    order_status_retur_subquery = Order.objects.filter(
-        id_pesanan=OuterRef('order_id_scanned')
-    ).values('status_retur')[:1]
-
     # Query untuk Order Cancel Belum Return (By User)
+    # status_retur order diambil lewat join ke OrderHeader (bukan subquery per baris log)
     order_cancel_by_user_belum_return = OrderCancelLog.objects.annotate(
-        linked_order_status_retur=Subquery(order_status_retur_subquery)
+        linked_order_status_retur=F('order_header__status_retur')
     ).filter(
         Q(linked_order_status_retur='N') | Q(linked_order_status_retur='') | Q(linked_order_status_retur__isnull=True),
-        # Filter: Order masih ada di orders_order (jika order sudah di-delete, tidak muncul di list)
-        Q(order_id_scanned__in=Order.objects.values_list('id_pesanan', flat=True))
+        # Filter: Order masih ada (header hanya ada selama order ada di orders_order)
+        Q(order_header__isnull=False)
     ).annotate(
         row_num=Window(
             expression=RowNumber(),
@@ -284,6 +282,7 @@ def get_returnlists_for_dropdown(request): # Nama fungsi tetap, tapi akan mempro
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Terjadi kesalahan: {str(e)}'}, status=500)
 
+@instrument_view('return.scan_source')
 @login_required
 @require_POST
 @permission_required('fullfilment.change_returnlist', raise_exception=True)
@@ -578,6 +577,7 @@ def scanordercancel_view(request, return_session_id, order_id=None):
     template_name = 'fullfilment/scanordercancel_mobile.html' if is_mobile else 'fullfilment/scanordercancel.html'
     return render(request, template_name, context)
 
+@instrument_view('return.scan_cancel_barcode')
 @login_required
 @require_POST
 @csrf_exempt
@@ -592,11 +592,7 @@ def scanordercancel_scan_barcode(request, return_session_id, order_id):
         return_session = get_object_or_404(ReturnSession, id=return_session_id)
 
         # Cari produk berdasarkan barcode
-        product = Product.objects.filter(barcode=barcode).first()
-        if not product:
-            extra_barcode_entry = ProductExtraBarcode.objects.filter(barcode=barcode).select_related('product').first()
-            if extra_barcode_entry:
-                product = extra_barcode_entry.product
+        product = resolve_product(barcode)
         
         if not product:
             return JsonResponse({'success': False, 'message': 'Produk dengan barcode ini tidak ditemukan.'})
@@ -1310,6 +1306,7 @@ def process_putaway_return(request, session_id):
         logging.exception(f"Error during putaway return session {session_id}")
         return JsonResponse({'success': False, 'message': f'Terjadi kesalahan: {str(e)}'}, status=500)
 
+@instrument_view('return.putaway_item')
 @login_required
 @require_POST
 @csrf_exempt
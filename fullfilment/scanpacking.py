@@ -4,11 +4,14 @@ from importlib import import_module
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.db import transaction
-from django.db.models import Q, F, Count, Window, Min
-from django.db.models.functions import RowNumber
+from django.db.models import Q, F, Count
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required, permission_required
-from orders.models import Order, OrderPackingHistory, OrderHandoverHistory
+from orders.models import Order, OrderHeader, OrderPackingHistory, OrderHandoverHistory
+from orders.order_headers import refresh_order_headers
+from orders.scan_keys import resolve_scan_lines
+from .station_metrics import PACKING, recent_activity, record_scan, scans_per_hour, station_totals, user_standing
+from erp_alfa.instrumentation import instrument_view
 import datetime
 from django.core.exceptions import PermissionDenied
 
@@ -47,6 +50,7 @@ def get_motivational_message_list(rank, total_packers):
         from fullfilment.motivasi import default
         return default.MESSAGES
 
+@instrument_view('packing.scan')
 @login_required
 def scanpacking(request):
     """
@@ -73,15 +77,14 @@ def scanpacking(request):
                 return JsonResponse({'success': False, 'message': 'Input tidak boleh kosong.'})
             
             with transaction.atomic():
-                orders = Order.objects.filter(
-                    Q(id_pesanan__iexact=scan_input) | Q(awb_no_tracking__iexact=scan_input)
-                )
+                # Satu lookup ber-index (id_pesanan / AWB), baris dipakai ulang untuk update & history
+                orders = resolve_scan_lines(scan_input)
 
-                if not orders.exists():
+                if not orders:
                     return JsonResponse({'success': False, 'message': f"Order dengan ID atau Resi '{scan_input}' tidak ditemukan."})
 
                 # NEW: Validasi status pembayaran atau status fulfillment adalah 'batal'/'cancel'
-                first_order = orders.first()
+                first_order = orders[0]
                 if 'batal' in (first_order.status or '').lower() or \
                    'cancel' in (first_order.status or '').lower() or \
                    'batal' in (first_order.status_order or '').lower() or \
@@ -103,11 +106,13 @@ def scanpacking(request):
                 current_status = first_order.status_order.lower()
 
                 if current_status == 'picked':
-                    updated_count = orders.update(status_order='packed')
+                    updated_count = Order.objects.filter(pk__in=[o.pk for o in orders]).update(status_order='packed')
+                    refresh_order_headers({o.id_pesanan for o in orders})
                     history_entries = [
                         OrderPackingHistory(order=order, user=request.user) for order in orders
                     ]
                     OrderPackingHistory.objects.bulk_create(history_entries)
+                    record_scan(PACKING, request.user, orders)
                     
                     # --- Start of Scan Counter Logic ---
                     scan_count = request.session.get('scan_count_for_message', 0) + 1
@@ -124,10 +129,10 @@ def scanpacking(request):
                         'message': f"Berhasil! {updated_count} item untuk pesanan '{scan_input}' telah diubah menjadi 'Packed'."
                     })
                 elif current_status == 'packed':
-                    last_packing = OrderPackingHistory.objects.filter(order=orders.first()).order_by('-waktu_pack').first()
+                    last_packing = OrderPackingHistory.objects.filter(order=first_order).order_by('-waktu_pack').first()
                     message = f"Pesanan '{scan_input}' sudah di-PACKED oleh {last_packing.user.username} pada {last_packing.waktu_pack.strftime('%d-%m-%Y %H:%M')}." if last_packing else f"Pesanan '{scan_input}' sudah di-PACKED sebelumnya."
                 elif current_status == 'shipped':
-                    last_ship = OrderHandoverHistory.objects.filter(order=orders.first()).order_by('-waktu_ho').first()
+                    last_ship = OrderHandoverHistory.objects.filter(order=first_order).order_by('-waktu_ho').first()
                     message = f"Pesanan '{scan_input}' sudah di-SHIPPED oleh {last_ship.user.username} pada {last_ship.waktu_ho.strftime('%d-%m-%Y %H:%M')}. Tolong kembalikan kertas ini ke admin." if last_ship else f"Pesanan '{scan_input}' sudah di-SHIPPED. Tolong kembalikan kertas ini ke admin."
                 elif current_status == 'printed':
                     message = f"Pesanan '{scan_input}' belum di-pick. Silakan lakukan proses picking terlebih dahulu."
@@ -141,27 +146,10 @@ def scanpacking(request):
         except Exception as e:
             return JsonResponse({'success': False, 'message': f'Terjadi error internal: {str(e)}'}, status=500)
     
-    today = timezone.now().date()
     current_user = request.user
 
-    user_scores = OrderPackingHistory.objects.filter(
-        waktu_pack__date=today
-    ).values('user_id').annotate(
-        total_packs=Count('order__id_pesanan', distinct=True)
-    ).order_by('-total_packs')
-
-    total_packers_today = len(user_scores)
-    user_packs_today = 0
-    user_rank_today = 0
-    
-    for i, score in enumerate(user_scores):
-        if score['user_id'] == current_user.id:
-            user_rank_today = i + 1
-            user_packs_today = score['total_packs']
-            break
-            
-    if user_rank_today == 0:
-        user_rank_today = total_packers_today + 1
+    # Leaderboard dari counter harian (station_metrics), bukan GROUP BY atas history
+    user_packs_today, user_rank_today, total_packers_today = user_standing(PACKING, current_user)
 
     # --- Motivational Message Logic with 10-Scan Cycle ---
     stored_message = request.session.get('motivational_message')
@@ -179,30 +167,14 @@ def scanpacking(request):
     else:
         motivational_message = stored_message
 
-    now = timezone.now()
-    start_of_work = now.replace(hour=9, minute=0, second=0, microsecond=0)
-    packs_per_hour = 0.0 
-
-    if now > start_of_work:
-        duration_seconds = (now - start_of_work).total_seconds()
-        if duration_seconds > 60:
-            duration_hours = duration_seconds / 3600
-            packs_per_hour = user_packs_today / duration_hours
-        else:
-            packs_per_hour = float(user_packs_today)
-            
-    last_10_packing = OrderPackingHistory.objects.annotate(
-        row_num=Window(
-            expression=RowNumber(),
-            partition_by=[F('order__id_pesanan')],
-            order_by=F('waktu_pack').desc()
-        )
-    ).filter(row_num=1).select_related('user', 'order').order_by('-waktu_pack')[:10]
-    
+    packs_per_hour = scans_per_hour(user_packs_today)
+    last_10_packing = recent_activity(PACKING)
+
     template_name = 'fullfilment/mobile_scanpacking.html' if is_mobile else 'fullfilment/scanpacking.html'
 
-    total_batched = Order.objects.filter(nama_batch__isnull=False).values('id_pesanan').distinct().count()
-    total_packed = Order.objects.filter(nama_batch__isnull=False, status_order='packed').values('id_pesanan').distinct().count()
+    totals = station_totals()
+    total_batched = totals['batched']
+    total_packed = totals['packed']
 
     context = {
         'last_10_packing': last_10_packing,
@@ -229,11 +201,11 @@ def scanpacking_list_api(request):
     length = int(request.GET.get('length', 25))
     search_value = request.GET.get('search[value]', '')
 
-    # Queryset dasar: hanya order yang sudah 'picked'
-    base_queryset = Order.objects.filter(status_order='picked')
+    # Queryset dasar: header order yang sudah 'picked' (satu baris per id_pesanan)
+    base_queryset = OrderHeader.objects.filter(status_order='picked')
 
     # Hitung total record unik
-    total_records = base_queryset.values('id_pesanan').distinct().count()
+    total_records = base_queryset.count()
 
     # Terapkan filter pencarian jika ada
     if search_value:
@@ -243,15 +215,10 @@ def scanpacking_list_api(request):
         )
     
     # Hitung record unik setelah difilter
-    filtered_records = base_queryset.values('id_pesanan').distinct().count()
+    filtered_records = base_queryset.count()
 
-    # Ambil data unik, ambil nilai pertama untuk kolom lain
     unique_orders_queryset = base_queryset.values(
-        'id_pesanan'
-    ).annotate(
-        tanggal_pembuatan=Min('tanggal_pembuatan'),
-        nama_batch=Min('nama_batch'),
-        status_order=Min('status_order'),
+        'id_pesanan', 'tanggal_pembuatan', 'nama_batch', 'status_order'
     ).order_by('-tanggal_pembuatan')
 
     # Terapkan paginasi
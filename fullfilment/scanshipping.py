@@ -5,12 +5,16 @@ from importlib import import_module
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.db import transaction
-from django.db.models import Q, F, Count, Window, Min
-from django.db.models.functions import RowNumber
+from django.db.models import Q, F, Count, Min
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required, permission_required
 from django.views.decorators.http import require_GET
-from orders.models import Order, OrderShippingHistory, OrderPackingHistory
+from orders.models import Order, OrderHeader, OrderShippingHistory
+from orders.order_headers import refresh_order_headers
+from orders.scan_keys import resolve_scan_lines
+from .station_metrics import SHIPPING, recent_activity, record_scan, scans_per_hour, station_totals, user_standing
+from erp_alfa.instrumentation import instrument_view
+from erp_alfa.exports import export_response
 import pytz
 from django.db.models import CharField, Value as V
 from django.db.models.functions import Concat
@@ -104,6 +108,7 @@ def is_order_in_courier_group(order_kurir, selected_courier):
     
     return False
 
+@instrument_view('shipping.scan')
 @login_required
 @permission_required('fullfilment.view_desktop_shipping_module', raise_exception=True)
 def scanshipping(request):
@@ -123,14 +128,13 @@ def scanshipping(request):
                 return JsonResponse({'success': False, 'message': 'Kurir belum dipilih.'})
 
             with transaction.atomic():
-                orders = Order.objects.filter(
-                    Q(id_pesanan__iexact=scan_input) | Q(awb_no_tracking__iexact=scan_input)
-                )
+                # Satu lookup ber-index (id_pesanan / AWB), baris dipakai ulang untuk update & history
+                orders = resolve_scan_lines(scan_input)
 
-                if not orders.exists():
+                if not orders:
                     return JsonResponse({'success': False, 'message': f"Order dengan ID atau Resi '{scan_input}' tidak ditemukan."})
 
-                order = orders.first()
+                order = orders[0]
 
                 # NEW: Validasi status pembayaran atau status fulfillment adalah 'batal'/'cancel'
                 if 'batal' in (order.status or '').lower() or \
@@ -169,12 +173,14 @@ def scanshipping(request):
                     return JsonResponse({'success': False, 'message': f"Order ini bukan milik kurir '{selected_courier}'. Kurir order: {order.kurir}."})
 
                 # --- JIKA SEMUA VALID, LANJUTKAN PROSES ---
-                updated_count = orders.update(status_order='shipped')
+                updated_count = Order.objects.filter(pk__in=[o.pk for o in orders]).update(status_order='shipped')
+                refresh_order_headers({o.id_pesanan for o in orders})
                 # Ubah dari OrderHandoverHistory ke OrderShippingHistory
                 history_entries = [
                     OrderShippingHistory(order=o, user=request.user) for o in orders
                 ]
                 OrderShippingHistory.objects.bulk_create(history_entries) # Ubah nama model di sini
+                record_scan(SHIPPING, request.user, orders)
                 
                 # --- Start of Scan Counter Logic ---
                 scan_count = request.session.get('scan_count_for_message', 0) + 1
@@ -196,27 +202,10 @@ def scanshipping(request):
         except Exception as e:
             return JsonResponse({'success': False, 'message': f'Terjadi error internal: {str(e)}'}, status=500)
     
-    today = timezone.now().date()
     current_user = request.user
 
-    user_scores = OrderShippingHistory.objects.filter(
-        waktu_ship__date=today
-    ).values('user_id').annotate(
-        total_ships=Count('order__id_pesanan', distinct=True)
-    ).order_by('-total_ships')
-
-    total_shippers_today = len(user_scores)
-    user_ships_today = 0
-    user_rank_today = 0
-    
-    for i, score in enumerate(user_scores):
-        if score['user_id'] == current_user.id:
-            user_rank_today = i + 1
-            user_ships_today = score['total_ships']
-            break
-            
-    if user_rank_today == 0:
-        user_rank_today = total_shippers_today + 1
+    # Leaderboard dari counter harian (station_metrics), bukan GROUP BY atas history
+    user_ships_today, user_rank_today, total_shippers_today = user_standing(SHIPPING, current_user)
 
     # --- Motivational Message Logic with 10-Scan Cycle ---
     stored_message = request.session.get('motivational_message')
@@ -234,33 +223,17 @@ def scanshipping(request):
     else:
         motivational_message = stored_message
 
-    now = timezone.now()
-    start_of_work = now.replace(hour=9, minute=0, second=0, microsecond=0)
-    ships_per_hour = 0.0 
+    ships_per_hour = scans_per_hour(user_ships_today)
+    last_10_shipping = recent_activity(SHIPPING)
 
-    if now > start_of_work:
-        duration_seconds = (now - start_of_work).total_seconds()
-        if duration_seconds > 60:
-            duration_hours = duration_seconds / 3600
-            ships_per_hour = user_ships_today / duration_hours
-        else:
-            ships_per_hour = float(user_ships_today)
-            
-    last_10_shipping = OrderShippingHistory.objects.annotate(
-        row_num=Window(
-            expression=RowNumber(),
-            partition_by=[F('order__id_pesanan')],
-            order_by=F('waktu_ship').desc()
-        )
-    ).filter(row_num=1).select_related('user', 'order').order_by('-waktu_ship')[:10]
-    
     user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
     is_mobile = any(x in user_agent for x in ['android', 'iphone', 'ipad', 'ipod', 'blackberry', 'iemobile', 'opera mini'])
     template_name = 'fullfilment/mobile_scanshipping.html' if is_mobile else 'fullfilment/scanshipping.html'
     
     # --- Tambahkan kalkulasi untuk statistik ---
-    total_batched_orders = Order.objects.filter(nama_batch__isnull=False).values('id_pesanan').distinct().count()
-    total_shipped_orders = Order.objects.filter(status_order='shipped', nama_batch__isnull=False).values('id_pesanan').distinct().count()
+    totals = station_totals()
+    total_batched_orders = totals['batched']
+    total_shipped_orders = totals['shipped']
 
     context = {
         'last_10_shipping': last_10_shipping,
@@ -546,112 +519,8 @@ def order_shipping_report_view(request):
 
 @login_required
 def order_shipping_report_download_excel(request):
-    """Download Excel report untuk shipping per kurir."""
-    try:
-        from datetime import datetime
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-        from django.http import HttpResponse
-    except ImportError as e:
-        return HttpResponse(f"Error importing openpyxl: {str(e)}", status=500)
-    
-    # Get selected date from request (default: today)
-    selected_date_str = request.GET.get('date', '')
-    courier_name = request.GET.get('courier', '')
-    
-    jakarta_tz = pytz.timezone('Asia/Jakarta')
-    if selected_date_str:
-        try:
-            selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            selected_date = timezone.now().astimezone(jakarta_tz).date()
-    else:
-        selected_date = timezone.now().astimezone(jakarta_tz).date()
-    
-    # Query shipping history untuk tanggal yang dipilih
-    shipping_histories = OrderShippingHistory.objects.filter(
-        waktu_ship__date=selected_date
-    ).select_related('order', 'user')
-    
-    # Filter by courier if specified
-    if courier_name:
-        shipping_histories = shipping_histories.filter(order__kurir=courier_name)
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Shipping Report {selected_date.strftime('%d-%m-%Y')}"
-    
-    # Define styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Headers
-    headers = [
-        'No', 'Order ID', 'Nama Toko', 'Kurir', 'User Shipper', 'User Packer',
-        'Waktu Ship', 'AWB/Tracking'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-    
-    # Data
-    for idx, history in enumerate(shipping_histories, 2):
-        # Get user packer from OrderPackingHistory
-        user_packer = 'N/A'
-        if history.order:
-            packing_history = OrderPackingHistory.objects.filter(order=history.order).first()
-            if packing_history and packing_history.user:
-                user_packer = packing_history.user.username
-        
-        ws.cell(row=idx, column=1, value=idx-1).border = border
-        ws.cell(row=idx, column=2, value=history.order.id_pesanan if history.order else 'N/A').border = border
-        ws.cell(row=idx, column=3, value=history.order.nama_toko if history.order else 'N/A').border = border
-        ws.cell(row=idx, column=4, value=history.order.kurir if history.order else 'N/A').border = border
-        ws.cell(row=idx, column=5, value=history.user.username if history.user else 'N/A').border = border
-        ws.cell(row=idx, column=6, value=user_packer).border = border
-        ws.cell(row=idx, column=7, value=history.waktu_ship.astimezone(jakarta_tz).strftime('%d-%m-%Y %H:%M:%S') if history.waktu_ship else 'N/A').border = border
-        ws.cell(row=idx, column=8, value=history.order.awb_no_tracking if history.order else 'N/A').border = border
-    
-    # Auto-adjust column widths
-    for col in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col)
-        max_length = 0
-        for row in range(1, ws.max_row + 1):
-            cell_value = ws[f"{column_letter}{row}"].value
-            if cell_value:
-                max_length = max(max_length, len(str(cell_value)))
-        ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-    
-    # Save to BytesIO
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Create response
-    filename = f"shipping_report_{selected_date.strftime('%Y%m%d')}"
-    if courier_name:
-        filename += f"_{courier_name.replace(' ', '_')}"
-    filename += ".xlsx"
-    
-    response = HttpResponse(
-        output.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+    """Download Excel report untuk shipping per kurir (?format=csv untuk CSV)."""
+    return export_response(request, 'fullfilment.exports.shipping_report')
 
 @login_required
 def order_shipping_detail_view(request):
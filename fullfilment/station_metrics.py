@@ -0,0 +1,232 @@
+"""
+Station metrics untuk halaman scan packing / shipping: leaderboard harian, pack/ship per jam,
+rank untuk pesan motivasi, aktivitas terakhir dan total order batch.
+
+- record_scan(): dipanggil saat scan pack/ship berhasil (di dalam transaksi scan). Menaikkan
+  StationDailyCounter (station, tanggal, user) sebanyak pesanan unik yang di-scan; setelah
+  commit aktivitas masuk ring buffer, counter total di cache disesuaikan dan delta dikirim
+  sebagai live update (topik station:<station>).
+- user_standing(): total, rank dan jumlah user hari ini dari counter (satu query kecil,
+  sebanyak user aktif hari itu) - bukan GROUP BY Count(distinct) atas tabel history.
+- recent_activity(): RECENT_LIMIT pesanan terakhir (unik per id_pesanan) dari ring buffer di
+  cache; jika cache kosong dibangun ulang dari history terbaru (urut pk, tanpa window function).
+- station_totals(): total order batch / packed / shipped dari cache. Dihitung ulang dari
+  OrderHeader setelah TOTALS_TIMEOUT sebagai jaring pengaman untuk perubahan status di luar
+  station scan (generate batch, cancel, edit manual).
+- rebuild_station_counters(): bangun ulang counter dari history (command rebuild_station_counters).
+
+Ring buffer dan total di cache hanya untuk tampilan: scan bersamaan bisa saling menimpa satu
+entri ring buffer, counter leaderboard di database tetap akurat.
+"""
+import logging
+from collections import namedtuple
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import OrderHeader, OrderPackingHistory, OrderShippingHistory
+from .live_updates import publish_station_scan
+from .models import StationDailyCounter
+
+logger = logging.getLogger(__name__)
+
+PACKING = 'packing'
+SHIPPING = 'shipping'
+RECENT_LIMIT = 10
+RECENT_SCAN_ROWS = 500
+RECENT_TIMEOUT = 60 * 60 * 24
+TOTALS_TIMEOUT = 300
+TOTAL_FIELDS = ('batched', 'packed', 'shipped')
+WORK_START_HOUR = 9
+
+StationConfig = namedtuple('StationConfig', ['history_model', 'time_field', 'status'])
+StationActivity = namedtuple('StationActivity', ['waktu', 'id_pesanan', 'kurir', 'username'])
+StationStanding = namedtuple('StationStanding', ['total', 'rank', 'participants'])
+
+STATIONS = {
+    PACKING: StationConfig(OrderPackingHistory, 'waktu_pack', 'packed'),
+    SHIPPING: StationConfig(OrderShippingHistory, 'waktu_ship', 'shipped'),
+}
+
+
+def _recent_key(station):
+    return f'station_metrics:{station}:recent'
+
+
+def _total_key(field):
+    return f'station_metrics:totals:{field}'
+
+
+# ---------------------------------------------------------------------------
+# Pencatatan scan
+# ---------------------------------------------------------------------------
+
+def _bump(station, tanggal, user, count, now):
+    return StationDailyCounter.objects.filter(station=station, tanggal=tanggal, user=user).update(
+        total=F('total') + count, last_scan_at=now,
+    )
+
+
+def record_scan(station, user, lines, when=None):
+    """
+    Catat scan berhasil: lines = baris Order yang baru di-pack/ship oleh user.
+    Counter dihitung per id_pesanan unik (sama dengan Count(distinct) di history).
+    """
+    orders = {}
+    for line in lines:
+        orders.setdefault(line.id_pesanan, line)
+    if not orders:
+        return
+    now = when or timezone.now()
+    tanggal = timezone.localdate(now)
+    if not _bump(station, tanggal, user, len(orders), now):
+        StationDailyCounter.objects.bulk_create(
+            [StationDailyCounter(station=station, tanggal=tanggal, user=user, first_scan_at=now)],
+            ignore_conflicts=True,
+        )
+        _bump(station, tanggal, user, len(orders), now)
+    total = StationDailyCounter.objects.filter(station=station, tanggal=tanggal, user=user).values_list(
+        'total', flat=True,
+    ).get()
+
+    activities = [
+        StationActivity(now, id_pesanan, line.kurir, user.username)
+        for id_pesanan, line in orders.items()
+    ]
+    batched = sum(1 for line in orders.values() if line.nama_batch is not None)
+    transaction.on_commit(lambda: _after_commit(station, user.username, total, activities, batched))
+
+
+def _after_commit(station, username, total, activities, batched):
+    recent = cache.get(_recent_key(station))
+    if recent is not None:
+        scanned = {activity.id_pesanan for activity in activities}
+        recent = [tuple(row) for row in reversed(activities)] + [row for row in recent if row[1] not in scanned]
+        recent = recent[:RECENT_LIMIT]
+        cache.set(_recent_key(station), recent, RECENT_TIMEOUT)
+
+    # Counter total yang belum ada di cache dibiarkan: dihitung ulang saat dibaca
+    if batched:
+        adjust = [(STATIONS[station].status, batched)]
+        if station == SHIPPING:
+            adjust.append((STATIONS[PACKING].status, -batched))
+        for field, delta in adjust:
+            try:
+                cache.incr(_total_key(field), delta)
+            except ValueError:
+                pass
+
+    keys = [_total_key(field) for field in TOTAL_FIELDS]
+    cached = cache.get_many(keys)
+    totals = {field: cached[key] for field, key in zip(TOTAL_FIELDS, keys)} if len(cached) == len(keys) else None
+    publish_station_scan(station, username, total, recent, totals)
+
+
+# ---------------------------------------------------------------------------
+# Pembacaan untuk halaman scan
+# ---------------------------------------------------------------------------
+
+def user_standing(station, user, tanggal=None):
+    """StationStanding(total user hari ini, rank, jumlah user); user tanpa scan rank terakhir + 1."""
+    tanggal = tanggal or timezone.localdate()
+    rows = StationDailyCounter.objects.filter(station=station, tanggal=tanggal, total__gt=0).order_by(
+        '-total', 'last_scan_at',
+    ).values_list('user_id', 'total')
+    participants = 0
+    total, rank = 0, 0
+    for position, (user_id, user_total) in enumerate(rows, start=1):
+        participants = position
+        if user_id == user.id:
+            total, rank = user_total, position
+    return StationStanding(total, rank or participants + 1, participants)
+
+
+def scans_per_hour(total, now=None):
+    """Rata-rata scan per jam sejak jam mulai kerja (WORK_START_HOUR) hari ini."""
+    now = now or timezone.now()
+    start_of_work = now.replace(hour=WORK_START_HOUR, minute=0, second=0, microsecond=0)
+    if now <= start_of_work:
+        return 0.0
+    duration_seconds = (now - start_of_work).total_seconds()
+    if duration_seconds <= 60:
+        return float(total)
+    return total / (duration_seconds / 3600)
+
+
+def _load_recent(station):
+    config = STATIONS[station]
+    rows = config.history_model.objects.order_by('-pk').values_list(
+        config.time_field, 'order__id_pesanan', 'order__kurir', 'user__username',
+    )[:RECENT_SCAN_ROWS]
+    recent, seen = [], set()
+    for row in rows:
+        if row[1] in seen:
+            continue
+        seen.add(row[1])
+        recent.append(tuple(row))
+        if len(recent) >= RECENT_LIMIT:
+            break
+    return recent
+
+
+def recent_activity(station):
+    """RECENT_LIMIT StationActivity terakhir (terbaru dulu, satu per id_pesanan)."""
+    recent = cache.get(_recent_key(station))
+    if recent is None:
+        recent = _load_recent(station)
+        cache.set(_recent_key(station), recent, RECENT_TIMEOUT)
+    return [StationActivity(*row) for row in recent]
+
+
+def station_totals():
+    """{'batched', 'packed', 'shipped'}: jumlah OrderHeader dalam batch per status."""
+    keys = {field: _total_key(field) for field in TOTAL_FIELDS}
+    cached = cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        return {field: cached[key] for field, key in keys.items()}
+
+    totals = OrderHeader.objects.filter(nama_batch__isnull=False).aggregate(
+        batched=Count('pk'),
+        packed=Count('pk', filter=Q(status_order='packed')),
+        shipped=Count('pk', filter=Q(status_order='shipped')),
+    )
+    cache.set_many({keys[field]: totals[field] for field in TOTAL_FIELDS}, TOTALS_TIMEOUT)
+    return totals
+
+
+def invalidate_station_cache():
+    """Hapus ring buffer dan total di cache (dibangun ulang saat dibaca berikutnya)."""
+    cache.delete_many([_recent_key(station) for station in STATIONS] + [_total_key(f) for f in TOTAL_FIELDS])
+
+
+# ---------------------------------------------------------------------------
+# Rebuild
+# ---------------------------------------------------------------------------
+
+def rebuild_station_counters(days=1):
+    """
+    Bangun ulang StationDailyCounter `days` hari terakhir (termasuk hari ini) dari
+    OrderPackingHistory / OrderShippingHistory. Return jumlah baris counter.
+    """
+    tanggal_from = timezone.localdate() - timedelta(days=max(days, 1) - 1)
+    counters = []
+    for station, config in STATIONS.items():
+        rows = config.history_model.objects.filter(
+            **{f'{config.time_field}__date__gte': tanggal_from}, user__isnull=False,
+        ).annotate(tanggal=TruncDate(config.time_field)).values('tanggal', 'user_id').annotate(
+            total=Count('order__id_pesanan', distinct=True),
+            first_scan_at=Min(config.time_field),
+            last_scan_at=Max(config.time_field),
+        ).order_by()
+        counters += [StationDailyCounter(station=station, **row) for row in rows]
+
+    with transaction.atomic():
+        StationDailyCounter.objects.filter(tanggal__gte=tanggal_from).delete()
+        StationDailyCounter.objects.bulk_create(counters, batch_size=1000)
+    transaction.on_commit(invalidate_station_cache)
+    logger.info("rebuild_station_counters: %s baris sejak %s", len(counters), tanggal_from)
+    return len(counters)
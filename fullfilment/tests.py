@@ -1,3 +1,86 @@
-from django.test import TestCase
+import threading
+from collections import Counter
 
-# Create your tests here.
+from django.db import connection
+from django.db.models import Sum
+from django.test import TransactionTestCase
+
+from inventory.models import Stock
+from products.models import Product
+
+from . import pick_scan
+from .models import BatchItem, BatchItemLog, BatchList
+
+
+class PickScanConcurrencyTest(TransactionTestCase):
+    """Beberapa picker scan SKU yang sama secara paralel: tidak boleh ada lost update."""
+
+    PICKERS = 6
+    QTY = 30
+    STOCK_QTY = 1000
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Database test SQLite in-memory (shared cache) langsung menolak writer paralel
+            self.skipTest('Butuh database yang mendukung koneksi paralel (PostgreSQL / SQLite file)')
+        self.batch = BatchList.objects.create(nama_batch='TEST-PICK', status_batch='open')
+        self.products = Product.objects.bulk_create([
+            Product(sku=f'TEST-PICK-{i}', barcode=f'TESTPICK{i}', nama_produk=f'Test Pick {i}')
+            for i in range(2)
+        ])
+        BatchItem.objects.bulk_create([
+            BatchItem(batchlist=self.batch, product=p, jumlah=self.QTY, jumlah_ambil=0, status_ambil='pending')
+            for p in self.products
+        ])
+        Stock.objects.bulk_create([
+            Stock(product=p, quantity=self.STOCK_QTY, quantity_locked=self.STOCK_QTY) for p in self.products
+        ])
+
+    def _scan_concurrently(self, plan):
+        success = Counter()
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.PICKERS)
+
+        def picker(product_ids):
+            local = Counter()
+            try:
+                barrier.wait()
+                for product_id in product_ids:
+                    try:
+                        result = pick_scan.apply_pick_scan(self.batch, product_id)
+                    except Exception as e:
+                        errors.append(repr(e))
+                        continue
+                    if result.status == pick_scan.PICKED:
+                        local[product_id] += 1
+            finally:
+                with lock:
+                    success.update(local)
+                connection.close()
+
+        threads = [threading.Thread(target=picker, args=(plan[i::self.PICKERS],)) for i in range(self.PICKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return success, errors
+
+    def test_concurrent_scans_have_no_lost_updates(self):
+        # Total scan melebihi jumlah: sebagian scan harus ditolak (QUANTITY_FULL / ALREADY_COMPLETED)
+        plan = [p.id for p in self.products] * (self.QTY + 10)
+        success, errors = self._scan_concurrently(plan)
+
+        self.assertEqual(errors, [])
+        items = {item.product_id: item for item in BatchItem.objects.filter(batchlist=self.batch)}
+        stocks = dict(Stock.objects.filter(product__in=self.products).values_list('product_id', 'quantity'))
+        logs = dict(BatchItemLog.objects.filter(batch=self.batch).values('product_id').annotate(
+            total=Sum('jumlah_input')
+        ).values_list('product_id', 'total'))
+        for product in self.products:
+            item = items[product.id]
+            self.assertEqual(item.jumlah_ambil, self.QTY)
+            self.assertEqual(success[product.id], self.QTY)
+            self.assertEqual(item.status_ambil, 'completed')
+            self.assertEqual(self.STOCK_QTY - stocks[product.id], self.QTY)
+            self.assertEqual(logs.get(product.id), self.QTY)
@@ -12,8 +12,6 @@ from django.contrib.auth.decorators import login_required, permission_required
 # Third-party
 from openpyxl import Workbook
 from django_tables2 import RequestConfig
-# from asgiref.sync import async_to_sync
-# from channels.layers import get_channel_layer
 from django.utils.encoding import smart_str
 from django.template.loader import render_to_string
 from itertools import groupby
@@ -24,10 +22,13 @@ from django.middleware.csrf import get_token
 
 # App imports
 from .models import BatchList, BatchItem, ReadyToPrint, BatchItemLog, BatchOrderLog, OrderCancelLog, ReturnSession, ReturnItem
-from orders.models import Order, OrderPackingHistory, OrderHandoverHistory, OrderPrintHistory
+from orders.models import Order, OrderHeader, OrderPackingHistory, OrderHandoverHistory, OrderPrintHistory
+from orders.order_headers import refresh_order_headers
 from inventory.models import Stock, OpnameQueue, StockCardEntry
 from products.models import Product, ProductExtraBarcode
+from products.barcode_resolver import resolve_product
 from inventory.models import Rak
+from inventory.rak_usage import sync_rak_usage
 from .tables import ReadyToPrintTable
 from .utils import get_sku_not_found
 from django.db.models import F, Sum, OuterRef, Subquery, Min, Window, Case, When, Value, IntegerField
@@ -41,7 +42,17 @@ from io import BytesIO
 from django.core.files.base import ContentFile
 from PIL import ImageOps
 from django.contrib.contenttypes.models import ContentType
-from .readytoprint_logic import calculate_and_sync_ready_to_print # <-- 1. Impor fungsi baru
+from .readytoprint_logic import refresh_ready_to_print, sync_ready_to_print_orders
+from . import pick_scan
+from .pick_scan import apply_pick_scan
+from .batch_settlement import close_batch_settlement, reopen_batch_settlement
+from .live_updates import publish_pick_progress
+from erp_alfa.views import invalidate_notification_cache
+from erp_alfa.instrumentation import instrument_view, span
+from .batch_metrics import (
+    METRIC_DEFAULTS, compute_batch_metrics, format_status_pengambilan,
+    get_sku_not_found_map, summarize_metrics,
+)
 
 import json
 import logging
@@ -102,188 +113,49 @@ def index(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
-    # Hitung summary untuk batch yang masih open
-    open_batches = BatchList.objects.filter(status_batch='open')
-    total_open_batches = open_batches.count()
-    
-    # Summary untuk batch open (sisanya tetap berdasarkan status OPEN)
-    total_sku_open = 0
-    total_sku_completed_open = 0
-    total_orders_open = 0
-    total_orders_to_pick_open = 0
-    total_orders_printed_open = 0
-    total_unallocated_sku_open = 0
-    total_over_stock_open = 0
-    
-    for open_batch in open_batches:
-        batch_items = BatchItem.objects.filter(batchlist=open_batch)
-        total_sku_open += batch_items.count()
-        total_sku_completed_open += batch_items.filter(jumlah_ambil__gte=F('jumlah')).count()
-        total_over_stock_open += batch_items.filter(jumlah_ambil__gt=F('jumlah')).count()
-        
-        # Orders
-        batch_orders = Order.objects.filter(nama_batch=open_batch.nama_batch).exclude(status_bundle='Y')
-        total_orders_open += batch_orders.values('id_pesanan').distinct().count()
-        total_orders_to_pick_open += ReadyToPrint.objects.filter(batchlist=open_batch).values_list('id_pesanan', flat=True).distinct().count()
-        total_orders_printed_open += ReadyToPrint.objects.filter(batchlist=open_batch, printed_at__isnull=False).values_list('id_pesanan', flat=True).distinct().count()
-        
-        # Unallocated SKU
-        picked_quantities = batch_items.values('product_id').annotate(total_picked=Sum('jumlah_ambil'))
-        ready_to_print_ids = ReadyToPrint.objects.filter(batchlist=open_batch).values_list('id_pesanan', flat=True)
-        needed_quantities = Order.objects.filter(nama_batch=open_batch.nama_batch, id_pesanan__in=ready_to_print_ids).values('product_id').annotate(total_needed=Sum('jumlah'))
-        
-        picked_map = {item['product_id']: item['total_picked'] for item in picked_quantities}
-        needed_map = {item['product_id']: item['total_needed'] for item in needed_quantities}
-        
-        product_ids = set(picked_map.keys()).union(set(needed_map.keys()))
-        for product_id in product_ids:
-            picked_qty = picked_map.get(product_id, 0)
-            needed_qty = needed_map.get(product_id, 0)
-            if picked_qty > needed_qty:
-                total_unallocated_sku_open += 1
-    
-    # Hitung summary untuk SEMUA batch (tidak terbatas yang open saja)
-    all_batches = BatchList.objects.all()
-    
-    # 1. Order Gantung - dari semua batch
-    total_orders_gantung_all = 0
-    for batch in all_batches:
-        total_orders_gantung_all += len(get_not_ready_to_pick_ids(batch))
-    
-    # 2. SKU Overstock - dari semua batch
-    total_over_stock_all = 0
-    for batch in all_batches:
-        batch_items = BatchItem.objects.filter(batchlist=batch)
-        total_over_stock_all += batch_items.filter(jumlah_ambil__gt=F('jumlah')).count()
-    
-    # 3. SKU Gantung - dari semua batch
-    total_unallocated_sku_all = 0
-    for batch in all_batches:
-        batch_items = BatchItem.objects.filter(batchlist=batch)
-        picked_quantities = batch_items.values('product_id').annotate(total_picked=Sum('jumlah_ambil'))
-        ready_to_print_ids = ReadyToPrint.objects.filter(batchlist=batch).values_list('id_pesanan', flat=True)
-        needed_quantities = Order.objects.filter(nama_batch=batch.nama_batch, id_pesanan__in=ready_to_print_ids).values('product_id').annotate(total_needed=Sum('jumlah'))
-        
-        picked_map = {item['product_id']: item['total_picked'] for item in picked_quantities}
-        needed_map = {item['product_id']: item['total_needed'] for item in needed_quantities}
-        
-        product_ids = set(picked_map.keys()).union(set(needed_map.keys()))
-        for product_id in product_ids:
-            picked_qty = picked_map.get(product_id, 0)
-            needed_qty = needed_map.get(product_id, 0)
-            if picked_qty > needed_qty:
-                total_unallocated_sku_all += 1
-    
-    # Lakukan kalkulasi hanya untuk batch di halaman saat ini
-    for batch in page_obj:
-        sku_not_found_list, sku_not_found_count = get_sku_not_found(batch.nama_batch)
-        batch.sku_not_found_count = sku_not_found_count
-        batch.sku_not_found_list = sku_not_found_list
+    # Semua metrics batch dihitung set-based dalam beberapa query GROUP BY
+    batch_metrics = compute_batch_metrics()
+    open_batch_ids = set(BatchList.objects.filter(status_batch='open').values_list('id', flat=True))
+    total_open_batches = len(open_batch_ids)
 
-        # Hitung SKU Completed dan Over Stock
-        batch_items = BatchItem.objects.filter(batchlist=batch)
-        total_sku_batch_items = batch_items.count()
-        completed_sku = batch_items.filter(jumlah_ambil__gte=F('jumlah')).count()
-        
-        # Hitung Over Stock: Jumlah BatchItem dimana jumlah_ambil > jumlah
-        over_stock_count = batch_items.filter(jumlah_ambil__gt=F('jumlah')).count()
-
-        # HITUNG SKU GANTUNG - Menggunakan logika yang sama dengan unallocated_stock_list
-        initial_needed_quantities_batchitem = batch_items.values('product_id').annotate(
-            total_needed_batchitem=Sum('jumlah')
-        )
-        initial_needed_quantities_batchitem_map = {
-            item['product_id']: item['total_needed_batchitem'] 
-            for item in initial_needed_quantities_batchitem
-        }
-
-        # 1. Hitung total jumlah_ambil per produk di batch ini
-        picked_quantities = batch_items.values('product_id').annotate(
-            total_picked=Sum('jumlah_ambil')
-        )
-        picked_quantities_map = {
-            item['product_id']: item['total_picked'] 
-            for item in picked_quantities
-        }
-
-        # 2. Ambil semua id_pesanan yang READY TO PRINT di batch ini
-        ready_to_print_ids = ReadyToPrint.objects.filter(batchlist=batch).values_list('id_pesanan', flat=True)
+    # Summary untuk batch open
+    summary_open = summarize_metrics(batch_metrics, open_batch_ids)
+    # Summary untuk SEMUA batch (order gantung, SKU overstock, SKU gantung)
+    summary_all = summarize_metrics(batch_metrics)
 
-        # 3. Hitung total jumlah_dibutuhkan per produk dari order yang READY TO PRINT
-        needed_quantities = Order.objects.filter(
-            nama_batch=batch.nama_batch, 
-            id_pesanan__in=ready_to_print_ids
-        ).values('product_id').annotate(total_needed=Sum('jumlah'))
-
-        needed_quantities_map = {
-            item['product_id']: item['total_needed'] 
-            for item in needed_quantities
-        }
-
-        # 4. Bandingkan picked vs needed untuk menemukan stok gantung
-        product_ids_in_batch = set(picked_quantities_map.keys()).union(set(needed_quantities_map.keys()))
-        
-        unallocated_products_data = []
-        for product_id in product_ids_in_batch:
-            picked_qty = picked_quantities_map.get(product_id, 0)
-            needed_qty = needed_quantities_map.get(product_id, 0)
-            unallocated_qty = picked_qty - needed_qty
-
-            if unallocated_qty > 0: # Hanya tampilkan jika ada surplus
-                unallocated_products_data.append({
-                    'product_id': product_id,
-                    'unallocated_quantity': unallocated_qty,
-                })
-
-        # Total unique unallocated products (SKU Gantung)
-        unallocated_sku_count = len(unallocated_products_data)
-
-        # PERBAIKAN: Pastikan semua nilai ter-assign dengan benar
-        batch.total_sku = total_sku_batch_items
-        batch.sku_completed = completed_sku
-        batch.unallocated_sku = unallocated_sku_count  # SKU GANTUNG
-        batch.over_stock_count = over_stock_count # Assign nilai over_stock_count
-
-        # NEW METRICS for expandable row (from readytoprint.html logic)
-        # Total Order: Total unique id_pesanan for this batch
-        batch_orders_qs = Order.objects.filter(nama_batch=batch.nama_batch).exclude(status_bundle='Y')
-        batch.total_orders_in_batch = batch_orders_qs.values('id_pesanan').distinct().count()
+    # Isi metrics untuk batch di halaman saat ini
+    sku_not_found_map = get_sku_not_found_map([batch.nama_batch for batch in page_obj])
+    for batch in page_obj:
+        sku_not_found_list = sku_not_found_map.get(batch.nama_batch, [])
+        batch.sku_not_found_count = len(sku_not_found_list)
+        batch.sku_not_found_list = sku_not_found_list
 
-        # Order to Pick (Ready to Pick): Count of unique id_pesanan in ReadyToPrint for this batch
-        batch.orders_to_pick = ReadyToPrint.objects.filter(batchlist=batch).values_list('id_pesanan', flat=True).distinct().count()
+        values = batch_metrics.get(batch.id, METRIC_DEFAULTS)
+        batch.total_sku = values['total_sku']
+        batch.sku_completed = values['sku_completed']
+        batch.unallocated_sku = values['unallocated_sku']  # SKU GANTUNG
+        batch.over_stock_count = values['over_stock_count']
 
-        # Order Printed: Count of unique id_pesanan in ReadyToPrint where printed_at is not null
-        batch.orders_printed = ReadyToPrint.objects.filter(batchlist=batch, printed_at__isnull=False).values_list('id_pesanan', flat=True).distinct().count()
+        # Metrics untuk expandable row (logika sama dengan readytoprint.html)
+        batch.total_orders_in_batch = values['total_orders']
+        batch.orders_to_pick = values['orders_to_pick']
+        batch.orders_printed = values['orders_printed']
+        batch.orders_gantung = values['orders_gantung']
 
-        # Order Gantung (Not Ready to Pick): Count of unique id_pesanan in Order but NOT in ReadyToPrint
-        batch.orders_gantung = len(get_not_ready_to_pick_ids(batch)) # get_not_ready_to_pick_ids already exists and returns a list
-        
-        # Hitung persentase pengambilan berdasarkan jumlah vs jumlah_ambil
-        if total_sku_batch_items > 0:
-            # Hitung total quantity yang dibutuhkan dan yang sudah diambil
-            total_jumlah = batch_items.aggregate(total=Sum('jumlah'))['total'] or 0
-            total_jumlah_ambil = batch_items.aggregate(total=Sum('jumlah_ambil'))['total'] or 0
-            
-            if total_jumlah > 0:
-                percentage = min(100, (total_jumlah_ambil / total_jumlah) * 100)
-                batch.status_pengambilan_display = f"{percentage:.0f}% ({total_jumlah_ambil}/{total_jumlah})"
-            else:
-                batch.status_pengambilan_display = "0% (0/0)"
-        else:
-            batch.status_pengambilan_display = "No Items"
+        batch.status_pengambilan_display = format_status_pengambilan(values)
 
     context = {
         'page_obj': page_obj,
         'summary_open_batches': {
             'total_batches': total_open_batches,
-            'total_sku': total_sku_open,
-            'total_sku_completed': total_sku_completed_open,
-            'total_orders': total_orders_open,
-            'total_orders_to_pick': total_orders_to_pick_open,
-            'total_orders_printed': total_orders_printed_open,
-            'total_orders_gantung': total_orders_gantung_all,  # Dari semua batch
-            'total_unallocated_sku': total_unallocated_sku_all,  # Dari semua batch
-            'total_over_stock': total_over_stock_all,  # Dari semua batch
+            'total_sku': summary_open['total_sku'],
+            'total_sku_completed': summary_open['sku_completed'],
+            'total_orders': summary_open['total_orders'],
+            'total_orders_to_pick': summary_open['orders_to_pick'],
+            'total_orders_printed': summary_open['orders_printed'],
+            'total_orders_gantung': summary_all['orders_gantung'],  # Dari semua batch
+            'total_unallocated_sku': summary_all['unallocated_sku'],  # Dari semua batch
+            'total_over_stock': summary_all['over_stock_count'],  # Dari semua batch
         }
     }
     
@@ -377,6 +249,7 @@ def edit_row(request):
         else:
             order_qs = order_qs.filter(product_id=product_id)
         updated = order_qs.update(jumlah=jumlah)
+        refresh_order_headers([id_pesanan])
         if updated:
             return JsonResponse({'success': True})
         else:
@@ -647,24 +520,21 @@ def batchpicking(request, nama_batch):
     return render(request, template, context)
 
 
+@instrument_view('picking.update_barcode')
 @csrf_exempt
 @require_POST
 @login_required
 def update_barcode_picklist(request, nama_batch):
-    start_time = time.perf_counter()
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method.'}, status=405)
     try:
         import json
-        from inventory.models import Stock
-        t0 = time.perf_counter()
         data = json.loads(request.body)
-        t1 = time.perf_counter()
         barcode = data.get('barcode')
         if not barcode:
             return JsonResponse({'success': False, 'error': 'Barcode tidak ditemukan.'})
-        batch = BatchList.objects.filter(nama_batch=nama_batch).first()
-        t2 = time.perf_counter()
+        with span('batch'):
+            batch = BatchList.objects.filter(nama_batch=nama_batch).first()
         if not batch:
             return JsonResponse({'success': False, 'error': 'Batch tidak ditemukan.'})
         
@@ -673,98 +543,53 @@ def update_barcode_picklist(request, nama_batch):
             return JsonResponse({'success': False, 'error': f"Batch '{nama_batch}' sudah ditutup. Tidak bisa melakukan update scan barcode."})
         # --- AKHIR TAMBAHAN BARU ---
         
-        # Cek barcode utama
-        product = Product.objects.filter(barcode=barcode).first()
-        
-        # JIKA TIDAK DITEMUKAN, CEK BARCODE TAMBAHAN
-        if not product:
-            extra_barcode_entry = ProductExtraBarcode.objects.filter(barcode=barcode).select_related('product').first()
-            if extra_barcode_entry:
-                product = extra_barcode_entry.product # Ambil produk dari relasi
+        # Cek barcode utama atau barcode tambahan (lewat barcode resolver)
+        with span('resolve_barcode'):
+            product = resolve_product(barcode)
 
-        t3 = time.perf_counter()
         if not product:
             return JsonResponse({'success': False, 'error': 'Produk dengan barcode ini tidak ditemukan.'})
             
-        batchitem = BatchItem.objects.filter(batchlist=batch, product=product).first()
-        t4 = time.perf_counter()
-        if not batchitem:
+        # Increment atomik: UPDATE bersyarat + Stock F() + BatchItemLog dalam satu transaksi
+        with span('pick_scan'):
+            result = apply_pick_scan(batch, product.id, user=request.user)
+        if result.status == pick_scan.NOT_FOUND:
             return JsonResponse({'success': False, 'error': 'Item tidak ditemukan di batch.'})
 
         # PENANGANAN EKSPLISIT UNTUK ITEM YANG SUDAH SELESAI
-        if batchitem.status_ambil == 'completed':
+        if result.status == pick_scan.ALREADY_COMPLETED:
             # --- BLOK PERBAIKAN TIMEZONE ---
-            if batchitem.completed_at:
+            if result.completed_at:
                 jakarta_tz = pytz.timezone('Asia/Jakarta')
-                completed_at_jakarta = batchitem.completed_at.astimezone(jakarta_tz)
+                completed_at_jakarta = result.completed_at.astimezone(jakarta_tz)
                 completed_time = completed_at_jakarta.strftime('%d %b %Y, %H:%M:%S')
             else:
                 completed_time = 'N/A'
             # --- AKHIR BLOK PERBAIKAN ---
             
-            completed_user = batchitem.completed_by.username if batchitem.completed_by else 'N/A'
-            logging.info(f"[PROFILING] update_barcode_picklist: total={time.perf_counter()-start_time:.4f}s | json={t1-t0:.4f}s | batch={t2-t1:.4f}s | product={t3-t2:.4f}s | batchitem={t4-t3:.4f}s | completed-early")
+            completed_by = User.objects.filter(id=result.completed_by_id).values_list('username', flat=True).first()
+            completed_user = completed_by or 'N/A'
             return JsonResponse({
                 'success': False, 
                 'already_completed': True,
                 'error': f"Item ini sudah selesai oleh <b>{completed_user}</b> pada <b>{completed_time}</b>."
             })
 
-        if batchitem.jumlah_ambil < batchitem.jumlah:
-            prev_jumlah_ambil = batchitem.jumlah_ambil
-            batchitem.jumlah_ambil += 1
-            t5 = time.perf_counter()
-            # --- TAMBAHAN: Update quantity_locked ---
-            stock = Stock.objects.filter(product=product).first()
-            t6 = time.perf_counter()
-            if stock:
-                delta = batchitem.jumlah_ambil - prev_jumlah_ambil
-                stock.quantity -= delta
-                stock.quantity_locked -= delta
-                stock.save(update_fields=['quantity', 'quantity_locked'])
-            # Check if completed
-            if batchitem.jumlah_ambil >= batchitem.jumlah:
-                batchitem.status_ambil = 'completed'
-                # SIMPAN DATA USER & WAKTU SAAT SELESAI
-                batchitem.completed_at = timezone.now()
-                if request.user.is_authenticated:
-                    batchitem.completed_by = request.user
-            batchitem.save()
-            t7 = time.perf_counter()
-            logging.info(f"[PROFILING] update_barcode_picklist: total={time.perf_counter()-start_time:.4f}s | json={t1-t0:.4f}s | batch={t2-t1:.4f}s | product={t3-t2:.4f}s | batchitem={t4-t3:.4f}s | stock={t6-t5:.4f}s | save={t7-t6:.4f}s | normal-exit")
+        if result.status == pick_scan.PICKED:
             jakarta_tz = pytz.timezone('Asia/Jakarta')
             now_jakarta = timezone.now().astimezone(jakarta_tz)
             server_time = now_jakarta.strftime('%H:%M:%S')
-            # Setelah update jumlah_ambil:
-            # WebSocket update disabled - channels not configured
-            # channel_layer = get_channel_layer()
-            # async_to_sync(channel_layer.group_send)(
-            #     f'batchpicking_{nama_batch}',
-            #     {
-            #         'type': 'send_update',
-            #         'data': {
-            #             'sku': product.sku,
-            #             'barcode': product.barcode,
-            #             'jumlah_ambil': batchitem.jumlah_ambil,
-            #             'status_ambil': batchitem.status_ambil,
-            #         }
-            #     }
-            # )
-            BatchItemLog.objects.create(
-                waktu=timezone.now(),
-                user=request.user if request.user.is_authenticated else None,
-                batch=batchitem.batchlist,
-                product=batchitem.product,
-                jumlah_input=1,
-                jumlah_ambil=batchitem.jumlah_ambil
+            # Live update ke picker lain di batch yang sama (dikirim setelah commit)
+            publish_pick_progress(
+                nama_batch, product.sku, product.barcode, result.jumlah_ambil, result.jumlah, result.status_ambil,
             )
             return JsonResponse({
                 'success': True,
                 'main_barcode': product.barcode,
-                'jumlah_ambil': batchitem.jumlah_ambil,
-                'jumlah': batchitem.jumlah,
-                'status_ambil': batchitem.status_ambil,
-                'completed': batchitem.jumlah_ambil >= batchitem.jumlah,
+                'jumlah_ambil': result.jumlah_ambil,
+                'jumlah': result.jumlah,
+                'status_ambil': result.status_ambil,
+                'completed': result.jumlah_ambil >= result.jumlah,
                 'server_time': server_time,
                 'product_info': {
                     'photo_url': product.photo.url if product.photo else '/static/icons/alfaicon.png',
@@ -776,17 +601,16 @@ def update_barcode_picklist(request, nama_batch):
                 }
             })
         else:
-            logging.info(f"[PROFILING] update_barcode_picklist: total={time.perf_counter()-start_time:.4f}s | fallback-exit")
             return JsonResponse({'success': False, 'error': 'Jumlah ambil sudah cukup.'})
     except Exception as e:
-        logging.exception("[PROFILING] update_barcode_picklist: exception occurred")
+        logging.exception("update_barcode_picklist: exception occurred")
         return JsonResponse({'success': False, 'error': str(e)})
 
+@instrument_view('picking.update_barcode_to_rak')
 @csrf_exempt
 @require_POST
 @login_required
 def update_barcode_picklist_to_rak(request, nama_batch):
-    start_time = time.perf_counter()
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method.'}, status=405)
     
@@ -794,10 +618,8 @@ def update_barcode_picklist_to_rak(request, nama_batch):
         import json
         from inventory.models import Stock, InventoryRakStock, InventoryRakStockLog
         from django.contrib.contenttypes.models import ContentType
-        
-        t0 = time.perf_counter()
+
         data = json.loads(request.body)
-        t1 = time.perf_counter()
         
         barcode = data.get('barcode')
         selected_rak = data.get('selected_rak')  # Kode rak yang dipilih
@@ -809,8 +631,8 @@ def update_barcode_picklist_to_rak(request, nama_batch):
             return JsonResponse({'success': False, 'error': 'Rak belum dipilih. Silakan pilih rak terlebih dahulu.'})
         
         # Cek batch exists
-        batch = BatchList.objects.filter(nama_batch=nama_batch).first()
-        t2 = time.perf_counter()
+        with span('batch'):
+            batch = BatchList.objects.filter(nama_batch=nama_batch).first()
         if not batch:
             return JsonResponse({'success': False, 'error': 'Batch tidak ditemukan.'})
         
@@ -819,19 +641,15 @@ def update_barcode_picklist_to_rak(request, nama_batch):
             return JsonResponse({'success': False, 'error': f"Batch '{nama_batch}' sudah ditutup. Tidak bisa melakukan update scan barcode."})
         
         # Cek barcode utama atau extra barcode
-        product = Product.objects.filter(barcode=barcode).first()
-        if not product:
-            extra_barcode_entry = ProductExtraBarcode.objects.filter(barcode=barcode).select_related('product').first()
-            if extra_barcode_entry:
-                product = extra_barcode_entry.product
-        
-        t3 = time.perf_counter()
+        with span('resolve_barcode'):
+            product = resolve_product(barcode)
+
         if not product:
             return JsonResponse({'success': False, 'error': 'Produk dengan barcode ini tidak ditemukan.'})
         
         # Cek batchitem exists
-        batchitem = BatchItem.objects.filter(batchlist=batch, product=product).first()
-        t4 = time.perf_counter()
+        with span('batchitem'):
+            batchitem = BatchItem.objects.filter(batchlist=batch, product=product).first()
         if not batchitem:
             return JsonResponse({'success': False, 'error': 'Item tidak ditemukan di batch.'})
         
@@ -883,75 +701,49 @@ def update_barcode_picklist_to_rak(request, nama_batch):
         
         # Proses update jika stok mencukupi
         if batchitem.jumlah_ambil < batchitem.jumlah:
-            prev_jumlah_ambil = batchitem.jumlah_ambil
-            batchitem.jumlah_ambil += 1
-            t5 = time.perf_counter()
-            
-            # Update Stock (quantity dan quantity_locked)
-            stock = Stock.objects.filter(product=product).first()
-            t6 = time.perf_counter()
-            if stock:
-                delta = batchitem.jumlah_ambil - prev_jumlah_ambil
-                stock.quantity -= delta
-                stock.quantity_locked -= delta
-                stock.save(update_fields=['quantity', 'quantity_locked'])
-            
-            # Update InventoryRakStock (stok di rak spesifik)
-            qty_awal_rak = inventory_rak_stock.quantity
-            inventory_rak_stock.quantity -= 1
-            qty_akhir_rak = inventory_rak_stock.quantity
-            inventory_rak_stock.save()
-            
-            # Check if completed
-            if batchitem.jumlah_ambil >= batchitem.jumlah:
-                batchitem.status_ambil = 'completed'
-                batchitem.completed_at = timezone.now()
-                if request.user.is_authenticated:
-                    batchitem.completed_by = request.user
-            
-            batchitem.save()
-            t7 = time.perf_counter()
+            with span('pick_scan'), transaction.atomic():
+                # Increment BatchItem + Stock secara atomik (lihat pick_scan)
+                result = apply_pick_scan(batch, product.id, user=request.user)
+                if result.status != pick_scan.PICKED:
+                    return JsonResponse({'success': False, 'error': 'Jumlah ambil sudah cukup.'})
+
+                # Update InventoryRakStock (stok di rak spesifik)
+                rak_updated = InventoryRakStock.objects.filter(
+                    id=inventory_rak_stock.id, quantity__gt=0
+                ).update(quantity=F('quantity') - 1)
+                if not rak_updated:
+                    # Stok rak diambil picker lain sejak dicek: batalkan increment BatchItem/Stock
+                    transaction.set_rollback(True)
+                    return JsonResponse({
+                        'success': False,
+                        'error': f"Stok produk <b>{product.sku}</b> di rak <b>{selected_rak}</b> sudah habis."
+                    })
+                qty_akhir_rak = InventoryRakStock.objects.filter(id=inventory_rak_stock.id).values_list('quantity', flat=True).first()
+                qty_awal_rak = qty_akhir_rak + 1
+                # Update set-based tidak memicu signal: terapkan perubahan ke RakCapacity di transaksi ini
+                sync_rak_usage([(inventory_rak_stock.rak_id, inventory_rak_stock.product_id)])
+
+                # Create InventoryRakStockLog (log pergerakan stok di rak)
+                InventoryRakStockLog.objects.create(
+                    produk=product,
+                    rak=rak,
+                    tipe_pergerakan='picking_keluar',
+                    qty=-1,  # Keluar (-1)
+                    qty_awal=qty_awal_rak,
+                    qty_akhir=qty_akhir_rak,
+                    content_type=ContentType.objects.get_for_model(BatchItem),
+                    object_id=result.batchitem_id,
+                    user=request.user if request.user.is_authenticated else None,
+                    catatan=f"Picking dari batch {nama_batch}"
+                )
+            batchitem.jumlah_ambil = result.jumlah_ambil
+            batchitem.status_ambil = result.status_ambil
             
-            # Create InventoryRakStockLog (log pergerakan stok di rak)
-            InventoryRakStockLog.objects.create(
-                produk=product,
-                rak=rak,
-                tipe_pergerakan='picking_keluar',
-                qty=-1,  # Keluar (-1)
-                qty_awal=qty_awal_rak,
-                qty_akhir=qty_akhir_rak,
-                content_type=ContentType.objects.get_for_model(BatchItem),
-                object_id=batchitem.id,
-                user=request.user if request.user.is_authenticated else None,
-                catatan=f"Picking dari batch {nama_batch}"
+            publish_pick_progress(
+                nama_batch, product.sku, product.barcode, batchitem.jumlah_ambil, batchitem.jumlah,
+                batchitem.status_ambil,
             )
             
-            # Create BatchItemLog (log batch picking)
-            BatchItemLog.objects.create(
-                waktu=timezone.now(),
-                user=request.user if request.user.is_authenticated else None,
-                batch=batchitem.batchlist,
-                product=batchitem.product,
-                jumlah_input=1,
-                jumlah_ambil=batchitem.jumlah_ambil
-            )
-            
-            # WebSocket update disabled - channels not configured
-            # channel_layer = get_channel_layer()
-            # async_to_sync(channel_layer.group_send)(
-            #     f'batchpicking_{nama_batch}',
-            #     {
-            #         'type': 'send_update',
-            #         'data': {
-            #             'sku': product.sku,
-            #             'barcode': product.barcode,
-            #             'jumlah_ambil': batchitem.jumlah_ambil,
-            #             'status_ambil': batchitem.status_ambil,
-            #             'rak_asal': selected_rak,
-            #         }
-            #     }
-            # )
-            
             jakarta_tz = pytz.timezone('Asia/Jakarta')
             now_jakarta = timezone.now().astimezone(jakarta_tz)
             server_time = now_jakarta.strftime('%H:%M:%S')
@@ -978,9 +770,10 @@ def update_barcode_picklist_to_rak(request, nama_batch):
             return JsonResponse({'success': False, 'error': 'Jumlah ambil sudah cukup.'})
             
     except Exception as e:
-        logging.exception("[PROFILING] update_barcode_picklist_to_rak: exception occurred")
+        logging.exception("update_barcode_picklist_to_rak: exception occurred")
         return JsonResponse({'success': False, 'error': f'Terjadi kesalahan: {str(e)}'}, status=500)
 
+@instrument_view('picking.update_manual')
 @csrf_exempt
 @login_required
 def update_manual(request, nama_batch):
@@ -1003,8 +796,7 @@ def update_manual(request, nama_batch):
             return JsonResponse({'success': False, 'error': f"Batch '{nama_batch}' sudah ditutup. Tidak bisa melakukan update manual."})
         # --- AKHIR TAMBAHAN BARU ---
         
-        from products.models import Product
-        product = Product.objects.filter(barcode=barcode).first()
+        product = resolve_product(barcode)
         if not product:
             return JsonResponse({'success': False, 'error': 'Produk dengan barcode ini tidak ditemukan.'})
         batchitem = BatchItem.objects.filter(batchlist=batch, product=product).first()
@@ -1074,10 +866,13 @@ def update_manual(request, nama_batch):
             jumlah_input=jumlah_ambil,
             jumlah_ambil=batchitem.jumlah_ambil
         )
-        
+        publish_pick_progress(
+            nama_batch, product.sku, product.barcode, batchitem.jumlah_ambil, batchitem.jumlah, batchitem.status_ambil,
+        )
+
         return JsonResponse({
-            'success': True, 
-            'jumlah_ambil': batchitem.jumlah_ambil, 
+            'success': True,
+            'jumlah_ambil': batchitem.jumlah_ambil,
             'status_ambil': batchitem.status_ambil,
             'completed': batchitem.jumlah_ambil >= batchitem.jumlah,
             'product_info': {
@@ -1121,9 +916,8 @@ def ready_to_print_list(request):
     if nama_batch:
         batchlist = get_object_or_404(BatchList, nama_batch=nama_batch)
         
-        # --- Panggil Logika Perhitungan dari file terpisah ---
-        calculate_and_sync_ready_to_print(batchlist)
-        # --- Logika Perhitungan Selesai ---
+        # --- Sinkronkan state ReadyToPrint (incremental, hanya jika ada perubahan) ---
+        refresh_ready_to_print(batchlist)
 
         # Queryset dasar untuk batch ini
         queryset = ReadyToPrint.objects.filter(batchlist=batchlist)
@@ -1141,104 +935,62 @@ def ready_to_print_list(request):
             )
         ).order_by('custom_order', '-printed_at')
 
-        # Tambahkan data order_type dan status_order dari tabel Order
-        from django.db.models import Subquery, OuterRef
+        # order_type, status_order dan status diambil dari OrderHeader (satu LEFT JOIN)
         queryset = queryset.annotate(
-            order_type=Subquery(
-                Order.objects.filter(
-                    id_pesanan=OuterRef('id_pesanan')
-                ).values('order_type')[:1]
-            ),
-            status_order=Subquery(
-                Order.objects.filter(
-                    id_pesanan=OuterRef('id_pesanan')
-                ).values('status_order')[:1]
-            ),
-            status=Subquery(
-                Order.objects.filter(
-                    id_pesanan=OuterRef('id_pesanan')
-                ).values('status')[:1]
-            )
+            order_type=F('order_header__order_type'),
+            status_order=F('order_header__status_order'),
+            status=F('order_header__status'),
         )
 
         # Re-calculate summary data here
-        orders = Order.objects.filter(nama_batch=nama_batch).exclude(status_bundle='Y')
-        total_order = orders.values('id_pesanan').distinct().count()
+        headers = OrderHeader.objects.filter(nama_batch=nama_batch)
+        total_order = headers.count()
 
         # Get ready_to_pick_ids from ReadyToPrint table for this batch
         ready_to_pick_ids = list(ReadyToPrint.objects.filter(batchlist=batchlist).values_list('id_pesanan', flat=True))
         
-        # Calculate summary for unprinted orders - PERBAIKAN LOGIKA
-        unprinted_ready_to_pick_ids = list(ReadyToPrint.objects.filter(
-            batchlist=batchlist, 
-            status_print='pending'  # Hanya yang pending
-        ).values_list('id_pesanan', flat=True))
-        
-        # Hitung SAT summary: order SAT yang belum di-print
-        sat_summary = Order.objects.filter(
-            nama_batch=nama_batch,
-            id_pesanan__in=unprinted_ready_to_pick_ids,
-            order_type='1'
-        ).values('id_pesanan').distinct().count()
-        
-        # Hitung PRIO summary: order PRIO yang belum di-print  
-        prio_summary = Order.objects.filter(
-            nama_batch=nama_batch,
-            id_pesanan__in=unprinted_ready_to_pick_ids,
-            order_type__in=['2', '3', '4']  # Semua order type selain '1'
-        ).values('id_pesanan').distinct().count()
+        # Order yang belum di-print (status_print pending)
+        unprinted_qs = ReadyToPrint.objects.filter(batchlist=batchlist, status_print='pending').values('id_pesanan')
+        unprinted_ready_to_pick_ids = list(unprinted_qs.values_list('id_pesanan', flat=True))
+
+        # SAT = order_type '1', PRIO = '2'/'3'/'4', Brand = '1'/'4' (order yang belum di-print)
+        type_summary = headers.filter(id_pesanan__in=unprinted_qs).aggregate(
+            sat=Count('pk', filter=Q(order_type='1')),
+            prio=Count('pk', filter=Q(order_type__in=['2', '3', '4'])),
+            brand=Count('pk', filter=Q(order_type__in=['1', '4'])),
+        )
+        sat_summary = type_summary['sat']
+        prio_summary = type_summary['prio']
+        brand_summary = type_summary['brand']
         
         # Hitung SAT SKU summary: SKU unik dari order SAT yang belum di-print
         sat_sku_summary = Order.objects.filter(
             nama_batch=nama_batch,
-            id_pesanan__in=unprinted_ready_to_pick_ids,
+            id_pesanan__in=unprinted_qs,
             order_type='1'
         ).values('sku').distinct().count()
         
-        # Hitung Brand summary: order dengan order_type '1' atau '4' yang belum di-print
-        brand_summary = Order.objects.filter(
-            nama_batch=nama_batch,
-            id_pesanan__in=unprinted_ready_to_pick_ids,
-            order_type__in=['1', '4']
-        ).values('id_pesanan').distinct().count()
-        
         mix_summary = len(unprinted_ready_to_pick_ids)
         printed_summary = ReadyToPrint.objects.filter(batchlist=batchlist, printed_at__isnull=False).count()
 
         # ========================================
         # LOGIKA PEMBEDAAN ORDER BATAL
         # ========================================
-        
-        # 1. AMBIL SEMUA ORDER BATAL/CANCEL DI BATCH INI
-        order_batal_count = orders.filter(
-            Q(status__icontains='batal') | Q(status__icontains='cancel')
-        ).values('id_pesanan').distinct().count()
-        
-        # 2. CARI ORDER BATAL YANG SUDAH PRINTED
-        # Cara: Order dengan status bayar 'batal'/'cancel' DAN status fulfillment 'printed'
-        cancelled_printed_count = orders.filter(
-            Q(status__icontains='batal') | Q(status__icontains='cancel')
-        ).filter(
-            status_order='printed'  # Status fulfillment = printed
-        ).values('id_pesanan').distinct().count()
-        
-        # 3. CARI ORDER BATAL YANG BELUM PRINTED  
-        # Cara: Order dengan status bayar 'batal'/'cancel' DAN status fulfillment 'pending' atau kosong
-        cancelled_not_printed_count = orders.filter(
-            Q(status__icontains='batal') | Q(status__icontains='cancel')
-        ).filter(
-            Q(status_order='pending') | Q(status_order__isnull=True) | Q(status_order='')
-        ).values('id_pesanan').distinct().count()
-        
-        # 4. HITUNG ORDER BATAL YANG SUDAH DI-RETUR
-        # Cara: Dari order batal yang sudah printed, cek mana yang status_retur='Y'
-        already_returned_count = orders.filter(
-            Q(status__icontains='batal') | Q(status__icontains='cancel')
-        ).filter(
-            status_order='printed'  # Status fulfillment = printed
-        ).filter(
-            status_retur='Y'  # Status retur = Y (sudah di-retur)
-        ).values('id_pesanan').distinct().count()
+        # 1. order batal/cancel di batch ini
+        # 2. batal yang sudah printed (status fulfillment 'printed')
+        # 3. batal yang belum printed (status fulfillment 'pending' atau kosong)
+        # 4. batal printed yang sudah di-retur (status_retur 'Y')
+        cancelled_q = Q(status__icontains='batal') | Q(status__icontains='cancel')
+        cancel_summary = headers.filter(cancelled_q).aggregate(
+            total=Count('pk'),
+            printed=Count('pk', filter=Q(status_order='printed')),
+            not_printed=Count('pk', filter=Q(status_order='pending') | Q(status_order__isnull=True) | Q(status_order='')),
+            returned=Count('pk', filter=Q(status_order='printed', status_retur='Y')),
+        )
+        order_batal_count = cancel_summary['total']
+        cancelled_printed_count = cancel_summary['printed']
+        cancelled_not_printed_count = cancel_summary['not_printed']
+        already_returned_count = cancel_summary['returned']
         
         # 5. HITUNG STOK GANTUNG (UNALLOCATED STOCK)
         # Stok Gantung = Total Di-Pick - Total Dibutuhkan (oleh order Ready to Print)
@@ -1286,22 +1038,15 @@ def ready_to_print_list(request):
     table = ReadyToPrintTable(queryset)
     RequestConfig(request, paginate={'per_page': 25}).configure(table) # Paginasi diatur ke 25
 
-    # Buat dictionary untuk lookup order_type yang lebih efisien
-    order_types = {}
-    if nama_batch:
-        orders = Order.objects.filter(nama_batch=nama_batch).exclude(status_bundle='Y')
-        for order in orders:
-            order_types[order.id_pesanan] = order.order_type
-
+    not_ready_to_pick_ids = get_not_ready_to_pick_ids(batchlist)
     context = {
         'table': table,
         'nama_batch': nama_batch,
-        'orders': Order.objects.filter(nama_batch=nama_batch).exclude(status_bundle='Y') if nama_batch else Order.objects.none(),
+        # Header order not-ready untuk badge status bayar di modal
+        'orders': OrderHeader.objects.filter(id_pesanan__in=not_ready_to_pick_ids) if nama_batch else OrderHeader.objects.none(),
         'search_query': search_query, # Kirim query ke template
     }
     context.update(summary_context)
-    
-    not_ready_to_pick_ids = get_not_ready_to_pick_ids(batchlist)
     context['not_ready_to_pick_ids'] = not_ready_to_pick_ids
     
     return render(request, 'fullfilment/readytoprint.html', context)
@@ -1338,6 +1083,7 @@ def ready_to_print_print(request):
             # Update status
             count = rtp_objects.count()
             rtp_objects.update(status_print='printed', printed_at=timezone.now(), printed_via='SELECTED')
+            invalidate_notification_cache(ReadyToPrint)
 
             return JsonResponse({'success': True, 'message': f'{count} order(s) have been marked as printed.'})
 
@@ -1474,6 +1220,7 @@ def print_sat_brand(request):
     if updated_count > 0:
         # 4. Update juga status_order di tabel Order
         Order.objects.filter(id_pesanan__in=list(idpesanan_to_update)).update(status_order='printed')
+        refresh_order_headers(idpesanan_to_update)
         
         # 5. UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
         batch = BatchList.objects.get(nama_batch=nama_batch)
@@ -1543,10 +1290,12 @@ def print_all_sat_brands(request):
     updated_count = ReadyToPrint.objects.filter(
         id__in=rtp_ids_to_update
     ).update(status_print='printed', printed_at=now_jakarta, printed_via='SAT ALL', printed_by=request.user)
+    invalidate_notification_cache(ReadyToPrint)
 
     # Update status_order di tabel Order
     if rtp_ids_to_update:
         Order.objects.filter(id_pesanan__in=idpesanan_set).update(status_order='printed')
+        refresh_order_headers(idpesanan_set)
         
         # UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
         batchlist = BatchList.objects.get(nama_batch=nama_batch)
@@ -1654,10 +1403,12 @@ def print_all_brands(request):
     updated_count = ReadyToPrint.objects.filter(
         id__in=rtp_ids_to_update
     ).update(status_print='printed', printed_at=now_jakarta, printed_via='BRAND', printed_by=request.user)
+    invalidate_notification_cache(ReadyToPrint)
 
     # Update status_order di tabel Order
     if rtp_ids_to_update:
         Order.objects.filter(id_pesanan__in=idpesanan_set).update(status_order='printed')
+        refresh_order_headers(idpesanan_set)
         
         # UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
         batchlist = BatchList.objects.get(nama_batch=nama_batch)
@@ -1738,6 +1489,7 @@ def print_brands(request):
     if updated_count > 0:
         # 4. Update juga status_order di tabel Order
         Order.objects.filter(id_pesanan__in=list(idpesanan_to_update)).update(status_order='printed')
+        refresh_order_headers(idpesanan_to_update)
         
         # 5. UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
         batch = BatchList.objects.get(nama_batch=nama_batch)
@@ -1900,21 +1652,10 @@ def batchitem_update_jumlah_ambil(request, nama_batch, pk):
                     # Jika delta negatif (ambil lebih sedikit), tambah quantity_locked
                     stock.quantity_locked = max(0, stock.quantity_locked - delta)
                     stock.save(update_fields=['quantity_locked'])
-            # Setelah update jumlah_ambil:
-            # WebSocket update disabled - channels not configured
-            # channel_layer = get_channel_layer()
-            # async_to_sync(channel_layer.group_send)(
-            #     f'batchpicking_{nama_batch}',
-            #     {
-            #         'type': 'send_update',
-            #         'data': {
-            #             'sku': batchitem.product.sku,
-            #             'barcode': batchitem.product.barcode,
-            #             'jumlah_ambil': batchitem.jumlah_ambil,
-            #             'status_ambil': batchitem.status_ambil,
-            #         }
-            #     }
-            # )
+            publish_pick_progress(
+                nama_batch, batchitem.product.sku, batchitem.product.barcode, batchitem.jumlah_ambil,
+                batchitem.jumlah, batchitem.status_ambil,
+            )
             BatchItemLog.objects.create(
                 waktu=timezone.now(),
                 user=request.user if request.user.is_authenticated else None,
@@ -2318,6 +2059,7 @@ def edit_order_batch_submit(request):
             
             if new_order_type is not None:
                 current_order_items.update(order_type=new_order_type)
+                refresh_order_headers([original_order_id_pesanan])
 
             return JsonResponse({'success': True, 'message': 'Order batch updated successfully.'})
 
@@ -2384,199 +2126,12 @@ def close_batch(request, batch_id):
     1. Tidak boleh ada unallocated stock
     2. Tidak boleh ada order gantung (not ready to pick)
     3. Semua order_id harus sudah di print (status_order = 'printed')
+    Validasi dan settlement stok dikerjakan batch_settlement.close_batch_settlement.
     """
-    if request.method != 'POST':
-        return JsonResponse({
-            'success': False,
-            'error': 'Method not allowed. Use POST.'
-        }, status=405)
-    
-    batch = get_object_or_404(BatchList, pk=batch_id)
-    
-    try:
-        with transaction.atomic():
-            # ✅ VALIDASI 1: Cek apakah batch sudah closed
-            if batch.status_batch == 'closed':
-                return JsonResponse({
-                    'success': False, 
-                    'error': f"Batch '{batch.nama_batch}' sudah berstatus closed!"
-                })
-            
-            # ✅ VALIDASI 2: Cek apakah ada order gantung (not ready to pick)
-            not_ready_ids = get_not_ready_to_pick_ids(batch)
-            if not_ready_ids:
-                return JsonResponse({
-                    'success': False,
-                    'error': f"Batch '{batch.nama_batch}' tidak bisa ditutup karena masih ada {len(not_ready_ids)} order yang belum ready to pick!"
-                })
-            
-            # ✅ VALIDASI 3: Cek apakah ada unallocated stock
-            # Hitung total picked quantities per produk
-            picked_quantities = BatchItem.objects.filter(batchlist=batch) \
-                .values('product_id') \
-                .annotate(total_picked=Sum('jumlah_ambil'))
-
-            picked_quantities_map = {item['product_id']: item['total_picked'] for item in picked_quantities}
-            
-            # Ambil ready to print IDs
-            ready_to_print_ids = ReadyToPrint.objects.filter(batchlist=batch).values_list('id_pesanan', flat=True)
-            
-            # Hitung total needed quantities dari order yang ready to print
-            needed_quantities = Order.objects.filter(nama_batch=batch.nama_batch, id_pesanan__in=ready_to_print_ids) \
-                .values('product_id') \
-                .annotate(total_needed=Sum('jumlah'))
-
-            needed_quantities_map = {item['product_id']: item['total_needed'] for item in needed_quantities}
-            
-            # Cek unallocated stock
-            unallocated_products = []  # ✅ DEFINE VARIABLE INI
-            for picked in picked_quantities:
-                product_id = picked['product_id']
-                picked_qty = picked['total_picked']
-                needed_qty = next((item['total_needed'] for item in needed_quantities if item['product_id'] == product_id), 0)
-                unallocated_qty = picked_qty - needed_qty
-                if unallocated_qty > 0:
-                    product = Product.objects.get(id=product_id)
-                    unallocated_products.append({
-                        'sku': product.sku,
-                        'unallocated_qty': unallocated_qty
-                    })
-            
-            if unallocated_products:
-                product_list = ', '.join([f"{p['sku']} ({p['unallocated_qty']} qty)" for p in unallocated_products])
-                return JsonResponse({
-                    'success': False,
-                    'error': f"Batch '{batch.nama_batch}' tidak bisa ditutup karena masih ada unallocated stock: {product_list}"
-                })
-            
-            # ✅ VALIDASI 4: Cek 3 case - status kosong, pending, wajib printed
-            # Case 1: Status kosong atau NULL
-            empty_status_orders = Order.objects.filter(
-                nama_batch=batch.nama_batch
-            ).filter(
-                Q(status_order='') | Q(status_order__isnull=True)
-            )
-
-            # Case 2: Status pending
-            pending_orders = Order.objects.filter(
-                nama_batch=batch.nama_batch,
-                status_order='pending'
-            )
-
-            # Case 3: Status bukan printed
-            non_printed_orders = Order.objects.filter(
-                nama_batch=batch.nama_batch
-            ).exclude(
-                status_order='printed'
-            )
-
-            # Gabungkan semua case
-            all_unprinted = empty_status_orders | pending_orders | non_printed_orders
-
-            if all_unprinted.exists():
-                # Ambil contoh untuk ditampilkan
-                sample_orders = all_unprinted.values('id_pesanan', 'status_order')[:5]
-                order_list = []
-                
-                for order in sample_orders:
-                    status = order['status_order'] or 'kosong'
-                    order_list.append(f"{order['id_pesanan']} ({status})")
-                
-                if all_unprinted.count() > 5:
-                    order_list.append(f"... dan {all_unprinted.count() - 5} order lainnya")
-                
-                return JsonResponse({
-                    'success': False,
-                    'error': f"Batch '{batch.nama_batch}' tidak bisa ditutup karena masih ada {all_unprinted.count()} order yang belum di print! Contoh: {', '.join(order_list)}"
-                })
-            
-            # ✅ SEMUA VALIDASI BERHASIL - LANJUTKAN CLOSE BATCH
-            
-            # 1. Increment close_count
-            batch.close_count += 1
-            close_count = batch.close_count
-            
-            # 2. Ubah status batch menjadi 'closed'
-            batch.status_batch = 'closed'
-            batch.completed_at = timezone.now()
-            batch.save(update_fields=['status_batch', 'completed_at', 'close_count'])
-
-            # 3. Kelompokkan BatchItem berdasarkan product_id DAN batchlist_id
-            batch_items = BatchItem.objects.filter(
-                batchlist=batch
-            ).exclude(
-                jumlah_ambil=0 # Hanya proses item yang memiliki jumlah_ambil > 0
-            ).select_related('product')
-
-            # Kelompokkan berdasarkan product_id DAN batchlist_id
-            product_batch_totals = {}
-            for batch_item in batch_items:
-                if not batch_item.product:
-                    continue
-                
-                # Key untuk grouping: (product_id, batchlist_id)
-                grouping_key = (batch_item.product.id, batch_item.batchlist.id)
-                if grouping_key not in product_batch_totals:
-                    product_batch_totals[grouping_key] = {
-                        'product': batch_item.product,
-                        'batchlist': batch_item.batchlist,
-                        'total_jumlah_ambil': 0,
-                        'batch_items': []
-                    }
-                product_batch_totals[grouping_key]['total_jumlah_ambil'] += batch_item.jumlah_ambil
-                product_batch_totals[grouping_key]['batch_items'].append(batch_item)
-
-            processed_items = 0
-            for grouping_key, data in product_batch_totals.items():
-                product = data['product']
-                batchlist = data['batchlist']
-                total_jumlah_ambil = data['total_jumlah_ambil']
-
-                try:
-                    stock = Stock.objects.select_for_update().get(product=product)
-                    
-                    # 4. Cek apakah ada perubahan quantity dari close batch sebelumnya
-                    last_close_entry = StockCardEntry.objects.filter(
-                        notes__contains=f"Batch {batch.nama_batch}",
-                        product=product,
-                        tipe_pergerakan='close_batch'
-                    ).order_by('-waktu').first()
-                    
-                    # Jika tidak ada perubahan quantity, skip
-                    if last_close_entry and last_close_entry.qty == -total_jumlah_ambil:
-                        continue
-                    
-                    # PERBAIKAN: Hitung stock awal dan akhir dengan benar
-                    qty_awal_fisik = stock.quantity + total_jumlah_ambil  # Stock awal = quantity saat ini + jumlah_ambil
-                    qty_akhir_fisik = stock.quantity  # Stock akhir = quantity saat ini
-                    
-                    # Update quantity_locked
-                    stock.quantity_locked -= total_jumlah_ambil
-                    stock.quantity_locked = max(0, stock.quantity_locked)
-                    stock.save(update_fields=['quantity_locked'])
-
-                    # 5. Buat SATU entri StockCardEntry untuk perubahan quantity
-                    StockCardEntry.objects.create(
-                        product=product,
-                        tipe_pergerakan='close_batch',
-                        qty=-total_jumlah_ambil, # Pengurangan quantity (negatif)
-                        qty_awal=qty_awal_fisik,  # Stock awal (quantity + jumlah_ambil)
-                        qty_akhir=qty_akhir_fisik, # Stock akhir (quantity saat ini)
-                        notes=f'Close Batch ke-{close_count} dari batch {batchlist.nama_batch}',
-                        user=request.user,
-                        reference=batchlist
-                    )
-                    
-                    processed_items += 1
+    get_object_or_404(BatchList, pk=batch_id)
 
-                except Stock.DoesNotExist:
-                    continue
-            
-            return JsonResponse({
-                'success': True,
-                'message': f"Batch '{batch.nama_batch}' berhasil ditutup (Closed). {processed_items} produk diproses."
-            })
-    
+    try:
+        result = close_batch_settlement(batch_id, user=request.user)
     except Exception as e:
         logging.error(f"Error closing batch {batch_id}: {e}")
         return JsonResponse({
@@ -2584,46 +2139,32 @@ def close_batch(request, batch_id):
             'error': f"Terjadi kesalahan saat menutup batch: {e}"
         })
 
+    if not result.success:
+        return JsonResponse({'success': False, 'error': result.error})
+    return JsonResponse({
+        'success': True,
+        'message': f"Batch '{result.batch.nama_batch}' berhasil ditutup (Closed). {result.processed} produk diproses."
+    })
+
 @require_POST
 @login_required
 def reopen_batch(request, batch_id):
+    get_object_or_404(BatchList, pk=batch_id)
     try:
-        with transaction.atomic():
-            batch = get_object_or_404(BatchList, pk=batch_id)
-            if batch.status_batch != 'closed':
-                messages.error(request, "Hanya batch yang berstatus 'closed' yang bisa di Re-Open.")
-                return redirect('/fullfilment/')
-
-            # PERBAIKAN: Ubah status_batch menjadi 'open'
-            batch.status_batch = 'open'
-            batch.save(update_fields=['status_batch'])
-
-            # PERBAIKAN: Gunakan jumlah_ambil untuk item yang sudah di-pick
-            batch_items = BatchItem.objects.filter(batchlist=batch).exclude(jumlah_ambil=0)
-            processed_items = 0
-            
-            for batch_item in batch_items:
-                try:
-                    stock = Stock.objects.select_for_update().get(product=batch_item.product)
-                    
-                    # PERBAIKAN: Kembalikan (tambahkan) jumlah_ambil ke quantity_locked
-                    stock.quantity_locked += batch_item.jumlah_ambil
-                    stock.save(update_fields=['quantity_locked'])
-                    
-                    processed_items += 1
-
-                except Stock.DoesNotExist:
-                    messages.warning(request, f"Stok untuk produk {batch_item.product.sku} tidak ditemukan saat Re-Open Batch.")
-                    continue
-
-            messages.success(request, f"Batch '{batch.nama_batch}' berhasil dibuka kembali. {processed_items} item diproses.")
-            return redirect('/fullfilment/')
-    
+        result = reopen_batch_settlement(batch_id, user=request.user)
     except Exception as e:
         logging.error(f"Error reopening batch {batch_id}: {e}")
         messages.error(request, f"Terjadi kesalahan saat membuka kembali batch: {e}")
         return redirect('/fullfilment/')
 
+    if not result.success:
+        messages.error(request, result.error)
+        return redirect('/fullfilment/')
+    for sku in result.missing_skus:
+        messages.warning(request, f"Stok untuk produk {sku} tidak ditemukan saat Re-Open Batch.")
+    messages.success(request, f"Batch '{result.batch.nama_batch}' berhasil dibuka kembali. {result.processed} produk diproses.")
+    return redirect('/fullfilment/')
+
 @login_required
 def scanpicking_list_view(request):
     """Menampilkan halaman daftar order yang siap untuk dipicking."""
@@ -2729,6 +2270,7 @@ def print_selected_ready_to_pick(request):
     # Update juga status di tabel Order utama
     if updated_count > 0:
         Order.objects.filter(id_pesanan__in=order_ids).update(status_order='printed')
+        refresh_order_headers(order_ids)
         
         # UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
         from collections import defaultdict
@@ -3058,6 +2600,7 @@ def mark_as_handed_over(request):
             printed_at=printed_at_dt,
             handed_over_at__isnull=True # Hanya update yang belum diserahkan
         ).update(handed_over_at=timezone.now())
+        invalidate_notification_cache(ReadyToPrint)
 
         if items_updated > 0:
             return JsonResponse({'success': True, 'message': f'{items_updated} item ditandai sudah diserahkan.'})
@@ -3154,6 +2697,7 @@ def print_sat_sku(request):
 
         if updated_count > 0:
             Order.objects.filter(id_pesanan__in=printed_order_ids).update(status_order='printed')
+            refresh_order_headers(printed_order_ids)
             
             # UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
             from collections import defaultdict
@@ -3255,6 +2799,7 @@ def print_prio(request, nama_batch):
         # 4. Update status_order di tabel Order
         if updated_count > 0:
             Order.objects.filter(id_pesanan__in=list(prio_order_ids)).update(status_order='printed')
+            refresh_order_headers(prio_order_ids)
             
             # 5. UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
             from collections import defaultdict
@@ -3361,6 +2906,7 @@ def print_mix(request, nama_batch):
         # 3. Update juga status di tabel Order utama
         if updated_count > 0:
             Order.objects.filter(id_pesanan__in=order_ids_to_update).update(status_order='printed')
+            refresh_order_headers(order_ids_to_update)
             
             # 4. UPDATE JUMLAH_TERPAKAI berdasarkan product dari order yang di-print
             from collections import defaultdict
@@ -3614,12 +3160,13 @@ def get_order_details_api(request, id_pesanan):
     return JsonResponse({'success': True, 'details': details, 'id_pesanan': id_pesanan})
 
 def get_not_ready_to_pick_ids(batchlist):
-    # Ambil semua id_pesanan di batch
-    all_ids = set(Order.objects.filter(nama_batch=batchlist.nama_batch).exclude(status_bundle='Y').values_list('id_pesanan', flat=True))
-    # Ambil id_pesanan yang sudah masuk ReadyToPrint
-    ready_ids = set(ReadyToPrint.objects.filter(batchlist=batchlist).values_list('id_pesanan', flat=True))
-    # Sisakan yang belum masuk ReadyToPrint
-    return list(all_ids - ready_ids)
+    # id_pesanan di batch (OrderHeader) yang belum masuk ReadyToPrint
+    ready_ids = ReadyToPrint.objects.filter(batchlist=batchlist).values('id_pesanan')
+    return list(
+        OrderHeader.objects.filter(nama_batch=batchlist.nama_batch)
+        .exclude(id_pesanan__in=ready_ids)
+        .values_list('id_pesanan', flat=True)
+    )
 
 @login_required
 def not_ready_to_pick_details(request, nama_batch):
@@ -3831,6 +3378,7 @@ def cancel_order(request):
 
             # Update status dan status_order
             orders.update(status='cancel', status_order='cancel')
+            refresh_order_headers([id_pesanan])
 
             nama_batch_lama = orders.first().nama_batch
             if nama_batch_lama:
@@ -3853,6 +3401,8 @@ def cancel_order(request):
 
             # Unlink dari batch
             orders.update(nama_batch=None)
+            refresh_order_headers([id_pesanan])
+            sync_ready_to_print_orders(nama_batch_lama, [id_pesanan])
 
         return JsonResponse({'status': 'success', 'message': f'Order {id_pesanan} berhasil dibatalkan, dihapus dari batch, dan stok terkunci dikembalikan.'})
     except Exception as e:
@@ -3951,6 +3501,8 @@ def erase_order_from_batch(request):
 
             # Unlink dari batch
             orders_to_erase.update(nama_batch=None)
+            refresh_order_headers([id_pesanan_to_erase])
+            sync_ready_to_print_orders(nama_batch_lama, [id_pesanan_to_erase])
 
         return JsonResponse({'status': 'success', 'message': f'Semua item dari {id_pesanan_to_erase} berhasil dihapus dari batch dan stok terkunci dikembalikan.'})
     except Exception as e:
@@ -4069,7 +3621,10 @@ def transfer_order_item(request):
 
             # 4. Pindahkan semua order item ke batch tujuan
             orders_to_transfer.update(nama_batch=target_batch_name)
+            refresh_order_headers([id_pesanan_to_transfer])
             logging.info(f"[{request.user.username}] All orders for {id_pesanan_to_transfer} updated to target batch {target_batch_name}.")
+            sync_ready_to_print_orders(source_batch_name, [id_pesanan_to_transfer])
+            sync_ready_to_print_orders(target_batch_name, [id_pesanan_to_transfer])
 
 
         logging.info(f"[{request.user.username}] Successfully transferred items for {id_pesanan_to_transfer} to {target_batch_name}.")
@@ -4204,6 +3759,9 @@ def transfer_batch_pending(request):
                     jumlah_ambil=0
                 )
             
+            sync_ready_to_print_orders(source_batch, not_ready_ids)
+            sync_ready_to_print_orders(target_batch, not_ready_ids)
+            
             return JsonResponse({
                 'success': True,
                 'message': f'Berhasil transfer {transferred_count} order "not ready to pick" dari "{source_batch}" ke "{target_batch}"',
@@ -4530,10 +4088,6 @@ def order_cancel_log_view(request):
     user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
     is_mobile = re.search(r'mobile|android|iphone', user_agent)
     
-    # Subquery to get the status_retur from the Order model for OrderCancelLog
-    order_status_retur_subquery = Order.objects.filter(
-        id_pesanan=OuterRef('order_id_scanned')
-    ).values('status_retur')[:1]
     
     # Subquery to get the return user from ReturnSourceLog
     return_user_subquery = ReturnSourceLog.objects.filter(
@@ -4545,17 +4099,14 @@ def order_cancel_log_view(request):
         order_id=OuterRef('order_id_scanned')
     ).order_by('-created_at').values('created_by__username')[:1]
     
-    # Subquery to get the latest fulfillment status from Order model
-    latest_fulfillment_subquery = Order.objects.filter(
-        id_pesanan=OuterRef('order_id_scanned')
-    ).order_by('-id').values('status_order')[:1]
+    # status_retur dan status fulfillment order diambil lewat join ke OrderHeader
     
     # Query untuk Order Cancel Belum Return (By User) - mirip returnlist
     order_cancel_by_user_belum_return = OrderCancelLog.objects.annotate(
-        linked_order_status_retur=Subquery(order_status_retur_subquery),
+        linked_order_status_retur=F('order_header__status_retur'),
         return_user=Subquery(return_user_subquery),
         scanner_user=Subquery(scanner_user_subquery),
-        latest_fulfillment_data=Subquery(latest_fulfillment_subquery)
+        latest_fulfillment_data=F('order_header__status_order')
     ).filter(
         Q(linked_order_status_retur='N') | Q(linked_order_status_retur='') | Q(linked_order_status_retur__isnull=True)
     ).annotate(
@@ -4568,10 +4119,10 @@ def order_cancel_log_view(request):
     
     # Query untuk Order Cancel Sudah Return (By User)
     order_cancel_by_user_sudah_return = OrderCancelLog.objects.annotate(
-        linked_order_status_retur=Subquery(order_status_retur_subquery),
+        linked_order_status_retur=F('order_header__status_retur'),
         return_user=Subquery(return_user_subquery),
         scanner_user=Subquery(scanner_user_subquery),
-        latest_fulfillment_data=Subquery(latest_fulfillment_subquery)
+        latest_fulfillment_data=F('order_header__status_order')
     ).filter(
         Q(linked_order_status_retur='Y')
     ).annotate(
@@ -4592,10 +4143,10 @@ def order_cancel_log_view(request):
         logs = order_cancel_by_user_sudah_return
     else:  # 'all'
         logs = OrderCancelLog.objects.annotate(
-            linked_order_status_retur=Subquery(order_status_retur_subquery),
+            linked_order_status_retur=F('order_header__status_retur'),
             return_user=Subquery(return_user_subquery),
             scanner_user=Subquery(scanner_user_subquery),
-            latest_fulfillment_data=Subquery(latest_fulfillment_subquery)
+            latest_fulfillment_data=F('order_header__status_order')
         ).annotate(
             row_num=Window(
                 expression=RowNumber(),
@@ -4631,10 +4182,6 @@ def order_cancel_log_data_api(request):
         from orders.models import Order
         from .models import ReturnSourceLog
         
-        # Subquery to get the status_retur from the Order model for OrderCancelLog
-        order_status_retur_subquery = Order.objects.filter(
-            id_pesanan=OuterRef('order_id_scanned')
-        ).values('status_retur')[:1]
         
         # Subquery to get the return user from ReturnSourceLog (user yang melakukan return session)
         return_user_subquery = ReturnSourceLog.objects.filter(
@@ -4646,10 +4193,7 @@ def order_cancel_log_data_api(request):
             order_id=OuterRef('order_id_scanned')
         ).order_by('-created_at').values('created_by__username')[:1]
         
-        # Subquery to get the latest fulfillment status from Order model
-        latest_fulfillment_subquery = Order.objects.filter(
-            id_pesanan=OuterRef('order_id_scanned')
-        ).order_by('-id').values('status_order')[:1]
+        # status_retur dan status fulfillment order diambil lewat join ke OrderHeader
         
         # Get filter parameter
         filter_type = request.GET.get('filter', 'all')
@@ -4657,10 +4201,10 @@ def order_cancel_log_data_api(request):
         # Apply same logic as desktop view
         if filter_type == 'belum_return':
             logs = OrderCancelLog.objects.annotate(
-                linked_order_status_retur=Subquery(order_status_retur_subquery),
+                linked_order_status_retur=F('order_header__status_retur'),
                 return_user=Subquery(return_user_subquery),
                 scanner_user=Subquery(scanner_user_subquery),
-                latest_fulfillment_data=Subquery(latest_fulfillment_subquery)
+                latest_fulfillment_data=F('order_header__status_order')
             ).filter(
                 Q(linked_order_status_retur='N') | Q(linked_order_status_retur='') | Q(linked_order_status_retur__isnull=True)
             ).annotate(
@@ -4672,10 +4216,10 @@ def order_cancel_log_data_api(request):
             ).filter(row_num=1).select_related('user').order_by('-scan_time')
         elif filter_type == 'sudah_return':
             logs = OrderCancelLog.objects.annotate(
-                linked_order_status_retur=Subquery(order_status_retur_subquery),
+                linked_order_status_retur=F('order_header__status_retur'),
                 return_user=Subquery(return_user_subquery),
                 scanner_user=Subquery(scanner_user_subquery),
-                latest_fulfillment_data=Subquery(latest_fulfillment_subquery)
+                latest_fulfillment_data=F('order_header__status_order')
             ).filter(
                 Q(linked_order_status_retur='Y')
             ).annotate(
@@ -4687,10 +4231,10 @@ def order_cancel_log_data_api(request):
             ).filter(row_num=1).select_related('user').order_by('-scan_time')
         else:  # 'all'
             logs = OrderCancelLog.objects.annotate(
-                linked_order_status_retur=Subquery(order_status_retur_subquery),
+                linked_order_status_retur=F('order_header__status_retur'),
                 return_user=Subquery(return_user_subquery),
                 scanner_user=Subquery(scanner_user_subquery),
-                latest_fulfillment_data=Subquery(latest_fulfillment_subquery)
+                latest_fulfillment_data=F('order_header__status_order')
             ).annotate(
                 row_num=Window(
                     expression=RowNumber(),
@@ -4782,6 +4326,7 @@ def clean_batch_orders(request, batch_id):
 
             # 3. Lepaskan order dengan mengubah nama_batch menjadi None
             released_count = orders_to_release_qs.update(nama_batch=None, status_order='pending')
+            refresh_order_headers(id_pesanan_to_release)
 
             # 4. Hitung ulang BatchItem dan Stock
             for product_id, jumlah_dilepas in products_to_recalculate.items():
@@ -4876,6 +4421,7 @@ def create_returnlist(request):
                     OrderCancelLog.objects.filter(order_id_scanned=source_value).update(status_retur='Y')
                     # Update Order status_retur menjadi 'Y'
                     orders_to_return.update(status_retur='Y')
+                    refresh_order_headers([source_value])
                 message = f"Return Session dari Order ID {source_value} berhasil dibuat."
 
             elif source_type == 'overstock_batch':
@@ -5179,6 +4725,8 @@ def scan_hapus_order_printed(request, nama_batch):
 
             # Unlink dari batch
             orders_to_erase.update(nama_batch=None)
+            refresh_order_headers([order_id])
+            sync_ready_to_print_orders(nama_batch, [order_id])
             
             return JsonResponse({
                 'success': True,
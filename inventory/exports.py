@@ -0,0 +1,34 @@
+"""
+Builder export stock (lihat erp_alfa/exports.py).
+"""
+from erp_alfa.exports import Column, ExportSpec
+from products.models import Product
+
+
+def _quantity(key):
+    return lambda row: row[key] or 0
+
+
+def stock_report(params):
+    """Semua produk dengan quantity stock (0 jika belum punya Stock)."""
+    products = Product.objects.all()
+    rows = products.order_by('pk').values(
+        'sku', 'barcode', 'nama_produk', 'variant_produk', 'brand', 'stock__quantity', 'stock__quantity_locked',
+    )
+    return ExportSpec(
+        filename='stock_export',
+        sheet_name='Stock',
+        columns=[
+            Column('SKU', 'sku'),
+            Column('Barcode', 'barcode'),
+            Column('Nama Produk', 'nama_produk'),
+            Column('Variant', 'variant_produk'),
+            Column('Brand', 'brand'),
+            Column('Quantity', _quantity('stock__quantity'), 'number'),
+            Column('Quantity Locked', _quantity('stock__quantity_locked'), 'number'),
+            Column('Quantity Ready', lambda row: (row['stock__quantity'] or 0) - (row['stock__quantity_locked'] or 0),
+                   'number'),
+        ],
+        rows=lambda: rows.iterator(chunk_size=2000),
+        count=products.count,
+    )
@@ -0,0 +1,78 @@
+"""
+Management command audit rekonsiliasi posisi stok: total stok di rak (quantity +
+quantity_opname) vs Stock.quantity master per produk, satu query grouped. Default hanya
+produk yang selisih (mode mismatch only), cocok untuk audit malam (cron).
+
+Usage:
+    python manage.py audit_stock_position
+    python manage.py audit_stock_position --all --csv /tmp/rekonsiliasi.csv
+    python manage.py audit_stock_position --fail-on-overstock
+"""
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.stock_position import STATUS_OVERSTOCK, reconcile_products
+
+CSV_FIELDS = [
+    'sku', 'nama_produk', 'rak_count', 'rak_quantity', 'opname_quantity', 'rak_total',
+    'master_quantity', 'selisih', 'status',
+]
+
+
+class Command(BaseCommand):
+    help = 'Audit rekonsiliasi total stok rak vs stok master per produk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Tampilkan semua produk, bukan hanya yang selisih')
+        parser.add_argument('--csv', help='Simpan hasil ke file CSV')
+        parser.add_argument('--limit', type=int, default=30, help='Jumlah baris yang ditampilkan')
+        parser.add_argument('--fail-on-overstock', action='store_true', help='Exit error jika ada produk OVERSTOCK')
+
+    def handle(self, *args, **options):
+        products = reconcile_products(mismatch_only=not options['all'])
+
+        checked = 0
+        mismatched = 0
+        overstock = 0
+        writer = None
+        csv_file = open(options['csv'], 'w', newline='', encoding='utf-8') if options['csv'] else None
+        try:
+            if csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+            self.stdout.write(
+                f"{'SKU':<24} {'Rak':>5} {'Total rak':>10} {'Master':>10} {'Selisih':>10}  Status"
+            )
+            for row in products.iterator(chunk_size=2000):
+                checked += 1
+                mismatched += row['selisih'] != 0
+                overstock += row['status'] == STATUS_OVERSTOCK
+                if writer:
+                    writer.writerow(row)
+                if checked <= options['limit']:
+                    line = (
+                        f"{(row['sku'] or '-')[:24]:<24} {row['rak_count']:>5} {row['rak_total']:>10} "
+                        f"{row['master_quantity']:>10} {row['selisih']:>10}  {row['status']}"
+                    )
+                    self.stdout.write(self.style.WARNING(line) if row['status'] == STATUS_OVERSTOCK else line)
+        finally:
+            if csv_file:
+                csv_file.close()
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Produk dicek     : {checked}{'' if options['all'] else ' (hanya yang selisih)'}")
+        self.stdout.write(f"Selisih          : {mismatched}")
+        self.stdout.write(f"OVERSTOCK        : {overstock}")
+        if options['csv']:
+            self.stdout.write(f"CSV              : {options['csv']}")
+        self.stdout.write("=" * 60)
+        if overstock:
+            self.stdout.write(self.style.ERROR(f"✗ {overstock} produk OVERSTOCK (total rak > master)"))
+            if options['fail_on_overstock']:
+                raise CommandError(f"{overstock} produk OVERSTOCK")
+        elif mismatched:
+            self.stdout.write(self.style.WARNING(f"⚠ {mismatched} produk total rak kurang dari master"))
+        else:
+            self.stdout.write(self.style.SUCCESS("✓ Total rak sama dengan master untuk semua produk"))
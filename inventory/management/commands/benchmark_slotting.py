@@ -0,0 +1,228 @@
+"""
+Management command untuk benchmark latency engine slotting.
+
+Seed N rak (dimensi/lokasi acak, sebagian tanpa dimensi), RakCapacity, stok rak produk
+pengisi, dan produk uji (sebagian posisi_tidur, sebagian sudah ada di rak = rak SAME)
+di dalam transaksi yang di-rollback. Untuk setiap produk uji, get_rak_options dihitung
+dengan loop per rak lama dan dengan engine array (inventory.slotting), lalu latency +
+jumlah query dilaporkan. Kesamaan top-10 dengan loop lama dicek oleh
+inventory.tests.SlottingGoldenTest (memakai legacy_get_rak_options dan seed_slotting_data).
+
+Usage: python manage.py benchmark_slotting --raks 1000 --products 50
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from inventory.models import InventoryRakStock, Rak, RakCapacity
+from inventory.putaway import SlottingService
+from inventory.rakcapacity import _calculate_width_slots_needed_for_product
+from products.models import Product
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_get_rak_options(product, quantity=None):
+    """
+    Loop per rak lama SlottingService.get_rak_options (list opsi top 10).
+    Satu-satunya perubahan: tie-break pk pada urutan -available_front agar urutan dasar
+    deterministik (sama dengan engine).
+    """
+    rak_capacities = RakCapacity.objects.select_related('rak').all().order_by('-available_front', 'pk')
+    options = []
+    for capacity in rak_capacities:
+        rak = capacity.rak
+        if not (rak.lebar_cm and rak.panjang_cm and rak.tinggi_cm):
+            continue
+        can_fit = SlottingService._can_product_fit_in_rak(product, rak)
+        if not can_fit['can_fit']:
+            continue
+        products_per_slot = SlottingService._calculate_hybrid_products_per_slot(rak, product)
+        if products_per_slot <= 0:
+            continue
+        orientation = can_fit.get('orientation_used', 'normal')
+        stackable_height = SlottingService._calculate_stackable_height(product, rak, orientation)
+        stacking_method = SlottingService._calculate_stacking_method(product, rak, orientation)
+        existing_stock = InventoryRakStock.objects.filter(product=product, rak=rak, quantity__gt=0).first()
+
+        available_slots = 0
+        remaining_capacity = 0
+        current_slots_used = 0
+        total_slots_available = 0
+        product_width = float(product.lebar_cm)
+        rak_width = float(rak.lebar_cm)
+        if existing_stock:
+            current_slots_used = _calculate_width_slots_needed_for_product(rak, product, existing_stock.quantity)
+            total_slots_available = int(rak_width / product_width) if product_width > 0 else 0
+            remaining_slots = max(0, total_slots_available - current_slots_used)
+            remaining_capacity = remaining_slots * products_per_slot
+            available_slots = remaining_slots
+        elif product_width > 0:
+            available_slots = int(float(capacity.available_front) / product_width)
+            remaining_capacity = available_slots * products_per_slot
+
+        capacity_valid = True
+        if quantity and quantity > 0:
+            if existing_stock:
+                capacity_valid = quantity <= remaining_capacity
+            else:
+                capacity_valid = available_slots >= _calculate_width_slots_needed_for_product(rak, product, quantity)
+
+        options.append({
+            'rak_id': rak.id,
+            'kode_rak': rak.kode_rak,
+            'nama_rak': rak.nama_rak,
+            'lokasi': rak.lokasi,
+            'lokasi_priority': rak.lokasi_priority_score,
+            'lebar_cm': rak.lebar_cm,
+            'panjang_cm': rak.panjang_cm,
+            'tinggi_cm': rak.tinggi_cm,
+            'available_front': float(capacity.available_front),
+            'used_front': float(capacity.used_front),
+            'utilization': float(capacity.utilization_percentage),
+            'fit_score': can_fit['fit_score'],
+            'reason': can_fit['reason'],
+            'products_per_slot': products_per_slot,
+            'stackable_height': stackable_height,
+            'stacking_method': stacking_method,
+            'orientation_used': orientation,
+            'supports_hybrid': can_fit.get('supports_hybrid', False),
+            'existing_stock': existing_stock.quantity if existing_stock else 0,
+            'available_slots': available_slots,
+            'remaining_capacity': remaining_capacity,
+            'current_slots_used': current_slots_used,
+            'total_slots_available': total_slots_available,
+            'has_same_product': existing_stock is not None,
+            'capacity_valid': capacity_valid,
+        })
+
+    def sort_key(option):
+        same_product_bonus = 1000 if option['has_same_product'] else 0
+        capacity_priority = option['remaining_capacity'] if option['has_same_product'] else option['available_slots']
+        return same_product_bonus + capacity_priority + (option['lokasi_priority'] or 0)
+
+    options.sort(key=sort_key, reverse=True)
+    return options[:10]
+
+
+def seed_slotting_data(rak_count, product_count, filler_count, seed=7):
+    """Seed rak, RakCapacity, stok rak dan produk uji (deterministik per seed). Return produk uji."""
+    rng = random.Random(seed)
+
+    def dim(low, high):
+        return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+    lokasi_choices = [code for code, _ in Rak.LOKASI_CHOICES] + [None]
+    raks = []
+    for i in range(rak_count):
+        missing = rng.random() < 0.05
+        raks.append(Rak(
+            kode_rak=f'BENCH-SLT-{i:05d}',
+            nama_rak=f'Bench Slotting {i}',
+            lebar_cm=None if missing else dim(40, 200),
+            panjang_cm=dim(30, 80),
+            tinggi_cm=dim(20, 60),
+            lokasi=rng.choice(lokasi_choices),
+        ))
+    raks = Rak.objects.bulk_create(raks, batch_size=2000)
+    RakCapacity.objects.bulk_create([
+        RakCapacity(
+            rak=rak,
+            # Sebagian rak sengaja punya available_front yang sama (uji urutan stabil)
+            available_front=(rak.lebar_cm or 0) * Decimal(rng.choice(['0', '0.25', '0.5', '1', str(rng.random())[:4]])),
+        )
+        for rak in raks
+    ], batch_size=2000)
+
+    def product(prefix, i):
+        return Product(
+            sku=f'BENCH-SLT-{prefix}{i}', barcode=f'BENCHSLT{prefix}{i}', nama_produk=f'Bench Slotting {prefix}{i}',
+            lebar_cm=dim(2, 30), panjang_cm=dim(2, 40), tinggi_cm=dim(2, 40), posisi_tidur=rng.random() < 0.5,
+        )
+
+    fillers = Product.objects.bulk_create([product('F', i) for i in range(filler_count)], batch_size=2000)
+    tests = Product.objects.bulk_create([product('T', i) for i in range(product_count)], batch_size=2000)
+    stocks = []
+    for rak in raks:
+        for filler in rng.sample(fillers, rng.randint(0, min(8, len(fillers)))):
+            stocks.append(InventoryRakStock(product=filler, rak=rak, quantity=rng.randint(0, 60)))
+    for test in tests:
+        # Produk uji sudah ada di 0-3 rak (rak SAME)
+        for rak in rng.sample(raks, rng.randint(0, 3)):
+            stocks.append(InventoryRakStock(product=test, rak=rak, quantity=rng.randint(1, 200)))
+    InventoryRakStock.objects.bulk_create(stocks, batch_size=5000)
+    return tests
+
+
+class _QueryCounter:
+    """Hitung query lewat execute_wrapper (loop lama bisa melebihi batas log query Django)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency get_rak_options: loop per rak lama vs engine array (data dummy, di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raks', type=int, default=1000, help='Jumlah rak')
+        parser.add_argument('--products', type=int, default=50, help='Jumlah produk uji')
+        parser.add_argument('--fillers', type=int, default=300, help='Jumlah produk pengisi stok rak')
+
+    def handle(self, *args, **options):
+        report = {'legacy': [], 'engine': [], 'legacy_queries': 0, 'engine_queries': 0, 'cases': 0}
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"Seeding {options['raks']} rak, {options['fillers']} produk pengisi, {options['products']} produk uji..."
+                )
+                products = seed_slotting_data(options['raks'], options['products'], options['fillers'])
+                rng = random.Random(17)
+                for product in products:
+                    for quantity in (None, rng.randint(1, 400)):
+                        self._run_case(product, quantity, report)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        cases = report['cases']
+        legacy_ms = sum(report['legacy']) * 1000 / cases
+        engine_ms = sum(report['engine']) * 1000 / cases
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Kasus (produk x quantity) : {cases}")
+        self.stdout.write(f"{'':<14} {'rata-rata (ms)':>16} {'maks (ms)':>12} {'query/kasus':>12}")
+        for label, key in (('loop lama', 'legacy'), ('engine', 'engine')):
+            self.stdout.write(
+                f"{label:<14} {sum(report[key]) * 1000 / cases:>16.1f} {max(report[key]) * 1000:>12.1f} "
+                f"{report[key + '_queries'] / cases:>12.1f}"
+            )
+        if engine_ms:
+            self.stdout.write(f"Speedup        : {legacy_ms / engine_ms:.1f}x")
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    def _run_case(self, product, quantity, report):
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            legacy_get_rak_options(product, quantity)
+            report['legacy'].append(time.perf_counter() - start)
+        report['legacy_queries'] += counter.count
+
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            SlottingService.get_rak_options(product, quantity)
+            report['engine'].append(time.perf_counter() - start)
+        report['engine_queries'] += counter.count
+
+        report['cases'] += 1
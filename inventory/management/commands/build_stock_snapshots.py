@@ -0,0 +1,98 @@
+"""
+Management command untuk membangun snapshot saldo kartu stok harian (StockBalanceSnapshot).
+Tiap produk dilanjutkan dari snapshot terakhirnya, jadi aman dijalankan berkala (cron harian).
+--verify N membandingkan balance_as_of (snapshot + tail scan) dengan jumlah penuh entri
+untuk N produk acak.
+
+Usage:
+    python manage.py build_stock_snapshots
+    python manage.py build_stock_snapshots --rebuild --chunk-size 1000
+    python manage.py build_stock_snapshots --sku SKU-001 --verify 50
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from django.utils import timezone
+
+from inventory.models import StockBalanceSnapshot, StockCardEntry
+from inventory.stock_ledger import SNAPSHOT_CHUNK_SIZE, balance_as_of, build_stock_snapshots
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Bangun snapshot saldo kartu stok harian per produk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help='Tanggal terakhir (YYYY-MM-DD), default kemarin')
+        parser.add_argument('--sku', action='append', default=[], help='SKU tertentu (boleh diulang)')
+        parser.add_argument('--chunk-size', type=int, default=SNAPSHOT_CHUNK_SIZE, help='Jumlah produk per chunk')
+        parser.add_argument('--rebuild', action='store_true', help='Hapus snapshot lama dan bangun dari awal')
+        parser.add_argument('--verify', type=int, default=0, help='Cek N produk acak terhadap jumlah penuh')
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Format --until harus YYYY-MM-DD")
+
+        product_ids = None
+        if options['sku']:
+            product_ids = list(Product.objects.filter(sku__in=options['sku']).values_list('id', flat=True))
+            if len(product_ids) != len(set(options['sku'])):
+                raise CommandError("Ada SKU yang tidak ditemukan")
+
+        start = time.perf_counter()
+        if options['rebuild']:
+            snapshots = StockBalanceSnapshot.objects.all()
+            if product_ids is not None:
+                snapshots = snapshots.filter(product_id__in=product_ids)
+            deleted = snapshots.delete()[0]
+            self.stdout.write(f"{deleted} snapshot lama dihapus")
+
+        def progress(products, created):
+            self.stdout.write(f"  {products} produk diproses, {created} snapshot dibuat...")
+
+        result = build_stock_snapshots(
+            until=until, product_ids=product_ids, chunk_size=options['chunk_size'], progress=progress,
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Produk diproses  : {result.products}")
+        self.stdout.write(f"Snapshot dibuat  : {result.snapshots}")
+        self.stdout.write(f"Waktu            : {elapsed:.2f}s")
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ Snapshot saldo kartu stok selesai"))
+
+        if options['verify']:
+            self._verify(options['verify'], product_ids)
+
+    def _verify(self, sample_size, product_ids):
+        if product_ids is None:
+            product_ids = list(StockCardEntry.objects.order_by().values_list('product_id', flat=True).distinct())
+        rng = random.Random()
+        mismatches = 0
+        checked = 0
+        for product_id in rng.sample(product_ids, min(sample_size, len(product_ids))):
+            entries = StockCardEntry.objects.filter(product_id=product_id, status='active')
+            waktu = list(entries.order_by('waktu').values_list('waktu', flat=True))
+            # Titik cek: sekarang, dan beberapa waktu acak di sepanjang riwayat produk
+            points = [timezone.now()] + [w + timedelta(seconds=rng.choice([-1, 0, 1])) for w in rng.sample(waktu, min(3, len(waktu)))]
+            for at in points:
+                checked += 1
+                expected = entries.filter(waktu__lte=at).aggregate(total=Sum('qty'))['total'] or 0
+                actual = balance_as_of(product_id, at)
+                if actual != expected:
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(
+                        f"✗ product {product_id} @ {timezone.localtime(at):%Y-%m-%d %H:%M:%S}: snapshot={actual} penuh={expected}"
+                    ))
+        if mismatches:
+            raise CommandError(f"{mismatches} dari {checked} titik cek berbeda")
+        self.stdout.write(self.style.SUCCESS(f"✓ balance_as_of identik dengan jumlah penuh untuk {checked} titik cek"))
@@ -0,0 +1,47 @@
+"""
+Management command untuk membandingkan RakCapacity/RakStockUsage inkremental dengan hasil
+hitung ulang penuh dari InventoryRakStock.
+
+Usage:
+    python manage.py check_rak_capacity_drift            # laporan drift
+    python manage.py check_rak_capacity_drift --verbose  # tampilkan contoh rak yang berbeda
+    python manage.py check_rak_capacity_drift --fix      # rebuild rak yang drift
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.rak_usage import find_capacity_drift, rebuild_rak_capacity
+
+
+class Command(BaseCommand):
+    help = 'Drift check RakCapacity inkremental vs hitung ulang penuh'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Hitung ulang penuh rak yang drift')
+        parser.add_argument('--verbose', action='store_true', help='Tampilkan contoh perbedaan')
+        parser.add_argument('--samples', type=int, default=20, help='Jumlah contoh perbedaan yang disimpan')
+
+    def handle(self, *args, **options):
+        drift = find_capacity_drift(sample_limit=options['samples'])
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Rak dicek            : {drift.checked}")
+        self.stdout.write(f"Rak berbeda          : {drift.mismatched_raks}")
+        self.stdout.write(f"Pasangan rak-produk  : {drift.mismatched_pairs} berbeda")
+        if options.get('verbose'):
+            for kode_rak, field, stored, expected in drift.samples:
+                if field == 'capacity':
+                    self.stdout.write(f"    {kode_rak}: RakCapacity belum ada")
+                else:
+                    self.stdout.write(f"    {kode_rak}.{field}: {stored!r} → seharusnya {expected!r}")
+
+        if options.get('fix') and drift.drifted_rak_ids:
+            rebuilt = rebuild_rak_capacity(drift.drifted_rak_ids)
+            self.stdout.write(f"  → {rebuilt} rak dihitung ulang")
+
+        self.stdout.write("=" * 60)
+        if drift.drifted_rak_ids:
+            self.stdout.write(self.style.ERROR(f"✗ {len(drift.drifted_rak_ids)} rak drift"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ {drift.checked} rak konsisten"))
+        self.stdout.write("=" * 60)
@@ -0,0 +1,49 @@
+"""
+Management command untuk menghitung ulang penuh RakCapacity dan cache RakStockUsage dari
+InventoryRakStock (perbaikan drift). Rak diproses per chunk, satu transaksi per chunk;
+--workers > 1 memproses chunk paralel (thread, koneksi database masing-masing).
+
+Usage:
+    python manage.py rebuild_rak_capacity
+    python manage.py rebuild_rak_capacity --workers 4 --chunk-size 100
+    python manage.py rebuild_rak_capacity --rak A1-01 --rak A1-02
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.models import Rak
+from inventory.rak_usage import REBUILD_CHUNK_SIZE, rebuild_all_rak_capacity, rebuild_rak_capacity
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang penuh RakCapacity (used/available front) dari stok rak'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Jumlah thread paralel')
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE, help='Jumlah rak per chunk/transaksi')
+        parser.add_argument('--rak', action='append', default=[], help='Kode rak tertentu (boleh diulang)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['rak']:
+            rak_ids = list(Rak.objects.filter(kode_rak__in=options['rak']).values_list('id', flat=True))
+            if len(rak_ids) != len(set(options['rak'])):
+                raise CommandError("Ada kode rak yang tidak ditemukan")
+            rebuilt = rebuild_rak_capacity(rak_ids)
+        else:
+            def progress(count):
+                self.stdout.write(f"  {count} rak dihitung ulang...")
+
+            rebuilt = rebuild_all_rak_capacity(
+                workers=options['workers'], chunk_size=options['chunk_size'], progress=progress,
+            )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Rak dihitung ulang : {rebuilt}")
+        self.stdout.write(f"Workers            : {options['workers'] if not options['rak'] else 1}")
+        self.stdout.write(f"Waktu              : {elapsed:.2f}s")
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ RakCapacity selesai dihitung ulang"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0035_alter_stockcardentry_tipe_pergerakan'),
+        ('products', '0020_product_sku_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rakcapacity',
+            name='used_width_cm',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Total front terpakai (cm), jumlah RakStockUsage rak ini', max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='RakStockUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width_slots', models.IntegerField(default=0, help_text='Jumlah slot width yang dipakai')),
+                ('used_width_cm', models.DecimalField(decimal_places=2, default=0, help_text='Front terpakai (cm)', max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rak_usages', to='products.product')),
+                ('rak', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_usages', to='inventory.rak')),
+            ],
+            options={
+                'verbose_name': 'Rak Stock Usage',
+                'verbose_name_plural': 'Rak Stock Usages',
+                'unique_together': {('rak', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated manually
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def populate_rak_stock_usage(apps, schema_editor):
+    """Isi RakStockUsage dan RakCapacity.used_width_cm dari stok rak (logika sama dengan inventory.rak_usage)"""
+    from inventory.rak_usage import available_front_for, pair_usage
+
+    InventoryRakStock = apps.get_model('inventory', 'InventoryRakStock')
+    RakCapacity = apps.get_model('inventory', 'RakCapacity')
+    RakStockUsage = apps.get_model('inventory', 'RakStockUsage')
+
+    usages = []
+    totals = defaultdict(Decimal)
+    for stock in InventoryRakStock.objects.filter(quantity__gt=0).select_related('rak', 'product').iterator(chunk_size=2000):
+        slots, width = pair_usage(stock.rak, stock.product, stock.quantity)
+        if width:
+            usages.append(RakStockUsage(rak_id=stock.rak_id, product_id=stock.product_id, width_slots=slots, used_width_cm=width))
+            totals[stock.rak_id] += width
+    RakStockUsage.objects.bulk_create(usages, batch_size=2000)
+
+    existing = set(RakCapacity.objects.values_list('rak_id', flat=True))
+    RakCapacity.objects.bulk_create([RakCapacity(rak_id=rak_id) for rak_id in totals if rak_id not in existing])
+    capacities = list(RakCapacity.objects.select_related('rak'))
+    for capacity in capacities:
+        capacity.used_width_cm = totals.get(capacity.rak_id, Decimal('0.00'))
+        capacity.available_front = available_front_for(capacity.rak, capacity.used_width_cm)
+    RakCapacity.objects.bulk_update(capacities, ['used_width_cm', 'available_front'], batch_size=2000)
+
+    print(f"Populated {len(usages)} rak stock usages for {len(capacities)} rak capacities")
+
+
+def clear_rak_stock_usage(apps, schema_editor):
+    apps.get_model('inventory', 'RakStockUsage').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0036_rakstockusage'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rak_stock_usage, clear_rak_stock_usage),
+    ]
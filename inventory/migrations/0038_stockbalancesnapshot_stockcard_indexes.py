@@ -0,0 +1,50 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('inventory', '0037_populate_rakstockusage'),
+        ('products', '0020_product_sku_upper_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tanggal', models.DateField()),
+                ('qty_masuk', models.IntegerField(default=0)),
+                ('qty_keluar', models.IntegerField(default=0)),
+                ('saldo', models.IntegerField(default=0)),
+                ('jumlah_entri', models.IntegerField(default=0)),
+                ('last_entry_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['product', '-tanggal'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockcardentry',
+            index=models.Index(fields=['waktu', 'id'], name='stockcard_waktu_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockcardentry',
+            index=models.Index(fields=['product', 'waktu', 'id'], name='stockcard_product_waktu_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockbalancesnapshot',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.product'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stockbalancesnapshot',
+            unique_together={('product', 'tanggal')},
+        ),
+    ]
@@ -198,12 +198,38 @@ class StockCardEntry(models.Model):
         ordering = ['-waktu']
         indexes = [
             models.Index(fields=["content_type", "object_id"]),
+            # Keyset pagination kartu stok (stock_ledger)
+            models.Index(fields=["waktu", "id"], name="stockcard_waktu_id_idx"),
+            # Kartu stok per produk dan tail scan saldo per tanggal
+            models.Index(fields=["product", "waktu", "id"], name="stockcard_product_waktu_idx"),
         ]
 
     def __str__(self):
         user_str = f" oleh {self.user}" if self.user else ""
         return f"{self.product} | {self.tipe_pergerakan} ({self.qty}) | {self.waktu.strftime('%Y-%m-%d %H:%M')}{user_str}"
 
+
+class StockBalanceSnapshot(models.Model):
+    """
+    Saldo kartu stok per produk per hari (akhir hari, zona waktu lokal).
+    Hanya hari yang ada pergerakan yang punya baris. saldo = jumlah kumulatif qty entri
+    active sampai akhir tanggal. Dibangun oleh stock_ledger.build_stock_snapshots.
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='stock_snapshots')
+    tanggal = models.DateField()
+    qty_masuk = models.IntegerField(default=0)
+    qty_keluar = models.IntegerField(default=0)
+    saldo = models.IntegerField(default=0)
+    jumlah_entri = models.IntegerField(default=0)
+    last_entry_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('product', 'tanggal')
+        ordering = ['product', '-tanggal']
+
+    def __str__(self):
+        return f"{self.product} - {self.tanggal} - Saldo {self.saldo}"
+
 class InventoryRakStockLog(models.Model):
     TIPE_PERGERAKAN = [
         ('putaway_masuk', 'Putaway Masuk (+)'),
@@ -508,16 +534,18 @@ class Rak(models.Model):
     def __str__(self):
         return f"{self.kode_rak} - {self.nama_rak}"
     
+    # Priority score slotting per lokasi (dipakai juga engine slotting)
+    LOKASI_PRIORITY = {
+        'DEKAT': 4,      # Priority tertinggi
+        'SEDANG': 3,     # Priority tinggi
+        'JAUH': 2,       # Priority sedang
+        'BEDA_GUDANG': 1, # Priority terendah
+    }
+
     @property
     def lokasi_priority_score(self):
         """Mendapatkan priority score untuk slotting berdasarkan lokasi"""
-        priority_map = {
-            'DEKAT': 4,      # Priority tertinggi
-            'SEDANG': 3,     # Priority tinggi
-            'JAUH': 2,       # Priority sedang
-            'BEDA_GUDANG': 1, # Priority terendah
-        }
-        return priority_map.get(self.lokasi, 0) if self.lokasi else 0
+        return self.LOKASI_PRIORITY.get(self.lokasi, 0) if self.lokasi else 0
     
     @property
     def dimensions_display(self):
@@ -539,6 +567,7 @@ class RakCapacity(models.Model):
     """
     rak = models.OneToOneField(Rak, on_delete=models.CASCADE, related_name='capacity')
     available_front = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text="Front space yang masih tersedia (cm)")
+    used_width_cm = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Total front terpakai (cm), jumlah RakStockUsage rak ini")
     last_updated = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -550,67 +579,10 @@ class RakCapacity(models.Model):
     
     @property
     def used_front(self):
-        """Front space yang sudah terpakai berdasarkan 3 dimensi"""
+        """Front space yang sudah terpakai berdasarkan 3 dimensi (dipelihara inkremental, lihat rak_usage)"""
         if not self.rak.lebar_cm:
             return 0
-        
-        total_used_width = 0
-        stocks = InventoryRakStock.objects.filter(rak=self.rak, quantity__gt=0).select_related('product')
-        
-        for stock in stocks:
-            if stock.product.lebar_cm and stock.product.panjang_cm and stock.product.tinggi_cm:
-                # Hitung berapa width slot yang dibutuhkan
-                width_slots_needed = self._calculate_width_slots_needed(stock.product, stock.quantity)
-                total_used_width += width_slots_needed * float(stock.product.lebar_cm)
-            elif stock.product.lebar_cm:
-                # Jika hanya width yang ada, gunakan perhitungan lama
-                total_used_width += float(stock.product.lebar_cm) * stock.quantity
-        
-        return total_used_width
-    
-    def _calculate_width_slots_needed(self, product, quantity):
-        """
-        Hitung berapa slot width yang dibutuhkan berdasarkan 3 dimensi
-        Mempertimbangkan semua kemungkinan orientasi produk (bisa ditidurkan/dirotasi)
-        """
-        if not (self.rak.lebar_cm and self.rak.panjang_cm and self.rak.tinggi_cm and 
-                product.lebar_cm and product.panjang_cm and product.tinggi_cm):
-            return 1  # Default jika ada dimensi yang kosong
-        
-        rak_width = float(self.rak.lebar_cm)
-        rak_length = float(self.rak.panjang_cm)
-        rak_height = float(self.rak.tinggi_cm)
-        
-        product_width = float(product.lebar_cm)
-        product_length = float(product.panjang_cm)
-        product_height = float(product.tinggi_cm)
-        
-        # Coba semua kemungkinan orientasi produk
-        orientations = [
-            # Orientasi normal: panjang x tinggi
-            (product_length, product_height),
-            # Orientasi ditidurkan: tinggi x panjang (jika tinggi produk jadi panjang)
-            (product_height, product_length),
-        ]
-        
-        max_products_per_slot = 0
-        
-        for prod_length, prod_height in orientations:
-            # Hitung kapasitas untuk orientasi ini
-            products_per_length = int(rak_length / prod_length) if prod_length > 0 else 1
-            products_per_height = int(rak_height / prod_height) if prod_height > 0 else 1
-            products_per_slot = products_per_length * products_per_height
-            
-            # Ambil yang maksimal
-            max_products_per_slot = max(max_products_per_slot, products_per_slot)
-        
-        # Hitung berapa slot width yang dibutuhkan
-        if max_products_per_slot > 0:
-            width_slots_needed = (quantity + max_products_per_slot - 1) // max_products_per_slot  # Ceiling division
-        else:
-            width_slots_needed = 1
-        
-        return width_slots_needed
+        return float(self.used_width_cm)
     
     @property
     def total_sku(self):
@@ -632,14 +604,30 @@ class RakCapacity(models.Model):
         return ((self.rak.lebar_cm - self.available_front) / self.rak.lebar_cm) * 100
     
     def update_available_front(self):
-        """Update available front berdasarkan current stock dengan 3 dimensi"""
-        total_used_width = self.used_front
-        
-        # Convert to float for calculation
-        rak_width_float = float(self.rak.lebar_cm) if self.rak.lebar_cm else 0
-        
-        self.available_front = max(0, rak_width_float - total_used_width)
-        self.save()
+        """Hitung ulang penuh used/available front rak ini dari current stock dengan 3 dimensi"""
+        from .rak_usage import rebuild_rak_capacity
+        rebuild_rak_capacity([self.rak_id])
+        self.refresh_from_db(fields=['available_front', 'used_width_cm', 'last_updated'])
+
+
+class RakStockUsage(models.Model):
+    """
+    Cache pemakaian front per pasangan (rak, produk) dari InventoryRakStock.
+    Selisih nilai lama dan baru diterapkan ke RakCapacity setiap kali stok rak berubah.
+    """
+    rak = models.ForeignKey(Rak, on_delete=models.CASCADE, related_name='stock_usages')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='rak_usages')
+    width_slots = models.IntegerField(default=0, help_text="Jumlah slot width yang dipakai")
+    used_width_cm = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Front terpakai (cm)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('rak', 'product')
+        verbose_name = "Rak Stock Usage"
+        verbose_name_plural = "Rak Stock Usages"
+
+    def __str__(self):
+        return f"{self.rak_id}/{self.product_id} - {self.width_slots} slot, {self.used_width_cm}cm"
 
 from django.conf import settings
 
@@ -706,7 +694,7 @@ def invalidate_notification_cache_on_stock_change(sender, instance, **kwargs):
     """
     try:
         from erp_alfa.views import invalidate_notification_cache
-        invalidate_notification_cache()
+        invalidate_notification_cache(sender)
     except ImportError:
         pass  # Ignore if function not available
 
@@ -717,7 +705,7 @@ def invalidate_notification_cache_on_opname_change(sender, instance, **kwargs):
     """
     try:
         from erp_alfa.views import invalidate_notification_cache
-        invalidate_notification_cache()
+        invalidate_notification_cache(sender)
     except ImportError:
         pass  # Ignore if function not available
 
@@ -728,7 +716,7 @@ def invalidate_notification_cache_on_batch_change(sender, instance, **kwargs):
     """
     try:
         from erp_alfa.views import invalidate_notification_cache
-        invalidate_notification_cache()
+        invalidate_notification_cache(sender)
     except ImportError:
         pass  # Ignore if function not available
 
@@ -739,7 +727,39 @@ def invalidate_notification_cache_on_transfer_change(sender, instance, **kwargs)
     """
     try:
         from erp_alfa.views import invalidate_notification_cache
-        invalidate_notification_cache()
+        invalidate_notification_cache(sender)
     except ImportError:
         pass  # Ignore if function not available
 
+
+@receiver(post_save, sender=InventoryRakStock)
+def sync_rak_usage_on_stock_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Terapkan perubahan stok rak ke RakCapacity (dalam transaksi yang sama).
+    Simpan parsial yang tidak menyentuh quantity/product/rak (mis. quantity_opname) dilewati.
+    """
+    if update_fields is not None and not {'quantity', 'product', 'rak'} & set(update_fields):
+        return
+    from .rak_usage import sync_rak_usage
+    sync_rak_usage([(instance.rak_id, instance.product_id)])
+
+
+@receiver(post_delete, sender=InventoryRakStock)
+def sync_rak_usage_on_stock_delete(sender, instance, **kwargs):
+    from .rak_usage import sync_rak_usage
+    sync_rak_usage([(instance.rak_id, instance.product_id)])
+
+
+@receiver([post_save, post_delete], sender=StockCardEntry)
+def invalidate_stock_snapshots_on_entry_change(sender, instance, created=False, **kwargs):
+    """
+    Snapshot saldo mulai tanggal entri tidak berlaku lagi jika entri diubah/dihapus.
+    Entri baru hari ini dilewati (snapshot hanya dibangun sampai kemarin).
+    """
+    if instance.waktu is None:
+        return
+    from .stock_ledger import invalidate_snapshots, local_date
+    tanggal = local_date(instance.waktu)
+    if created and tanggal >= timezone.localdate():
+        return
+    invalidate_snapshots(instance.product_id, tanggal)
@@ -15,6 +15,7 @@ import uuid
 from datetime import datetime, timedelta
 from .models import Rak, RakOpnameSession, RakOpnameItem, RakOpnameLog, InventoryRakStock, Stock, OpnameQueue, InventoryRakStockLog, FullOpnameSession
 from products.models import Product
+from products.search import search_products
 
 User = get_user_model()
 
@@ -1276,12 +1277,22 @@ def product_autocomplete(request):
     if len(query) < 2:
         return JsonResponse({'results': []})
     
-    products = Product.objects.filter(
-        Q(sku__icontains=query) | 
-        Q(nama_produk__icontains=query) |
-        Q(barcode__icontains=query)
-    )[:10]
-    
+    products = search_products(query, limit=10, queryset=Product.objects.select_related('stock')).products
+
+    # Lokasi rak semua produk hasil pencarian dalam satu query
+    rak_by_product = {}
+    rak_locations = InventoryRakStock.objects.filter(
+        product_id__in=[product.id for product in products],
+        quantity__gt=0
+    ).values(
+        'product_id',
+        'rak__lokasi',
+        'rak__kode_rak', 
+        'quantity'
+    ).order_by('rak__lokasi')
+    for rak in rak_locations:
+        rak_by_product.setdefault(rak['product_id'], []).append(rak)
+
     results = []
     for product in products:
         # Get photo URL safely
@@ -1294,20 +1305,11 @@ def product_autocomplete(request):
         
         # Get stock master quantity
         try:
-            stock = Stock.objects.get(product=product)
-            stok_master = stock.quantity
+            stok_master = product.stock.quantity
         except Stock.DoesNotExist:
             stok_master = 0
         
-        # Get existing locations (rak) where this product is stored
-        rak_locations = InventoryRakStock.objects.filter(
-            product=product,
-            quantity__gt=0
-        ).select_related('rak').values(
-            'rak__lokasi',
-            'rak__kode_rak', 
-            'quantity'
-        ).order_by('rak__lokasi')
+        rak_locations = rak_by_product.get(product.id, [])
         
         # Format rak information
         rak_info = []
@@ -355,138 +355,10 @@ class SlottingService:
                     'error': 'Produk tidak memiliki dimensi lengkap'
                 }
             
-            # Get all racks with capacity data
-            from .models import RakCapacity
-            rak_capacities = RakCapacity.objects.select_related('rak').all().order_by('-available_front')
-            
-            options = []
-            for capacity in rak_capacities:
-                rak = capacity.rak
-                
-                # Check if rak has dimensions
-                if not (rak.lebar_cm and rak.panjang_cm and rak.tinggi_cm):
-                    continue
-                
-                # Calculate if product can fit
-                can_fit = SlottingService._can_product_fit_in_rak(product, rak)
-                
-                if can_fit['can_fit']:
-                    # Calculate products per slot dengan hybrid stacking
-                    products_per_slot = SlottingService._calculate_hybrid_products_per_slot(rak, product)
-                    
-                    # Hanya tampilkan rak yang bisa menampung minimal 1 produk
-                    if products_per_slot > 0:
-                        # Hitung stackable berdasarkan tinggi
-                        stackable_height = SlottingService._calculate_stackable_height(product, rak, can_fit.get('orientation_used', 'normal'))
-                        
-                        # Hitung cara stacking
-                        stacking_method = SlottingService._calculate_stacking_method(product, rak, can_fit.get('orientation_used', 'normal'))
-                        
-                        # Check existing stock
-                        from .models import InventoryRakStock
-                        existing_stock = InventoryRakStock.objects.filter(
-                            product=product,
-                            rak=rak,
-                            quantity__gt=0
-                        ).first()
-                        
-                        # Calculate capacity info sesuai SLOTTINGRULES.md
-                        available_slots = 0
-                        remaining_capacity = 0
-                        current_slots_used = 0
-                        total_slots_available = 0
-                        
-                        product_width = float(product.lebar_cm)
-                        rak_width = float(rak.lebar_cm)
-                        
-                        if existing_stock:
-                            # RAK SAME (sudah ada produk yang sama)
-                            current_quantity = existing_stock.quantity
-                            from .rakcapacity import _calculate_width_slots_needed_for_product
-                            
-                            # Hitung berapa slot yang sudah terpakai
-                            current_slots_used = _calculate_width_slots_needed_for_product(rak, product, current_quantity)
-                            
-                            # Hitung total slot yang tersedia untuk produk ini
-                            total_slots_available = int(rak_width / product_width) if product_width > 0 else 0
-                            
-                            # Hitung berapa slot yang masih tersisa
-                            remaining_slots = max(0, total_slots_available - current_slots_used)
-                            
-                            # Hitung berapa produk yang bisa ditambah
-                            remaining_capacity = remaining_slots * products_per_slot
-                            
-                            # Available slots untuk rak SAME = remaining_slots
-                            available_slots = remaining_slots
-                        else:
-                            # RAK BARU (belum ada produk yang sama)
-                            # Hitung available slots berdasarkan available_front
-                            if product_width > 0:
-                                available_front_float = float(capacity.available_front)
-                                available_slots = int(available_front_float / product_width)
-                                remaining_capacity = available_slots * products_per_slot
-                            else:
-                                available_slots = 0
-                                remaining_capacity = 0
-                        
-                        # Validasi kapasitas untuk quantity yang akan diputaway
-                        capacity_valid = True
-                        if quantity and quantity > 0:
-                            if existing_stock:
-                                # Untuk rak SAME: cek remaining_capacity
-                                if quantity > remaining_capacity:
-                                    capacity_valid = False
-                            else:
-                                # Untuk rak baru: cek available_slots
-                                from .rakcapacity import _calculate_width_slots_needed_for_product
-                                slots_needed = _calculate_width_slots_needed_for_product(rak, product, quantity)
-                                if available_slots < slots_needed:
-                                    capacity_valid = False
-                        
-                        options.append({
-                            'rak_id': rak.id,
-                            'kode_rak': rak.kode_rak,
-                            'nama_rak': rak.nama_rak,
-                            'lokasi': rak.lokasi,
-                            'lokasi_priority': rak.lokasi_priority_score,
-                            'lebar_cm': rak.lebar_cm,
-                            'panjang_cm': rak.panjang_cm,
-                            'tinggi_cm': rak.tinggi_cm,
-                            'available_front': float(capacity.available_front),
-                            'used_front': float(capacity.used_front),
-                            'utilization': float(capacity.utilization_percentage),
-                            'fit_score': can_fit['fit_score'],
-                            'reason': can_fit['reason'],
-                            'products_per_slot': products_per_slot,
-                            'stackable_height': stackable_height,
-                            'stacking_method': stacking_method,
-                            'orientation_used': can_fit.get('orientation_used', 'normal'),
-                            'supports_hybrid': can_fit.get('supports_hybrid', False),
-                            'existing_stock': existing_stock.quantity if existing_stock else 0,
-                            'available_slots': available_slots,
-                            'remaining_capacity': remaining_capacity,
-                            'current_slots_used': current_slots_used,
-                            'total_slots_available': total_slots_available,
-                            'has_same_product': existing_stock is not None,
-                            'capacity_valid': capacity_valid
-                        })
-            
-            # Sort by existing product priority first, then by capacity
-            # Priority: SAME_PRODUCT_EXISTS > CAPACITY > LOCATION
-            def sort_key(option):
-                # Check if same product already exists in this rak
-                same_product_bonus = 1000 if option['has_same_product'] else 0  # Highest priority
-                
-                # Capacity priority (higher capacity gets higher priority)
-                capacity_priority = option['remaining_capacity'] if option['has_same_product'] else option['available_slots']
-                
-                # Location priority
-                location_priority = option['lokasi_priority'] or 0
-                
-                # Combine priorities: same product (highest) > capacity > location
-                return (same_product_bonus + capacity_priority + location_priority)
-            
-            options.sort(key=sort_key, reverse=True)
+            # Semua rak dievaluasi sekaligus (array NumPy), urutan sesuai SLOTTINGRULES.md:
+            # SAME_PRODUCT_EXISTS > CAPACITY > LOCATION
+            from .slotting import rank_rak_options
+            options = rank_rak_options(product, quantity)
             
             return {
                 'success': True,
@@ -497,7 +369,7 @@ class SlottingService:
                     'posisi_tidur': product.posisi_tidur,
                     'supports_hybrid': product.posisi_tidur
                 },
-                'rak_options': options[:10]  # Return top 10 options
+                'rak_options': options  # Top 10 options
             }
             
         except Exception as e:
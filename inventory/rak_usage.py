@@ -0,0 +1,283 @@
+"""
+Pemeliharaan inkremental RakCapacity dari perubahan InventoryRakStock.
+
+Pemakaian front per pasangan (rak, produk) di-cache di RakStockUsage (width_slots,
+used_width_cm). RakCapacity.used_width_cm adalah jumlah used_width_cm pasangan di rak dan
+available_front = max(0, lebar rak - used_width_cm).
+
+- sync_rak_usage(pairs): hitung ulang pemakaian pasangan yang berubah dan terapkan
+  selisihnya ke RakCapacity dalam transaksi yang sama (baris RakCapacity di-lock).
+  Dipanggil signal save/delete InventoryRakStock (models.py) dan langsung setelah
+  update set-based (pick scan).
+- rebuild_rak_capacity(rak_ids): hitung ulang penuh rak tertentu (tombol update capacity,
+  opname selesai, perubahan dimensi rak).
+- rebuild_all_rak_capacity(): rebuild seluruh rak per chunk, opsional paralel
+  (command rebuild_rak_capacity).
+- find_capacity_drift(): bandingkan nilai inkremental dengan hitung ulang penuh
+  (command check_rak_capacity_drift).
+"""
+import logging
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import InventoryRakStock, RakCapacity, RakStockUsage
+from .rakcapacity import _calculate_width_slots_needed_for_product
+
+logger = logging.getLogger(__name__)
+
+REBUILD_CHUNK_SIZE = 200
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+CapacityDrift = namedtuple('CapacityDrift', [
+    'checked', 'mismatched_raks', 'mismatched_pairs', 'samples', 'drifted_rak_ids',
+])
+
+
+def _decimal(value):
+    return Decimal(str(value)) if value else ZERO
+
+
+def pair_usage(rak, product, quantity):
+    """
+    Pemakaian front satu pasangan (rak, produk): return (width_slots, used_width_cm).
+    Sama dengan perhitungan update_rak_capacity_for_rak: 3 dimensi lengkap -> slot width
+    greedy hybrid x lebar produk, hanya lebar produk -> lebar x quantity.
+    """
+    if not quantity or quantity <= 0:
+        return 0, ZERO
+    if (product.lebar_cm and product.panjang_cm and product.tinggi_cm and
+            rak.lebar_cm and rak.panjang_cm and rak.tinggi_cm):
+        slots = _calculate_width_slots_needed_for_product(rak, product, quantity)
+    elif product.lebar_cm:
+        slots = quantity
+    else:
+        return 0, ZERO
+    return slots, (slots * _decimal(product.lebar_cm)).quantize(CENT)
+
+
+def available_front_for(rak, used_width):
+    return max(ZERO, _decimal(rak.lebar_cm) - used_width)
+
+
+def _lock_capacities(rak_ids):
+    """Lock RakCapacity rak (urut rak_id agar tidak deadlock); baris yang belum ada dibuat."""
+    def locked():
+        return {
+            capacity.rak_id: capacity
+            for capacity in RakCapacity.objects.select_for_update(of=('self',)).select_related('rak')
+            .filter(rak_id__in=rak_ids).order_by('rak_id')
+        }
+
+    capacities = locked()
+    missing = [rak_id for rak_id in rak_ids if rak_id not in capacities]
+    if missing:
+        RakCapacity.objects.bulk_create([RakCapacity(rak_id=rak_id) for rak_id in missing], ignore_conflicts=True)
+        capacities = locked()
+    return capacities
+
+
+def _save_capacities(capacities):
+    now = timezone.now()
+    for capacity in capacities:
+        capacity.last_updated = now
+    RakCapacity.objects.bulk_update(capacities, ['used_width_cm', 'available_front', 'last_updated'])
+
+
+def sync_rak_usage(pairs):
+    """
+    Terapkan perubahan stok untuk pasangan (rak_id, product_id) ke RakStockUsage dan
+    RakCapacity. Return jumlah pasangan yang pemakaiannya berubah.
+    """
+    pairs = {(rak_id, product_id) for rak_id, product_id in pairs if rak_id and product_id}
+    if not pairs:
+        return 0
+    rak_ids = sorted({rak_id for rak_id, _ in pairs})
+    product_ids = {product_id for _, product_id in pairs}
+
+    with transaction.atomic():
+        capacities = _lock_capacities(rak_ids)
+        stocks = {
+            (stock.rak_id, stock.product_id): stock
+            for stock in InventoryRakStock.objects.filter(rak_id__in=rak_ids, product_id__in=product_ids)
+            .select_related('rak', 'product')
+        }
+        usages = {
+            (usage.rak_id, usage.product_id): usage
+            for usage in RakStockUsage.objects.filter(rak_id__in=rak_ids, product_id__in=product_ids)
+        }
+
+        now = timezone.now()
+        to_create, to_update, to_delete = [], [], []
+        delta = defaultdict(Decimal)
+        for pair in pairs:
+            stock = stocks.get(pair)
+            slots, width = pair_usage(stock.rak, stock.product, stock.quantity) if stock else (0, ZERO)
+            usage = usages.get(pair)
+            if usage is None:
+                if width:
+                    to_create.append(RakStockUsage(rak_id=pair[0], product_id=pair[1], width_slots=slots, used_width_cm=width))
+                    delta[pair[0]] += width
+            elif not width:
+                to_delete.append(usage.pk)
+                delta[pair[0]] -= usage.used_width_cm
+            elif usage.width_slots != slots or usage.used_width_cm != width:
+                delta[pair[0]] += width - usage.used_width_cm
+                usage.width_slots, usage.used_width_cm, usage.updated_at = slots, width, now
+                to_update.append(usage)
+
+        if to_create:
+            RakStockUsage.objects.bulk_create(to_create)
+        if to_update:
+            RakStockUsage.objects.bulk_update(to_update, ['width_slots', 'used_width_cm', 'updated_at'])
+        if to_delete:
+            RakStockUsage.objects.filter(pk__in=to_delete).delete()
+
+        changed = []
+        for rak_id, width_delta in delta.items():
+            capacity = capacities[rak_id]
+            capacity.used_width_cm = max(ZERO, capacity.used_width_cm + width_delta)
+            capacity.available_front = available_front_for(capacity.rak, capacity.used_width_cm)
+            changed.append(capacity)
+        if changed:
+            _save_capacities(changed)
+    return len(to_create) + len(to_update) + len(to_delete)
+
+
+def compute_rak_usage(rak_ids):
+    """
+    Hitung ulang penuh dari InventoryRakStock: return ({(rak_id, product_id): (slots, width)},
+    {rak_id: total width}). Pasangan tanpa pemakaian tidak ada di hasil.
+    """
+    pairs = {}
+    totals = defaultdict(Decimal)
+    stocks = InventoryRakStock.objects.filter(rak_id__in=rak_ids, quantity__gt=0).select_related('rak', 'product')
+    for stock in stocks:
+        slots, width = pair_usage(stock.rak, stock.product, stock.quantity)
+        if width:
+            pairs[(stock.rak_id, stock.product_id)] = (slots, width)
+            totals[stock.rak_id] += width
+    return pairs, totals
+
+
+def rebuild_rak_capacity(rak_ids):
+    """Hitung ulang penuh RakStockUsage dan RakCapacity untuk rak_ids. Return jumlah rak."""
+    rak_ids = sorted(set(rak_ids))
+    if not rak_ids:
+        return 0
+    with transaction.atomic():
+        capacities = _lock_capacities(rak_ids)
+        pairs, totals = compute_rak_usage(rak_ids)
+        RakStockUsage.objects.filter(rak_id__in=rak_ids).delete()
+        RakStockUsage.objects.bulk_create([
+            RakStockUsage(rak_id=rak_id, product_id=product_id, width_slots=slots, used_width_cm=width)
+            for (rak_id, product_id), (slots, width) in pairs.items()
+        ], batch_size=1000)
+        for rak_id, capacity in capacities.items():
+            capacity.used_width_cm = totals.get(rak_id, ZERO)
+            capacity.available_front = available_front_for(capacity.rak, capacity.used_width_cm)
+        _save_capacities(list(capacities.values()))
+    return len(rak_ids)
+
+
+def capacity_rak_ids():
+    """Rak yang dipelihara: sudah punya RakCapacity atau punya stok rak."""
+    rak_ids = set(RakCapacity.objects.values_list('rak_id', flat=True))
+    rak_ids.update(InventoryRakStock.objects.filter(quantity__gt=0).values_list('rak_id', flat=True).distinct())
+    return sorted(rak_ids)
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _rebuild_chunk_in_thread(chunk):
+    try:
+        return rebuild_rak_capacity(chunk)
+    finally:
+        # Thread worker memakai koneksi database sendiri
+        connections.close_all()
+
+
+def rebuild_all_rak_capacity(workers=1, chunk_size=REBUILD_CHUNK_SIZE, progress=None):
+    """
+    Rebuild seluruh rak per chunk (satu transaksi per chunk). workers > 1 menjalankan
+    chunk paralel di thread terpisah (masing-masing koneksi database sendiri).
+    Return jumlah rak.
+    """
+    chunks = list(_chunks(capacity_rak_ids(), chunk_size))
+    if connection.vendor == 'sqlite':
+        # SQLite hanya mengizinkan satu penulis: chunk dijalankan berurutan
+        workers = 1
+    rebuilt = 0
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for count in executor.map(_rebuild_chunk_in_thread, chunks):
+                rebuilt += count
+                if progress:
+                    progress(rebuilt)
+    else:
+        for chunk in chunks:
+            rebuilt += rebuild_rak_capacity(chunk)
+            if progress:
+                progress(rebuilt)
+    logger.info("rebuild_all_rak_capacity: %s rak dihitung ulang", rebuilt)
+    return rebuilt
+
+
+def find_capacity_drift(chunk_size=REBUILD_CHUNK_SIZE, sample_limit=20):
+    """
+    Bandingkan nilai inkremental (RakCapacity, RakStockUsage) dengan hitung ulang penuh.
+    Return CapacityDrift(checked, mismatched_raks, mismatched_pairs, samples, drifted_rak_ids).
+    samples berisi (kode_rak, field, nilai tersimpan, nilai seharusnya); field 'pair:<product_id>'
+    untuk cache pasangan, 'capacity' jika RakCapacity belum ada.
+    """
+    checked = 0
+    mismatched_raks = 0
+    mismatched_pairs = 0
+    samples = []
+    drifted = set()
+
+    def record(rak_id, kode_rak, field, stored, expected):
+        drifted.add(rak_id)
+        if len(samples) < sample_limit:
+            samples.append((kode_rak, field, stored, expected))
+
+    for chunk in _chunks(capacity_rak_ids(), chunk_size):
+        pairs, totals = compute_rak_usage(chunk)
+        capacities = {c.rak_id: c for c in RakCapacity.objects.select_related('rak').filter(rak_id__in=chunk)}
+        stored_pairs = {
+            (usage.rak_id, usage.product_id): (usage.width_slots, usage.used_width_cm)
+            for usage in RakStockUsage.objects.filter(rak_id__in=chunk)
+        }
+        for rak_id in chunk:
+            checked += 1
+            capacity = capacities.get(rak_id)
+            if capacity is None:
+                mismatched_raks += 1
+                record(rak_id, rak_id, 'capacity', None, totals.get(rak_id, ZERO))
+                continue
+            kode_rak = capacity.rak.kode_rak
+            expected_used = totals.get(rak_id, ZERO)
+            expected_available = available_front_for(capacity.rak, expected_used)
+            rak_drift = False
+            if capacity.used_width_cm != expected_used:
+                rak_drift = True
+                record(rak_id, kode_rak, 'used_width_cm', capacity.used_width_cm, expected_used)
+            if capacity.available_front != expected_available.quantize(CENT):
+                rak_drift = True
+                record(rak_id, kode_rak, 'available_front', capacity.available_front, expected_available)
+            mismatched_raks += rak_drift
+        for pair in set(pairs) | set(stored_pairs):
+            if pairs.get(pair) != stored_pairs.get(pair):
+                mismatched_pairs += 1
+                rak_id = pair[0]
+                capacity = capacities.get(rak_id)
+                record(rak_id, capacity.rak.kode_rak if capacity else rak_id, f'pair:{pair[1]}',
+                       stored_pairs.get(pair), pairs.get(pair))
+    return CapacityDrift(checked, mismatched_raks, mismatched_pairs, samples, drifted)
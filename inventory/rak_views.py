@@ -13,6 +13,11 @@ import json
 from .models import Rak
 from products.models import Product
 from inventory.models import Stock, InventoryRakStock, InventoryRakStockLog
+from django.core.paginator import Paginator
+from inventory.stock_position import (
+    MAX_PAGE_LENGTH, PAGE_SIZE, attach_opname_sessions, order_rows, position_page, position_rows,
+    position_summary, serialize_row,
+)
 
 @login_required
 @permission_required('inventory.view_rak', raise_exception=True)
@@ -843,112 +848,27 @@ def stock_position_view(request):
 
     template_name = 'inventory/stock_position_mobile.html' if is_mobile else 'inventory/stock_position.html'
 
-    from .models import RakOpnameSession, RakOpnameItem
-    
-    # Get all rak stocks with related data
-    rak_stocks = InventoryRakStock.objects.select_related(
-        'product', 'rak'
-    ).filter(
-        Q(quantity__gt=0) | Q(quantity_opname__gt=0)
-    ).order_by('rak__lokasi', 'rak__kode_rak', 'product__nama_produk')
-    
-    # Filter by rak if specified
     rak_filter = request.GET.get('rak_filter')
-    if rak_filter:
-        rak_stocks = rak_stocks.filter(rak_id=rak_filter)
-    
-    # Search filter
     search_query = request.GET.get('search')
-    if search_query:
-        rak_stocks = rak_stocks.filter(
-            Q(product__sku__icontains=search_query) |
-            Q(product__nama_produk__icontains=search_query) |
-            Q(product__barcode__icontains=search_query) |
-            Q(product__variant_produk__icontains=search_query) |
-            Q(product__brand__icontains=search_query) |
-            Q(rak__lokasi__icontains=search_query) |
-            Q(rak__kode_rak__icontains=search_query)
-        )
-    
-    # Get master stock data
-    master_stocks = Stock.objects.select_related('product').filter(
-        product__in=[rs.product for rs in rak_stocks]
-    )
-    master_stock_dict = {ms.product_id: ms.quantity for ms in master_stocks}
-    
-    # Get active opname sessions for each product
-    active_opname_sessions = {}
-    for rs in rak_stocks:
-        if rs.quantity_opname > 0:
-            # Get active opname sessions for this product
-            opname_items = RakOpnameItem.objects.filter(
-                product=rs.product,
-                session__status='draft'
-            ).select_related('session__rak')
-            
-            if opname_items.exists():
-                active_opname_sessions[rs.product_id] = []
-                for item in opname_items:
-                    active_opname_sessions[rs.product_id].append({
-                        'session_code': item.session.session_code,
-                        'rak_lokasi': f"{item.session.rak.lokasi} ({item.session.rak.kode_rak})",
-                        'qty_fisik': item.qty_fisik,
-                        'created_at': item.session.tanggal_mulai.strftime('%d/%m/%Y %H:%M')
-                    })
-    
-    # Prepare data for template
-    stock_data = []
-    for rs in rak_stocks:
-        master_qty = master_stock_dict.get(rs.product_id, 0)
-        total_qty = rs.quantity + rs.quantity_opname
-        
-        # Get opname info for this product
-        opname_info = active_opname_sessions.get(rs.product_id, [])
-        
-        stock_data.append({
-            'rak_lokasi': f"{rs.rak.lokasi} ({rs.rak.kode_rak})",
-            'rak_id': rs.rak.id,
-            'product_sku': rs.product.sku,
-            'product_name': rs.product.nama_produk,
-            'product_barcode': rs.product.barcode or '-',
-            'product_variant': rs.product.variant_produk or '-',
-            'product_brand': rs.product.brand or '-',
-            'quantity': rs.quantity,
-            'quantity_opname': rs.quantity_opname,
-            'total_quantity': total_qty,
-            'master_quantity': master_qty,
-            'status': 'OK' if total_qty <= master_qty else 'OVERSTOCK',
-            'last_updated': rs.updated_at.strftime('%d/%m/%Y %H:%M') if rs.updated_at else '-',
-            'opname_sessions': opname_info,
-            'has_active_opname': len(opname_info) > 0
-        })
-    
+    status_filter = request.GET.get('status_filter', '')
+    rows = position_rows(rak_id=rak_filter, search=search_query, status=status_filter)
+
+    # Filter, urutan dan pagination di database; sesi opname di-prefetch per halaman
+    paginator = Paginator(order_rows(rows), PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    stock_data = [serialize_row(row) for row in attach_opname_sessions(list(page_obj.object_list))]
+
     # Get all raks for filter dropdown
     all_raks = Rak.objects.all().order_by('lokasi', 'kode_rak')
-    
-    # Summary statistics
-    total_raks = rak_stocks.values('rak').distinct().count()
-    total_products = rak_stocks.values('product').distinct().count()
-    total_quantity = sum(rs.quantity for rs in rak_stocks)
-    total_quantity_opname = sum(rs.quantity_opname for rs in rak_stocks)
-    overstock_count = len([s for s in stock_data if s['status'] == 'OVERSTOCK'])
-    products_with_opname = len([s for s in stock_data if s['has_active_opname']])
-    
-    summary = {
-        'total_raks': total_raks,
-        'total_products': total_products,
-        'total_quantity': total_quantity,
-        'total_quantity_opname': total_quantity_opname,
-        'overstock_count': overstock_count,
-        'products_with_opname': products_with_opname
-    }
-    
+
     context = {
         'stock_data': stock_data,
+        'page_obj': page_obj,
         'all_raks': all_raks,
         'selected_rak': rak_filter,
         'search_query': search_query,
-        'summary': summary
+        'status_filter': status_filter,
+        'summary': position_summary(rows),
     }
     
     return render(request, template_name, context)
@@ -957,173 +877,40 @@ def stock_position_view(request):
 @require_GET
 def stock_position_summary(request):
     """API endpoint untuk mendapatkan ringkasan data posisi stock"""
-    from .models import RakOpnameSession, RakOpnameItem
-    
-    # Get all rak stocks with related data
-    rak_stocks = InventoryRakStock.objects.select_related(
-        'product', 'rak'
-    ).filter(
-        Q(quantity__gt=0) | Q(quantity_opname__gt=0)
-    )
-    
-    # Get master stock data
-    master_stocks = Stock.objects.select_related('product').filter(
-        product__in=[rs.product for rs in rak_stocks]
-    )
-    master_stock_dict = {ms.product_id: ms.quantity for ms in master_stocks}
-    
-    # Calculate summary statistics
-    total_raks = rak_stocks.values('rak').distinct().count()
-    total_products = rak_stocks.values('product').distinct().count()
-    total_quantity = sum(rs.quantity for rs in rak_stocks)
-    total_quantity_opname = sum(rs.quantity_opname for rs in rak_stocks)
-    
-    # Count overstock items
-    overstock_count = 0
-    products_with_opname = 0
-    
-    for rs in rak_stocks:
-        master_qty = master_stock_dict.get(rs.product_id, 0)
-        total_qty = rs.quantity + rs.quantity_opname
-        
-        if total_qty > master_qty:
-            overstock_count += 1
-        
-        if rs.quantity_opname > 0:
-            products_with_opname += 1
-    
-    summary = {
-        'total_raks': total_raks,
-        'total_products': total_products,
-        'total_quantity': total_quantity,
-        'total_quantity_opname': total_quantity_opname,
-        'overstock_count': overstock_count,
-        'products_with_opname': products_with_opname
-    }
-    
     return JsonResponse({
         'success': True,
-        'data': summary
+        'data': position_summary(position_rows())
     })
 
 
 @require_GET
 def stock_position_data(request):
-    """API endpoint untuk mendapatkan data posisi stock dengan filtering dan sorting"""
-    from .models import RakOpnameSession, RakOpnameItem
-    
-    # Get all rak stocks with related data
-    rak_stocks = InventoryRakStock.objects.select_related(
-        'product', 'rak'
-    ).filter(
-        Q(quantity__gt=0) | Q(quantity_opname__gt=0)
-    )
-    
-    # Apply filters
-    rak_filter = request.GET.get('rak_filter')
-    if rak_filter:
-        rak_stocks = rak_stocks.filter(rak_id=rak_filter)
-    
-    status_filter = request.GET.get('status_filter')
-    search_query = request.GET.get('search')
-    
-    if search_query:
-        rak_stocks = rak_stocks.filter(
-            Q(product__sku__icontains=search_query) |
-            Q(product__nama_produk__icontains=search_query) |
-            Q(product__barcode__icontains=search_query) |
-            Q(product__variant_produk__icontains=search_query) |
-            Q(product__brand__icontains=search_query) |
-            Q(rak__lokasi__icontains=search_query) |
-            Q(rak__kode_rak__icontains=search_query)
-        )
-    
-    # Get master stock data
-    master_stocks = Stock.objects.select_related('product').filter(
-        product__in=[rs.product for rs in rak_stocks]
+    """
+    API endpoint data posisi stock (format DataTables server-side: draw/start/length).
+    Filter rak/status/search, mismatch_only (total rak produk != master), urutan dan
+    pagination dikerjakan database.
+    """
+    rows = position_rows(
+        rak_id=request.GET.get('rak_filter'),
+        search=request.GET.get('search') or request.GET.get('search[value]', ''),
+        status=request.GET.get('status_filter', ''),
+        mismatch_only=request.GET.get('mismatch_only') in ('1', 'true'),
     )
-    master_stock_dict = {ms.product_id: ms.quantity for ms in master_stocks}
-    
-    # Get active opname sessions for each product
-    active_opname_sessions = {}
-    for rs in rak_stocks:
-        if rs.quantity_opname > 0:
-            opname_items = RakOpnameItem.objects.filter(
-                product=rs.product,
-                session__status='draft'
-            ).select_related('session__rak')
-            
-            if opname_items.exists():
-                active_opname_sessions[rs.product_id] = []
-                for item in opname_items:
-                    active_opname_sessions[rs.product_id].append({
-                        'session_code': item.session.session_code,
-                        'rak_lokasi': f"{item.session.rak.lokasi} ({item.session.rak.kode_rak})",
-                        'qty_fisik': item.qty_fisik,
-                        'created_at': item.session.tanggal_mulai.strftime('%d/%m/%Y %H:%M')
-                    })
-    
-    # Prepare data for response
-    stock_data = []
-    for rs in rak_stocks:
-        master_qty = master_stock_dict.get(rs.product_id, 0)
-        total_qty = rs.quantity + rs.quantity_opname
-        
-        # Apply status filter
-        if status_filter:
-            if status_filter == 'OK' and total_qty > master_qty:
-                continue
-            elif status_filter == 'OVERSTOCK' and total_qty <= master_qty:
-                continue
-        
-        # Get opname info for this product
-        opname_info = active_opname_sessions.get(rs.product_id, [])
-        
-        # Get product photo URL
-        photo_url = ''
-        if rs.product.photo:
-            photo_url = rs.product.photo.url
-        
-        stock_data.append({
-            'rak_lokasi': f"{rs.rak.lokasi} ({rs.rak.kode_rak})",
-            'rak_id': rs.rak.id,
-            'product_sku': rs.product.sku,
-            'product_name': rs.product.nama_produk,
-            'product_barcode': rs.product.barcode or '-',
-            'product_variant': rs.product.variant_produk or '-',
-            'product_brand': rs.product.brand or '-',
-            'quantity': rs.quantity,
-            'quantity_opname': rs.quantity_opname,
-            'total_quantity': total_qty,
-            'master_quantity': master_qty,
-            'status': 'OK' if total_qty <= master_qty else 'OVERSTOCK',
-            'last_updated': rs.updated_at.strftime('%d/%m/%Y %H:%M') if rs.updated_at else '-',
-            'opname_sessions': opname_info,
-            'has_active_opname': len(opname_info) > 0,
-            'photo_url': photo_url
-        })
-    
-    # Apply sorting
-    order_column = request.GET.get('order[0][column]', '0')
-    order_direction = request.GET.get('order[0][dir]', 'asc')
-    
-    # Map column index to field name
-    column_map = {
-        '0': 'rak_lokasi',
-        '3': 'product_name',
-        '8': 'total_quantity',
-        '9': 'master_quantity',
-        '10': 'status',
-        '11': 'last_updated'
-    }
-    
-    sort_field = column_map.get(order_column, 'rak_lokasi')
-    
-    # Sort the data
-    reverse_sort = order_direction == 'desc'
-    stock_data.sort(key=lambda x: x[sort_field], reverse=reverse_sort)
-    
+    rows = order_rows(rows, request.GET.get('order[0][column]', '0'), request.GET.get('order[0][dir]', 'asc'))
+    try:
+        start = max(int(request.GET.get('start', 0)), 0)
+        length = int(request.GET.get('length', PAGE_SIZE))
+    except ValueError:
+        start, length = 0, PAGE_SIZE
+    # length -1 (DataTables "semua") tetap dibatasi MAX_PAGE_LENGTH per request
+    if length <= 0:
+        length = MAX_PAGE_LENGTH if length == -1 else PAGE_SIZE
+    page = position_page(rows, start, min(length, MAX_PAGE_LENGTH))
+
     return JsonResponse({
         'success': True,
-        'data': stock_data
+        'draw': int(request.GET.get('draw', 0) or 0),
+        'recordsTotal': page.total,
+        'recordsFiltered': page.filtered,
+        'data': [serialize_row(row) for row in page.rows],
     }) 
\ No newline at end of file
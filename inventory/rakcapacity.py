@@ -6,7 +6,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
 import json
 
-from .models import Rak, RakCapacity, InventoryRakStock
+from .models import Rak, RakCapacity, RakStockUsage, InventoryRakStock
 from products.models import Product
 
 
@@ -201,39 +201,14 @@ def _calculate_hybrid_products_per_slot(rak, product):
 
 def update_rak_capacity_for_rak(rak_code):
     """
-    Utility function untuk update capacity satu rak tertentu
+    Utility function untuk update capacity satu rak tertentu (hitung ulang penuh)
     """
+    from .rak_usage import rebuild_rak_capacity
     try:
         rak = get_object_or_404(Rak, kode_rak=rak_code)
         
-        # Update capacity untuk rak ini saja
-        try:
-            capacity = RakCapacity.objects.get(rak=rak)
-        except RakCapacity.DoesNotExist:
-            capacity = RakCapacity.objects.create(rak=rak)
-        
-        # Hitung ulang capacity
-        stocks = InventoryRakStock.objects.filter(rak=rak, quantity__gt=0).select_related('product')
-        
-        total_used_width = 0
-        for stock in stocks:
-            if (stock.product.lebar_cm and stock.product.panjang_cm and 
-                stock.product.tinggi_cm and rak.lebar_cm and 
-                rak.panjang_cm and rak.tinggi_cm):
-                
-                # Hitung berdasarkan 3 dimensi
-                width_slots_needed = _calculate_width_slots_needed_for_product(
-                    rak, stock.product, stock.quantity
-                )
-                total_used_width += width_slots_needed * float(stock.product.lebar_cm)
-            elif stock.product.lebar_cm:
-                # Fallback ke perhitungan lama
-                total_used_width += float(stock.product.lebar_cm) * stock.quantity
-        
-        # Update available_front
-        rak_width_float = float(rak.lebar_cm) if rak.lebar_cm else 0
-        capacity.available_front = max(0, rak_width_float - total_used_width)
-        capacity.save()
+        # Hitung ulang RakStockUsage dan RakCapacity rak ini saja
+        rebuild_rak_capacity([rak.id])
         
         return True, f'Capacity rak {rak_code} berhasil diupdate'
         
@@ -244,21 +219,20 @@ def update_rak_capacity_for_rak(rak_code):
 def update_rak_capacity_for_product(product_id):
     """
     Utility function untuk update capacity semua rak yang memiliki produk tertentu
+    (mis. setelah dimensi produk berubah): hanya pasangan (rak, produk) ini yang dihitung ulang
     """
+    from .rak_usage import sync_rak_usage
     try:
-        # Ambil semua rak yang memiliki produk ini
-        rak_stocks = InventoryRakStock.objects.filter(
+        # Ambil semua rak yang memiliki produk ini (termasuk cache pemakaian lama)
+        rak_ids = set(InventoryRakStock.objects.filter(
             product_id=product_id,
             quantity__gt=0
-        ).values_list('rak__kode_rak', flat=True).distinct()
+        ).values_list('rak_id', flat=True))
+        rak_ids.update(RakStockUsage.objects.filter(product_id=product_id).values_list('rak_id', flat=True))
         
-        updated_count = 0
-        for rak_code in rak_stocks:
-            success, message = update_rak_capacity_for_rak(rak_code)
-            if success:
-                updated_count += 1
+        sync_rak_usage([(rak_id, product_id) for rak_id in rak_ids])
         
-        return True, f'Berhasil update capacity untuk {updated_count} rak'
+        return True, f'Berhasil update capacity untuk {len(rak_ids)} rak'
         
     except Exception as e:
         return False, f'Error update capacity untuk produk {product_id}: {str(e)}'
@@ -301,11 +275,9 @@ def update_rak_capacity(request):
     AJAX endpoint untuk update rak capacity berdasarkan current stock
     """
     try:
-        # Update semua rak capacity
-        updated_count = 0
-        for capacity in RakCapacity.objects.select_related('rak').all():
-            capacity.update_available_front()
-            updated_count += 1
+        # Hitung ulang penuh semua rak capacity (per chunk)
+        from .rak_usage import rebuild_all_rak_capacity
+        updated_count = rebuild_all_rak_capacity()
         
         return JsonResponse({
             'success': True,
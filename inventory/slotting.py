@@ -0,0 +1,213 @@
+"""
+Engine ranking rak untuk slotting (SlottingService.get_rak_options / auto_slotting).
+
+Seluruh rak dievaluasi sekaligus sebagai array NumPy:
+1. dimensi rak, available_front dan lokasi dimuat dalam satu query values_list,
+2. stok produk yang sama di rak (rak SAME) dimuat dalam satu query,
+3. fit (orientasi normal/tidur), fit_score, products per slot (greedy hybrid) dan
+   kapasitas (available_slots, remaining_capacity, capacity_valid) dihitung per kolom,
+4. urutan sesuai SLOTTINGRULES.md: SAME (bonus 1000) + kapasitas + prioritas lokasi,
+   stabil terhadap urutan dasar -available_front,
+5. dict opsi hanya dibangun untuk top-N (satu query tambahan untuk RakCapacity + rak).
+
+Rumus per kolom identik dengan helper skalar di putaway.SlottingService dan
+rakcapacity (termasuk pembulatan int() ke arah nol); dibandingkan terhadap loop lama
+oleh inventory.tests.SlottingGoldenTest.
+"""
+import numpy as np
+
+from .models import InventoryRakStock, Rak, RakCapacity
+
+RAK_OPTION_LIMIT = 10
+SAME_PRODUCT_BONUS = 1000
+
+
+def _fit_count(rak_dim, product_dim, default=1):
+    """int(rak_dim / product_dim) per rak; default jika dimensi produk <= 0 (sama dengan helper skalar)."""
+    if product_dim > 0:
+        return np.trunc(rak_dim / product_dim).astype(np.int64)
+    return np.full(len(rak_dim), default, dtype=np.int64)
+
+
+def _greedy_products_per_slot(W, L, H, w, l, h, posisi_tidur):
+    """
+    Versi array SlottingService._calculate_hybrid_products_per_slot.
+
+    Slot yang dibutuhkan untuk 1 produk (normal maupun tidur) selalu 1, sehingga
+    kombinasi greedy hanya bergantung pada jumlah slot width rak (total_slots).
+    """
+    standing = _fit_count(L, l) * _fit_count(H, h)
+    if not posisi_tidur:
+        return standing
+    rotated = _fit_count(L, h) * _fit_count(H, l)
+    normal = np.maximum(standing, rotated)
+    total_slots = _fit_count(W, w, default=0)
+
+    best = np.where(total_slots >= 1, np.maximum(np.maximum(normal, rotated), 0), 0)
+    # normal_ratio = 0 -> rotated_ratio = total_slots
+    best = np.where((total_slots >= 0) & (total_slots <= 1), np.maximum(best, rotated * total_slots), best)
+    # normal_ratio = 1 -> rotated_ratio = total_slots - 1
+    best = np.where((total_slots >= 1) & (total_slots <= 2), np.maximum(best, normal + rotated * (total_slots - 1)), best)
+
+    return np.select(
+        [(normal == 0) & (rotated > 0), (rotated == 0) & (normal > 0), (normal == 0) & (rotated == 0)],
+        [rotated, normal, 0],
+        default=best,
+    )
+
+
+def _vertical_products_per_slot(L, H, w, l, h, posisi_tidur):
+    """Versi array rakcapacity._calculate_hybrid_products_per_slot (dasar perhitungan slot terpakai)."""
+    normal = _fit_count(L, l) * _fit_count(H, h)
+    if not posisi_tidur:
+        return normal
+    rotated = _fit_count(L, h) * _fit_count(H, l)
+    # Stack bawah: produk tidur di setengah tinggi rak, stack atas: produk berdiri
+    rotated_height_bottom = _fit_count(H / 2, l, default=0)
+    bottom = _fit_count(L, h, default=0) * rotated_height_bottom
+    remaining_height = H - rotated_height_bottom * l
+    top = _fit_count(L, l, default=0) * _fit_count(remaining_height, h, default=0)
+    return np.maximum(bottom + top, np.maximum(normal, rotated))
+
+
+def _slots_needed(products_per_slot, quantity):
+    """Ceiling quantity / products_per_slot; 1 jika produk per slot <= 0."""
+    divisor = np.maximum(products_per_slot, 1)
+    return np.where(products_per_slot > 0, (quantity + divisor - 1) // divisor, 1)
+
+
+def _load_racks():
+    """Rak berdimensi lengkap beserta kapasitasnya, urut -available_front (tie-break pk)."""
+    rows = list(
+        RakCapacity.objects.filter(
+            rak__lebar_cm__isnull=False, rak__panjang_cm__isnull=False, rak__tinggi_cm__isnull=False,
+        ).exclude(rak__lebar_cm=0).exclude(rak__panjang_cm=0).exclude(rak__tinggi_cm=0)
+        .order_by('-available_front', 'pk')
+        .values_list('pk', 'rak_id', 'available_front', 'rak__lebar_cm', 'rak__panjang_cm', 'rak__tinggi_cm', 'rak__lokasi')
+    )
+    count = len(rows)
+    columns = list(zip(*rows)) if rows else [()] * 7
+    return {
+        'capacity_id': np.fromiter(columns[0], dtype=np.int64, count=count),
+        'rak_id': np.fromiter(columns[1], dtype=np.int64, count=count),
+        'front': np.fromiter((float(v) for v in columns[2]), dtype=np.float64, count=count),
+        'W': np.fromiter((float(v) for v in columns[3]), dtype=np.float64, count=count),
+        'L': np.fromiter((float(v) for v in columns[4]), dtype=np.float64, count=count),
+        'H': np.fromiter((float(v) for v in columns[5]), dtype=np.float64, count=count),
+        'priority': np.fromiter((Rak.LOKASI_PRIORITY.get(v, 0) if v else 0 for v in columns[6]), dtype=np.int64, count=count),
+    }
+
+
+def _existing_stock(product, rak_ids):
+    """Quantity stok produk yang sama per rak (0 jika tidak ada) dan mask rak SAME."""
+    existing = np.zeros(len(rak_ids), dtype=np.int64)
+    has_same = np.zeros(len(rak_ids), dtype=bool)
+    stock_by_rak = {}
+    for rak_id, quantity in (
+        InventoryRakStock.objects.filter(product=product, quantity__gt=0).order_by('pk').values_list('rak_id', 'quantity')
+    ):
+        stock_by_rak.setdefault(rak_id, quantity)
+    if stock_by_rak:
+        positions = {rak_id: i for i, rak_id in enumerate(rak_ids.tolist())}
+        for rak_id, quantity in stock_by_rak.items():
+            i = positions.get(rak_id)
+            if i is not None:
+                existing[i] = quantity
+                has_same[i] = True
+    return existing, has_same
+
+
+def rank_rak_options(product, quantity=None, limit=RAK_OPTION_LIMIT):
+    """
+    Opsi rak untuk produk (dimensi produk harus lengkap), sudah diurutkan sesuai
+    SLOTTINGRULES.md. Return list dict dengan key yang sama seperti get_rak_options lama.
+    """
+    racks = _load_racks()
+    if not len(racks['rak_id']):
+        return []
+
+    w = float(product.lebar_cm)
+    l = float(product.panjang_cm)
+    h = float(product.tinggi_cm)
+    tidur = bool(product.posisi_tidur)
+    W, L, H = racks['W'], racks['L'], racks['H']
+
+    fits_normal = (w <= W) & (l <= L) & (h <= H)
+    fits_rotated = (w <= W) & (h <= L) & (l <= H) if tidur else np.zeros(len(W), dtype=bool)
+    products_per_slot = _greedy_products_per_slot(W, L, H, w, l, h, tidur)
+    candidates = np.flatnonzero((fits_normal | fits_rotated) & (products_per_slot > 0))
+    if not len(candidates):
+        return []
+
+    normal_score = (w / W + l / L + h / H) / 3
+    rotated_score = (w / W + h / L + l / H) / 3
+    fit_score = np.where(
+        fits_normal & fits_rotated, np.maximum(normal_score, rotated_score),
+        np.where(fits_normal, normal_score, rotated_score),
+    )
+    hybrid = fits_normal & fits_rotated & (rotated_score > normal_score)
+
+    existing, has_same = _existing_stock(product, racks['rak_id'])
+    slot_basis = _vertical_products_per_slot(L, H, w, l, h, tidur)
+
+    # Rak SAME: sisa slot dari total slot width rak dikurangi slot stok yang ada
+    current_slots_used = np.where(has_same, _slots_needed(slot_basis, existing), 0)
+    total_slots_available = np.where(has_same, _fit_count(W, w, default=0), 0)
+    remaining_slots = np.maximum(0, total_slots_available - current_slots_used)
+    # Rak baru: slot dari available_front
+    available_slots = np.where(has_same, remaining_slots, _fit_count(racks['front'], w, default=0))
+    remaining_capacity = available_slots * products_per_slot
+
+    if quantity and quantity > 0:
+        capacity_valid = np.where(
+            has_same, quantity <= remaining_capacity, available_slots >= _slots_needed(slot_basis, quantity),
+        )
+    else:
+        capacity_valid = np.ones(len(W), dtype=bool)
+
+    sort_key = (
+        np.where(has_same, SAME_PRODUCT_BONUS + remaining_capacity, available_slots) + racks['priority']
+    )
+    # argsort stabil dari -key = sort(reverse=True) Python: key sama tetap urut -available_front
+    top = candidates[np.argsort(-sort_key[candidates], kind='stable')][:limit]
+    if not len(top):
+        return []
+
+    capacities = RakCapacity.objects.select_related('rak').in_bulk(racks['capacity_id'][top].tolist())
+
+    from .putaway import SlottingService
+
+    options = []
+    for i in top.tolist():
+        capacity = capacities[int(racks['capacity_id'][i])]
+        rak = capacity.rak
+        orientation = 'hybrid' if hybrid[i] else 'normal'
+        pps = int(products_per_slot[i])
+        options.append({
+            'rak_id': rak.id,
+            'kode_rak': rak.kode_rak,
+            'nama_rak': rak.nama_rak,
+            'lokasi': rak.lokasi,
+            'lokasi_priority': rak.lokasi_priority_score,
+            'lebar_cm': rak.lebar_cm,
+            'panjang_cm': rak.panjang_cm,
+            'tinggi_cm': rak.tinggi_cm,
+            'available_front': float(capacity.available_front),
+            'used_front': float(capacity.used_front),
+            'utilization': float(capacity.utilization_percentage),
+            'fit_score': float(fit_score[i]),
+            'reason': f'Dapat menampung {pps} produk per slot ({orientation} stacking)',
+            'products_per_slot': pps,
+            'stackable_height': SlottingService._calculate_stackable_height(product, rak, orientation),
+            'stacking_method': SlottingService._calculate_stacking_method(product, rak, orientation),
+            'orientation_used': orientation,
+            'supports_hybrid': product.posisi_tidur,
+            'existing_stock': int(existing[i]),
+            'available_slots': int(available_slots[i]),
+            'remaining_capacity': int(remaining_capacity[i]),
+            'current_slots_used': int(current_slots_used[i]),
+            'total_slots_available': int(total_slots_available[i]),
+            'has_same_product': bool(has_same[i]),
+            'capacity_valid': bool(capacity_valid[i]),
+        })
+    return options
@@ -0,0 +1,287 @@
+"""
+Query layer kartu stok (StockCardEntry).
+
+- filter_ledger(): filter halaman kartu stok; filter kolom sku/barcode/nama dan pencarian
+  produk lewat subquery Product (index trigram di PostgreSQL) sehingga tidak join per baris.
+- ledger_page(): pagination keyset (cursor) pada (waktu, id) - biaya per halaman konstan,
+  tidak tergantung posisi halaman seperti OFFSET.
+- estimated_count(): jumlah baris perkiraan (statistik planner PostgreSQL) untuk tampilan
+  tanpa filter.
+- prefetch_references(): resolve GenericForeignKey reference satu query per content type.
+- balance_as_of(): saldo produk pada waktu tertentu = snapshot harian terakhir sebelum
+  tanggal tersebut + tail scan entri sesudahnya.
+- build_stock_snapshots(): bangun StockBalanceSnapshot (command build_stock_snapshots),
+  dilanjutkan dari snapshot terakhir tiap produk.
+
+Saldo kartu stok = jumlah kumulatif qty entri berstatus active.
+"""
+import base64
+import logging
+from collections import defaultdict, namedtuple
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Max, Q, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from products.models import Product
+from .models import StockBalanceSnapshot, StockCardEntry
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CHUNK_SIZE = 500
+# Di bawah jumlah ini COUNT(*) biasa cukup murah dan lebih akurat dari statistik planner
+EXACT_COUNT_THRESHOLD = 100000
+
+LedgerPage = namedtuple('LedgerPage', ['entries', 'next_cursor'])
+SnapshotBuild = namedtuple('SnapshotBuild', ['products', 'snapshots'])
+
+
+def local_date(value):
+    """Tanggal lokal (TIME_ZONE) dari datetime."""
+    return timezone.localtime(value).date()
+
+
+def _start_of_day(tanggal):
+    return timezone.make_aware(datetime.combine(tanggal, time.min))
+
+
+# ---------------------------------------------------------------------------
+# Cursor
+# ---------------------------------------------------------------------------
+
+def encode_cursor(entry):
+    raw = f"{entry.waktu.isoformat()}|{entry.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (waktu, id) atau None jika cursor tidak valid."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        waktu, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(waktu), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Filter, count, page
+# ---------------------------------------------------------------------------
+
+def product_search_ids(keyword):
+    """Subquery id Product yang sku/barcode/nama_produk mengandung keyword."""
+    return Product.objects.filter(
+        Q(sku__icontains=keyword) | Q(barcode__icontains=keyword) | Q(nama_produk__icontains=keyword)
+    ).values('id')
+
+
+def filter_ledger(queryset, sku='', barcode='', nama='', tipe='', status='', username='', notes='', tanggal=None,
+                  search=''):
+    """
+    Filter kartu stok. Filter kolom sku/barcode/nama berlaku bersamaan (AND) dalam satu
+    subquery Product; pencarian produk/user memakai subquery id, bukan join per baris.
+    """
+    product_filters = {
+        lookup: value
+        for lookup, value in (('sku__icontains', sku), ('barcode__icontains', barcode), ('nama_produk__icontains', nama))
+        if value
+    }
+    if product_filters:
+        queryset = queryset.filter(product_id__in=Product.objects.filter(**product_filters).values('id'))
+    if tipe:
+        queryset = queryset.filter(tipe_pergerakan=tipe)
+    if status:
+        queryset = queryset.filter(status=status)
+    if username:
+        queryset = queryset.filter(user_id__in=get_user_model().objects.filter(username__icontains=username).values('id'))
+    if notes:
+        queryset = queryset.filter(notes__icontains=notes)
+    if tanggal:
+        queryset = queryset.filter(waktu__gte=_start_of_day(tanggal), waktu__lt=_start_of_day(tanggal + timedelta(days=1)))
+    if search:
+        queryset = queryset.filter(
+            Q(product_id__in=product_search_ids(search)) |
+            Q(tipe_pergerakan__icontains=search) |
+            Q(user_id__in=get_user_model().objects.filter(username__icontains=search).values('id')) |
+            Q(notes__icontains=search)
+        )
+    return queryset
+
+
+def estimated_count(model=StockCardEntry):
+    """
+    Jumlah baris tabel. PostgreSQL: reltuples dari pg_class (diperbarui ANALYZE/autovacuum);
+    tabel kecil atau belum pernah di-ANALYZE tetap memakai COUNT(*).
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] is not None and row[0] >= EXACT_COUNT_THRESHOLD:
+            return row[0]
+    return model.objects.count()
+
+
+def ledger_page(queryset, cursor=None, length=50, descending=True):
+    """
+    Satu halaman urut (waktu, id) mulai setelah cursor (None = halaman pertama).
+    Return LedgerPage(entries, next_cursor); next_cursor None jika halaman terakhir.
+    """
+    if descending:
+        queryset = queryset.order_by('-waktu', '-id')
+    else:
+        queryset = queryset.order_by('waktu', 'id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        waktu, pk = position
+        if descending:
+            queryset = queryset.filter(Q(waktu__lt=waktu) | Q(waktu=waktu, id__lt=pk))
+        else:
+            queryset = queryset.filter(Q(waktu__gt=waktu) | Q(waktu=waktu, id__gt=pk))
+    entries = list(queryset[:length + 1])
+    next_cursor = encode_cursor(entries[length - 1]) if len(entries) > length else None
+    return LedgerPage(entries[:length], next_cursor)
+
+
+def prefetch_references(entries):
+    """
+    Isi cache GenericForeignKey reference untuk entries: satu query per content type
+    (bukan satu query per baris). Referensi yang sudah dihapus di-cache sebagai None.
+    """
+    ids_by_type = defaultdict(set)
+    for entry in entries:
+        if entry.content_type_id and entry.object_id is not None:
+            ids_by_type[entry.content_type_id].add(entry.object_id)
+
+    objects = {}
+    for content_type_id, ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        for obj in model._base_manager.filter(pk__in=ids):
+            objects[(content_type_id, obj.pk)] = obj
+
+    field = StockCardEntry._meta.get_field('reference')
+    for entry in entries:
+        field.set_cached_value(entry, objects.get((entry.content_type_id, entry.object_id)))
+    return entries
+
+
+# ---------------------------------------------------------------------------
+# Snapshot saldo
+# ---------------------------------------------------------------------------
+
+def _active_entries(product_id):
+    return StockCardEntry.objects.filter(product_id=product_id, status='active')
+
+
+def balance_as_of(product_id, at=None):
+    """
+    Saldo kartu stok produk pada waktu at (default sekarang): snapshot terakhir sebelum
+    tanggal at + jumlah qty entri active sesudah snapshot sampai at.
+    """
+    at = at or timezone.now()
+    snapshot = (
+        StockBalanceSnapshot.objects.filter(product_id=product_id, tanggal__lt=local_date(at))
+        .order_by('-tanggal').values_list('tanggal', 'saldo').first()
+    )
+    tail = _active_entries(product_id).filter(waktu__lte=at)
+    saldo = 0
+    if snapshot:
+        tanggal, saldo = snapshot
+        tail = tail.filter(waktu__gte=_start_of_day(tanggal + timedelta(days=1)))
+    return saldo + (tail.aggregate(total=Sum('qty'))['total'] or 0)
+
+
+def invalidate_snapshots(product_id, tanggal):
+    """Hapus snapshot produk mulai tanggal (dibangun ulang oleh build berikutnya)."""
+    return StockBalanceSnapshot.objects.filter(product_id=product_id, tanggal__gte=tanggal).delete()[0]
+
+
+def _daily_totals(product_ids, since, until):
+    """
+    Total harian entri active per produk: {product_id: [(tanggal, masuk, keluar, jumlah, last_id), ...]}
+    urut tanggal. since/until adalah tanggal lokal (inklusif, since None = dari awal).
+    """
+    queryset = StockCardEntry.objects.filter(
+        product_id__in=product_ids, status='active', waktu__lt=_start_of_day(until + timedelta(days=1)),
+    )
+    if since:
+        queryset = queryset.filter(waktu__gte=_start_of_day(since))
+    rows = (
+        queryset.annotate(tanggal=TruncDate('waktu', tzinfo=timezone.get_current_timezone()))
+        .values('product_id', 'tanggal')
+        .annotate(
+            masuk=Sum(Case(When(qty__gt=0, then='qty'), default=0, output_field=IntegerField())),
+            keluar=Sum(Case(When(qty__lt=0, then='qty'), default=0, output_field=IntegerField())),
+            jumlah=Count('id'),
+            last_id=Max('id'),
+        )
+        .order_by('product_id', 'tanggal')
+    )
+    totals = defaultdict(list)
+    for row in rows:
+        totals[row['product_id']].append(
+            (row['tanggal'], row['masuk'] or 0, row['keluar'] or 0, row['jumlah'], row['last_id'])
+        )
+    return totals
+
+
+def _build_chunk(product_ids, until):
+    latest = {}
+    for product_id, tanggal, saldo in (
+        StockBalanceSnapshot.objects.filter(product_id__in=product_ids)
+        .order_by('product_id', '-tanggal').values_list('product_id', 'tanggal', 'saldo')
+    ):
+        latest.setdefault(product_id, (tanggal, saldo))
+
+    # Produk tanpa snapshot dihitung dari awal; sisanya mulai hari sesudah snapshot terakhir
+    fresh = [pid for pid in product_ids if pid not in latest]
+    pending = defaultdict(list)
+    if fresh:
+        pending.update(_daily_totals(fresh, None, until))
+    resume = defaultdict(list)
+    for product_id, (tanggal, _) in latest.items():
+        if tanggal < until:
+            resume[tanggal + timedelta(days=1)].append(product_id)
+    for since, ids in resume.items():
+        pending.update(_daily_totals(ids, since, until))
+
+    snapshots = []
+    for product_id, days in pending.items():
+        saldo = latest.get(product_id, (None, 0))[1]
+        for tanggal, masuk, keluar, jumlah, last_id in days:
+            saldo += masuk + keluar
+            snapshots.append(StockBalanceSnapshot(
+                product_id=product_id, tanggal=tanggal, qty_masuk=masuk, qty_keluar=keluar,
+                saldo=saldo, jumlah_entri=jumlah, last_entry_id=last_id,
+            ))
+    with transaction.atomic():
+        StockBalanceSnapshot.objects.bulk_create(snapshots, batch_size=1000, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def build_stock_snapshots(until=None, product_ids=None, chunk_size=SNAPSHOT_CHUNK_SIZE, progress=None):
+    """
+    Bangun snapshot harian sampai tanggal until (paling lambat kemarin, hari berjalan belum final).
+    Tiap produk dilanjutkan dari snapshot terakhirnya. Return SnapshotBuild(products, snapshots).
+    """
+    yesterday = timezone.localdate() - timedelta(days=1)
+    until = min(until or yesterday, yesterday)
+    if product_ids is None:
+        product_ids = StockCardEntry.objects.order_by('product_id').values_list('product_id', flat=True).distinct()
+    product_ids = sorted(set(product_ids))
+    created = 0
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        created += _build_chunk(chunk, until)
+        if progress:
+            progress(start + len(chunk), created)
+    logger.info("build_stock_snapshots: %s produk, %s snapshot sampai %s", len(product_ids), created, until)
+    return SnapshotBuild(len(product_ids), created)
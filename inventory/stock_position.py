@@ -0,0 +1,188 @@
+"""
+Engine rekonsiliasi posisi stok: total stok di rak vs Stock.quantity (master) per produk.
+
+Total rak produk = jumlah quantity + quantity_opname seluruh InventoryRakStock produk.
+Status OK jika total rak <= master, OVERSTOCK jika melebihi; selisih = total rak - master.
+
+- position_rows(): baris stok rak (rak x produk) dengan total rak produk, master, status dan
+  selisih sebagai anotasi SQL; filter, urutan dan pagination dikerjakan database
+  (halaman posisi stok dan API stock_position_data).
+- attach_opname_sessions(): sesi opname draft untuk satu halaman baris, satu query.
+- position_summary(): ringkasan satu query aggregate.
+- reconcile_products(): rekonsiliasi per produk dalam satu query grouped, opsional hanya
+  yang selisih (command audit_stock_position).
+"""
+import logging
+from collections import defaultdict, namedtuple
+
+from django.db.models import (
+    Case, CharField, Count, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+from products.models import Product
+from .models import InventoryRakStock, RakOpnameItem
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+MAX_PAGE_LENGTH = 1000
+
+STATUS_OK = 'OK'
+STATUS_OVERSTOCK = 'OVERSTOCK'
+
+# Kolom DataTables -> urutan database (tie-break pk agar pagination stabil)
+ORDER_COLUMNS = {
+    '0': ('rak__lokasi', 'rak__kode_rak'),
+    '3': ('product__nama_produk',),
+    '8': ('total_quantity',),
+    '9': ('master_quantity',),
+    '10': ('status',),
+    '11': ('updated_at',),
+}
+
+PositionPage = namedtuple('PositionPage', ['rows', 'total', 'filtered'])
+
+
+def _status(total, master):
+    return Case(
+        When(**{f'{total}__gt': F(master)}, then=Value(STATUS_OVERSTOCK)),
+        default=Value(STATUS_OK),
+        output_field=CharField(),
+    )
+
+
+def _product_rak_total():
+    """Subquery total rak (quantity + quantity_opname) produk baris, seluruh rak."""
+    return Subquery(
+        InventoryRakStock.objects.filter(product_id=OuterRef('product_id')).order_by()
+        .values('product_id').annotate(total=Sum(F('quantity') + F('quantity_opname'))).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def position_rows(rak_id=None, search='', status='', mismatch_only=False):
+    """Queryset baris stok rak aktif (quantity atau quantity_opname > 0) beranotasi rekonsiliasi."""
+    rows = InventoryRakStock.objects.select_related('product', 'rak').filter(
+        Q(quantity__gt=0) | Q(quantity_opname__gt=0)
+    ).annotate(
+        total_quantity=F('quantity') + F('quantity_opname'),
+        master_quantity=Coalesce(F('product__stock__quantity'), 0),
+        product_rak_total=Coalesce(_product_rak_total(), 0),
+    ).annotate(
+        status=_status('product_rak_total', 'master_quantity'),
+        selisih=F('product_rak_total') - F('master_quantity'),
+    )
+    if rak_id:
+        rows = rows.filter(rak_id=rak_id)
+    if search:
+        rows = rows.filter(
+            Q(product__sku__icontains=search) |
+            Q(product__nama_produk__icontains=search) |
+            Q(product__barcode__icontains=search) |
+            Q(product__variant_produk__icontains=search) |
+            Q(product__brand__icontains=search) |
+            Q(rak__lokasi__icontains=search) |
+            Q(rak__kode_rak__icontains=search)
+        )
+    if status in (STATUS_OK, STATUS_OVERSTOCK):
+        rows = rows.filter(status=status)
+    if mismatch_only:
+        rows = rows.exclude(selisih=0)
+    return rows
+
+
+def order_rows(rows, column='0', direction='asc'):
+    fields = ORDER_COLUMNS.get(str(column), ORDER_COLUMNS['0'])
+    prefix = '-' if direction == 'desc' else ''
+    return rows.order_by(*[f'{prefix}{field}' for field in fields], f'{prefix}pk')
+
+
+def position_page(rows, start=0, length=PAGE_SIZE):
+    """Satu halaman baris (sudah diurutkan) + jumlah total/terfilter, sesi opname sudah terisi."""
+    total = InventoryRakStock.objects.filter(Q(quantity__gt=0) | Q(quantity_opname__gt=0)).count()
+    filtered = rows.count()
+    return PositionPage(attach_opname_sessions(list(rows[start:start + length])), total, filtered)
+
+
+def attach_opname_sessions(rows):
+    """
+    Isi row.opname_sessions (list dict) untuk baris dengan quantity_opname > 0 dari sesi
+    opname draft produknya - satu query untuk seluruh baris.
+    """
+    product_ids = {row.product_id for row in rows if row.quantity_opname > 0}
+    sessions = defaultdict(list)
+    if product_ids:
+        items = RakOpnameItem.objects.filter(
+            product_id__in=product_ids, session__status='draft'
+        ).select_related('session__rak').order_by('pk')
+        for item in items:
+            sessions[item.product_id].append({
+                'session_code': item.session.session_code,
+                'rak_lokasi': f"{item.session.rak.lokasi} ({item.session.rak.kode_rak})",
+                'qty_fisik': item.qty_fisik,
+                'created_at': item.session.tanggal_mulai.strftime('%d/%m/%Y %H:%M'),
+            })
+    for row in rows:
+        row.opname_sessions = sessions.get(row.product_id, []) if row.quantity_opname > 0 else []
+    return rows
+
+
+def serialize_row(row):
+    """Dict baris untuk template/JSON (format sama dengan API lama)."""
+    product = row.product
+    return {
+        'rak_lokasi': f"{row.rak.lokasi} ({row.rak.kode_rak})",
+        'rak_id': row.rak_id,
+        'product_sku': product.sku,
+        'product_name': product.nama_produk,
+        'product_barcode': product.barcode or '-',
+        'product_variant': product.variant_produk or '-',
+        'product_brand': product.brand or '-',
+        'quantity': row.quantity,
+        'quantity_opname': row.quantity_opname,
+        'total_quantity': row.total_quantity,
+        'product_rak_total': row.product_rak_total,
+        'master_quantity': row.master_quantity,
+        'selisih': row.selisih,
+        'status': row.status,
+        'last_updated': row.updated_at.strftime('%d/%m/%Y %H:%M') if row.updated_at else '-',
+        'opname_sessions': row.opname_sessions,
+        'has_active_opname': bool(row.opname_sessions),
+        'photo_url': product.photo.url if product.photo else '',
+    }
+
+
+def position_summary(rows):
+    """Ringkasan baris (queryset position_rows) dalam satu query aggregate."""
+    return rows.order_by().aggregate(
+        total_raks=Count('rak', distinct=True),
+        total_products=Count('product', distinct=True),
+        total_quantity=Coalesce(Sum('quantity'), 0),
+        total_quantity_opname=Coalesce(Sum('quantity_opname'), 0),
+        overstock_count=Count('product', distinct=True, filter=Q(status=STATUS_OVERSTOCK)),
+        products_with_opname=Count('product', distinct=True, filter=Q(quantity_opname__gt=0)),
+    )
+
+
+def reconcile_products(mismatch_only=False):
+    """
+    Rekonsiliasi per produk (punya stok rak atau stok master) dalam satu query grouped.
+    Return queryset values: id, sku, nama_produk, rak_quantity, opname_quantity, rak_total,
+    master_quantity, selisih, rak_count, status. mismatch_only: hanya selisih != 0.
+    """
+    products = Product.objects.values('id', 'sku', 'nama_produk').annotate(
+        rak_quantity=Coalesce(Sum('inventoryrakstock__quantity'), 0),
+        opname_quantity=Coalesce(Sum('inventoryrakstock__quantity_opname'), 0),
+        rak_count=Count('inventoryrakstock', filter=Q(inventoryrakstock__quantity__gt=0) | Q(inventoryrakstock__quantity_opname__gt=0)),
+        # Stock one-to-one: Max hanya untuk agregasi satu nilai per grup
+        master_quantity=Coalesce(Max('stock__quantity'), 0),
+    ).annotate(
+        rak_total=F('rak_quantity') + F('opname_quantity'),
+    ).annotate(
+        selisih=F('rak_total') - F('master_quantity'),
+        status=_status('rak_total', 'master_quantity'),
+    ).exclude(rak_total=0, master_quantity=0, rak_count=0)
+    if mismatch_only:
+        products = products.exclude(selisih=0)
+    return products.order_by('-selisih', 'sku')
@@ -1,3 +1,45 @@
+import math
+import random
+
 from django.test import TestCase
 
-# Create your tests here.
+from .management.commands.benchmark_slotting import legacy_get_rak_options, seed_slotting_data
+from .slotting import rank_rak_options
+
+FLOAT_FIELDS = ('used_front', 'utilization', 'fit_score')
+
+
+def _diff_options(legacy, new):
+    """Daftar perbedaan (posisi, field, lama, baru) antara dua list opsi."""
+    diffs = []
+    if len(legacy) != len(new):
+        diffs.append((None, 'len', len(legacy), len(new)))
+    for position, (old, current) in enumerate(zip(legacy, new)):
+        if set(old) != set(current):
+            diffs.append((position, 'keys', sorted(old), sorted(current)))
+            continue
+        for field, value in old.items():
+            if field in FLOAT_FIELDS:
+                same = math.isclose(value, current[field], rel_tol=1e-9, abs_tol=1e-9)
+            else:
+                same = value == current[field] and type(value) is type(current[field])
+            if not same:
+                diffs.append((position, field, value, current[field]))
+    return diffs
+
+
+class SlottingGoldenTest(TestCase):
+    """Top-10 rank_rak_options harus identik dengan loop per rak lama (golden result)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_slotting_data(rak_count=300, product_count=20, filler_count=80)
+
+    def test_top10_matches_legacy_loop(self):
+        rng = random.Random(17)
+        for product in self.products:
+            for quantity in (None, rng.randint(1, 400)):
+                with self.subTest(sku=product.sku, quantity=quantity):
+                    legacy = legacy_get_rak_options(product, quantity)
+                    self.assertTrue(legacy, "Seed harus menghasilkan opsi rak")
+                    self.assertEqual(_diff_options(legacy, rank_rak_options(product, quantity)), [])
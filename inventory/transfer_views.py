@@ -18,6 +18,7 @@ from .models import (
     InventoryRakStockLog,
 )
 from products.models import Product
+from products.barcode_resolver import resolve_product
 
 
 @login_required
@@ -632,7 +633,7 @@ def transfer_putaway_scan_product(request):
             return JsonResponse({'error': 'Sesi transfer tidak siap untuk putaway'}, status=400)
         
         # Cari produk berdasarkan barcode
-        product = Product.objects.filter(barcode=barcode).first()
+        product = resolve_product(barcode)
         if not product:
             return JsonResponse({'error': f'Produk dengan barcode "{barcode}" tidak ditemukan'}, status=404)
         
@@ -684,11 +685,7 @@ def transfer_rak_scan_product(request, session_id):
     
     try:
         # Cari produk berdasarkan barcode atau SKU
-        product = Product.objects.filter(
-            Q(barcode__iexact=barcode) | 
-            Q(sku__iexact=barcode) |
-            Q(extra_barcodes__barcode__iexact=barcode)
-        ).distinct().first()
+        product = resolve_product(barcode) or Product.objects.filter(sku__iexact=barcode).first()
         
         if not product:
             return JsonResponse({'success': False, 'message': f'Produk dengan barcode/SKU "{barcode}" tidak ditemukan'})
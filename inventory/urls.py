@@ -36,6 +36,7 @@ urlpatterns = [
     path('opname/input/<int:queue_id>/', views.opname_input, name='opname_input'),
     path('stock_card/', views.stock_card_view, name='stock_card'),
     path('stock_card/data/', views.stock_card_data, name='stock_card_data'),
+    path('stock_card/balance/', views.stock_card_balance, name='stock_card_balance'),
     path('putaway/', views.putaway_list, name='putaway'),
     path('putaway/scan/', views.putaway_scan, name='putaway_scan'),
     path('putaway/scan-rak/', views.putaway_scan_rak, name='putaway_scan_rak'),
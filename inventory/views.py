@@ -2,6 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse, JsonResponse, FileResponse, HttpResponseRedirect
 from .models import Stock, HistoryImportStock, Inbound, InboundItem, Supplier, OpnameQueue, OpnameHistory, StockCardEntry, RakOpnameSession, RakOpnameItem, RakCapacity
 from products.models import Product, ProductExtraBarcode
+from products.barcode_resolver import resolve_product
+from products.search import search_products
 import pandas as pd
 import io
 from django.contrib import messages
@@ -26,8 +28,15 @@ from django.contrib.contenttypes.models import ContentType # Pastikan ini sudah
 from django.contrib.contenttypes.fields import GenericForeignKey # Pastikan ini sudah diimpor
 from inventory.models import InventoryRakStockLog # Pastikan ini sudah diimpor
 import json
+from datetime import datetime
 from inventory.models import InventoryRakStock # Pastikan ini sudah diimpor
 from inventory.models import PutawaySlottingLog
+from fullfilment.models import BatchList
+from fullfilment.batch_settlement import close_batch_settlement, reopen_batch_settlement
+from inventory.stock_ledger import (
+    balance_as_of, decode_cursor, encode_cursor, estimated_count, filter_ledger, ledger_page, prefetch_references,
+)
+from erp_alfa.exports import export_response
 
 @login_required
 def mobile_inventory(request):
@@ -133,35 +142,8 @@ def index(request):
 @login_required
 @permission_required('inventory.view_stock', raise_exception=True)
 def export_stock(request):
-    # Export all products with stock info to Excel
-    products = Product.objects.all().select_related()
-    stock_map = {s.product_id: s for s in Stock.objects.all()}
-    data = []
-    for p in products:
-        stock = stock_map.get(p.id)
-        # Perbaiki: gunakan property quantity_ready_virtual atau hitung manual
-        quantity_ready = 0
-        if stock:
-            quantity_ready = stock.quantity - stock.quantity_locked
-        
-        data.append({
-            'SKU': p.sku,
-            'Barcode': p.barcode,
-            'Nama Produk': p.nama_produk,
-            'Variant': p.variant_produk,
-            'Brand': p.brand,
-            'Quantity': stock.quantity if stock else 0,
-            'Quantity Locked': stock.quantity_locked if stock else 0,
-            'Quantity Ready': quantity_ready,  # Perbaiki: gunakan variabel yang sudah dihitung
-        })
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Stock')
-    output.seek(0)
-    response = HttpResponse(output.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=stock_export.xlsx'  # Perbaiki nama file
-    return response
+    # Export all products with stock info to Excel (?format=csv untuk CSV)
+    return export_response(request, 'inventory.exports.stock_report')
 
 @csrf_exempt
 @login_required
@@ -261,9 +243,19 @@ def inbound_list_api(request):
 
     return JsonResponse({'html': html, 'has_more': inbounds_page.has_next()})
 
-def get_next_inbound_id():
-    last = Inbound.objects.order_by('-id').first()
-    return (last.id + 1) if last else 1
+INBOUND_NUMBER_FORMAT = {'width': 1, 'separator': '/', 'date_format': '%d-%m-%Y'}
+
+
+def get_next_inbound_number():
+    """Nomor inbound INV/dd-mm-YYYY/N dari counter harian (dipesan, tidak kembar antar user)."""
+    from finance.sequences import document_number
+    return document_number('INV', Inbound, 'nomor_inbound', **INBOUND_NUMBER_FORMAT)
+
+
+def preview_next_inbound_number():
+    """Perkiraan nomor inbound berikutnya untuk form (tidak memesan counter)."""
+    from finance.sequences import preview_document_number
+    return preview_document_number('INV', Inbound, 'nomor_inbound', **INBOUND_NUMBER_FORMAT)
 
 @login_required
 @permission_required('inventory.add_inbound', raise_exception=True)
@@ -284,6 +276,7 @@ def inbound_tambah(request):
             with transaction.atomic():
                 # 1. Ambil data dari form
                 nomor_inbound = request.POST.get('nomor_inbound')
+                auto_nomor_inbound = request.POST.get('auto_nomor_inbound')
                 tanggal = request.POST.get('tanggal')
                 keterangan = request.POST.get('keterangan')
                 from_warehouse = request.POST.get('from_warehouse')
@@ -296,6 +289,7 @@ def inbound_tambah(request):
                     # Kembalikan ke form dengan data yang sudah diisi
                     context = {
                         'default_nomor_inbound': nomor_inbound,
+                        'auto_nomor_inbound': auto_nomor_inbound,
                         'default_tanggal': tanggal,
                         'keterangan': keterangan,
                         'from_warehouse': from_warehouse,
@@ -303,6 +297,11 @@ def inbound_tambah(request):
                     }
                     return render(request, template_name, context)
 
+                # Nomor dari form masih perkiraan (tidak dipesan saat GET): pesan nomor sebenarnya
+                # di transaksi ini, kecuali user mengetik nomor sendiri
+                if auto_nomor_inbound and nomor_inbound == auto_nomor_inbound:
+                    nomor_inbound = get_next_inbound_number()
+
                 # 2. Buat objek Inbound (Transfer Antar Gudang)
                 inbound_obj, created = Inbound.objects.update_or_create(
                     nomor_inbound=nomor_inbound,
@@ -396,12 +395,12 @@ def inbound_tambah(request):
 
     # Untuk request GET
     else:
-        next_id = get_next_inbound_id()
         now = timezone.localtime()
-        nomor_inbound = f"INV/{now.strftime('%d-%m-%Y')}/{next_id}"
+        nomor_inbound = preview_next_inbound_number()
         tanggal = now.strftime('%Y-%m-%dT%H:%M')
         context = {
             'default_nomor_inbound': nomor_inbound,
+            'auto_nomor_inbound': nomor_inbound,
             'default_tanggal': tanggal,
         }
         return render(request, template_name, context)
@@ -412,17 +411,20 @@ def produk_lookup(request):
     q = request.GET.get('q', '').strip()
     mode = request.GET.get('mode', '')
     if mode == 'manual':
-        # Search by SKU, Barcode, Nama Produk, Variant, Brand (case-insensitive, contains)
-        produk_qs = Product.objects.filter(
-            Q(sku__icontains=q) |
-            Q(barcode__icontains=q) |
-            Q(nama_produk__icontains=q) |
-            Q(variant_produk__icontains=q) |
-            Q(brand__icontains=q)
-        ).order_by('nama_produk')
-        # Hilangkan paginasi, ambil semua data
+        # Search by SKU, Barcode, Nama Produk, Variant, Brand lewat products/search.py
+        # (urut relevansi, per halaman; page_size dari client, default 20).
+        # Response {'results': [...], 'has_more': bool} untuk memuat halaman berikutnya
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+            page_size = int(request.GET.get('page_size', 20))
+        except ValueError:
+            page, page_size = 1, 20
+        result = search_products(
+            q, limit=page_size, offset=(page - 1) * page_size,
+            queryset=Product.objects.select_related('stock'),
+        )
         data = []
-        for p in produk_qs:
+        for p in result.products:
             photo_url = ''
             if p.photo:
                 try:
@@ -453,7 +455,7 @@ def produk_lookup(request):
                 'qty_fisik': qty_fisik,
                 'location': '-'  # Default location
             })
-        return JsonResponse(data, safe=False)
+        return JsonResponse({'results': data, 'has_more': result.has_more})
     # Default: scan barcode/sku exact
     produk = Product.objects.filter(Q(barcode=q) | Q(sku=q)).first()
     if produk:
@@ -1106,83 +1108,49 @@ def stock_card_view(request):
 def stock_card_data(request):
     """
     Provides server-side data for the DataTables on the stock card page.
+
+    Urutan waktu (default) memakai pagination keyset: client mengirim cursor dari
+    response sebelumnya (next_cursor), tanpa cursor dipakai OFFSET (lompat halaman).
+    recordsTotal memakai jumlah perkiraan; COUNT(*) hanya untuk hasil filter.
     """
+    draw = int(request.GET.get('draw', 0))
     try:
-        # Base queryset
-        queryset = StockCardEntry.objects.select_related('product', 'user').all()
+        queryset = StockCardEntry.objects.select_related('product', 'user')
 
-        # Total records
-        total_records = queryset.count()
-
-        # Search logic (global search)
-        search_value = request.GET.get('search[value]', '')
-        if search_value:
-            queryset = queryset.filter(
-                Q(product__sku__icontains=search_value) |
-                Q(product__barcode__icontains=search_value) |
-                Q(product__nama_produk__icontains=search_value) |
-                Q(tipe_pergerakan__icontains=search_value) |
-                Q(user__username__icontains=search_value) |
-                Q(notes__icontains=search_value)
-            )
-        
-        # Per-column filtering
-        # Waktu (kolom 0)
+        tanggal = None
         waktu_search = request.GET.get('columns[0][search][value]', '')
         if waktu_search:
             try:
-                # Handle date search
-                queryset = queryset.filter(waktu__date=waktu_search)
-            except:
+                tanggal = datetime.strptime(waktu_search, '%Y-%m-%d').date()
+            except ValueError:
                 pass  # Ignore invalid date format
 
-        # SKU (kolom 1)
-        sku_search = request.GET.get('columns[1][search][value]', '')
-        if sku_search:
-            queryset = queryset.filter(product__sku__icontains=sku_search)
-
-        # Barcode (kolom 2) - BARU
-        barcode_search = request.GET.get('columns[2][search][value]', '')
-        if barcode_search:
-            queryset = queryset.filter(product__barcode__icontains=barcode_search)
-
-        # Nama Produk (kolom 3)
-        nama_search = request.GET.get('columns[3][search][value]', '')
-        if nama_search:
-            queryset = queryset.filter(product__nama_produk__icontains=nama_search)
-
-        # Tipe Pergerakan (kolom 4)
-        tipe_search = request.GET.get('columns[4][search][value]', '')
-        if tipe_search:
-            queryset = queryset.filter(tipe_pergerakan=tipe_search)
-
-        # User (kolom 5)
-        user_search = request.GET.get('columns[5][search][value]', '')
-        if user_search:
-            queryset = queryset.filter(user__username__icontains=user_search)
-            
-        # Status (kolom 6)
-        status_search = request.GET.get('columns[6][search][value]', '')
-        if status_search:
-            queryset = queryset.filter(status=status_search)
-            
-        # Notes (kolom 10)
-        notes_search = request.GET.get('columns[10][search][value]', '')
-        if notes_search:
-            queryset = queryset.filter(notes__icontains=notes_search)
+        filters = {
+            'sku': request.GET.get('columns[1][search][value]', '').strip(),
+            'barcode': request.GET.get('columns[2][search][value]', '').strip(),
+            'nama': request.GET.get('columns[3][search][value]', '').strip(),
+            'tipe': request.GET.get('columns[4][search][value]', ''),
+            'username': request.GET.get('columns[5][search][value]', '').strip(),
+            'status': request.GET.get('columns[6][search][value]', ''),
+            'notes': request.GET.get('columns[10][search][value]', '').strip(),
+            'search': request.GET.get('search[value]', '').strip(),
+        }
+        is_filtered = bool(tanggal) or any(filters.values())
+        queryset = filter_ledger(queryset, tanggal=tanggal, **filters)
 
-        # Total filtered records
-        total_filtered = queryset.count()
+        total_records = estimated_count()
+        total_filtered = queryset.count() if is_filtered else total_records
 
-        # Ordering - PERBAIKAN: Gunakan mapping yang benar
         order_column_index = request.GET.get('order[0][column]', '0')
         order_dir = request.GET.get('order[0][dir]', 'desc')
-        
+        start = max(int(request.GET.get('start', 0)), 0)
+        length = min(max(int(request.GET.get('length', 50)), 1), 500)
+        cursor = request.GET.get('cursor', '')
+
         # Mapping kolom untuk ordering
         column_mapping = {
-            '0': 'waktu',
-            '1': 'product__sku', 
-            '2': 'product__barcode',  # BARU
+            '1': 'product__sku',
+            '2': 'product__barcode',
             '3': 'product__nama_produk',
             '4': 'tipe_pergerakan',
             '5': 'user__username',
@@ -1192,36 +1160,34 @@ def stock_card_data(request):
             '9': 'qty_akhir',
             '10': 'notes'
         }
-        
-        order_column_name = column_mapping.get(order_column_index, 'waktu')
-        if order_dir == 'desc':
-            order_column_name = f'-{order_column_name}'
-        
-        # Apply ordering
-        if order_column_name in ['waktu', '-waktu', 'product__sku', '-product__sku', 
-                               'product__barcode', '-product__barcode',  # BARU
-                               'product__nama_produk', '-product__nama_produk', 
-                               'tipe_pergerakan', '-tipe_pergerakan', 
-                               'user__username', '-user__username', 'status', '-status',
-                               'qty', '-qty', 'qty_awal', '-qty_awal', 'qty_akhir', '-qty_akhir',
-                               'notes', '-notes']:
-            queryset = queryset.order_by(order_column_name)
 
-        # Pagination
-        start = int(request.GET.get('start', 0))
-        length = int(request.GET.get('length', 50))
-        queryset = queryset[start:start + length]
+        next_cursor = None
+        if order_column_index not in column_mapping and (start == 0 or decode_cursor(cursor)):
+            page = ledger_page(queryset, cursor=cursor if start else None, length=length,
+                               descending=order_dir != 'asc')
+            entries, next_cursor = page.entries, page.next_cursor
+        else:
+            order_column_name = column_mapping.get(order_column_index, 'waktu')
+            if order_dir == 'desc':
+                queryset = queryset.order_by(f'-{order_column_name}', '-id')
+            else:
+                queryset = queryset.order_by(order_column_name, 'id')
+            entries = list(queryset[start:start + length])
+            if entries and order_column_name == 'waktu' and len(entries) == length:
+                next_cursor = encode_cursor(entries[-1])
+
+        prefetch_references(entries)
 
         # Prepare data for JSON response
         jakarta_tz = dj_timezone.get_current_timezone()
 
         data = []
-        for entry in queryset:
+        for entry in entries:
             try:
                 data.append({
                     "waktu": dj_timezone.localtime(entry.waktu, jakarta_tz).strftime('%Y-%m-%d %H:%M:%S') if entry.waktu else '',
                     "product__sku": entry.product.sku if entry.product else '',
-                    "product__barcode": entry.product.barcode if entry.product else '',  # BARU
+                    "product__barcode": entry.product.barcode if entry.product else '',
                     "product__nama_produk": entry.product.nama_produk if entry.product else '',
                     "product__variant_produk": entry.product.variant_produk if entry.product else '',
                     "tipe_pergerakan": entry.get_tipe_pergerakan_display(),
@@ -1236,26 +1202,52 @@ def stock_card_data(request):
                 })
             except Exception as e:
                 # Log error but continue processing other entries
-                print(f"Error processing entry {entry.id}: {e}")
+                logger.warning("Error processing stock card entry %s: %s", entry.id, e)
                 continue
 
         return JsonResponse({
-            "draw": int(request.GET.get('draw', 0)),
+            "draw": draw,
             "recordsTotal": total_records,
             "recordsFiltered": total_filtered,
             "data": data,
+            "next_cursor": next_cursor,
+            "next_start": start + len(entries),
         })
-        
+
     except Exception as e:
         # Return error response instead of crashing
         return JsonResponse({
-            "draw": int(request.GET.get('draw', 0)),
+            "draw": draw,
             "recordsTotal": 0,
             "recordsFiltered": 0,
             "data": [],
             "error": str(e)
         }, status=500)
 
+
+@login_required
+@require_GET
+def stock_card_balance(request):
+    """
+    Saldo kartu stok produk pada tanggal tertentu (akhir hari).
+    GET ?product_id=<id>&tanggal=YYYY-MM-DD (tanggal kosong = sekarang)
+    """
+    product = get_object_or_404(Product, pk=request.GET.get('product_id'))
+    tanggal = request.GET.get('tanggal', '')
+    at = None
+    if tanggal:
+        try:
+            at = dj_timezone.make_aware(datetime.combine(datetime.strptime(tanggal, '%Y-%m-%d').date(), datetime.max.time()))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Format tanggal harus YYYY-MM-DD'}, status=400)
+    return JsonResponse({
+        'success': True,
+        'product_id': product.id,
+        'sku': product.sku,
+        'tanggal': tanggal or dj_timezone.localdate().isoformat(),
+        'saldo': balance_as_of(product.id, at),
+    })
+
 @login_required
 @permission_required('inventory.change_inbound', raise_exception=True)
 def inbound_edit(request, pk):
@@ -1591,102 +1583,41 @@ def supplier_delete(request, pk):
 @require_POST
 def close_batch(request, batch_id):
     """
-    Menutup batch, mengubah status, dan yang paling penting:
-    Memindahkan `quantity_locked` menjadi pengurangan permanen dari `quantity`.
-    Ini menandakan barang secara fisik sudah tidak ada di rak.
+    Menutup batch: validasi dan settlement stok (quantity_locked, kartu stok) lewat
+    service yang sama dengan fullfilment (batch_settlement).
     """
+    get_object_or_404(BatchList, pk=batch_id)
     try:
-        with transaction.atomic():
-            batch = get_object_or_404(BatchList, pk=batch_id)
-            if batch.status_batch != 'completed':
-                messages.error(request, "Hanya batch yang berstatus 'completed' yang bisa ditutup.")
-                return redirect('fullfilment:index')
-
-            # 1. Ubah status batch menjadi 'closed'
-            batch.status_batch = 'closed'
-            batch.completed_at = timezone.now()
-            batch.save(update_fields=['status_batch', 'completed_at'])
-
-            # 2. Kurangi stok fisik berdasarkan item yang sudah di-pick
-            batch_items = BatchItem.objects.filter(batchlist=batch, is_picked=True)
-            for batch_item in batch_items:
-                try:
-                    stock = Stock.objects.select_for_update().get(product=batch_item.product)
-                    
-                    qty_awal_fisik = stock.quantity
-                    qty_awal_locked = stock.quantity_locked
-
-                    stock.quantity -= batch_item.picked_quantity
-                    stock.quantity_locked -= batch_item.picked_quantity
-                    stock.save(update_fields=['quantity', 'quantity_locked'])
-
-                    # 3. Buat entri StockCardEntry
-                    StockCardEntry.objects.create(
-                        product=batch_item.product,
-                        tipe_pergerakan='close_batch',
-                        qty=-batch_item.picked_quantity,
-                        qty_awal=qty_awal_fisik,
-                        qty_akhir=stock.quantity,
-                        notes=f'Stok dikunci untuk Batch {batch.nama_batch}',
-                        user=request.user,
-                        reference=batch_item
-                    )
-                except Stock.DoesNotExist:
-                    messages.warning(request, f"Stok untuk produk {batch_item.product.sku} tidak ditemukan saat Close Batch.")
-                    continue
-            
-            messages.success(request, f"Batch '{batch.nama_batch}' berhasil ditutup (Closed).")
-            return redirect('fullfilment:index')
-    
+        result = close_batch_settlement(batch_id, user=request.user)
     except Exception as e:
         logging.error(f"Error closing batch {batch_id}: {e}")
         messages.error(request, f"Terjadi kesalahan saat menutup batch: {e}")
         return redirect('fullfilment:index')
 
+    if not result.success:
+        messages.error(request, result.error)
+    else:
+        messages.success(request, f"Batch '{result.batch.nama_batch}' berhasil ditutup (Closed).")
+    return redirect('fullfilment:index')
+
 @require_POST
 def reopen_batch(request, batch_id):
+    get_object_or_404(BatchList, pk=batch_id)
     try:
-        with transaction.atomic():
-            batch = get_object_or_404(BatchList, pk=batch_id)
-            if batch.status_batch != 'closed':
-                messages.error(request, "Hanya batch yang berstatus 'closed' yang bisa di Re-Open.")
-                return redirect('fullfilment:index')
-
-            batch.status_batch = 'completed'
-            batch.save(update_fields=['status_batch'])
-
-            batch_items = BatchItem.objects.filter(batchlist=batch, is_picked=True)
-            for batch_item in batch_items:
-                try:
-                    stock = Stock.objects.select_for_update().get(product=batch_item.product)
-                    
-                    qty_awal_locked = stock.quantity_locked
-
-                    stock.quantity_locked += batch_item.picked_quantity
-                    stock.save(update_fields=['quantity_locked'])
-                    
-                    StockCardEntry.objects.create(
-                        product=batch_item.product,
-                        tipe_pergerakan='reopen_batch',
-                        qty=batch_item.picked_quantity,
-                        qty_awal=qty_awal_locked,
-                        qty_akhir=stock.quantity_locked,
-                        notes=f'Stok dikembalikan dari Re-Open Batch {batch.nama_batch}',
-                        user=request.user,
-                        reference=batch_item
-                    )
-                except Stock.DoesNotExist:
-                    messages.warning(request, f"Stok untuk produk {batch_item.product.sku} tidak ditemukan saat Re-Open Batch.")
-                    continue
-
-            messages.success(request, f"Batch '{batch.nama_batch}' berhasil dibuka kembali (Re-Opened).")
-            return redirect('fullfilment:index')
-    
+        result = reopen_batch_settlement(batch_id, user=request.user)
     except Exception as e:
         logging.error(f"Error reopening batch {batch_id}: {e}")
         messages.error(request, f"Terjadi kesalahan saat membuka kembali batch: {e}")
         return redirect('fullfilment:index')
 
+    if not result.success:
+        messages.error(request, result.error)
+        return redirect('fullfilment:index')
+    for sku in result.missing_skus:
+        messages.warning(request, f"Stok untuk produk {sku} tidak ditemukan saat Re-Open Batch.")
+    messages.success(request, f"Batch '{result.batch.nama_batch}' berhasil dibuka kembali (Re-Opened).")
+    return redirect('fullfilment:index')
+
 @login_required
 @permission_required('inventory.view_putaway', raise_exception=True)
 def putaway_list(request):
@@ -1862,7 +1793,9 @@ def putaway_scan_product(request):
         return JsonResponse({'error': 'Rak ID tidak boleh kosong'}, status=400)
     
     try:
-        product = Product.objects.get(barcode=barcode)
+        product = resolve_product(barcode)
+        if product is None:
+            raise Product.DoesNotExist
         stock = Stock.objects.filter(product=product).first()
         
         if not stock or stock.quantity_putaway <= 0:
@@ -2031,11 +1964,7 @@ def api_scan_product_for_picking(request):
         rak = get_object_or_404(Rak, id=rak_id)
 
         # Cari produk berdasarkan barcode utama atau barcode tambahan
-        product = Product.objects.filter(barcode=barcode).first()
-        if not product:
-            extra_barcode_entry = ProductExtraBarcode.objects.filter(barcode=barcode).select_related('product').first()
-            if extra_barcode_entry:
-                product = extra_barcode_entry.product
+        product = resolve_product(barcode)
 
         if not product:
             return JsonResponse({'success': False, 'error': f'Produk dengan barcode "{barcode}" tidak ditemukan.'}, status=404)
@@ -2985,37 +2914,12 @@ def update_rak_capacity_for_rak(rak_code):
     """
     Utility function untuk update capacity satu rak tertentu
     """
+    from .rak_usage import rebuild_rak_capacity
     try:
         rak = get_object_or_404(Rak, kode_rak=rak_code)
         
-        # Update capacity untuk rak ini saja
-        try:
-            capacity = RakCapacity.objects.get(rak=rak)
-        except RakCapacity.DoesNotExist:
-            capacity = RakCapacity.objects.create(rak=rak)
-        
-        # Hitung ulang capacity
-        stocks = InventoryRakStock.objects.filter(rak=rak, quantity__gt=0).select_related('product')
-        
-        total_used_width = 0
-        for stock in stocks:
-            if (stock.product.lebar_cm and stock.product.panjang_cm and 
-                stock.product.tinggi_cm and rak.lebar_cm and 
-                rak.panjang_cm and rak.tinggi_cm):
-                
-                # Hitung berdasarkan 3 dimensi
-                width_slots_needed = _calculate_width_slots_needed_for_product(
-                    rak, stock.product, stock.quantity
-                )
-                total_used_width += width_slots_needed * float(stock.product.lebar_cm)
-            elif stock.product.lebar_cm:
-                # Fallback ke perhitungan lama
-                total_used_width += float(stock.product.lebar_cm) * stock.quantity
-        
-        # Update available_front
-        rak_width_float = float(rak.lebar_cm) if rak.lebar_cm else 0
-        capacity.available_front = max(0, rak_width_float - total_used_width)
-        capacity.save()
+        # Hitung ulang RakStockUsage dan RakCapacity rak ini saja
+        rebuild_rak_capacity([rak.id])
         
         return True, f'Capacity rak {rak_code} berhasil diupdate'
         
@@ -0,0 +1,193 @@
+"""
+Engine ekspansi SKU bundling menjadi order child.
+
+explode_bundles() memproses order parent per chunk memakai map bundling terkompilasi
+(products.bundle_map):
+- SKU produk biasa  -> product parent diisi (bulk_update)
+- SKU bundling      -> order child dibuat set-based dengan satu INSERT ... SELECT per chunk
+                       (kolom parent disalin langsung di database, dikali qty bundling),
+                       parent ditandai status_bundle='Y', order_type=''
+- SKU tidak dikenal -> status_bundle='N'
+Jumlah query per chunk konstan, tidak tergantung jumlah baris. OrderHeader id_pesanan yang
+berubah di-refresh per chunk.
+
+Dipakai oleh view extract_bundling, extract_sku, dan sebagai tahap import order.
+"""
+import logging
+from collections import namedtuple
+
+from django.db import connection, transaction
+
+from products.bundle_map import get_bundle_map, products_by_upper_sku
+from .models import Order
+from .order_headers import refresh_order_headers
+
+logger = logging.getLogger(__name__)
+
+EXPLODE_CHUNK_SIZE = 2000
+CHILD_ORDER_TYPE = '3'
+
+# Field parent yang disalin ke order child
+CHILD_COPY_FIELDS = [
+    'id_pesanan', 'status', 'tanggal_pembuatan', 'jenis_pesanan', 'channel', 'nama_toko',
+    'catatan_pembeli', 'kurir', 'awb_no_tracking', 'metode_pengiriman', 'kirim_sebelum',
+    'status_order', 'status_cancel', 'status_retur', 'import_history_id',
+]
+
+# extract_sku (ekspansi ulang order Lunas yang belum punya product) juga menyalin harga dan
+# progres picking parent, sama dengan extract_sku lama
+EXTRACT_SKU_COPY_FIELDS = CHILD_COPY_FIELDS + ['harga_promosi', 'nama_batch', 'jumlah_ambil', 'status_ambil']
+
+ExplodeResult = namedtuple('ExplodeResult', ['parents', 'children_created', 'products_linked', 'failed_skus'])
+
+
+def _child_insert_columns(copy_fields=CHILD_COPY_FIELDS):
+    """
+    Kolom INSERT order child dan ekspresi SELECT-nya: field copy_fields disalin dari
+    parent (alias p), sku/product/jumlah dari map bundling (alias m), sisanya nilai default field.
+    """
+    qn = connection.ops.quote_name
+    columns, expressions, params = [], [], []
+    for field in Order._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        columns.append(qn(field.column))
+        if field.attname in copy_fields:
+            expressions.append(f'p.{qn(field.column)}')
+        elif field.attname == 'sku':
+            expressions.append('m.child_sku')
+        elif field.attname == 'product_id':
+            expressions.append('m.product_id')
+        elif field.attname == 'jumlah':
+            expressions.append(f'COALESCE(p.{qn(field.column)}, 0) * m.qty')
+        elif field.attname == 'order_type':
+            expressions.append('%s')
+            params.append(CHILD_ORDER_TYPE)
+        else:
+            expressions.append('%s')
+            params.append(field.get_db_prep_save(field.get_default(), connection))
+    return columns, expressions, params
+
+
+def _map_row_placeholder():
+    """
+    Placeholder satu baris CTE map dengan CAST eksplisit. Tanpa tipe, PostgreSQL menebak tipe
+    kolom VALUES dari isinya: chunk yang semua child-nya tidak ter-resolve (product_id NULL)
+    menjadi text dan INSERT ke kolom bigint gagal.
+    """
+    sku_type = Order._meta.get_field('sku').cast_db_type(connection)
+    product_type = Order._meta.get_field('product').target_field.rel_db_type(connection)
+    int_type = Order._meta.get_field('jumlah').cast_db_type(connection)
+    return (
+        f'(CAST(%s AS {sku_type}), CAST(%s AS {int_type}), CAST(%s AS {sku_type}), '
+        f'CAST(%s AS {product_type}), CAST(%s AS {int_type}))'
+    )
+
+
+def _insert_children(bundle_pks, sku_children, copy_fields=CHILD_COPY_FIELDS):
+    """
+    Buat order child untuk parent bundle_pks dalam satu query.
+    sku_children: {sku parent (apa adanya): [BundleChild, ...]}
+
+    CROSS JOIN dipakai agar SQLite membaca parent lewat pk lebih dulu (bukan probe index sku
+    untuk setiap baris map); di PostgreSQL tetap direncanakan sebagai join biasa.
+    """
+    if not bundle_pks:
+        return
+    qn = connection.ops.quote_name
+    table = qn(Order._meta.db_table)
+    columns, expressions, select_params = _child_insert_columns(copy_fields)
+    row_placeholder = _map_row_placeholder()
+    map_rows, map_params = [], []
+    for parent_sku, children in sku_children.items():
+        for position, child in enumerate(children):
+            map_rows.append(row_placeholder)
+            map_params.extend([parent_sku, position, child.sku, child.product_id, child.qty])
+    pk_placeholders = ', '.join(['%s'] * len(bundle_pks))
+    sql = (
+        f"WITH m (parent_sku, position, child_sku, product_id, qty) AS (VALUES {', '.join(map_rows)}) "
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"SELECT {', '.join(expressions)} FROM {table} p CROSS JOIN m "
+        f"WHERE p.{qn('id')} IN ({pk_placeholders}) AND p.{qn('sku')} = m.parent_sku "
+        f"ORDER BY p.{qn('id')}, m.position"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, map_params + select_params + list(bundle_pks))
+
+
+def explode_bundles(queryset, chunk_size=EXPLODE_CHUNK_SIZE, refresh_headers=True, copy_fields=CHILD_COPY_FIELDS):
+    """
+    Ekspansi bundling untuk order parent di queryset (diproses per chunk urut pk).
+    refresh_headers=False jika pemanggil me-refresh OrderHeader sendiri (import order).
+    copy_fields: field parent yang disalin ke child (EXTRACT_SKU_COPY_FIELDS untuk extract_sku).
+    Return ExplodeResult.
+    """
+    bundle_map = get_bundle_map()
+    parents_total = 0
+    children_created = 0
+    products_linked = 0
+    failed_skus = []
+    last_pk = 0
+    value_fields = ['pk', 'sku', 'id_pesanan']
+    # Order child yang dibuat selama proses tidak ikut diproses sebagai parent
+    max_pk = queryset.order_by('-pk').values_list('pk', flat=True).first()
+    if max_pk is None:
+        return ExplodeResult(0, 0, 0, [])
+    queryset = queryset.filter(pk__lte=max_pk)
+
+    while True:
+        parents = list(queryset.filter(pk__gt=last_pk).order_by('pk').values(*value_fields)[:chunk_size])
+        if not parents:
+            break
+        last_pk = parents[-1]['pk']
+        parents_total += len(parents)
+
+        simple_products = products_by_upper_sku({(p['sku'] or '').strip() for p in parents})
+        sku_children = {}
+        children_count = 0
+        product_updates = []
+        bundle_pks = []
+        failed_pks = []
+        touched_ids = set()
+        for parent in parents:
+            sku = (parent['sku'] or '').strip().upper()
+            if not sku:
+                continue
+            if sku in simple_products:
+                touched_ids.add(parent['id_pesanan'])
+                product_updates.append(Order(pk=parent['pk'], product_id=simple_products[sku]))
+            elif sku in bundle_map and bundle_map[sku]:
+                touched_ids.add(parent['id_pesanan'])
+                sku_children[parent['sku']] = bundle_map[sku]
+                children_count += len(bundle_map[sku])
+                bundle_pks.append(parent['pk'])
+            else:
+                failed_skus.append(sku)
+                failed_pks.append(parent['pk'])
+
+        with transaction.atomic():
+            _insert_children(bundle_pks, sku_children, copy_fields)
+            if product_updates:
+                Order.objects.bulk_update(product_updates, ['product'], batch_size=500)
+            if bundle_pks:
+                Order.objects.filter(pk__in=bundle_pks).update(status_bundle='Y', order_type='')
+            if failed_pks:
+                Order.objects.filter(pk__in=failed_pks).update(status_bundle='N')
+            if refresh_headers:
+                refresh_order_headers(touched_ids)
+
+        children_created += children_count
+        products_linked += len(product_updates)
+        if len(parents) < chunk_size:
+            break
+
+    logger.info(
+        "explode_bundles: %s parent, %s child dibuat, %s produk di-link, %s gagal",
+        parents_total, children_created, products_linked, len(failed_skus),
+    )
+    return ExplodeResult(parents_total, children_created, products_linked, failed_skus)
+
+
+def pending_bundle_parents():
+    """Order Lunas yang belum diekspansi (status_bundle bukan 'Y')."""
+    return Order.objects.filter(status__iexact='Lunas').exclude(status_bundle__iexact='Y')
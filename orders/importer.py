@@ -0,0 +1,445 @@
+"""
+Pipeline import order marketplace.
+
+File dibaca secara streaming (openpyxl read-only untuk .xlsx, csv reader untuk .csv),
+baris digabung per (id_pesanan, sku) dalam satu pass, order_type dihitung dengan
+groupby pandas, dan order yang sudah ada dicari per chunk `id_pesanan__in`.
+Seluruh langkah O(N) sehingga export marketplace puluhan ribu baris tidak timeout.
+
+Setelah order dibuat, order baru yang SKU-nya bukan produk biasa langsung diekspansi
+oleh engine bundling (orders.bundles), lalu OrderHeader untuk id_pesanan di file
+di-refresh (orders.order_headers) sebagai tahap terakhir import.
+
+Dijalankan dari Celery task (orders.tasks.import_orders_task); progress disimpan di
+cache dengan key per task_id dan dibaca oleh import_status_view.
+"""
+import csv
+import logging
+import os
+import time
+
+import openpyxl
+import pandas as pd
+from django.core.cache import cache
+from django.utils import timezone
+
+from products.models import Product
+from .bundles import explode_bundles, pending_bundle_parents
+from .models import Order, OrderImportHistory
+from .order_headers import refresh_order_headers
+from .scan_keys import invalidate_scan_keys
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 2000
+PROGRESS_TIMEOUT = 60 * 60 * 6
+SUPPORTED_EXTENSIONS = ('.xls', '.xlsx', '.csv')
+
+HEADER_MAP = {
+    'Tanggal Pembuatan': 'tanggal_pembuatan',
+    'Status': 'status',
+    'Jenis Pesanan': 'jenis_pesanan',
+    'Channel': 'channel',
+    'Nama Toko': 'nama_toko',
+    'ID Pesanan': 'id_pesanan',
+    'SKU': 'sku',
+    'Jumlah': 'jumlah',
+    'Harga Promosi': 'harga_promosi',
+    'Catatan Pembeli': 'catatan_pembeli',
+    'Kurir': 'kurir',
+    'AWB/No. Tracking': 'awb_no_tracking',
+    'Metode Pengiriman': 'metode_pengiriman',
+    'Kirim Sebelum': 'kirim_sebelum',
+}
+
+# Field Order yang tidak ada di file diisi default yang sama dengan import lama
+ORDER_DEFAULTS = {
+    'status_order': 'pending',
+    'status_cancel': 'N',
+    'status_retur': 'N',
+    'jumlah_ambil': 0,
+    'nama_batch': '',
+    'status_ambil': '',
+    'status_stock': '',
+    'status_bundle': '',
+}
+
+
+def normalize_header(h):
+    return str(h).strip().replace('.', '').replace('/', '').replace('-', '').replace('_', '').replace('  ', ' ').lower()
+
+
+NORM_HEADER_MAP = {normalize_header(k): v for k, v in HEADER_MAP.items()}
+
+
+def _is_blank(val):
+    if val is None:
+        return True
+    try:
+        if pd.isna(val):
+            return True
+    except (TypeError, ValueError):
+        pass
+    return not str(val).strip()
+
+
+def safe_str(val, default=''):
+    return default if _is_blank(val) else str(val).strip()
+
+
+def safe_int(val, default=0):
+    if _is_blank(val):
+        return default
+    try:
+        return int(float(val))
+    except (TypeError, ValueError):
+        return default
+
+
+def safe_float(val, default=0.0):
+    if _is_blank(val):
+        return default
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return default
+
+
+def progress_cache_key(task_id):
+    return f'order_import_progress_{task_id}'
+
+
+def set_import_progress(task_id, **data):
+    """Simpan status import ke cache agar bisa dipolling import_status_view."""
+    if not task_id:
+        return
+    current = cache.get(progress_cache_key(task_id)) or {}
+    current.update(data)
+    cache.set(progress_cache_key(task_id), current, PROGRESS_TIMEOUT)
+
+
+def get_import_progress(task_id):
+    return cache.get(progress_cache_key(task_id))
+
+
+def _chunks(values, size=IMPORT_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _map_header(header):
+    """Return list nama field per kolom (None untuk kolom yang diabaikan, mis. 'No.')."""
+    columns = []
+    for col in header:
+        if col is None or str(col).strip().lower() == 'no.':
+            columns.append(None)
+        else:
+            columns.append(NORM_HEADER_MAP.get(normalize_header(col), str(col).strip()))
+    return columns
+
+
+def _iter_rows_xlsx(path):
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _map_header(header)
+        for values in rows:
+            if values is None or all(_is_blank(v) for v in values):
+                continue
+            yield {col: val for col, val in zip(columns, values) if col}
+    finally:
+        wb.close()
+
+
+def _iter_rows_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as fh:
+        sample = fh.read(4096)
+        fh.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(fh, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = _map_header(header)
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            yield {col: val for col, val in zip(columns, values) if col}
+
+
+def _iter_rows_xls(path):
+    # Format .xls lama tidak didukung openpyxl; dibaca lewat pandas (xlrd)
+    df = pd.read_excel(path)
+    columns = _map_header(df.columns)
+    for values in df.itertuples(index=False, name=None):
+        yield {col: val for col, val in zip(columns, values) if col}
+
+
+def iter_order_rows(path):
+    """Generator baris file import sebagai dict {field: value}."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xlsx':
+        return _iter_rows_xlsx(path)
+    if ext == '.csv':
+        return _iter_rows_csv(path)
+    if ext == '.xls':
+        return _iter_rows_xls(path)
+    raise ValueError('File harus Excel (.xls/.xlsx) atau CSV')
+
+
+def count_data_rows(path):
+    """Perkiraan jumlah baris data untuk progress (dimension sheet / jumlah baris CSV)."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == '.xlsx':
+            wb = openpyxl.load_workbook(path, read_only=True)
+            try:
+                return max((wb.active.max_row or 1) - 1, 0)
+            finally:
+                wb.close()
+        if ext == '.csv':
+            with open(path, 'rb') as fh:
+                return max(sum(1 for _ in fh) - 1, 0)
+    except Exception:
+        logger.warning("Gagal menghitung baris %s", path, exc_info=True)
+    return 0
+
+
+def compute_order_types(grouped, brand_by_sku):
+    """
+    Hitung order_type per id_pesanan secara vektor.
+
+    grouped: DataFrame dengan kolom id_pesanan, sku, jumlah (sudah digabung per id_pesanan+sku).
+    - 1 baris & jumlah 1  -> '1' (SAT)
+    - 1 baris & jumlah >1 -> '2'
+    - >1 baris, semua SKU satu brand yang sama (dan semua produk dikenal) -> '4'
+    - selain itu -> '3'
+    Return Series order_type sejajar dengan index grouped.
+    """
+    if grouped.empty:
+        return pd.Series([], dtype=object)
+    brand = grouped['sku'].map(brand_by_sku).fillna('')
+    frame = pd.DataFrame({'id_pesanan': grouped['id_pesanan'], 'brand': brand, 'jumlah': grouped['jumlah']})
+    by_order = frame.groupby('id_pesanan', sort=False)
+    lines = by_order['brand'].transform('size')
+    brand_count = by_order['brand'].transform('nunique')
+    has_blank = (frame['brand'] == '').groupby(frame['id_pesanan'], sort=False).transform('any')
+
+    single = lines == 1
+    order_type = pd.Series('3', index=grouped.index, dtype=object)
+    order_type[single & (frame['jumlah'] == 1)] = '1'
+    order_type[single & (frame['jumlah'] != 1)] = '2'
+    order_type[~single & (brand_count == 1) & ~has_blank] = '4'
+    return order_type
+
+
+def _aggregate_rows(rows, task_id, total_rows):
+    """Satu pass: gabung baris per (id_pesanan, sku), jumlah dijumlahkan, field lain ambil yang pertama."""
+    aggregated = {}
+    read = 0
+    for row in rows:
+        read += 1
+        id_pesanan = safe_str(row.get('id_pesanan'))
+        sku = safe_str(row.get('sku')).upper()
+        key = (id_pesanan, sku)
+        jumlah = safe_int(row.get('jumlah'), 0)
+        if key in aggregated:
+            aggregated[key]['jumlah'] += jumlah
+        else:
+            row = dict(row)
+            row['id_pesanan'] = id_pesanan
+            row['sku'] = sku
+            row['jumlah'] = jumlah
+            aggregated[key] = row
+        if read % IMPORT_CHUNK_SIZE == 0:
+            set_import_progress(
+                task_id, status='reading', processed=read,
+                progress=round(0.5 * read / total_rows, 3) if total_rows else 0,
+            )
+    return aggregated, read
+
+
+def _existing_orders(id_pesanan_list):
+    """Map (id_pesanan, sku) -> (pk, status) untuk order yang sudah ada, dicari per chunk."""
+    existing = {}
+    for chunk in _chunks(id_pesanan_list):
+        for pk, id_pesanan, sku, status in Order.objects.filter(id_pesanan__in=chunk).values_list(
+            'id', 'id_pesanan', 'sku', 'status'
+        ):
+            existing.setdefault((id_pesanan, sku), (pk, status))
+    return existing
+
+
+def _products_by_sku(skus):
+    products = {}
+    for chunk in _chunks(skus):
+        for product in Product.objects.filter(sku__in=chunk).only('id', 'sku', 'brand'):
+            products[product.sku.upper()] = product
+    return products
+
+
+def _build_order(row, order_type, product, import_history):
+    kwargs = dict(ORDER_DEFAULTS)
+    kwargs.update({
+        'tanggal_pembuatan': safe_str(row.get('tanggal_pembuatan')),
+        'status': safe_str(row.get('status')),
+        'jenis_pesanan': safe_str(row.get('jenis_pesanan')),
+        'channel': safe_str(row.get('channel')),
+        'nama_toko': safe_str(row.get('nama_toko')),
+        'id_pesanan': row['id_pesanan'],
+        'sku': row['sku'],
+        'jumlah': row['jumlah'],
+        'harga_promosi': safe_float(row.get('harga_promosi'), 0.0),
+        'catatan_pembeli': '' if _is_blank(row.get('catatan_pembeli')) else row.get('catatan_pembeli'),
+        'kurir': safe_str(row.get('kurir')),
+        'awb_no_tracking': safe_str(row.get('awb_no_tracking'), ''),
+        'metode_pengiriman': safe_str(row.get('metode_pengiriman')),
+        'kirim_sebelum': safe_str(row.get('kirim_sebelum')),
+        'order_type': order_type,
+        'status_order': safe_str(row.get('status_order'), 'pending'),
+        'status_cancel': safe_str(row.get('status_cancel'), 'N'),
+        'status_retur': safe_str(row.get('status_retur'), 'N'),
+        'jumlah_ambil': safe_int(row.get('jumlah_ambil'), 0),
+        'product': product,
+        'import_history': import_history,
+    })
+    return Order(**kwargs)
+
+
+def run_order_import(path, file_name, user_id=None, task_id=None):
+    """
+    Import order dari file (.xlsx/.csv/.xls) dan catat hasilnya di OrderImportHistory.
+
+    Order yang sudah ada (id_pesanan+sku sama) hanya diupdate statusnya jika berbeda;
+    order baru dibuat dengan bulk_create per chunk. Return dict ringkasan import.
+    """
+    started = time.perf_counter()
+    total_rows = count_data_rows(path)
+    set_import_progress(task_id, status='reading', progress=0, processed=0, total=total_rows)
+
+    aggregated, read_rows = _aggregate_rows(iter_order_rows(path), task_id, total_rows)
+    keys = list(aggregated)
+
+    products_map = _products_by_sku({sku for _, sku in keys})
+    existing = _existing_orders({id_pesanan for id_pesanan, _ in keys})
+
+    grouped = pd.DataFrame(
+        [(id_pesanan, sku, aggregated[(id_pesanan, sku)]['jumlah']) for id_pesanan, sku in keys],
+        columns=['id_pesanan', 'sku', 'jumlah'],
+    )
+    brand_by_sku = {sku: (p.brand or '').strip().upper() for sku, p in products_map.items()}
+    order_types = compute_order_types(grouped, brand_by_sku).tolist()
+
+    import_history = OrderImportHistory.objects.create(
+        file_name=file_name,
+        notes='Import sedang diproses',
+        imported_by_id=user_id,
+    )
+
+    updated, created, skipped = 0, 0, 0
+    failed_notes = []
+    orders_to_update = []
+    orders_to_create = []
+
+    def flush_create():
+        nonlocal created
+        if not orders_to_create:
+            return
+        try:
+            Order.objects.bulk_create(orders_to_create, batch_size=IMPORT_CHUNK_SIZE)
+            created += len(orders_to_create)
+        except Exception as e:
+            failed_notes.append(f"Bulk create error: {str(e)}")
+        orders_to_create.clear()
+
+    total_keys = len(keys) or 1
+    for index, key in enumerate(keys):
+        row = aggregated[key]
+        id_pesanan, sku = key
+        if key in existing:
+            pk, current_status = existing[key]
+            new_status = safe_str(row.get('status'))
+            if new_status and current_status != new_status:
+                orders_to_update.append(Order(id=pk, status=new_status))
+                updated += 1
+            else:
+                skipped += 1
+        elif not id_pesanan or not sku:
+            if not sku:
+                failed_notes.append(f"Row {id_pesanan}/(SKU kosong) dilewati: SKU wajib diisi.")
+            else:
+                failed_notes.append(f"Row {id_pesanan}/{sku} dilewati: id_pesanan, sku, dan jumlah wajib diisi.")
+        else:
+            try:
+                orders_to_create.append(_build_order(row, order_types[index], products_map.get(sku), import_history))
+            except Exception as e:
+                failed_notes.append(f"Row {id_pesanan}/{sku} failed: {str(e)}")
+
+        if len(orders_to_create) >= IMPORT_CHUNK_SIZE:
+            flush_create()
+        if len(orders_to_update) >= IMPORT_CHUNK_SIZE:
+            Order.objects.bulk_update(orders_to_update, ['status'])
+            orders_to_update.clear()
+        if (index + 1) % IMPORT_CHUNK_SIZE == 0:
+            set_import_progress(
+                task_id, status='saving', progress=round(0.5 + 0.5 * (index + 1) / total_keys, 3),
+                processed=read_rows, created=created, updated=updated,
+            )
+
+    flush_create()
+    if orders_to_update:
+        Order.objects.bulk_update(orders_to_update, ['status'])
+
+    # Tahap bundling: order baru tanpa produk dicek ke map bundling dan dipecah jadi child
+    set_import_progress(task_id, status='bundling', progress=0.99, processed=read_rows, created=created, updated=updated)
+    bundles = explode_bundles(
+        pending_bundle_parents().filter(import_history=import_history, product__isnull=True),
+        refresh_headers=False,
+    )
+    sku_not_found = sorted(set(bundles.failed_skus))
+    refresh_order_headers({id_pesanan for id_pesanan, _ in keys})
+    if created:
+        # bulk_create tidak memicu signal Order; AWB baru bisa menimpa mapping scan key lama
+        invalidate_scan_keys()
+
+    duration = time.perf_counter() - started
+    rows_per_second = read_rows / duration if duration > 0 else 0.0
+
+    summary = (
+        f"Created: {created}, Updated: {updated}, Skipped: {skipped}, Failed: {len(failed_notes)}, "
+        f"Bundle child: {bundles.children_created}, SKU not found: {len(sku_not_found)}"
+    )
+    notes_for_history = summary
+    if failed_notes:
+        notes_for_history += "\nDetails: " + '; '.join(failed_notes)
+
+    import_history.notes = notes_for_history
+    import_history.row_count = read_rows
+    import_history.duration_seconds = round(duration, 3)
+    import_history.rows_per_second = round(rows_per_second, 1)
+    import_history.finished_at = timezone.now()
+    import_history.save(update_fields=['notes', 'row_count', 'duration_seconds', 'rows_per_second', 'finished_at'])
+
+    result = {
+        'created': created,
+        'updated': updated,
+        'skipped': skipped,
+        'bundle_children_created': bundles.children_created,
+        'sku_not_found_count': len(sku_not_found),
+        'sku_not_found_list': sku_not_found,
+        'failed_notes': failed_notes,
+        'rows': read_rows,
+        'rows_per_second': import_history.rows_per_second,
+        'duration_seconds': import_history.duration_seconds,
+        'import_history_id': import_history.id,
+    }
+    set_import_progress(task_id, status='done', progress=1.0, processed=read_rows, result=result)
+    logger.info("Order import %s: %s baris, %.1f rows/s", file_name, read_rows, rows_per_second)
+    return result
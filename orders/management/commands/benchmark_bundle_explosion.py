@@ -0,0 +1,126 @@
+"""
+Management command untuk benchmark ekspansi bundling.
+
+Seed produk, definisi ProductsBundling, dan N order parent bundling (ditambah sebagian
+order produk biasa dan SKU tidak dikenal) di dalam transaksi yang di-rollback, lalu
+jalankan explode_bundles dan laporkan waktu, jumlah query, serta kebenaran hasil
+(jumlah child dan qty child = qty parent x qty bundling).
+
+Usage: python manage.py benchmark_bundle_explosion --lines 50000 --bundles 500
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+
+from orders.bundles import explode_bundles
+from orders.models import Order
+from products.bundle_map import invalidate_bundle_map, parse_sku_list
+from products.models import Product, ProductsBundling
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ekspansi bundling set-based (data dummy, di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=50000, help='Jumlah order parent bundling')
+        parser.add_argument('--bundles', type=int, default=500, help='Jumlah definisi bundling')
+        parser.add_argument('--products', type=int, default=2000, help='Jumlah produk child')
+
+    def handle(self, *args, **options):
+        report = {}
+        try:
+            with transaction.atomic():
+                expected = self._seed(options['lines'], options['bundles'], options['products'])
+                invalidate_bundle_map()
+                parents = Order.objects.filter(id_pesanan__startswith='BENCH-BDL-')
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    result = explode_bundles(parents)
+                    report['elapsed'] = time.perf_counter() - start
+                report['queries'] = len(queries.captured_queries)
+                report['result'] = result
+                report['problems'] = self._verify(expected, result)
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            invalidate_bundle_map()
+
+        result = report['result']
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Parent diproses   : {result.parents}")
+        self.stdout.write(f"Child dibuat      : {result.children_created}")
+        self.stdout.write(f"Produk di-link    : {result.products_linked}")
+        self.stdout.write(f"SKU gagal         : {len(result.failed_skus)}")
+        self.stdout.write(f"Waktu             : {report['elapsed']:.2f}s")
+        self.stdout.write(f"Jumlah query      : {report['queries']}")
+        self.stdout.write("=" * 60)
+        for problem in report['problems']:
+            self.stdout.write(self.style.ERROR(f"✗ {problem}"))
+        if report['problems']:
+            raise CommandError("Hasil ekspansi bundling tidak sesuai")
+        self.stdout.write(self.style.SUCCESS("✓ Ekspansi bundling sesuai"))
+
+    def _seed(self, lines, bundle_count, product_count):
+        rng = random.Random(5)
+        self.stdout.write(f"Seeding {product_count} produk, {bundle_count} bundling, {lines} order...")
+        Product.objects.bulk_create([
+            Product(sku=f'BENCH-BDL-P{i}', barcode=f'BENCHBDL{i}', nama_produk=f'Bench Bundle Child {i}')
+            for i in range(product_count)
+        ], batch_size=5000)
+        bundles = {}
+        for i in range(bundle_count):
+            children = rng.sample(range(product_count), rng.randint(2, 4))
+            # Sebagian SKU child ditulis huruf kecil untuk menguji lookup case-insensitive
+            bundles[f'BENCH-BDL-B{i}'] = ','.join(
+                f"{'bench-bdl-p' if j % 2 else 'BENCH-BDL-P'}{c}:{rng.randint(1, 3)}" for j, c in enumerate(children)
+            )
+        ProductsBundling.objects.bulk_create([
+            ProductsBundling(sku_bundling=sku, sku_list=sku_list) for sku, sku_list in bundles.items()
+        ], batch_size=5000)
+
+        orders = []
+        expected = {'children': 0, 'qty': 0, 'simple': 0, 'unknown': 0}
+        bundle_skus = list(bundles)
+        for i in range(lines):
+            roll = rng.random()
+            jumlah = rng.randint(1, 3)
+            if roll < 0.05:
+                sku = f'BENCH-BDL-P{rng.randrange(product_count)}'
+                expected['simple'] += 1
+            elif roll < 0.07:
+                sku = f'BENCH-BDL-UNKNOWN-{i}'
+                expected['unknown'] += 1
+            else:
+                sku = rng.choice(bundle_skus)
+                pairs = parse_sku_list(bundles[sku])
+                expected['children'] += len(pairs)
+                expected['qty'] += sum(jumlah * qty for _, qty in pairs)
+            orders.append(Order(id_pesanan=f'BENCH-BDL-{i:07d}', sku=sku, jumlah=jumlah, status='Lunas'))
+        Order.objects.bulk_create(orders, batch_size=5000)
+        return expected
+
+    def _verify(self, expected, result):
+        problems = []
+        if result.children_created != expected['children']:
+            problems.append(f"child dibuat {result.children_created}, seharusnya {expected['children']}")
+        if result.products_linked != expected['simple']:
+            problems.append(f"produk di-link {result.products_linked}, seharusnya {expected['simple']}")
+        if len(result.failed_skus) != expected['unknown']:
+            problems.append(f"SKU gagal {len(result.failed_skus)}, seharusnya {expected['unknown']}")
+        children = Order.objects.filter(id_pesanan__startswith='BENCH-BDL-', order_type='3')
+        qty = children.aggregate(total=Sum('jumlah'))['total'] or 0
+        if qty != expected['qty']:
+            problems.append(f"total qty child {qty}, seharusnya {expected['qty']}")
+        if children.filter(product__isnull=True).exists():
+            problems.append("ada order child tanpa product")
+        return problems
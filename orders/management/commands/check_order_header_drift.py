@@ -0,0 +1,51 @@
+"""
+Management command untuk membandingkan OrderHeader tersimpan dengan hasil hitung ulang dari Order.
+
+Usage:
+    python manage.py check_order_header_drift            # laporan drift
+    python manage.py check_order_header_drift --verbose  # tampilkan contoh id_pesanan yang berbeda
+    python manage.py check_order_header_drift --fix      # refresh header yang drift + hapus header yatim
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.order_headers import delete_orphan_headers, find_header_drift, refresh_order_headers
+
+
+class Command(BaseCommand):
+    help = 'Drift check OrderHeader vs tabel Order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Refresh header yang drift dan hapus header yatim')
+        parser.add_argument('--verbose', action='store_true', help='Tampilkan contoh perbedaan')
+        parser.add_argument('--samples', type=int, default=20, help='Jumlah contoh perbedaan yang disimpan')
+
+    def handle(self, *args, **options):
+        drift = find_header_drift(sample_limit=options['samples'])
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"id_pesanan dicek   : {drift.checked}")
+        self.stdout.write(f"Header belum ada   : {drift.missing}")
+        self.stdout.write(f"Header yatim       : {drift.orphans}")
+        for field, count in sorted(drift.mismatched_fields.items()):
+            self.stdout.write(self.style.WARNING(f"  {field:<18}: {count} berbeda"))
+        if options.get('verbose'):
+            for id_pesanan, field, stored, expected in drift.samples:
+                if field == '*':
+                    self.stdout.write(f"    {id_pesanan}: header belum ada")
+                else:
+                    self.stdout.write(f"    {id_pesanan}.{field}: {stored!r} → seharusnya {expected!r}")
+
+        if options.get('fix') and (drift.drifted_ids or drift.orphans):
+            refreshed = refresh_order_headers(drift.drifted_ids)
+            deleted = delete_orphan_headers()
+            self.stdout.write(f"  → {refreshed} header di-refresh, {deleted} header yatim dihapus")
+
+        self.stdout.write("=" * 60)
+        if drift.drifted_ids or drift.orphans:
+            self.stdout.write(self.style.ERROR(
+                f"✗ {len(drift.drifted_ids)} header drift, {drift.orphans} header yatim"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ {drift.checked} header konsisten"))
+        self.stdout.write("=" * 60)
@@ -0,0 +1,39 @@
+"""
+Management command untuk membangun ulang proyeksi OrderHeader dari tabel Order.
+
+Usage:
+    python manage.py rebuild_order_headers
+    python manage.py rebuild_order_headers --chunk-size 2000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.order_headers import HEADER_CHUNK_SIZE, rebuild_order_headers
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang OrderHeader (satu baris per id_pesanan) dari tabel Order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=HEADER_CHUNK_SIZE, help='Jumlah id_pesanan per chunk')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        last_report = [0]
+
+        def progress(written):
+            if written - last_report[0] >= 50000:
+                last_report[0] = written
+                self.stdout.write(f"  {written} header ditulis...")
+
+        written, orphans = rebuild_order_headers(options['chunk_size'], progress=progress)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"Header ditulis       : {written}")
+        self.stdout.write(f"Header yatim dihapus : {orphans}")
+        self.stdout.write(f"Waktu                : {elapsed:.2f}s")
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ OrderHeader selesai dibangun ulang"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_alter_order_options_and_more'),
+        ('products', '0018_product_hpp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['nama_batch', 'product'], name='orders_orde_nama_ba_1393f2_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_nama_batch_product_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderimporthistory',
+            name='duration_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderimporthistory',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderimporthistory',
+            name='row_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orderimporthistory',
+            name='rows_per_second',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_orderimporthistory_throughput'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderHeader',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_pesanan', models.CharField(max_length=100, unique=True)),
+                ('order_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('status_order', models.CharField(blank=True, max_length=50, null=True)),
+                ('status_retur', models.CharField(blank=True, max_length=50, null=True)),
+                ('kurir', models.CharField(blank=True, max_length=100, null=True)),
+                ('nama_batch', models.CharField(blank=True, max_length=100, null=True)),
+                ('tanggal_pembuatan', models.CharField(blank=True, max_length=100, null=True)),
+                ('brands', models.TextField(blank=True, default='')),
+                ('line_count', models.IntegerField(default=0)),
+                ('total_qty', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Order Header',
+                'verbose_name_plural': 'Order Headers',
+                'indexes': [models.Index(fields=['nama_batch', 'order_type'], name='orders_orde_nama_ba_1a65c0_idx'), models.Index(fields=['status_order', 'tanggal_pembuatan'], name='orders_orde_status__8a9b16_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated manually
+
+from collections import defaultdict
+
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def populate_order_headers(apps, schema_editor):
+    """Isi OrderHeader dari data Order yang sudah ada (logika sama dengan orders.order_headers)"""
+    Order = apps.get_model('orders', 'Order')
+    OrderHeader = apps.get_model('orders', 'OrderHeader')
+
+    ids = list(
+        Order.objects.exclude(id_pesanan__isnull=True).exclude(id_pesanan='')
+        .order_by('id_pesanan').values_list('id_pesanan', flat=True).distinct()
+    )
+    created_count = 0
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        lines_by_id = defaultdict(list)
+        rows = Order.objects.filter(id_pesanan__in=chunk).order_by('pk').values_list(
+            'id_pesanan', 'status_bundle', 'order_type', 'status', 'status_order', 'status_retur',
+            'kurir', 'nama_batch', 'tanggal_pembuatan', 'jumlah', 'product__brand',
+        )
+        for row in rows:
+            lines_by_id[row[0]].append(row)
+        headers = []
+        for id_pesanan, lines in lines_by_id.items():
+            real_lines = [line for line in lines if line[1] != 'Y'] or lines
+            first = real_lines[0]
+            headers.append(OrderHeader(
+                id_pesanan=id_pesanan,
+                order_type=first[2],
+                status=first[3],
+                status_order=first[4],
+                status_retur=first[5],
+                kurir=first[6],
+                nama_batch=first[7],
+                tanggal_pembuatan=first[8],
+                brands=', '.join(sorted({line[10] for line in real_lines if line[10]})),
+                line_count=len(real_lines),
+                total_qty=sum(line[9] or 0 for line in real_lines),
+            ))
+        OrderHeader.objects.bulk_create(headers, ignore_conflicts=True)
+        created_count += len(headers)
+
+    print(f"Populated {created_count} order headers")
+
+
+def clear_order_headers(apps, schema_editor):
+    apps.get_model('orders', 'OrderHeader').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_orderheader'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_order_headers, clear_order_headers),
+    ]
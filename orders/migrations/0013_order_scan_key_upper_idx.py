@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:38
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_populate_orderheader'),
+        ('products', '0021_product_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(django.db.models.functions.text.Upper('id_pesanan'), name='order_id_pesanan_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(django.db.models.functions.text.Upper('awb_no_tracking'), name='order_awb_upper_idx'),
+        ),
+    ]
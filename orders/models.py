@@ -1,6 +1,9 @@
 from django.db import models
 from django.conf import settings
 from django.db import transaction
+from django.db.models.functions import Upper
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from products.models import Product
 
 # Create your models here.
@@ -12,6 +15,10 @@ class OrderImportHistory(models.Model):
     )
     file_name = models.CharField(max_length=255)
     notes = models.TextField(blank=True, null=True)
+    row_count = models.IntegerField(default=0)
+    duration_seconds = models.FloatField(blank=True, null=True)
+    rows_per_second = models.FloatField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.file_name} at {self.import_time}"
@@ -48,12 +55,50 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['id_pesanan']),
             models.Index(fields=['sku']),
+            models.Index(fields=['nama_batch', 'product']),
+            # Lookup scan station (id_pesanan / AWB tidak case sensitive), lihat orders/scan_keys.py
+            models.Index(Upper('id_pesanan'), name='order_id_pesanan_upper_idx'),
+            models.Index(Upper('awb_no_tracking'), name='order_awb_upper_idx'),
         ]
 
     def __str__(self):
         return f"Order {self.id_pesanan} - {self.sku}"
 
 
+class OrderHeader(models.Model):
+    """
+    Proyeksi header per id_pesanan (dipelihara oleh orders.order_headers).
+
+    Field skalar diambil dari baris order pertama (pk terkecil) yang bukan parent bundling,
+    brands adalah himpunan brand produk (dipisah koma, urut), line_count dan total_qty
+    dihitung dari baris yang sama. Dipakai view fulfillment agar cukup satu join per baris
+    daripada subquery ke tabel Order.
+    """
+    id_pesanan = models.CharField(max_length=100, unique=True)
+    order_type = models.CharField(max_length=50, blank=True, null=True)
+    status = models.CharField(max_length=50, blank=True, null=True)
+    status_order = models.CharField(max_length=50, blank=True, null=True)
+    status_retur = models.CharField(max_length=50, blank=True, null=True)
+    kurir = models.CharField(max_length=100, blank=True, null=True)
+    nama_batch = models.CharField(max_length=100, blank=True, null=True)
+    tanggal_pembuatan = models.CharField(max_length=100, blank=True, null=True)
+    brands = models.TextField(blank=True, default='')
+    line_count = models.IntegerField(default=0)
+    total_qty = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Order Header"
+        verbose_name_plural = "Order Headers"
+        indexes = [
+            models.Index(fields=['nama_batch', 'order_type']),
+            models.Index(fields=['status_order', 'tanggal_pembuatan']),
+        ]
+
+    def __str__(self):
+        return f"Header {self.id_pesanan} ({self.line_count} baris)"
+
+
 class OrderPrintHistory(models.Model):
     order = models.ForeignKey('orders.Order', on_delete=models.CASCADE)
     waktu_print = models.DateTimeField(auto_now_add=True)
@@ -143,3 +188,27 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.order.id_pesanan} - {self.product.sku}"
+
+
+@receiver(post_save, sender=Order)
+def refresh_order_header_on_save(sender, instance, update_fields=None, **kwargs):
+    from .order_headers import HEADER_SOURCE_FIELDS, schedule_order_header_refresh
+    # Simpan parsial yang tidak menyentuh field sumber header (mis. jumlah_ambil saat scan) diabaikan
+    if update_fields and not HEADER_SOURCE_FIELDS.intersection(update_fields):
+        return
+    schedule_order_header_refresh([instance.id_pesanan])
+
+
+@receiver(post_save, sender=Order)
+def invalidate_scan_keys_on_save(sender, instance, created, update_fields=None, **kwargs):
+    from .scan_keys import SCAN_KEY_FIELDS, invalidate_scan_keys
+    # Simpan parsial tanpa id_pesanan/AWB diabaikan; baris terhapus cukup ditangani cek ulang hit LRU
+    if not created and update_fields and not SCAN_KEY_FIELDS.intersection(update_fields):
+        return
+    transaction.on_commit(invalidate_scan_keys)
+
+
+@receiver(post_delete, sender=Order)
+def refresh_order_header_on_delete(sender, instance, **kwargs):
+    from .order_headers import schedule_order_header_refresh
+    schedule_order_header_refresh([instance.id_pesanan])
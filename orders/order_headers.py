@@ -0,0 +1,208 @@
+"""
+Pemeliharaan proyeksi OrderHeader (satu baris per id_pesanan).
+
+Header dihitung ulang dari baris Order untuk id_pesanan yang berubah:
+- refresh_order_headers(ids): dipanggil langsung setelah update massal (import, cancel,
+  assign/release batch, perubahan status fulfillment/retur),
+- schedule_order_header_refresh(ids): dipakai signal save/delete Order; id dikumpulkan dan
+  di-refresh sekali setelah transaksi commit,
+- rebuild_order_headers(): bangun ulang seluruh header (command rebuild_order_headers),
+- find_header_drift(): bandingkan header tersimpan dengan hasil hitung ulang
+  (command check_order_header_drift).
+"""
+import logging
+import threading
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Order, OrderHeader
+
+logger = logging.getLogger(__name__)
+
+HEADER_CHUNK_SIZE = 1000
+BUNDLE_PARENT = 'Y'
+
+# Field header yang disimpan (selain id_pesanan)
+HEADER_FIELDS = [
+    'order_type', 'status', 'status_order', 'status_retur', 'kurir', 'nama_batch',
+    'tanggal_pembuatan', 'brands', 'line_count', 'total_qty',
+]
+
+# Field Order yang mempengaruhi header; simpan parsial di luar field ini tidak memicu refresh
+HEADER_SOURCE_FIELDS = frozenset([
+    'id_pesanan', 'order_type', 'status', 'status_order', 'status_retur', 'kurir', 'nama_batch',
+    'tanggal_pembuatan', 'jumlah', 'product', 'product_id', 'status_bundle',
+])
+
+_LINE_FIELDS = (
+    'id_pesanan', 'status_bundle', 'order_type', 'status', 'status_order', 'status_retur',
+    'kurir', 'nama_batch', 'tanggal_pembuatan', 'jumlah', 'product__brand',
+)
+
+HeaderDrift = namedtuple('HeaderDrift', ['checked', 'missing', 'orphans', 'mismatched_fields', 'samples', 'drifted_ids'])
+
+_pending = threading.local()
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def compute_order_headers(id_pesanan_list):
+    """
+    Hitung nilai header dari baris Order. Return {id_pesanan: {field: nilai}};
+    id_pesanan yang tidak punya baris order tidak ada di hasil.
+    """
+    lines_by_id = defaultdict(list)
+    rows = Order.objects.filter(id_pesanan__in=list(id_pesanan_list)).order_by('pk').values_list(*_LINE_FIELDS)
+    for row in rows:
+        lines_by_id[row[0]].append(row)
+
+    headers = {}
+    for id_pesanan, lines in lines_by_id.items():
+        # Parent bundling yang sudah diekspansi diwakili oleh order child-nya
+        real_lines = [line for line in lines if line[1] != BUNDLE_PARENT] or lines
+        first = real_lines[0]
+        headers[id_pesanan] = {
+            'order_type': first[2],
+            'status': first[3],
+            'status_order': first[4],
+            'status_retur': first[5],
+            'kurir': first[6],
+            'nama_batch': first[7],
+            'tanggal_pembuatan': first[8],
+            'brands': ', '.join(sorted({line[10] for line in real_lines if line[10]})),
+            'line_count': len(real_lines),
+            'total_qty': sum(line[9] or 0 for line in real_lines),
+        }
+    return headers
+
+
+def refresh_order_headers(id_pesanan_list):
+    """
+    Hitung ulang dan upsert header untuk id_pesanan yang diberikan; header tanpa baris
+    order dihapus. Return jumlah header yang ditulis.
+    """
+    ids = {id_pesanan for id_pesanan in id_pesanan_list if id_pesanan}
+    written = 0
+    for chunk in _chunks(sorted(ids), HEADER_CHUNK_SIZE):
+        headers = compute_order_headers(chunk)
+        OrderHeader.objects.bulk_create(
+            [OrderHeader(id_pesanan=id_pesanan, **values) for id_pesanan, values in headers.items()],
+            update_conflicts=True,
+            unique_fields=['id_pesanan'],
+            update_fields=HEADER_FIELDS + ['updated_at'],
+        )
+        gone = [id_pesanan for id_pesanan in chunk if id_pesanan not in headers]
+        if gone:
+            OrderHeader.objects.filter(id_pesanan__in=gone).delete()
+        written += len(headers)
+    return written
+
+
+def order_ids_of(queryset):
+    """id_pesanan unik dari queryset Order (ambil sebelum update yang mengubah filter queryset)."""
+    return set(queryset.order_by().values_list('id_pesanan', flat=True).distinct())
+
+
+def _flush_pending_refresh():
+    ids = getattr(_pending, 'ids', None)
+    if not ids:
+        return
+    _pending.ids = set()
+    refresh_order_headers(ids)
+
+
+def schedule_order_header_refresh(id_pesanan_list):
+    """
+    Refresh header setelah transaksi commit (langsung jika tidak di dalam transaksi).
+    id dikumpulkan per thread sehingga delete/save ribuan baris dalam satu transaksi
+    cukup satu refresh per id_pesanan. Jika transaksi rollback, id tetap tercatat dan
+    ikut di-refresh pada commit berikutnya (refresh selalu aman diulang).
+    """
+    ids = {id_pesanan for id_pesanan in id_pesanan_list if id_pesanan}
+    if not ids:
+        return
+    pending = getattr(_pending, 'ids', None)
+    if pending is None:
+        pending = _pending.ids = set()
+    pending.update(ids)
+    transaction.on_commit(_flush_pending_refresh, robust=True)
+
+
+def _order_id_chunks(chunk_size):
+    """id_pesanan unik di tabel Order, keyset per chunk urut id_pesanan."""
+    last = ''
+    while True:
+        chunk = list(
+            Order.objects.filter(id_pesanan__gt=last)
+            .order_by('id_pesanan')
+            .values_list('id_pesanan', flat=True)
+            .distinct()[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def _orphan_headers():
+    """Header yang id_pesanan-nya sudah tidak punya baris Order."""
+    return OrderHeader.objects.exclude(Exists(Order.objects.filter(id_pesanan=OuterRef('id_pesanan'))))
+
+
+def delete_orphan_headers():
+    deleted, _ = _orphan_headers().delete()
+    return deleted
+
+
+def rebuild_order_headers(chunk_size=HEADER_CHUNK_SIZE, progress=None):
+    """Bangun ulang seluruh header. Return (jumlah header ditulis, jumlah header yatim dihapus)."""
+    written = 0
+    for chunk in _order_id_chunks(chunk_size):
+        written += refresh_order_headers(chunk)
+        if progress:
+            progress(written)
+    orphans = delete_orphan_headers()
+    logger.info("rebuild_order_headers: %s header ditulis, %s header yatim dihapus", written, orphans)
+    return written, orphans
+
+
+def find_header_drift(chunk_size=HEADER_CHUNK_SIZE, sample_limit=20):
+    """
+    Bandingkan header tersimpan dengan hasil hitung ulang dari Order.
+    Return HeaderDrift(checked, missing, orphans, mismatched_fields {field: jumlah}, samples,
+    drifted_ids). samples berisi (id_pesanan, field, nilai tersimpan, nilai seharusnya);
+    field '*' berarti header belum ada.
+    """
+    checked = 0
+    missing = 0
+    mismatched = defaultdict(int)
+    samples = []
+    drifted_ids = set()
+    for chunk in _order_id_chunks(chunk_size):
+        expected = compute_order_headers(chunk)
+        stored = {
+            row['id_pesanan']: row
+            for row in OrderHeader.objects.filter(id_pesanan__in=chunk).values('id_pesanan', *HEADER_FIELDS)
+        }
+        for id_pesanan, values in expected.items():
+            checked += 1
+            current = stored.get(id_pesanan)
+            if current is None:
+                missing += 1
+                drifted_ids.add(id_pesanan)
+                if len(samples) < sample_limit:
+                    samples.append((id_pesanan, '*', None, None))
+                continue
+            for field in HEADER_FIELDS:
+                if current[field] != values[field]:
+                    mismatched[field] += 1
+                    drifted_ids.add(id_pesanan)
+                    if len(samples) < sample_limit:
+                        samples.append((id_pesanan, field, current[field], values[field]))
+    return HeaderDrift(checked, missing, _orphan_headers().count(), dict(mismatched), samples, drifted_ids)
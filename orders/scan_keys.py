@@ -0,0 +1,155 @@
+"""
+Resolver scan order (id_pesanan / AWB) bersama untuk station scan packing & shipping.
+
+Input scan dikanonikalisasi (trim + upper) lalu dipetakan ke baris Order:
+
+1. LRU lokal per proses: scan key -> id_pesanan. Hit dibaca lewat index id_pesanan (exact),
+   baris hasilnya dicek ulang terhadap key sehingga entri basi (AWB diedit, baris dihapus)
+   otomatis jatuh ke lookup database.
+2. database: UPPER(id_pesanan) = key OR UPPER(awb_no_tracking) = key, dilayani index
+   fungsional order_id_pesanan_upper_idx / order_awb_upper_idx.
+
+Miss tidak disimpan agar order yang baru diimport langsung terbaca. Invalidasi memakai nomor
+generasi di cache Django: signal Order (create / perubahan field key) dan import order
+menaikkan generasi, proses lain mengecek paling lama setiap GENERATION_CHECK_INTERVAL detik.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+SCAN_KEY_FIELDS = frozenset(['id_pesanan', 'awb_no_tracking'])
+GENERATION_KEY = 'scan_keys:generation'
+GENERATION_CHECK_INTERVAL = 1.0
+LOCAL_MAX_ENTRIES = 100000
+
+_lock = threading.Lock()
+_local = OrderedDict()
+_local_generation = None
+_generation_checked_at = 0.0
+
+
+def canonical_scan_key(value):
+    """Key scan: tanpa spasi di tepi dan tidak case sensitive (setara iexact)."""
+    if value is None:
+        return ''
+    return str(value).strip().upper()
+
+
+def _shared_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY) or 1
+    return generation
+
+
+def _current_generation():
+    """Generasi aktif; LRU lokal dikosongkan jika generasi di shared cache berubah."""
+    global _local_generation, _generation_checked_at
+    now = time.monotonic()
+    if _local_generation is not None and now - _generation_checked_at < GENERATION_CHECK_INTERVAL:
+        return _local_generation
+    generation = _shared_generation()
+    with _lock:
+        if generation != _local_generation:
+            _local.clear()
+            _local_generation = generation
+        _generation_checked_at = now
+    return generation
+
+
+def _matches(line, key):
+    return canonical_scan_key(line.id_pesanan) == key or canonical_scan_key(line.awb_no_tracking) == key
+
+
+def scan_key_queryset(value):
+    """Queryset Order untuk input scan (id_pesanan atau AWB), lewat index fungsional UPPER."""
+    from .models import Order
+
+    key = canonical_scan_key(value)
+    return Order.objects.alias(
+        scan_id_key=Upper('id_pesanan'), scan_awb_key=Upper('awb_no_tracking'),
+    ).filter(Q(scan_id_key=key) | Q(scan_awb_key=key))
+
+
+def _remember(generation, key, lines):
+    id_pesanan = tuple(sorted({line.id_pesanan for line in lines}))
+    if not id_pesanan or None in id_pesanan:
+        return
+    with _lock:
+        if generation != _local_generation:
+            return
+        _local[key] = id_pesanan
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def resolve_scan_lines(value):
+    """
+    Baris Order (urut pk) untuk input scan id_pesanan / AWB; list kosong jika tidak ditemukan.
+    Satu query ber-index per scan.
+    """
+    from .models import Order
+
+    key = canonical_scan_key(value)
+    if not key:
+        return []
+
+    generation = _current_generation()
+    with _lock:
+        id_pesanan = _local.get(key)
+        if id_pesanan is not None:
+            _local.move_to_end(key)
+
+    if id_pesanan is not None:
+        lines = [
+            line for line in Order.objects.filter(id_pesanan__in=id_pesanan).order_by('pk')
+            if _matches(line, key)
+        ]
+        if lines:
+            return lines
+
+    lines = list(scan_key_queryset(key).order_by('pk'))
+    if lines:
+        _remember(generation, key, lines)
+    return lines
+
+
+def invalidate_scan_keys():
+    """Naikkan generasi sehingga LRU scan key di seluruh proses dianggap basi."""
+    global _local_generation, _generation_checked_at
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, _shared_generation() + 1, None)
+        generation = cache.get(GENERATION_KEY)
+    with _lock:
+        _local.clear()
+        _local_generation = generation
+        _generation_checked_at = time.monotonic()
+
+
+def warm_scan_keys():
+    """Isi LRU lokal dari seluruh order (dipakai benchmark / startup worker scan). Return jumlah key."""
+    from .models import Order
+
+    generation = _current_generation()
+    entries = {}
+    rows = Order.objects.exclude(id_pesanan__isnull=True).values_list('id_pesanan', 'awb_no_tracking')
+    for id_pesanan, awb in rows.iterator(chunk_size=5000):
+        for key in (canonical_scan_key(id_pesanan), canonical_scan_key(awb)):
+            if key:
+                entries.setdefault(key, set()).add(id_pesanan)
+    with _lock:
+        if generation != _local_generation:
+            return 0
+        for key, ids in list(entries.items())[-LOCAL_MAX_ENTRIES:]:
+            _local[key] = tuple(sorted(ids))
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+    return len(entries)
@@ -0,0 +1,21 @@
+import logging
+import os
+
+from celery import shared_task
+
+from .importer import run_order_import, set_import_progress
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def import_orders_task(path, filename, user_id=None, task_id=None):
+    try:
+        return run_order_import(path, filename, user_id=user_id, task_id=task_id)
+    except Exception as e:
+        logger.exception("Import order %s gagal", filename)
+        set_import_progress(task_id, status='error', error=str(e))
+        raise
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
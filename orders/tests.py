@@ -0,0 +1,62 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from products.bundle_map import invalidate_bundle_map
+from products.models import Product, ProductsBundling
+
+from .bundles import explode_bundles, pending_bundle_parents
+from .extract_sku import extract_sku
+from .models import Order
+
+
+class ExplodeBundlesTest(TestCase):
+    """Ekspansi bundling set-based (INSERT ... SELECT dengan CTE map)."""
+
+    def setUp(self):
+        self.child = Product.objects.create(sku='BND-CHILD', barcode='BNDCHILD', nama_produk='Child')
+        ProductsBundling.objects.create(sku_bundling='BND-GHOST', sku_list='GHOST-A:2,GHOST-B:1')
+        ProductsBundling.objects.create(sku_bundling='BND-OK', sku_list='BND-CHILD:3')
+        invalidate_bundle_map()
+
+    def _parent(self, sku, **values):
+        return Order.objects.create(
+            id_pesanan=f'INV-{sku}', sku=sku, jumlah=2, status='Lunas', nama_toko='Toko', **values
+        )
+
+    def test_bundle_with_only_unresolved_children(self):
+        # Semua child tanpa product: kolom product_id di CTE hanya berisi NULL
+        parent = self._parent('BND-GHOST')
+        with CaptureQueriesContext(connection) as queries:
+            result = explode_bundles(pending_bundle_parents())
+
+        self.assertEqual(result.children_created, 2)
+        insert_sql = next(q['sql'] for q in queries if q['sql'].lstrip().upper().startswith('WITH'))
+        self.assertIn('CAST(', insert_sql)
+        children = Order.objects.filter(id_pesanan=parent.id_pesanan).exclude(pk=parent.pk).order_by('pk')
+        self.assertEqual(
+            list(children.values_list('sku', 'product_id', 'jumlah')),
+            [('GHOST-A', None, 4), ('GHOST-B', None, 2)],
+        )
+        parent.refresh_from_db()
+        self.assertEqual(parent.status_bundle, 'Y')
+
+    def test_extract_sku_copies_price_and_picking_fields(self):
+        parent = self._parent('BND-OK', harga_promosi=15000.0, nama_batch='BATCH-1', jumlah_ambil=1, status_ambil='partial')
+        extracted, skipped = extract_sku()
+
+        self.assertEqual((extracted, skipped), (1, 0))
+        child = Order.objects.get(id_pesanan=parent.id_pesanan, product=self.child)
+        self.assertEqual(child.jumlah, 6)
+        self.assertEqual(child.harga_promosi, 15000.0)
+        self.assertEqual(child.nama_batch, 'BATCH-1')
+        self.assertEqual(child.jumlah_ambil, 1)
+        self.assertEqual(child.status_ambil, 'partial')
+
+    def test_explode_bundles_default_fields(self):
+        parent = self._parent('BND-OK', harga_promosi=15000.0, nama_batch='BATCH-1')
+        explode_bundles(pending_bundle_parents())
+
+        child = Order.objects.get(id_pesanan=parent.id_pesanan, product=self.child)
+        self.assertEqual((child.nama_toko, child.order_type), ('Toko', '3'))
+        self.assertIsNone(child.nama_batch)
@@ -11,6 +11,9 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.views.decorators.http import require_POST, require_GET
 from django.http import JsonResponse, HttpResponse
 from .excel_header_rules import validate_orders_excel_header
+from .order_headers import refresh_order_headers
+from .importer import SUPPORTED_EXTENSIONS, get_import_progress, set_import_progress
+from .tasks import import_orders_task
 from django.urls import reverse
 from django.contrib import messages
 from django.db import models
@@ -21,6 +24,7 @@ import traceback
 import logging
 from fullfilment.utils import get_sku_not_found
 from django.core.cache import cache
+from django.conf import settings
 import uuid
 from django.db.models import Count
 from django.db import transaction
@@ -248,225 +252,40 @@ def orderimport_history(request):
 @login_required
 @permission_required('orders.add_order', raise_exception=True)
 def import_orders(request):
-    import os
-    import pandas as pd
-    from django.db import transaction
-    import traceback
+    """
+    Terima file import order lalu jalankan pipeline import di Celery.
+    Progress bisa dipolling lewat import_status_view dengan task_id yang dikembalikan.
+    """
     try:
         if request.method != 'POST' or 'file' not in request.FILES:
             return JsonResponse({'error': 'Invalid request'}, status=400)
-        
+
         file = request.FILES['file']
         ext = os.path.splitext(file.name)[1].lower()
-        if ext not in ['.xls', '.xlsx']:
-            return JsonResponse({'error': 'File harus Excel (.xls/.xlsx)'}, status=400)
-        file.seek(0)
-        df = pd.read_excel(file)
-        df = df.loc[:, [c for c in df.columns if c.strip().lower() != 'no.']]
-        header_map = {
-            'Tanggal Pembuatan': 'tanggal_pembuatan',
-            'Status': 'status',
-            'Jenis Pesanan': 'jenis_pesanan',
-            'Channel': 'channel',
-            'Nama Toko': 'nama_toko',
-            'ID Pesanan': 'id_pesanan',
-            'SKU': 'sku',
-            'Jumlah': 'jumlah',
-            'Harga Promosi': 'harga_promosi',
-            'Catatan Pembeli': 'catatan_pembeli',
-            'Kurir': 'kurir',
-            'AWB/No. Tracking': 'awb_no_tracking',
-            'Metode Pengiriman': 'metode_pengiriman',
-            'Kirim Sebelum': 'kirim_sebelum',
-        }
-        def normalize_header(h):
-            return h.strip().replace('.', '').replace('/', '').replace('-', '').replace('_', '').replace('  ', ' ').lower()
-        norm_header_map = {normalize_header(k): v for k, v in header_map.items()}
-        df.rename(columns=lambda c: norm_header_map.get(normalize_header(c), c), inplace=True)
-        # NORMALIZE id_pesanan and sku for deduplication and DB query
-        df['id_pesanan'] = df['id_pesanan'].astype(str).str.strip()  # Hanya strip, tidak lower
-        df['sku'] = df['sku'].astype(str).str.strip().str.upper()  # SKU tetap upper agar konsisten
-        grouped = df.groupby(['id_pesanan', 'sku'], as_index=False).agg({**{col: 'first' for col in df.columns if col not in ['id_pesanan', 'sku', 'jumlah']}, 'jumlah': 'sum'})
-        updated, created, skipped = 0, 0, 0
-        failed_notes = []
-        orders_to_create = []
-        # --- OPTIMIZED BULK UPDATE & CREATE LOGIC ---
-        # 1. Kumpulkan semua kombinasi id_pesanan+sku dari data import
-        update_map = {}
-        for _, row in grouped.iterrows():
-            id_pesanan = row['id_pesanan']
-            sku = row['sku']
-            status = row['status'] if 'status' in row else ''
-            update_map[(id_pesanan, sku)] = status
-        # 2. Ambil semua order yang sudah ada di DB untuk kombinasi tsb (PASTIKAN NORMALISASI SAMA)
-        q_objs = [Q(id_pesanan=idp, sku=sku) for (idp, sku) in update_map.keys()]
-        if q_objs:
-            query = q_objs.pop()
-            for q in q_objs:
-                query |= q
-            existing_orders = Order.objects.filter(query)
-        else:
-            existing_orders = Order.objects.none()
-        # 3. Siapkan list untuk bulk_update
-        orders_to_update = []
-        existing_keys = set((order.id_pesanan, order.sku) for order in existing_orders)
-        # 4. Query semua SKU unik dari grouped, ambil product sekaligus
-        sku_set = set(grouped['sku'])
-        products_map = {p.sku.upper(): p for p in Product.objects.filter(sku__in=sku_set)}
-        # 5. Loop sekali saja untuk create & update
-        for _, row in grouped.iterrows():
-            id_pesanan = row['id_pesanan']
-            sku = row['sku']
-            key = (id_pesanan, sku)
-            product_obj = products_map.get(sku.upper())
-            # --- update ---
-            if key in existing_keys:
-                order = next((o for o in existing_orders if o.id_pesanan == id_pesanan and o.sku == sku), None)
-                if order:
-                    new_status = row['status'] if 'status' in row else ''
-                    if new_status and order.status != new_status:
-                        order.status = new_status
-                        orders_to_update.append(order)
-                        updated += 1
-                    else:
-                        skipped += 1
-                continue
-            # --- create ---
-            same_id = grouped[grouped['id_pesanan'] == id_pesanan]
-            try:
-                if len(same_id) == 1:
-                    if row['jumlah'] == 1:
-                        order_type = '1'
-                    else:
-                        order_type = '2'
-                else:
-                    brands = set()
-                    for _, r in same_id.iterrows():
-                        sku_lookup = str(r['sku']).strip().upper()
-                        prod = products_map.get(sku_lookup)
-                        if prod and prod.brand:
-                            brands.add(prod.brand.strip().upper())
-                        else:
-                            brands.add('')
-                    if len(brands) == 1 and list(brands)[0] != '':
-                        order_type = '4'
-                    else:
-                        order_type = '3'
-            except Exception as e:
-                failed_notes.append(f"Error determining order_type for {id_pesanan}: {str(e)}")
-                order_type = '3'
-            def safe_str(val, default=''):
-                return str(val).strip() if pd.notna(val) and str(val).strip() else default
-            def safe_int(val, default=0):
-                try:
-                    return int(val) if pd.notna(val) and str(val).strip() else default
-                except Exception:
-                    return default
-            def safe_float(val, default=0.0):
-                try:
-                    return float(val) if pd.notna(val) and str(val).strip() else default
-                except Exception:
-                    return default
-            order_kwargs = {
-                'tanggal_pembuatan': safe_str(row.get('tanggal_pembuatan')),
-                'status': safe_str(row.get('status')),
-                'jenis_pesanan': safe_str(row.get('jenis_pesanan')),
-                'channel': safe_str(row.get('channel')),
-                'nama_toko': safe_str(row.get('nama_toko')),
-                'id_pesanan': safe_str(id_pesanan),
-                'sku': safe_str(sku),
-                'jumlah': safe_int(row.get('jumlah'), 0),
-                'harga_promosi': safe_float(row.get('harga_promosi'), 0.0),
-                'catatan_pembeli': row.get('catatan_pembeli') if pd.notna(row.get('catatan_pembeli')) else '',
-                'kurir': safe_str(row.get('kurir')),
-                'awb_no_tracking': safe_str(row.get('awb_no_tracking'), ''),
-                'metode_pengiriman': safe_str(row.get('metode_pengiriman')),
-                'kirim_sebelum': safe_str(row.get('kirim_sebelum')),
-                'order_type': order_type,
-                'status_order': safe_str(row.get('status_order'), 'pending'),
-                'status_cancel': safe_str(row.get('status_cancel'), 'N'),
-                'status_retur': safe_str(row.get('status_retur'), 'N'),
-                'jumlah_ambil': safe_int(row.get('jumlah_ambil'), 0),
-            }
-            from django.forms.models import model_to_dict
-            order_fields = [f.name for f in Order._meta.get_fields() if f.concrete and not f.auto_created and f.name != 'id']
-            for f in order_fields:
-                if f not in order_kwargs:
-                    if f in ['jumlah', 'jumlah_ambil']:
-                        order_kwargs[f] = 0
-                    elif f == 'harga_promosi':
-                        order_kwargs[f] = 0.0
-                    elif f == 'nama_batch':
-                        order_kwargs[f] = ''
-                    elif f == 'import_history' or f == 'product':
-                        order_kwargs[f] = None
-                    else:
-                        order_kwargs[f] = ''
-            if product_obj:
-                order_kwargs['product'] = product_obj
-            try:
-                if not order_kwargs['id_pesanan'] or not order_kwargs['sku'] or order_kwargs['jumlah'] is None:
-                    if not order_kwargs['sku']:
-                        failed_notes.append(f"Row {id_pesanan}/(SKU kosong) dilewati: SKU wajib diisi.")
-                    else:
-                        failed_notes.append(f"Row {id_pesanan}/{sku} dilewati: id_pesanan, sku, dan jumlah wajib diisi.")
-                    continue
-                if 'jumlah_ambil' not in order_kwargs or order_kwargs['jumlah_ambil'] is None:
-                    order_kwargs['jumlah_ambil'] = 0
-                orders_to_create.append(Order(**order_kwargs))
-            except Exception as e:
-                failed_notes.append(f"Row {id_pesanan}/{sku} failed: {str(e)}")
-        # --- BULK UPDATE ---
-        if orders_to_update:
-            Order.objects.bulk_update(orders_to_update, ['status'])
-        # --- BULK CREATE SEKALI SAJA ---
-        if orders_to_create:
-            try:
-                Order.objects.bulk_create(orders_to_create, batch_size=2000)
-                created += len(orders_to_create)
-            except Exception as e:
-                failed_notes.append(f"Bulk create error: {str(e)}")
-        # --- Import history ---
-        summary = f"Created: {created}, Updated: {updated}, Skipped: {skipped}, Failed: {len(failed_notes)}"
-        
-        # Gabungkan ringkasan dengan detail error jika ada
-        notes_for_history = summary
-        if failed_notes:
-            notes_for_history += "\nDetails: " + '; '.join(failed_notes)
-
-        import_history = OrderImportHistory.objects.create(
-            file_name=file.name,
-            notes=notes_for_history,
-            imported_by=request.user if request.user.is_authenticated else None
-        )
-        
-        # Update import_history pada order yang baru dibuat
-        if created > 0:
-            # Update berdasarkan kombinasi unik id_pesanan dan sku dari data yang diimport
-            update_q = Q()
-            for _, row in grouped.iterrows():
-                update_q |= Q(id_pesanan=row['id_pesanan'], sku=row['sku'])
-            if update_q:
-                Order.objects.filter(import_history__isnull=True).filter(update_q).update(import_history=import_history)
-        # Kumpulkan info SKU not found
-        sku_not_found_list = []
-        for note in failed_notes:
-            if note.startswith("SKU ") and "is not in table products" in note:
-                sku = note.split()[1]
-                sku_not_found_list.append(sku)
-        sku_not_found_count = len(sku_not_found_list)
+        if ext not in SUPPORTED_EXTENSIONS:
+            return JsonResponse({'error': 'File harus Excel (.xls/.xlsx) atau CSV'}, status=400)
+
         task_id = request.POST.get('task_id') or str(uuid.uuid4())
-        return JsonResponse({
-            'created': created,
-            'updated': updated,
-            'skipped': skipped,
-            'sku_not_found_count': sku_not_found_count,
-            'sku_not_found_list': sku_not_found_list,
-            'failed_notes': failed_notes,
-            'status': 'Import selesai',
-            'success': True,
-            'task_id': task_id
-        })
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'order_imports')
+        os.makedirs(upload_dir, exist_ok=True)
+        path = os.path.join(upload_dir, f'{task_id}{ext}')
+        with open(path, 'wb') as dest:
+            for chunk in file.chunks():
+                dest.write(chunk)
+
+        user_id = request.user.id if request.user.is_authenticated else None
+        set_import_progress(task_id, status='queued', progress=0, file_name=file.name)
+        try:
+            import_orders_task.delay(path, file.name, user_id=user_id, task_id=task_id)
+        except Exception:
+            # Broker tidak tersedia: jalankan langsung agar import tetap bisa dipakai
+            logging.getLogger(__name__).error(
+                "Broker Celery tidak dapat dihubungi (cek CELERY_BROKER_URL), import order dijalankan sinkron", exc_info=True
+            )
+            result = import_orders_task.apply(args=(path, file.name), kwargs={'user_id': user_id, 'task_id': task_id}).get()
+            return JsonResponse({**result, 'status': 'Import selesai', 'success': True, 'task_id': task_id})
+
+        return JsonResponse({'status': 'queued', 'success': True, 'task_id': task_id})
     except Exception as e:
         tb = traceback.format_exc()
         return JsonResponse({'error': str(e), 'traceback': tb}, status=500)
@@ -483,15 +302,17 @@ def unique_order_filters(request):
         'order_type': [o for o in order_type if o],
     })
 
-# Simulasi status import (untuk demo, ganti dengan logic real sesuai kebutuhan)
-import_status = {'status': 'done', 'progress': 1.0}
-
 @login_required
 @permission_required('orders.view_order', raise_exception=True)
 def import_status_view(request):
-    # Ganti dengan logic real: cek status import dari database, cache, atau file
-    # Contoh: return JsonResponse({'status': 'processing', 'progress': 0.5})
-    return JsonResponse(import_status)
+    """Status import order berdasarkan task_id (disimpan di cache oleh orders.importer)."""
+    task_id = request.GET.get('task_id')
+    if not task_id:
+        return JsonResponse({'status': 'done', 'progress': 1.0})
+    progress = get_import_progress(task_id)
+    if progress is None:
+        return JsonResponse({'status': 'unknown', 'progress': 0, 'task_id': task_id}, status=404)
+    return JsonResponse({**progress, 'task_id': task_id})
 
 @csrf_exempt
 @login_required
@@ -1207,6 +1028,7 @@ def update_order_status_and_notes(request):
 
         # Lakukan update pada field 'status' dan 'catatan_pembeli'
         orders_to_update.update(status=new_status, catatan_pembeli=new_catatan_pembeli)
+        refresh_order_headers([id_pesanan])
 
         return JsonResponse({'success': True, 'message': f"Status dan catatan untuk Order {id_pesanan} berhasil diupdate."})
 
@@ -0,0 +1,157 @@
+"""
+Barcode resolver bersama untuk semua endpoint scan.
+
+Barcode utama (Product.barcode) dan barcode tambahan (ProductExtraBarcode) dipetakan ke
+record produk ringkas. Lookup berlapis:
+
+1. cache lokal per proses (dict) - tanpa network sama sekali
+2. cache Django (Redis di produksi) - dibagi antar worker
+3. database - exact match dulu, lalu case-insensitive; hasilnya disimpan ke dua cache di atas
+
+Invalidasi memakai nomor generasi di cache Django. Signal Product/ProductExtraBarcode
+menaikkan generasi sehingga semua entri lama tidak terpakai lagi. Proses lain mengecek
+generasi paling lama setiap GENERATION_CHECK_INTERVAL detik.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+
+BarcodeRecord = namedtuple('BarcodeRecord', ['id', 'sku', 'barcode', 'nama_produk', 'variant_produk', 'brand'])
+
+RECORD_FIELDS = list(BarcodeRecord._fields)
+GENERATION_KEY = 'barcode_resolver:generation'
+GENERATION_CHECK_INTERVAL = 1.0
+CACHE_TIMEOUT = 60 * 60 * 24
+MISS_TIMEOUT = 60
+LOCAL_MAX_ENTRIES = 200000
+_MISS = ''
+
+_lock = threading.Lock()
+_local = {}
+_local_generation = None
+_generation_checked_at = 0.0
+
+
+def normalize_barcode(value):
+    """Barcode dibandingkan tanpa spasi dan tidak case sensitive."""
+    if value is None:
+        return ''
+    return ''.join(str(value).split()).upper()
+
+
+def _shared_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY) or 1
+    return generation
+
+
+def _current_generation():
+    """Generasi aktif; cache lokal dikosongkan jika generasi di shared cache berubah."""
+    global _local_generation, _generation_checked_at
+    now = time.monotonic()
+    if _local_generation is not None and now - _generation_checked_at < GENERATION_CHECK_INTERVAL:
+        return _local_generation
+    generation = _shared_generation()
+    with _lock:
+        if generation != _local_generation:
+            _local.clear()
+            _local_generation = generation
+        _generation_checked_at = now
+    return generation
+
+
+def _shared_key(generation, normalized):
+    return f'barcode_resolver:{generation}:{normalized}'
+
+
+def _lookup_db(raw, normalized):
+    """Exact match dulu (index unik barcode), baru case-insensitive jika tidak ketemu."""
+    from .models import Product, ProductExtraBarcode
+
+    extra_fields = [f'product__{field}' for field in RECORD_FIELDS]
+    candidates = {raw, normalized}
+    for lookup, value in (('barcode__in', candidates), ('barcode__iexact', normalized)):
+        row = Product.objects.filter(**{lookup: value}).values_list(*RECORD_FIELDS).first()
+        if row is None:
+            row = ProductExtraBarcode.objects.filter(**{lookup: value}).values_list(*extra_fields).first()
+        if row is not None:
+            return BarcodeRecord(*row)
+    return None
+
+
+def resolve_barcode(value):
+    """Return BarcodeRecord untuk barcode utama/tambahan, atau None jika tidak ditemukan."""
+    normalized = normalize_barcode(value)
+    if not normalized:
+        return None
+
+    generation = _current_generation()
+    cached = _local.get(normalized)
+    if cached is not None:
+        return cached or None
+
+    shared_key = _shared_key(generation, normalized)
+    cached = cache.get(shared_key)
+    if cached is None:
+        record = _lookup_db(str(value).strip(), normalized)
+        cached = tuple(record) if record else _MISS
+        cache.set(shared_key, cached, CACHE_TIMEOUT if record else MISS_TIMEOUT)
+    record = BarcodeRecord(*cached) if cached else None
+
+    # Miss tidak disimpan di cache lokal agar barcode baru langsung terbaca setelah MISS_TIMEOUT
+    if record is not None:
+        with _lock:
+            if len(_local) >= LOCAL_MAX_ENTRIES:
+                _local.clear()
+            _local[normalized] = record
+    return record
+
+
+def resolve_product(value):
+    """
+    Resolve barcode menjadi instance Product (field ringkas sudah terisi, field lain deferred).
+    Cocok untuk filter/FK assignment tanpa query tambahan.
+    """
+    from .models import Product
+
+    record = resolve_barcode(value)
+    if record is None:
+        return None
+    return Product.from_db('default', RECORD_FIELDS, list(record))
+
+
+def invalidate_barcode_cache():
+    """Naikkan generasi sehingga seluruh cache barcode (lokal & shared) dianggap basi."""
+    global _local_generation, _generation_checked_at
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, _shared_generation() + 1, None)
+        generation = cache.get(GENERATION_KEY)
+    with _lock:
+        _local.clear()
+        _local_generation = generation
+        _generation_checked_at = time.monotonic()
+
+
+def warm_barcode_cache():
+    """Isi cache lokal dengan seluruh barcode (dipakai benchmark / startup worker scan)."""
+    from .models import Product, ProductExtraBarcode
+
+    generation = _current_generation()
+    entries = {}
+    for row in Product.objects.values_list(*RECORD_FIELDS).iterator(chunk_size=5000):
+        entries[normalize_barcode(row[2])] = BarcodeRecord(*row)
+    extra_rows = ProductExtraBarcode.objects.values_list(
+        'barcode', *[f'product__{field}' for field in RECORD_FIELDS]
+    ).iterator(chunk_size=5000)
+    for row in extra_rows:
+        entries.setdefault(normalize_barcode(row[0]), BarcodeRecord(*row[1:]))
+    with _lock:
+        if generation == _local_generation:
+            _local.update(entries)
+    return len(entries)
@@ -0,0 +1,114 @@
+"""
+Map SKU bundling terkompilasi.
+
+Seluruh ProductsBundling.sku_list di-parse sekali menjadi
+{SKU_BUNDLING: (BundleChild(sku, product_id, qty), ...)} dengan product child sudah di-resolve.
+Map disimpan di cache Django plus salinan lokal per proses dan di-invalidate dengan menaikkan
+nomor generasi: oleh signal ProductsBundling/Product, atau invalidate_bundle_map() setelah
+bulk_create. Dipakai oleh engine ekspansi bundling di orders.bundles.
+"""
+import logging
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models.functions import Upper
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'bundle_map:generation'
+GENERATION_CHECK_INTERVAL = 1.0
+CACHE_TIMEOUT = 60 * 60 * 24
+LOOKUP_CHUNK_SIZE = 2000
+
+BundleChild = namedtuple('BundleChild', ['sku', 'product_id', 'qty'])
+
+_local = {'generation': None, 'checked_at': 0.0, 'map': None}
+
+
+def parse_sku_list(sku_list):
+    """'SKU1:2,SKU2:1' -> [('SKU1', 2), ('SKU2', 1)]; qty tidak valid dianggap 1."""
+    pairs = []
+    for pair in (sku_list or '').split(','):
+        if ':' not in pair:
+            continue
+        sku_child, qty_child = pair.split(':', 1)
+        sku_child = sku_child.strip().upper()
+        try:
+            qty_child = int(qty_child)
+        except (ValueError, TypeError):
+            logger.error("Gagal konversi qty_child %r untuk sku_child=%s, default=1", qty_child, sku_child)
+            qty_child = 1
+        pairs.append((sku_child, qty_child))
+    return pairs
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def products_by_upper_sku(skus):
+    """Map SKU (upper) -> product_id, dicari case-insensitive per chunk."""
+    from .models import Product
+
+    found = {}
+    for chunk in _chunks({sku.upper() for sku in skus if sku}, LOOKUP_CHUNK_SIZE):
+        rows = Product.objects.annotate(sku_upper=Upper('sku')).filter(sku_upper__in=chunk).order_by('id')
+        for sku_upper, product_id in rows.values_list('sku_upper', 'id'):
+            found.setdefault(sku_upper, product_id)
+    return found
+
+
+def compile_bundle_map():
+    """Parse semua ProductsBundling dan resolve product child; 2 query + lookup per chunk."""
+    from .models import ProductsBundling
+
+    parsed = {}
+    for sku_bundling, sku_list in ProductsBundling.objects.values_list('sku_bundling', 'sku_list'):
+        key = (sku_bundling or '').strip().upper()
+        if key:
+            parsed.setdefault(key, parse_sku_list(sku_list))
+    child_products = products_by_upper_sku({sku for pairs in parsed.values() for sku, _ in pairs})
+    return {
+        key: tuple(BundleChild(sku, child_products.get(sku), qty) for sku, qty in pairs)
+        for key, pairs in parsed.items()
+    }
+
+
+def _shared_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY) or 1
+    return generation
+
+
+def get_bundle_map():
+    """Map bundling terkompilasi (cache lokal -> cache Django -> compile)."""
+    now = time.monotonic()
+    if _local['map'] is not None and now - _local['checked_at'] < GENERATION_CHECK_INTERVAL:
+        return _local['map']
+
+    generation = _shared_generation()
+    if _local['map'] is not None and _local['generation'] == generation:
+        _local['checked_at'] = now
+        return _local['map']
+
+    cache_key = f'bundle_map:{generation}'
+    bundle_map = cache.get(cache_key)
+    if bundle_map is None:
+        bundle_map = compile_bundle_map()
+        cache.set(cache_key, bundle_map, CACHE_TIMEOUT)
+    _local.update(generation=generation, checked_at=now, map=bundle_map)
+    return bundle_map
+
+
+def invalidate_bundle_map():
+    """Naikkan generasi; semua proses akan compile ulang map saat dipakai berikutnya."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, _shared_generation() + 1, None)
+    _local.update(generation=None, checked_at=0.0, map=None)
@@ -0,0 +1,21 @@
+"""
+Builder export produk (lihat erp_alfa/exports.py). Kolom sama dengan template import produk.
+"""
+from erp_alfa.exports import Column, ExportSpec
+from .models import Product
+
+EXPORT_FIELDS = ['sku', 'barcode', 'nama_produk', 'variant_produk', 'brand', 'rak', 'panjang_cm', 'lebar_cm',
+                 'tinggi_cm', 'berat_gram']
+NUMBER_FIELDS = {'panjang_cm', 'lebar_cm', 'tinggi_cm', 'berat_gram'}
+
+
+def product_report(params):
+    products = Product.objects.all()
+    rows = products.order_by('pk').values(*EXPORT_FIELDS)
+    return ExportSpec(
+        filename='products',
+        sheet_name='Products',
+        columns=[Column(field, field, 'number' if field in NUMBER_FIELDS else 'text') for field in EXPORT_FIELDS],
+        rows=lambda: rows.iterator(chunk_size=2000),
+        count=products.count,
+    )
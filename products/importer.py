@@ -0,0 +1,417 @@
+"""
+Pipeline import produk (master produk dari file .xlsx / .csv / .xls).
+
+File dibaca secara streaming (openpyxl read-only untuk .xlsx, csv reader untuk .csv) dan
+diproses per IMPORT_CHUNK_SIZE baris: satu query produk existing per chunk (sku__in), satu
+query cek barcode untuk produk baru, lalu bulk_create dan update massal.
+
+Mode:
+- insert: produk baru dibuat, SKU / barcode yang sudah ada ditolak (perilaku import lama)
+- upsert: produk yang SKU-nya sudah ada diupdate (nama, variant, brand, dimensi) dengan
+  update massal per batch (_update_products); sel kosong di file tidak menimpa nilai lama. Setiap field yang berubah dicatat
+  sebagai EditProductLog (bulk_create). Update massal tidak memicu signal: pemakaian rak
+  (RakStockUsage / RakCapacity) produk yang dimensinya berubah disinkronkan per chunk, cache
+  barcode resolver / pencarian diinvalidasi di akhir import.
+
+Dijalankan dari Celery task (products.tasks.import_products_task); progress disimpan di cache
+dengan key per job_id dan dibaca oleh view import_progress.
+"""
+import csv
+import logging
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+import pandas as pd
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from erp_alfa.list_queries import invalidate_list_cache
+from inventory.models import InventoryRakStock, RakStockUsage
+from inventory.rak_usage import sync_rak_usage
+from .barcode_resolver import invalidate_barcode_cache
+from .bundle_map import invalidate_bundle_map
+from .models import EditProductLog, Product, ProductImportHistory
+from .search import LIST_NAMESPACE, invalidate_product_search
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 2000
+PROGRESS_TIMEOUT = 60 * 60 * 6
+SUPPORTED_EXTENSIONS = ('.xls', '.xlsx', '.csv')
+IMPORT_MODES = ('insert', 'upsert')
+
+TEXT_FIELDS = ['nama_produk', 'variant_produk', 'brand']
+DIMENSION_FIELDS = ['panjang_cm', 'lebar_cm', 'tinggi_cm', 'berat_gram']
+# Field yang diupdate mode upsert (barcode tidak diubah: dipakai scan & barcode resolver)
+UPSERT_FIELDS = TEXT_FIELDS + DIMENSION_FIELDS
+VALID_FIELDS = ['sku', 'barcode'] + UPSERT_FIELDS
+TWO_PLACES = Decimal('0.01')
+
+
+def progress_cache_key(job_id):
+    return f'product_import_progress_{job_id}'
+
+
+def set_import_progress(job_id, **data):
+    """Simpan status import ke cache agar bisa dipolling view import_progress."""
+    if not job_id:
+        return
+    current = cache.get(progress_cache_key(job_id)) or {}
+    current.update(data)
+    cache.set(progress_cache_key(job_id), current, PROGRESS_TIMEOUT)
+
+
+def get_import_progress(job_id):
+    return cache.get(progress_cache_key(job_id))
+
+
+# ---------------------------------------------------------------------------
+# Baca file
+# ---------------------------------------------------------------------------
+
+def _is_blank(val):
+    if val is None:
+        return True
+    try:
+        if pd.isna(val):
+            return True
+    except (TypeError, ValueError):
+        pass
+    return not str(val).strip() or str(val).strip() in ('nan', 'NaN', '[null]')
+
+
+def _clean_text(val):
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)  # Sel angka Excel (barcode / SKU numerik) tanpa '.0'
+    return '' if _is_blank(val) else str(val).strip()
+
+
+def _parse_decimal(val):
+    """Dimensi sebagai Decimal 2 desimal (sama dengan kolom DB); None jika kosong / tidak valid."""
+    if _is_blank(val):
+        return None
+    try:
+        return Decimal(str(val).strip().replace(',', '.')).quantize(TWO_PLACES)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _map_header(header):
+    return [str(col).strip().replace('\ufeff', '').lower() if col is not None else None for col in header]
+
+
+def _iter_rows_xlsx(path):
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _map_header(header)
+        for values in rows:
+            if values is None or all(_is_blank(v) for v in values):
+                continue
+            yield {col: val for col, val in zip(columns, values) if col in VALID_FIELDS}
+    finally:
+        wb.close()
+
+
+def _iter_rows_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as fh:
+        sample = fh.read(4096)
+        fh.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(fh, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = _map_header(header)
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            yield {col: val for col, val in zip(columns, values) if col in VALID_FIELDS}
+
+
+def _iter_rows_xls(path):
+    # Format .xls lama tidak didukung openpyxl; dibaca lewat pandas (xlrd)
+    df = pd.read_excel(path, dtype=str)
+    columns = _map_header(df.columns)
+    for values in df.itertuples(index=False, name=None):
+        yield {col: val for col, val in zip(columns, values) if col in VALID_FIELDS}
+
+
+def iter_product_rows(path):
+    """Generator baris file import sebagai dict {field: value} (hanya VALID_FIELDS)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xlsx':
+        return _iter_rows_xlsx(path)
+    if ext == '.csv':
+        return _iter_rows_csv(path)
+    if ext == '.xls':
+        return _iter_rows_xls(path)
+    raise ValueError('File harus Excel (.xls/.xlsx) atau CSV')
+
+
+def count_data_rows(path):
+    """Perkiraan jumlah baris data untuk progress (dimension sheet / jumlah baris CSV)."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == '.xlsx':
+            wb = openpyxl.load_workbook(path, read_only=True)
+            try:
+                return max((wb.active.max_row or 1) - 1, 0)
+            finally:
+                wb.close()
+        if ext == '.csv':
+            with open(path, 'rb') as fh:
+                return max(sum(1 for _ in fh) - 1, 0)
+    except Exception:
+        logger.warning("Gagal menghitung baris %s", path, exc_info=True)
+    return 0
+
+
+def _chunks(rows, size=IMPORT_CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def _row_values(row):
+    """Nilai field dari baris file; sel kosong (dan dimensi tidak valid) tidak ikut."""
+    values = {}
+    for field in TEXT_FIELDS:
+        if field in row and not _is_blank(row[field]):
+            values[field] = _clean_text(row[field])
+    for field in DIMENSION_FIELDS:
+        if field in row:
+            parsed = _parse_decimal(row[field])
+            if parsed is not None:
+                values[field] = parsed
+    return values
+
+
+def _update_products(rows, fields):
+    """
+    Update massal produk existing: satu UPDATE ... FROM (VALUES ...) per batch.
+    rows: list (id, {field: value}) dengan semua `fields` terisi.
+
+    Pengganti QuerySet.bulk_update, yang membangun CASE WHEN per objek per field dan
+    mendominasi waktu import upsert 100k baris.
+    """
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    table = qn(Product._meta.db_table)
+    model_fields = [Product._meta.get_field(name) for name in fields]
+    columns = ', '.join(qn(column) for column in ['id'] + [field.column for field in model_fields])
+    assignments = ', '.join(
+        f'{qn(field.column)} = CAST(v.{qn(field.column)} AS {field.cast_db_type(connection)})'
+        for field in model_fields
+    )
+    placeholder = '(' + ', '.join(['%s'] * (len(model_fields) + 1)) + ')'
+    batch_size = max(1, min(IMPORT_CHUNK_SIZE, connection.ops.bulk_batch_size(['id'] + fields, rows)))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            params = []
+            for pk, values in batch:
+                params.append(pk)
+                params.extend(field.get_db_prep_save(values[field.name], connection) for field in model_fields)
+            cursor.execute(
+                f"WITH v ({columns}) AS (VALUES {', '.join([placeholder] * len(batch))}) "
+                f"UPDATE {table} SET {assignments} FROM v WHERE {table}.{qn('id')} = v.{qn('id')}",
+                params,
+            )
+
+
+def _sync_rak_capacity(product_ids):
+    """
+    Hitung ulang pemakaian rak pasangan (rak, produk) untuk produk yang dimensinya berubah,
+    seperti rakcapacity.update_rak_capacity_for_product (RakCapacity dipelihara inkremental).
+    """
+    if not product_ids:
+        return
+    pairs = set(InventoryRakStock.objects.filter(product_id__in=product_ids, quantity__gt=0).values_list('rak_id', 'product_id'))
+    pairs.update(RakStockUsage.objects.filter(product_id__in=product_ids).values_list('rak_id', 'product_id'))
+    sync_rak_usage(pairs)
+
+
+def _log_value(value):
+    return '' if value is None else str(value)
+
+
+class _ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed_notes = []
+
+
+def _import_chunk(rows, first_row, mode, seen_skus, seen_barcodes, user_id, file_name, result):
+    """Proses satu chunk baris: create produk baru dan (mode upsert) update produk existing."""
+    parsed = []
+    for offset, row in enumerate(rows):
+        row_number = first_row + offset
+        sku = _clean_text(row.get('sku'))
+        barcode = _clean_text(row.get('barcode'))
+        if not sku:
+            result.failed_notes.append(f"Row {row_number}: SKU wajib diisi")
+            continue
+        if sku in seen_skus:
+            result.failed_notes.append(f"Row {row_number}: Duplicate SKU di file: {sku}")
+            continue
+        seen_skus.add(sku)
+        parsed.append((row_number, sku, barcode, _row_values(row)))
+
+    existing = {
+        values['sku']: values
+        for values in Product.objects.filter(sku__in=[sku for _, sku, _, _ in parsed]).values(
+            'id', 'sku', 'barcode', *UPSERT_FIELDS,
+        )
+    }
+    new_barcodes = [barcode for _, sku, barcode, _ in parsed if sku not in existing and barcode]
+    taken_barcodes = set(Product.objects.filter(barcode__in=new_barcodes).values_list('barcode', flat=True))
+
+    to_create, to_update, logs = [], [], []
+    update_fields = set()
+    resized_ids = []
+    for row_number, sku, barcode, values in parsed:
+        current = existing.get(sku)
+        if current is None:
+            if not barcode:
+                result.failed_notes.append(f"Row {row_number}: Barcode wajib diisi untuk produk baru {sku}")
+            elif barcode in taken_barcodes or barcode in seen_barcodes:
+                result.failed_notes.append(f"Row {row_number}: Duplicate SKU/barcode: {sku}/{barcode}")
+            else:
+                seen_barcodes.add(barcode)
+                to_create.append(Product(sku=sku, barcode=barcode, **{'nama_produk': '', **values}))
+            continue
+
+        if mode != 'upsert':
+            result.failed_notes.append(f"Row {row_number}: Duplicate SKU/barcode: {sku}/{barcode}")
+            continue
+        changed = {field: value for field, value in values.items() if current[field] != value}
+        if not changed:
+            result.unchanged += 1
+            continue
+        # Update menulis gabungan field yang berubah di chunk; field lain tetap nilai lama
+        to_update.append((current['id'], {**{field: current[field] for field in UPSERT_FIELDS}, **changed}))
+        update_fields.update(changed)
+        if any(field in DIMENSION_FIELDS for field in changed):
+            resized_ids.append(current['id'])
+        for field, value in changed.items():
+            old_value = _log_value(current[field])
+            new_value = _log_value(value)
+            logs.append(EditProductLog(
+                product_id=current['id'],
+                edited_by_id=user_id,
+                field_name=field,
+                old_value=old_value,
+                new_value=new_value,
+                change_type='UPDATE',
+                notes=f"Field {field} diubah dari '{old_value}' menjadi '{new_value}' (import {file_name})",
+                product_sku=sku,
+                product_name=changed.get('nama_produk', current['nama_produk']),
+                product_barcode=current['barcode'],
+            ))
+
+    with transaction.atomic():
+        if to_create:
+            created = Product.objects.bulk_create(to_create, batch_size=IMPORT_CHUNK_SIZE)
+            logs.extend(
+                EditProductLog(
+                    product_id=product.pk,
+                    edited_by_id=user_id,
+                    field_name='CREATE',
+                    old_value='',
+                    new_value=f"Produk baru: {product.sku} - {product.nama_produk}",
+                    change_type='CREATE',
+                    notes=f"Produk diimpor dari file {file_name}. SKU: {product.sku}, Barcode: {product.barcode}",
+                    product_sku=product.sku,
+                    product_name=product.nama_produk,
+                    product_barcode=product.barcode,
+                )
+                for product in created
+            )
+        _update_products(to_update, sorted(update_fields))
+        if logs:
+            EditProductLog.objects.bulk_create(logs, batch_size=IMPORT_CHUNK_SIZE)
+    _sync_rak_capacity(resized_ids)
+
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+
+def run_product_import(path, file_name, user_id=None, job_id=None, mode='insert'):
+    """
+    Import produk dari file (.xlsx/.csv/.xls) per chunk dan catat hasilnya di
+    ProductImportHistory. Return dict ringkasan import.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f'Mode import tidak dikenal: {mode}')
+    started = time.perf_counter()
+    total_rows = count_data_rows(path)
+    set_import_progress(job_id, status='running', progress=0, processed=0, total=total_rows, mode=mode)
+
+    result = _ImportResult()
+    seen_skus, seen_barcodes = set(), set()
+    processed = 0
+    for chunk in _chunks(iter_product_rows(path)):
+        # Nomor baris mengikuti file (baris 1 = header)
+        _import_chunk(chunk, processed + 2, mode, seen_skus, seen_barcodes, user_id, file_name, result)
+        processed += len(chunk)
+        set_import_progress(
+            job_id, status='running', processed=processed,
+            progress=round(min(processed / total_rows, 0.99), 3) if total_rows else 0,
+            created=result.created, updated=result.updated, failed=len(result.failed_notes),
+        )
+
+    # bulk_create / update massal tidak memicu signal Product. Barcode resolver menyimpan
+    # nama / variant / brand sehingga ikut diinvalidasi saat upsert mengubah produk
+    if result.created or result.updated:
+        invalidate_barcode_cache()
+    if result.created:
+        invalidate_bundle_map()
+    if result.created or result.updated:
+        invalidate_product_search()
+        invalidate_list_cache(LIST_NAMESPACE)
+
+    duration = time.perf_counter() - started
+    failed = len(result.failed_notes)
+    summary = f"Created: {result.created}, Updated: {result.updated}, Unchanged: {result.unchanged}, Failed: {failed}"
+    ProductImportHistory.objects.create(
+        file_name=file_name,
+        notes=summary + ('\n' + '\n'.join(result.failed_notes) if result.failed_notes else ''),
+        success_count=result.created + result.updated,
+        failed_count=failed,
+        imported_by_id=user_id,
+    )
+
+    summary_result = {
+        'created': result.created,
+        'updated': result.updated,
+        'unchanged': result.unchanged,
+        'failed': failed,
+        'failed_notes': result.failed_notes[:100],
+        'rows': processed,
+        'duration_seconds': round(duration, 3),
+        'rows_per_second': round(processed / duration, 1) if duration > 0 else 0.0,
+    }
+    set_import_progress(job_id, status='done', progress=1.0, processed=processed, result=summary_result)
+    logger.info("Product import %s (%s): %s baris dalam %.1fs", file_name, mode, processed, duration)
+    return summary_result
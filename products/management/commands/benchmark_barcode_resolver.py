@@ -0,0 +1,113 @@
+"""
+Management command untuk micro-benchmark barcode resolver.
+
+Seed N produk dummy (sebagian dengan barcode tambahan) di dalam transaksi yang
+di-rollback, lalu ukur latency p50/p99 untuk:
+- lookup lama (Product.filter(barcode) + fallback ProductExtraBarcode)
+- resolver cold (cache kosong, ke database)
+- resolver warm (cache lokal proses)
+
+Usage: python manage.py benchmark_barcode_resolver --products 100000 --samples 100000
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.barcode_resolver import invalidate_barcode_cache, resolve_barcode, warm_barcode_cache
+from products.models import Product, ProductExtraBarcode
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency p50/p99 barcode resolver (data dummy, di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Jumlah produk dummy')
+        parser.add_argument('--samples', type=int, default=100000, help='Jumlah resolve untuk putaran warm')
+        parser.add_argument('--db-samples', type=int, default=2000,
+                            help='Jumlah lookup untuk putaran yang menyentuh database (legacy & cold)')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                barcodes = self._seed(options['products'])
+                results = self._measure(barcodes, options['samples'], options['db_samples'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            # Entri produk dummy tidak boleh tertinggal di cache setelah rollback
+            invalidate_barcode_cache()
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Mode':<16} {'Samples':>10} {'p50 (us)':>12} {'p99 (us)':>12}")
+        for mode, timings in results:
+            self.stdout.write(
+                f"{mode:<16} {len(timings):>10} {_percentile(timings, 50):>12.1f} {_percentile(timings, 99):>12.1f}"
+            )
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    def _seed(self, count):
+        self.stdout.write(f"Seeding {count} produk dummy...")
+        products = Product.objects.bulk_create([
+            Product(sku=f'BENCH-BC-SKU-{i}', barcode=f'BENCHBC{i:08d}', nama_produk=f'Bench Product {i}')
+            for i in range(count)
+        ], batch_size=5000)
+        extras = [
+            ProductExtraBarcode(product=product, barcode=f'BENCHXB{i:08d}')
+            for i, product in enumerate(products) if i % 5 == 0
+        ]
+        ProductExtraBarcode.objects.bulk_create(extras, batch_size=5000)
+        invalidate_barcode_cache()
+        return [p.barcode for p in products] + [e.barcode for e in extras]
+
+    def _measure(self, barcodes, samples, db_samples):
+        rng = random.Random(42)
+        db_sample = [rng.choice(barcodes) for _ in range(db_samples)]
+        # Scanner sering mengirim huruf kecil / spasi di ujung
+        db_sample = [b.lower() + ' ' if i % 3 == 0 else b for i, b in enumerate(db_sample)]
+
+        legacy = []
+        for barcode in db_sample:
+            start = time.perf_counter()
+            product = Product.objects.filter(barcode=barcode).first()
+            if not product:
+                entry = ProductExtraBarcode.objects.filter(barcode=barcode).select_related('product').first()
+                product = entry.product if entry else None
+            legacy.append((time.perf_counter() - start) * 1e6)
+
+        invalidate_barcode_cache()
+        cold = []
+        for barcode in db_sample:
+            start = time.perf_counter()
+            resolve_barcode(barcode)
+            cold.append((time.perf_counter() - start) * 1e6)
+
+        warm_barcode_cache()
+        warm = []
+        misses = 0
+        for _ in range(samples):
+            barcode = rng.choice(barcodes)
+            start = time.perf_counter()
+            record = resolve_barcode(barcode)
+            warm.append((time.perf_counter() - start) * 1e6)
+            if record is None:
+                misses += 1
+        if misses:
+            self.stdout.write(self.style.ERROR(f"✗ {misses} barcode tidak ter-resolve"))
+
+        return [('legacy', legacy), ('resolver-cold', cold), ('resolver-warm', warm)]
@@ -0,0 +1,109 @@
+"""
+Management command untuk benchmark pipeline import produk (products.importer).
+
+Di dalam transaksi yang di-rollback:
+1. insert: file CSV N produk baru diimpor dengan mode insert
+2. upsert: file CSV N baris (SKU yang sama, dimensi / brand / nama berubah, ditambah
+   --new-ratio produk baru) diimpor dengan mode upsert - bulk_update + EditProductLog per field
+
+Per tahap diukur waktu, baris/detik, jumlah query dan hasil created / updated.
+
+Usage: python manage.py benchmark_product_import --rows 100000
+"""
+
+import csv
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products.barcode_resolver import invalidate_barcode_cache
+from products.bundle_map import invalidate_bundle_map
+from products.importer import run_product_import
+from products.models import EditProductLog
+from products.search import invalidate_product_search
+
+HEADER = ['sku', 'barcode', 'nama_produk', 'variant_produk', 'brand', 'panjang_cm', 'lebar_cm', 'tinggi_cm', 'berat_gram']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark import produk insert + upsert dari CSV (di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Jumlah baris file import')
+        parser.add_argument('--new-ratio', type=float, default=0.1, help='Porsi produk baru di file upsert')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        new_rows = int(rows * options['new_ratio'])
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            insert_path = os.path.join(directory, 'insert.csv')
+            upsert_path = os.path.join(directory, 'upsert.csv')
+            _write_csv(insert_path, [
+                [f'BENCH-IMP-{i:07d}', f'BENCHIMP{i:08d}', f'Bench Import {i}', 'Hitam', 'Alfa', '10', '20', '5', '250']
+                for i in range(rows)
+            ])
+            # Upsert: baris lama dengan dimensi & brand baru (sebagian tidak berubah) + produk baru
+            _write_csv(upsert_path, [
+                [f'BENCH-IMP-{i:07d}', f'BENCHIMP{i:08d}', f'Bench Import {i}', 'Hitam',
+                 'Nusantara' if i % 2 else 'Alfa', '10', '20', str(5 + i % 3), '250']
+                for i in range(rows - new_rows)
+            ] + [
+                [f'BENCH-IMP-{i:07d}', f'BENCHIMP{i:08d}', f'Bench Import {i}', 'Putih', 'Garuda', '11', '21', '6', '300']
+                for i in range(rows, rows + new_rows)
+            ])
+
+            try:
+                with transaction.atomic():
+                    results.append(self._run('insert', insert_path, 'insert'))
+                    results.append(self._run('upsert', upsert_path, 'upsert'))
+                    logs = EditProductLog.objects.filter(product_sku__startswith='BENCH-IMP-').count()
+                    self.stdout.write(f"EditProductLog dibuat: {logs}")
+                    raise _Rollback()
+            except _Rollback:
+                pass
+            finally:
+                # Produk dummy tidak boleh tertinggal di cache setelah rollback
+                invalidate_barcode_cache()
+                invalidate_bundle_map()
+                invalidate_product_search()
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Mode':<8} {'Baris':>8} {'Waktu (s)':>10} {'Baris/s':>9} {'Query':>7} {'Created':>8} {'Updated':>8}")
+        for mode, elapsed, queries, result in results:
+            self.stdout.write(
+                f"{mode:<8} {result['rows']:>8} {elapsed:>10.2f} {result['rows'] / elapsed:>9.0f} {queries:>7} "
+                f"{result['created']:>8} {result['updated']:>8}"
+            )
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    def _run(self, label, path, mode):
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            result = run_product_import(path, os.path.basename(path), mode=mode)
+            elapsed = time.perf_counter() - start
+        if result['failed']:
+            self.stdout.write(self.style.ERROR(f"✗ {label}: {result['failed']} baris gagal, mis. {result['failed_notes'][:3]}"))
+        self.stdout.write(f"{label}: {elapsed:.2f}s")
+        return label, elapsed, queries[0], result
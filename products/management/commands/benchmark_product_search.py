@@ -0,0 +1,145 @@
+"""
+Management command untuk benchmark latency pencarian produk per ketikan (autocomplete).
+
+Seed N produk dummy (nama dari kombinasi jenis / brand / warna / ukuran) di dalam transaksi
+yang di-rollback, lalu simulasikan user mengetik query huruf demi huruf (nama, SKU, barcode).
+Setiap ketikan diukur untuk:
+- legacy: OR icontains sku/barcode/nama/variant/brand + count() + slice 20
+- search: products.search.search_products tanpa cache (ranking + limit + 1, tanpa count)
+- search-hot: search_products dengan cache query populer (ketikan yang sama diulang user lain)
+
+Usage: python manage.py benchmark_product_search --products 200000 --typists 30
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from products.models import Product
+from products.search import invalidate_product_search, search_products
+
+JENIS = ['Kaos', 'Kemeja', 'Celana', 'Jaket', 'Hoodie', 'Rok', 'Dress', 'Sepatu', 'Sandal', 'Topi', 'Tas', 'Dompet']
+MODEL = ['Polos', 'Oversize', 'Slim Fit', 'Cargo', 'Chino', 'Denim', 'Flanel', 'Basic', 'Premium', 'Sport']
+BRAND = ['Alfa', 'Nusantara', 'Garuda', 'Rajawali', 'Merapi', 'Bromo', 'Samudra', 'Pelangi', 'Mentari', 'Cendana']
+WARNA = ['Hitam', 'Putih', 'Navy', 'Merah', 'Abu', 'Hijau', 'Coklat', 'Krem', 'Biru', 'Kuning']
+UKURAN = ['S', 'M', 'L', 'XL', 'XXL', '38', '39', '40', '41', '42']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _legacy_autocomplete(q):
+    qs = Product.objects.filter(
+        Q(sku__icontains=q) |
+        Q(barcode__icontains=q) |
+        Q(nama_produk__icontains=q) |
+        Q(variant_produk__icontains=q) |
+        Q(brand__icontains=q)
+    )
+    total = qs.count()
+    return list(qs[:20]), 20 < total
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency per ketikan pencarian produk: legacy icontains + count vs search service (di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200000, help='Jumlah produk dummy')
+        parser.add_argument('--typists', type=int, default=30, help='Jumlah query yang diketik huruf demi huruf')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                self._seed(options['products'])
+                results = self._measure(options['products'], options['typists'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            # Id produk dummy tidak boleh tertinggal di cache setelah rollback
+            invalidate_product_search()
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Mode':<12} {'Ketikan':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'Query/ketik':>12}")
+        for mode, timings, queries in results:
+            self.stdout.write(
+                f"{mode:<12} {len(timings):>8} {_percentile(timings, 50):>10.2f} "
+                f"{_percentile(timings, 99):>10.2f} {queries / len(timings):>12.2f}"
+            )
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    def _seed(self, count):
+        self.stdout.write(f"Seeding {count} produk dummy...")
+        rng = random.Random(7)
+        for start in range(0, count, 5000):
+            Product.objects.bulk_create([
+                Product(
+                    sku=f'BENCH-SRC-{i:07d}',
+                    barcode=f'899{i:010d}',
+                    nama_produk=f'{rng.choice(JENIS)} {rng.choice(MODEL)} {rng.choice(BRAND)} {i % 997}',
+                    variant_produk=f'{rng.choice(WARNA)} {rng.choice(UKURAN)}',
+                    brand=rng.choice(BRAND),
+                )
+                for i in range(start, min(start + 5000, count))
+            ])
+        invalidate_product_search()
+
+    def _queries(self, count, typists):
+        rng = random.Random(42)
+        targets = []
+        for n in range(typists):
+            kind = n % 3
+            i = rng.randrange(count)
+            if kind == 0:
+                targets.append(f'{rng.choice(JENIS)} {rng.choice(WARNA)}'.lower())
+            elif kind == 1:
+                targets.append(f'BENCH-SRC-{i:07d}')
+            else:
+                targets.append(f'899{i:010d}')
+        # Setiap query diketik huruf demi huruf (mulai 2 karakter, seperti form PO / opname)
+        keystrokes = [target[:length] for target in targets for length in range(2, len(target) + 1)]
+        return targets, keystrokes
+
+    def _timed(self, keystrokes, func):
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        timings = []
+        with connection.execute_wrapper(count_queries):
+            for q in keystrokes:
+                start = time.perf_counter()
+                func(q)
+                timings.append((time.perf_counter() - start) * 1000)
+        return timings, queries[0]
+
+    def _measure(self, count, typists):
+        targets, keystrokes = self._queries(count, typists)
+        self.stdout.write(f"{len(keystrokes)} ketikan dari {typists} query")
+
+        # SKU / barcode yang diketik lengkap harus menjadi hasil teratas
+        for target in targets[1::3] + targets[2::3]:
+            products = search_products(target, use_cache=False).products
+            if not products or target not in (products[0].sku, products[0].barcode):
+                self.stdout.write(self.style.ERROR(f"✗ {target} bukan hasil teratas"))
+
+        legacy = self._timed(keystrokes, _legacy_autocomplete)
+        search = self._timed(keystrokes, lambda q: search_products(q, use_cache=False))
+        invalidate_product_search()
+        self._timed(keystrokes, search_products)  # user pertama mengisi cache
+        hot = self._timed(keystrokes, search_products)
+        return [('legacy', *legacy), ('search', *search), ('search-hot', *hot)]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:33
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_product_hpp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productextrabarcode',
+            name='barcode',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Upper('barcode'), name='product_barcode_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productextrabarcode',
+            index=models.Index(django.db.models.functions.text.Upper('barcode'), name='extrabarcode_upper_idx'),
+        ),
+    ]
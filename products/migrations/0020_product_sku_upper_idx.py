@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 14:45
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_barcode_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Upper('sku'), name='product_sku_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated manually
+
+from django.db import migrations
+
+# Index GIN trigram untuk pencarian icontains (UPPER(col::text) LIKE UPPER('%...%')) pada
+# kartu stok dan pencarian produk. Hanya PostgreSQL; database lain dilewati.
+TRGM_INDEXES = [
+    ('product_sku_trgm_idx', 'sku'),
+    ('product_barcode_trgm_idx', 'barcode'),
+    ('product_nama_trgm_idx', 'nama_produk'),
+]
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "products_product" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRGM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0020_product_sku_upper_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.2 on 2026-10-18 16:16
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# Index untuk products/search.py (hanya PostgreSQL; database lain dilewati):
+# - GIN trigram pada search_text untuk LIKE '%KATA%'
+# - text_pattern_ops pada UPPER(kolom::text) untuk prefix istartswith (index UPPER btree biasa
+#   tidak dipakai LIKE 'X%' di luar collation C)
+SEARCH_INDEXES = [
+    ('product_search_text_trgm_idx', 'USING gin ("search_text" gin_trgm_ops)'),
+    ('product_sku_prefix_idx', '(UPPER("sku"::text) text_pattern_ops)'),
+    ('product_barcode_prefix_idx', '(UPPER("barcode"::text) text_pattern_ops)'),
+    ('product_nama_prefix_idx', '(UPPER("nama_produk"::text) text_pattern_ops)'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, definition in SEARCH_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "products_product" {definition}')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_product_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_text',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Upper(django.db.models.functions.text.Concat('sku', models.Value(' '), 'barcode', models.Value(' '), 'nama_produk', models.Value(' '), django.db.models.functions.comparison.Coalesce('variant_produk', models.Value('')), models.Value(' '), django.db.models.functions.comparison.Coalesce('brand', models.Value('')))), output_field=models.TextField()),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.db.models.functions import Coalesce, Concat, Upper
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
 # Create your models here.
 
@@ -25,6 +28,25 @@ class Product(models.Model):
     last_purchase_date = models.DateTimeField(null=True, blank=True, help_text="Tanggal pembelian terakhir")
     hpp = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, help_text="Harga Pokok Penjualan (HPP) - Weighted Average")
 
+    # Teks pencarian (lihat products/search.py), dihitung database di setiap insert/update
+    # termasuk bulk_create / bulk_update / update()
+    search_text = models.GeneratedField(
+        expression=Upper(Concat(
+            'sku', models.Value(' '), 'barcode', models.Value(' '), 'nama_produk', models.Value(' '),
+            Coalesce('variant_produk', models.Value('')), models.Value(' '), Coalesce('brand', models.Value('')),
+        )),
+        output_field=models.TextField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Lookup barcode case-insensitive dari barcode resolver
+            models.Index(Upper('barcode'), name='product_barcode_upper_idx'),
+            # Lookup SKU case-insensitive dari ekspansi bundling
+            models.Index(Upper('sku'), name='product_sku_upper_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nama_produk} ({self.barcode})"
 
@@ -67,7 +89,12 @@ class ProductsBundling(models.Model):
 
 class ProductExtraBarcode(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='extra_barcodes')
-    barcode = models.CharField(max_length=64)
+    barcode = models.CharField(max_length=64, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(Upper('barcode'), name='extrabarcode_upper_idx'),
+        ]
 
     def __str__(self):
         return f"{self.barcode} (extra for {self.product})"
@@ -120,3 +147,43 @@ class EditProductLog(models.Model):
         else:
             return f"{self.product_sku} (DELETED) - {self.field_name} changed by {self.edited_by} at {self.edited_at}"
 
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductExtraBarcode)
+def invalidate_barcode_cache_on_change(sender, instance, **kwargs):
+    """
+    Invalidate cache barcode resolver ketika barcode produk atau barcode tambahan berubah
+    """
+    from .barcode_resolver import RECORD_FIELDS, invalidate_barcode_cache
+    update_fields = kwargs.get('update_fields')
+    if sender is Product and update_fields and not set(update_fields) & set(RECORD_FIELDS):
+        return  # Mis. update HPP saja, record barcode tidak berubah
+    invalidate_barcode_cache()
+
+
+@receiver([post_save, post_delete], sender=ProductsBundling)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_bundle_map_on_change(sender, instance, **kwargs):
+    """
+    Invalidate map bundling terkompilasi ketika definisi bundling atau SKU produk berubah
+    """
+    from .bundle_map import invalidate_bundle_map
+    update_fields = kwargs.get('update_fields')
+    if sender is Product and update_fields and 'sku' not in update_fields:
+        return  # Product child hanya di-resolve lewat SKU
+    invalidate_bundle_map()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_search_on_change(sender, instance, **kwargs):
+    """
+    Invalidate cache hasil pencarian produk dan count list produk ketika field yang dicari berubah
+    """
+    from erp_alfa.list_queries import invalidate_list_cache
+    from .search import LIST_NAMESPACE, SEARCH_FIELDS, invalidate_product_search
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not set(update_fields) & set(SEARCH_FIELDS + ('rak', 'is_active')):
+        return  # Mis. update HPP / harga beli saja
+    invalidate_product_search()
+    invalidate_list_cache(LIST_NAMESPACE)
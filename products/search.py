@@ -0,0 +1,183 @@
+"""
+Pencarian produk bersama untuk autocomplete, grid produk dan lookup (inbound, opname, PO).
+
+- Product.search_text: kolom generated UPPER(sku barcode nama_produk variant_produk brand),
+  selalu sinkron karena dihitung database (termasuk bulk_create / bulk_update / update()).
+- Query dipecah per kata; setiap kata harus ada di search_text (LIKE '%KATA%', memakai index
+  GIN pg_trgm product_search_text_trgm_idx). Jika semua kata lebih pendek dari MIN_TRGM_LENGTH
+  (trigram tidak bisa dipakai), query hanya dicocokkan sebagai prefix SKU / barcode / nama
+  (index text_pattern_ops).
+- Urutan relevansi: SKU/barcode persis, prefix SKU/barcode, prefix nama, sisanya; di dalam
+  tier urut nama_produk, id.
+- Tanpa count(): diambil limit + 1 baris untuk has_more.
+- Cache lokal per proses (LRU) untuk query yang sering diketik: menyimpan id hasil saja, baris
+  diambil ulang lewat pk. Invalidasi memakai generasi di cache Django seperti barcode_resolver
+  (signal Product menaikkan generasi) + HOT_CACHE_TTL untuk perubahan yang tidak lewat signal.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Q, Value, When
+
+SEARCH_FIELDS = ('sku', 'barcode', 'nama_produk', 'variant_produk', 'brand')
+LIST_NAMESPACE = 'products'
+MIN_TRGM_LENGTH = 3
+MAX_TOKENS = 8
+MAX_LIMIT = 1000
+
+GENERATION_KEY = 'product_search:generation'
+GENERATION_CHECK_INTERVAL = 1.0
+HOT_CACHE_SIZE = 2000
+HOT_CACHE_TTL = 30
+
+SearchPage = namedtuple('SearchPage', ['products', 'has_more'])
+
+_lock = threading.Lock()
+_hot = OrderedDict()
+_local_generation = None
+_generation_checked_at = 0.0
+
+
+def normalize_query(value):
+    """Query dibandingkan uppercase dengan spasi tunggal (sama dengan isi search_text)."""
+    return ' '.join(str(value or '').split()).upper()
+
+
+def search_filter(query):
+    """Q pencocokan produk untuk query, atau None jika query kosong."""
+    normalized = normalize_query(query)
+    if not normalized:
+        return None
+    tokens = normalized.split(' ')[:MAX_TOKENS]
+    if max(len(token) for token in tokens) < MIN_TRGM_LENGTH:
+        return (
+            Q(sku__istartswith=normalized) |
+            Q(barcode__istartswith=normalized) |
+            Q(nama_produk__istartswith=normalized)
+        )
+    condition = Q()
+    for token in tokens:
+        condition &= Q(search_text__contains=token)
+    return condition
+
+
+def rank_expression(query):
+    """Tier relevansi (0 = paling relevan) untuk order_by."""
+    normalized = normalize_query(query)
+    return Case(
+        When(Q(sku__iexact=normalized) | Q(barcode__iexact=normalized), then=Value(0)),
+        When(Q(sku__istartswith=normalized) | Q(barcode__istartswith=normalized), then=Value(1)),
+        When(nama_produk__istartswith=normalized, then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )
+
+
+def ranked_queryset(query, queryset=None):
+    """Produk yang cocok dengan query, terurut relevansi."""
+    from .models import Product
+
+    queryset = queryset if queryset is not None else Product.objects.all()
+    condition = search_filter(query)
+    if condition is None:
+        return queryset.none()
+    return queryset.filter(condition).annotate(search_rank=rank_expression(query)).order_by(
+        'search_rank', 'nama_produk', 'id',
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cache query populer
+# ---------------------------------------------------------------------------
+
+def _shared_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY) or 1
+    return generation
+
+
+def _check_generation():
+    """Kosongkan cache lokal jika generasi di shared cache berubah."""
+    global _local_generation, _generation_checked_at
+    now = time.monotonic()
+    if _local_generation is not None and now - _generation_checked_at < GENERATION_CHECK_INTERVAL:
+        return
+    generation = _shared_generation()
+    with _lock:
+        if generation != _local_generation:
+            _hot.clear()
+            _local_generation = generation
+        _generation_checked_at = now
+
+
+def _hot_get(key):
+    _check_generation()
+    with _lock:
+        entry = _hot.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > HOT_CACHE_TTL:
+            del _hot[key]
+            return None
+        _hot.move_to_end(key)
+        return entry[1]
+
+
+def _hot_set(key, value):
+    with _lock:
+        _hot[key] = (time.monotonic(), value)
+        _hot.move_to_end(key)
+        while len(_hot) > HOT_CACHE_SIZE:
+            _hot.popitem(last=False)
+
+
+def invalidate_product_search():
+    """Naikkan generasi sehingga cache pencarian di semua proses tidak terpakai lagi."""
+    global _local_generation, _generation_checked_at
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, _shared_generation() + 1, None)
+        generation = cache.get(GENERATION_KEY)
+    with _lock:
+        _hot.clear()
+        _local_generation = generation
+        _generation_checked_at = time.monotonic()
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def search_products(query, limit=20, offset=0, queryset=None, use_cache=True):
+    """
+    Satu halaman hasil pencarian: SearchPage(products, has_more).
+
+    queryset hanya untuk select_related / only (bukan filter), karena hasil di-cache per query.
+    """
+    from .models import Product
+
+    normalized = normalize_query(query)
+    if not normalized:
+        return SearchPage([], False)
+    limit = min(max(int(limit), 1), MAX_LIMIT)
+    offset = max(int(offset), 0)
+    queryset = queryset if queryset is not None else Product.objects.all()
+
+    key = (normalized, offset, limit)
+    cached = _hot_get(key) if use_cache else None
+    if cached is not None:
+        ids, has_more = cached
+        by_id = queryset.in_bulk(ids)
+        return SearchPage([by_id[pk] for pk in ids if pk in by_id], has_more)
+
+    products = list(ranked_queryset(normalized, queryset)[offset:offset + limit + 1])
+    has_more = len(products) > limit
+    products = products[:limit]
+    if use_cache:
+        _hot_set(key, ([product.pk for product in products], has_more))
+    return SearchPage(products, has_more)
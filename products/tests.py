@@ -1,3 +1,53 @@
+import csv
+import os
+import tempfile
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from inventory.models import InventoryRakStock, Rak, RakStockUsage
+from inventory.rak_usage import find_capacity_drift
+
+from .barcode_resolver import invalidate_barcode_cache, resolve_barcode
+from .importer import run_product_import
+from .models import Product
+
+
+class ProductUpsertImportTest(TestCase):
+    """Upsert memakai update massal (tanpa signal): cache barcode dan kapasitas rak harus ikut diperbarui."""
+
+    def setUp(self):
+        invalidate_barcode_cache()
+        self.product = Product.objects.create(
+            sku='UPS-1', barcode='BC1', nama_produk='Lama',
+            lebar_cm=Decimal('10.00'), panjang_cm=Decimal('10.00'), tinggi_cm=Decimal('10.00'),
+        )
+        self.rak = Rak.objects.create(
+            kode_rak='UPS-RAK', nama_rak='Rak Upsert',
+            lebar_cm=Decimal('100.00'), panjang_cm=Decimal('10.00'), tinggi_cm=Decimal('10.00'),
+        )
+        InventoryRakStock.objects.create(product=self.product, rak=self.rak, quantity=3)
+
+    def _upsert(self, **values):
+        header = ['sku', 'barcode', 'nama_produk', 'lebar_cm']
+        row = {'sku': 'UPS-1', 'barcode': 'BC1', **values}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'upsert.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as fh:
+                writer = csv.writer(fh)
+                writer.writerow(header)
+                writer.writerow([row.get(field, '') for field in header])
+            return run_product_import(path, 'upsert.csv', mode='upsert')
+
+    def test_upsert_invalidates_barcode_resolver(self):
+        self.assertEqual(resolve_barcode('BC1').nama_produk, 'Lama')
+        result = self._upsert(nama_produk='Baru')
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(resolve_barcode('BC1').nama_produk, 'Baru')
+
+    def test_upsert_dimension_change_syncs_rak_capacity(self):
+        self.assertEqual(RakStockUsage.objects.get(rak=self.rak, product=self.product).used_width_cm, Decimal('30.00'))
+        result = self._upsert(lebar_cm='20')
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(RakStockUsage.objects.get(rak=self.rak, product=self.product).used_width_cm, Decimal('60.00'))
+        self.assertEqual(find_capacity_drift().mismatched_raks, 0)
@@ -7,11 +7,15 @@ from django.views.decorators.http import require_GET, require_POST
 from django.db import IntegrityError, transaction
 from django.db.models import Q, ProtectedError, Count, Sum # Tambah Sum untuk agregasi total stok rak
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from django.core.exceptions import PermissionDenied
 from django.contrib import messages
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model # Ganti get_user menjadi get_user_model
+from django.conf import settings
 import csv, io, os
+import logging
+import uuid
 import pandas as pd
 import json
 import xlsxwriter
@@ -19,6 +23,12 @@ import re # Diperlukan untuk deteksi mobile
 
 # Import Models yang digunakan di views ini
 from .models import Product, ProductImportHistory, ProductAddHistory, ProductsBundling, ProductExtraBarcode, EditProductLog
+from .bundle_map import invalidate_bundle_map
+from .importer import SUPPORTED_EXTENSIONS, get_import_progress, set_import_progress
+from .search import LIST_NAMESPACE, search_filter, search_products
+from .tasks import import_products_task
+from erp_alfa.exports import export_response
+from erp_alfa.list_queries import cached_value
 from inventory.models import InventoryRakStock # Diperlukan untuk rak_detail dan rak_data
 from inventory.models import Rak # Rak sekarang ada di inventory
 from inventory.models import Stock # Diperlukan untuk mendapatkan quantity_putaway dan quantity
@@ -47,105 +57,54 @@ def index(request):
 @login_required
 @permission_required('products.add_product', raise_exception=True)
 def import_products(request):
-    if request.method == 'POST' and request.FILES.get('file'):
-        file = request.FILES['file']
-        filename = file.name
-        ext = os.path.splitext(filename)[1].lower()
-        rows = []
-        if ext == '.csv':
-            decoded = file.read().decode('utf-8-sig')
-            reader = csv.DictReader(io.StringIO(decoded))
-            rows = list(reader)
-        elif ext in ['.xls', '.xlsx']:
-            df = pd.read_excel(file, dtype=str)
-            df = df.fillna('')
-            rows = df.to_dict(orient='records')
-        else:
-            return redirect('/products/')
-        valid_fields = ['sku', 'barcode', 'nama_produk', 'variant_produk', 'brand', 'panjang_cm', 'lebar_cm', 'tinggi_cm', 'berat_gram']
-        total = len(rows)
-        inserted = 0
-        failed = 0
-        failed_notes = []
-        batch_size = 500
-        created_products = []  # Untuk menyimpan produk yang berhasil dibuat
-        
-        for i in range(0, total, batch_size):
-            batch = rows[i:i+batch_size]
-            products = []
-            duplicate_sku = set(Product.objects.filter(sku__in=[str(row.get('sku') or '').strip() for row in batch]).values_list('sku', flat=True))
-            duplicate_barcode = set(Product.objects.filter(barcode__in=[str(row.get('barcode') or '').strip() for row in batch]).values_list('barcode', flat=True))
-            for idx, row in enumerate(batch):
-                clean_row = {k.strip().replace('\ufeff', ''): (v if v not in [None, 'nan', 'NaN', '[null]'] else '') for k, v in row.items() if k and k.strip().replace('\ufeff', '') in valid_fields}
-                sku = str(clean_row.get('sku') or '').strip()
-                barcode = str(clean_row.get('barcode') or '').strip()
-                if sku in duplicate_sku or barcode in duplicate_barcode:
-                    failed += 1
-                    failed_notes.append(f"Row {i+idx+1}: Duplicate SKU/barcode: {sku}/{barcode}")
-                    continue
-                try:
-                    # Helper function untuk konversi decimal
-                    def parse_decimal(value):
-                        if value and value.strip():
-                            try:
-                                return float(value.strip())
-                            except ValueError:
-                                return None
-                        return None
-                    
-                    # Parse field decimal
-                    clean_row['panjang_cm'] = parse_decimal(clean_row.get('panjang_cm'))
-                    clean_row['lebar_cm'] = parse_decimal(clean_row.get('lebar_cm'))
-                    clean_row['tinggi_cm'] = parse_decimal(clean_row.get('tinggi_cm'))
-                    clean_row['berat_gram'] = parse_decimal(clean_row.get('berat_gram'))
-                    
-                    products.append(Product(**clean_row))
-                except Exception as e:
-                    failed += 1
-                    failed_notes.append(f"Row {i+idx+1}: {e}")
-            
-            # Bulk create products
-            created_products_batch = Product.objects.bulk_create(products, ignore_conflicts=True)
-            created_products.extend(created_products_batch)
-            inserted += len(created_products_batch)
-            request.session['import_progress'] = int((inserted + failed) / total * 100)
-        
-        # Create logs for all successfully imported products
-        log_entries = []
-        for product in created_products:
-            log_entries.append(EditProductLog(
-                product=product,
-                edited_by=request.user if request.user.is_authenticated else None,
-                field_name='CREATE',
-                old_value='',
-                new_value=f"Produk baru: {product.sku} - {product.nama_produk}",
-                change_type='CREATE',
-                notes=f"Produk diimpor dari file {filename}. SKU: {product.sku}, Barcode: {product.barcode}",
-                product_sku=product.sku,
-                product_name=product.nama_produk,
-                product_barcode=product.barcode
-            ))
-        
-        # Bulk create logs
-        if log_entries:
-            EditProductLog.objects.bulk_create(log_entries)
-        
-        request.session['import_progress'] = 100
-        ProductImportHistory.objects.create(
-            file_name=filename,
-            notes='\n'.join(failed_notes) if failed_notes else 'Berhasil',
-            success_count=inserted,
-            failed_count=failed,
-            imported_by=request.user if request.user.is_authenticated else None
+    """
+    Terima file import produk lalu jalankan pipeline import (products.importer) di Celery.
+    Halaman status mempolling import_progress dengan job_id.
+    """
+    if request.method != 'POST' or not request.FILES.get('file'):
+        return redirect('/products/')
+
+    file = request.FILES['file']
+    ext = os.path.splitext(file.name)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        messages.error(request, 'File harus Excel (.xls/.xlsx) atau CSV')
+        return redirect('/products/')
+    mode = 'upsert' if request.POST.get('mode') == 'upsert' else 'insert'
+    if mode == 'upsert' and not request.user.has_perm('products.change_product'):
+        # Upsert menimpa data produk existing: butuh izin ubah produk, bukan hanya tambah
+        raise PermissionDenied
+
+    job_id = str(uuid.uuid4())
+    upload_dir = os.path.join(settings.MEDIA_ROOT, 'product_imports')
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, f'{job_id}{ext}')
+    with open(path, 'wb') as dest:
+        for chunk in file.chunks():
+            dest.write(chunk)
+
+    user_id = request.user.id if request.user.is_authenticated else None
+    set_import_progress(job_id, status='queued', progress=0, file_name=file.name, mode=mode)
+    try:
+        import_products_task.delay(path, file.name, user_id=user_id, job_id=job_id, mode=mode)
+    except Exception:
+        # Broker tidak tersedia: jalankan langsung agar import tetap bisa dipakai
+        logging.getLogger(__name__).error(
+            "Broker Celery tidak dapat dihubungi (cek CELERY_BROKER_URL), import produk dijalankan sinkron", exc_info=True
         )
-        return render(request, 'products/import_status.html', {'status': 'Import selesai. Semua data telah diimpor.'})
-    return redirect('/products/')
+        import_products_task.apply(args=(path, file.name), kwargs={'user_id': user_id, 'job_id': job_id, 'mode': mode})
+    return render(request, 'products/import_status.html', {'job_id': job_id, 'file_name': file.name, 'mode': mode})
 
 @login_required
 @permission_required('products.view_product', raise_exception=True)
 def import_progress(request):
-    progress = request.session.get('import_progress', 0)
-    return JsonResponse({'progress': progress})
+    """Status import produk berdasarkan job_id (disimpan di cache oleh products.importer)."""
+    job_id = request.GET.get('job_id')
+    if not job_id:
+        return JsonResponse({'status': 'unknown', 'progress': 0}, status=404)
+    progress = get_import_progress(job_id)
+    if progress is None:
+        return JsonResponse({'status': 'unknown', 'progress': 0, 'job_id': job_id}, status=404)
+    return JsonResponse({**progress, 'job_id': job_id})
 
 def download_template(request):
     output = io.BytesIO()
@@ -163,15 +122,9 @@ def download_template(request):
     response['Content-Disposition'] = 'attachment; filename=template_import_produk.xlsx'
     return response
 
+@login_required
 def export_products(request):
-    products = Product.objects.all().values('sku', 'barcode', 'nama_produk', 'variant_produk', 'brand', 'rak', 'panjang_cm', 'lebar_cm', 'tinggi_cm', 'berat_gram')
-    df = pd.DataFrame(list(products))
-    df = df[['sku', 'barcode', 'nama_produk', 'variant_produk', 'brand', 'rak', 'panjang_cm', 'lebar_cm', 'tinggi_cm', 'berat_gram']]
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=products.xlsx'
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Products')
-    return response
+    return export_response(request, 'products.exports.product_report')
 
 @login_required
 @permission_required('products.delete_product', raise_exception=True)
@@ -382,10 +335,7 @@ def products_data(request):
         else:
             order_column = order_column_name
 
-        queryset = Product.objects.all().annotate(
-            extra_barcode_count=Count('extra_barcodes')
-        ).distinct()
-        total_count = queryset.count()
+        total_count = cached_value(LIST_NAMESPACE, 'total', {}, Product.objects.count)
 
         import re
         filter_q = Q()
@@ -399,7 +349,9 @@ def products_data(request):
                     clean_search = col_search.replace('^', '').replace('$', '')
                     if clean_search:
                         # Use exact match to ensure only products in specific rak are shown
-                        filter_q &= Q(inventoryrakstock__rak__kode_rak__iexact=clean_search)
+                        filter_q &= Q(pk__in=InventoryRakStock.objects.filter(
+                            rak__kode_rak__iexact=clean_search
+                        ).values('product_id'))
                 else:
                     # Handle other columns with regex pattern
                     m = re.match(r'^\^(.*)\$$', col_search)
@@ -408,22 +360,25 @@ def products_data(request):
                     else:
                         filter_q &= Q(**{f"{col}__icontains": col_search})
         
-        if search_value:
+        search_q = search_filter(search_value)
+        if search_q is not None:
             filter_q &= (
-                Q(sku__icontains=search_value) |
-                Q(barcode__icontains=search_value) |
-                Q(nama_produk__icontains=search_value) |
-                Q(variant_produk__icontains=search_value) |
-                Q(brand__icontains=search_value) |
+                search_q |
                 Q(rak__icontains=search_value) |
-                # Search in InventoryRakStock for rak codes
-                Q(inventoryrakstock__rak__kode_rak__icontains=search_value)
+                # Search in InventoryRakStock for rak codes (subquery, bukan join + distinct)
+                Q(pk__in=InventoryRakStock.objects.filter(
+                    rak__kode_rak__icontains=search_value
+                ).values('product_id'))
             )
-        
+
+        filtered_count = total_count
         if filter_q:
-            queryset = queryset.filter(filter_q).distinct()
-            
-        filtered_count = queryset.count()
+            # Count di-cache per signature filter (invalidasi lewat signal Product)
+            filter_signature = {key: value for key, value in request.GET.items() if 'search' in key}
+            filtered_count = cached_value(
+                LIST_NAMESPACE, 'filtered', filter_signature, Product.objects.filter(filter_q).count
+            )
+        queryset = Product.objects.filter(filter_q).annotate(extra_barcode_count=Count('extra_barcodes'))
         
         # Debug logging untuk filter rak
         import logging
@@ -661,19 +616,22 @@ def aggrid_data(request):
         val = request.GET.get(f'filter_{field}', '').strip()
         if val:
             filter_q &= Q(**{f"{field}__icontains": val})
+    search_q = search_filter(request.GET.get('q', ''))
+    if search_q is not None:
+        filter_q &= search_q
     queryset = Product.objects.filter(filter_q)
     if sort_field in filter_fields + ['id']:
         if sort_dir == 'desc':
-            queryset = queryset.order_by(f'-{sort_field}')
+            queryset = queryset.order_by(f'-{sort_field}', '-id')
         else:
-            queryset = queryset.order_by(sort_field)
+            queryset = queryset.order_by(sort_field, 'id')
     else:
         queryset = queryset.order_by('id')
-    total = queryset.count()
-    paginator = Paginator(queryset, page_size)
-    page_obj = paginator.get_page(page)
+    # has_more dari page_size + 1 baris, tanpa count() per request
+    start = (max(page, 1) - 1) * page_size
+    rows = list(queryset[start:start + page_size + 1])
     data = []
-    for p in page_obj.object_list:
+    for p in rows[:page_size]:
         data.append({
             'id': p.id,
             'sku': p.sku,
@@ -690,7 +648,7 @@ def aggrid_data(request):
         })
     return JsonResponse({
         'results': data,
-        'total': total
+        'has_more': len(rows) > page_size
     })
 
 def products_autocomplete(request):
@@ -699,17 +657,8 @@ def products_autocomplete(request):
     page_size = 20
     if not q:
         return JsonResponse({'results': [], 'has_more': False}, safe=False)
-    qs = Product.objects.filter(
-        Q(sku__icontains=q) |
-        Q(barcode__icontains=q) |
-        Q(nama_produk__icontains=q) |
-        Q(variant_produk__icontains=q) |
-        Q(brand__icontains=q)
-    )
-    total = qs.count()
-    start = (page - 1) * page_size
-    end = start + page_size
-    qs = qs[start:end]
+    # Ranking relevansi + has_more tanpa count() (products/search.py)
+    result = search_products(q, limit=page_size, offset=(page - 1) * page_size)
     data = [
         {
             'id': p.id,
@@ -722,10 +671,9 @@ def products_autocomplete(request):
             'lebar_cm': p.lebar_cm,
             'tinggi_cm': p.tinggi_cm,
             'berat_gram': p.berat_gram,
-        } for p in qs
+        } for p in result.products
     ]
-    has_more = end < total
-    return JsonResponse({'results': data, 'has_more': has_more}, safe=False)
+    return JsonResponse({'results': data, 'has_more': result.has_more}, safe=False)
 
 @require_GET
 def unique_brands(request):
@@ -1372,6 +1320,8 @@ def import_sku_bundling(request):
                 final_bundlings_to_create = list(unique_bundlings.values())
                 
                 ProductsBundling.objects.bulk_create(final_bundlings_to_create, ignore_conflicts=True)
+                # bulk_create tidak memicu signal
+                invalidate_bundle_map()
                 
                 inserted = len(final_bundlings_to_create)
 
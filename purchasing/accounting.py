@@ -1,339 +1,195 @@
 """
 Accounting utilities for Purchase module
 Handles automatic journal entries for purchase flow
+
+Setiap create_*_journal_entry menerima batch (finance.journal_batch.JournalBatch) opsional:
+tanpa batch entry langsung disimpan, dengan batch entry hanya ditambahkan dan disimpan
+bersama entry lain saat batch.commit() (bulk verify, payment run, upload faktur pajak).
 """
-from django.db import transaction
-from django.utils import timezone
-from datetime import datetime
 from decimal import Decimal
-from finance.models import JournalEntry, JournalEntryItem, Account
-from django.contrib.contenttypes.models import ContentType
+
+from django.utils import timezone
+
+from finance.journal_batch import JournalBatch, JournalLine, get_account
+from finance.sequences import journal_entry_number
 
 
 def create_journal_entry_number(prefix="JE"):
-    """Generate unique journal entry number"""
-    from django.utils import timezone
-    date_str = timezone.now().strftime('%Y%m%d')
-    
-    # Get next ID
-    last_entry = JournalEntry.objects.filter(
-        entry_number__startswith=f'{prefix}-{date_str}'
-    ).order_by('-entry_number').first()
-    
-    if last_entry and last_entry.entry_number:
-        try:
-            last_id = int(last_entry.entry_number.split('-')[-1])
-            new_id = last_id + 1
-        except (ValueError, IndexError):
-            new_id = 1
-    else:
-        new_id = 1
-    
-    return f"{prefix}-{date_str}-{new_id:04d}"
+    """Generate unique journal entry number (counter DocumentSequence per prefix per hari)"""
+    return journal_entry_number(prefix)
 
 
 def get_or_create_account_by_code(code, name, account_type_code, balance_type):
-    """Get or create account by code"""
-    from finance.models import AccountType
-    
-    # Get or create account type
-    account_type, created = AccountType.objects.get_or_create(
-        code=account_type_code,
-        defaults={
-            'name': account_type_code,
-            'type': 'ASSET' if account_type_code.startswith('1') else 
-                   'LIABILITY' if account_type_code.startswith('2') else 'EXPENSE'
-        }
+    """Get or create account by code (dari cache chart of accounts)"""
+    return get_account(code, name, account_type_code, balance_type)
+
+
+def _inventory_account():
+    return get_or_create_account_by_code(
+        code='1-1200',
+        name='Persediaan Barang',
+        account_type_code='1',
+        balance_type='DEBIT'
     )
-    
-    # Get or create account
-    account, created = Account.objects.get_or_create(
-        code=code,
-        defaults={
-            'name': name,
-            'account_type': account_type,
-            'balance_type': balance_type,
-            'is_system': True
-        }
+
+
+def _accounts_payable_account():
+    return get_or_create_account_by_code(
+        code='2-2000',
+        name='Hutang Usaha',
+        account_type_code='2',
+        balance_type='CREDIT'
     )
-    
-    return account
 
 
-def create_purchase_verify_journal_entry(purchase, user):
+def _supplier_name(purchase):
+    return purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'
+
+
+def _post(batch, user, error_label, prefix, entry_date, description, lines, purchase):
+    """Tambah entry ke batch, atau simpan langsung jika batch None. Return JournalEntry."""
+    try:
+        own_batch = batch is None
+        if own_batch:
+            batch = JournalBatch(user)
+        entry = batch.add(
+            prefix, entry_date, description, lines,
+            reference=purchase.nomor_purchase, related_object=purchase, user=user,
+        )
+        if own_batch:
+            batch.commit()
+        return entry
+    except Exception as e:
+        raise Exception(f"Error creating journal entry for {error_label}: {str(e)}")
+
+
+def create_purchase_verify_journal_entry(purchase, user, batch=None):
     """
     Create journal entry for Purchase Verify
     Debit: Inventory (based on purchase items)
     Credit: Accounts Payable
     """
-    try:
-        with transaction.atomic():
-            # Get or create accounts
-            inventory_account = get_or_create_account_by_code(
-                code='1-1200',
-                name='Persediaan Barang',
-                account_type_code='1',
-                balance_type='DEBIT'
-            )
-            
-            accounts_payable_account = get_or_create_account_by_code(
-                code='2-2000',
-                name='Hutang Usaha',
-                account_type_code='2',
-                balance_type='CREDIT'
-            )
-            
-            # Create journal entry
-            journal_entry = JournalEntry.objects.create(
-                entry_number=create_journal_entry_number("PV"),
-                entry_date=purchase.tanggal_purchase or timezone.now().date(),
-                reference=purchase.nomor_purchase,
-                description=f"Verifikasi Purchase {purchase.nomor_purchase}",
-                status='posted',
-                content_type=ContentType.objects.get_for_model(purchase),
-                object_id=purchase.id,
-                created_by=user,
-                posted_by=user,
-                posted_at=timezone.now()
-            )
-            
-            # Create journal entry items
-            total_amount = Decimal(str(purchase.total_amount))
-            
+    total_amount = Decimal(str(purchase.total_amount))
+    supplier = _supplier_name(purchase)
+    return _post(
+        batch, user, 'purchase verify', 'PV',
+        purchase.tanggal_purchase or timezone.localdate(),
+        f"Verifikasi Purchase {purchase.nomor_purchase}",
+        [
             # Debit: Inventory
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=inventory_account,
-                debit=total_amount,
-                credit=Decimal('0'),
-                description=f"Penerimaan barang dari {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-            )
-            
+            JournalLine(_inventory_account(), total_amount, 0, f"Penerimaan barang dari {supplier}"),
             # Credit: Accounts Payable
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=accounts_payable_account,
-                debit=Decimal('0'),
-                credit=total_amount,
-                description=f"Hutang ke {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-            )
-            
-            return journal_entry
-            
-    except Exception as e:
-        raise Exception(f"Error creating journal entry for purchase verify: {str(e)}")
+            JournalLine(_accounts_payable_account(), 0, total_amount, f"Hutang ke {supplier}"),
+        ],
+        purchase,
+    )
 
 
-def create_purchase_payment_journal_entry(purchase, payment_amount, bank_account, user, discount_amount=0):
+def create_purchase_payment_journal_entry(purchase, payment_amount, bank_account, user, discount_amount=0,
+                                          batch=None, entry_date=None):
     """
     Create journal entry for Purchase Payment
     Debit: Accounts Payable (total amount)
     Credit: Cash/Bank (payment amount)
     Credit: Discount Received (discount amount, if any)
     """
-    try:
-        with transaction.atomic():
-            # Get or create accounts
-            accounts_payable_account = get_or_create_account_by_code(
-                code='2-2000',
-                name='Hutang Usaha',
-                account_type_code='2',
-                balance_type='CREDIT'
-            )
-            
-            # Use bank account if linked, otherwise create cash account
-            if bank_account and bank_account.account:
-                cash_bank_account = bank_account.account
-            else:
-                cash_bank_account = get_or_create_account_by_code(
-                    code='1-1100',
-                    name='Kas',
-                    account_type_code='1',
-                    balance_type='DEBIT'
-                )
-            
-            # Create journal entry
-            journal_entry = JournalEntry.objects.create(
-                entry_number=create_journal_entry_number("PP"),
-                entry_date=timezone.now().date(),
-                reference=purchase.nomor_purchase,
-                description=f"Pembayaran Purchase {purchase.nomor_purchase}",
-                status='posted',
-                content_type=ContentType.objects.get_for_model(purchase),
-                object_id=purchase.id,
-                created_by=user,
-                posted_by=user,
-                posted_at=timezone.now()
-            )
-            
-            # Create journal entry items
-            payment_decimal = Decimal(str(payment_amount))
-            discount_decimal = Decimal(str(discount_amount))
-            total_decimal = payment_decimal + discount_decimal
-            
-            # Debit: Accounts Payable (total amount = payment + discount)
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=accounts_payable_account,
-                debit=total_decimal,
-                credit=Decimal('0'),
-                description=f"Pembayaran hutang ke {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-            )
-            
-            # Credit: Cash/Bank (actual payment amount)
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=cash_bank_account,
-                debit=Decimal('0'),
-                credit=payment_decimal,
-                description=f"Pembayaran dari {bank_account.nama_bank if bank_account else 'Kas'}"
-            )
-            
-            # Credit: Discount Received (if discount exists)
-            if discount_decimal > 0:
-                discount_account = get_or_create_account_by_code(
-                    code='4-4000',
-                    name='Discount Received',
-                    account_type_code='4',
-                    balance_type='CREDIT'
-                )
-                JournalEntryItem.objects.create(
-                    journal_entry=journal_entry,
-                    account=discount_account,
-                    debit=Decimal('0'),
-                    credit=discount_decimal,
-                    description=f"Discount received dari {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-                )
-            
-            return journal_entry
-            
-    except Exception as e:
-        raise Exception(f"Error creating journal entry for purchase payment: {str(e)}")
+    # Use bank account if linked, otherwise create cash account
+    if bank_account and bank_account.account:
+        cash_bank_account = bank_account.account
+    else:
+        cash_bank_account = get_or_create_account_by_code(
+            code='1-1100',
+            name='Kas',
+            account_type_code='1',
+            balance_type='DEBIT'
+        )
+
+    payment_decimal = Decimal(str(payment_amount))
+    discount_decimal = Decimal(str(discount_amount))
+    supplier = _supplier_name(purchase)
+    lines = [
+        # Debit: Accounts Payable (total amount = payment + discount)
+        JournalLine(_accounts_payable_account(), payment_decimal + discount_decimal, 0, f"Pembayaran hutang ke {supplier}"),
+        # Credit: Cash/Bank (actual payment amount)
+        JournalLine(cash_bank_account, 0, payment_decimal, f"Pembayaran dari {bank_account.nama_bank if bank_account else 'Kas'}"),
+    ]
+    # Credit: Discount Received (if discount exists)
+    if discount_decimal > 0:
+        discount_account = get_or_create_account_by_code(
+            code='4-4000',
+            name='Discount Received',
+            account_type_code='4',
+            balance_type='CREDIT'
+        )
+        lines.append(JournalLine(discount_account, 0, discount_decimal, f"Discount received dari {supplier}"))
+
+    return _post(
+        batch, user, 'purchase payment', 'PP', entry_date or timezone.localdate(),
+        f"Pembayaran Purchase {purchase.nomor_purchase}", lines, purchase,
+    )
 
 
-def create_purchase_taxinvoice_journal_entry(purchase, tax_amount, user):
+def create_purchase_taxinvoice_journal_entry(purchase, tax_amount, user, batch=None):
     """
     Create journal entry for Purchase Tax Invoice
     Debit: Tax Expense (or Inventory if included in cost)
     Credit: Tax Payable
     """
-    try:
-        with transaction.atomic():
-            # Get or create accounts
-            tax_expense_account = get_or_create_account_by_code(
-                code='6-6000',
-                name='Biaya Pajak',
-                account_type_code='6',
-                balance_type='DEBIT'
-            )
-            
-            tax_payable_account = get_or_create_account_by_code(
-                code='2-2100',
-                name='Pajak Terutang',
-                account_type_code='2',
-                balance_type='CREDIT'
-            )
-            
-            # Create journal entry
-            journal_entry = JournalEntry.objects.create(
-                entry_number=create_journal_entry_number("PT"),
-                entry_date=timezone.now().date(),
-                reference=purchase.nomor_purchase,
-                description=f"Pajak Invoice Purchase {purchase.nomor_purchase}",
-                status='posted',
-                content_type=ContentType.objects.get_for_model(purchase),
-                object_id=purchase.id,
-                created_by=user,
-                posted_by=user,
-                posted_at=timezone.now()
-            )
-            
-            # Create journal entry items
-            tax_decimal = Decimal(str(tax_amount))
-            
+    tax_expense_account = get_or_create_account_by_code(
+        code='6-6000',
+        name='Biaya Pajak',
+        account_type_code='6',
+        balance_type='DEBIT'
+    )
+    tax_payable_account = get_or_create_account_by_code(
+        code='2-2100',
+        name='Pajak Terutang',
+        account_type_code='2',
+        balance_type='CREDIT'
+    )
+
+    tax_decimal = Decimal(str(tax_amount))
+    supplier = _supplier_name(purchase)
+    return _post(
+        batch, user, 'purchase tax invoice', 'PT', timezone.localdate(),
+        f"Pajak Invoice Purchase {purchase.nomor_purchase}",
+        [
             # Debit: Tax Expense
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=tax_expense_account,
-                debit=tax_decimal,
-                credit=Decimal('0'),
-                description=f"Biaya pajak dari {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-            )
-            
+            JournalLine(tax_expense_account, tax_decimal, 0, f"Biaya pajak dari {supplier}"),
             # Credit: Tax Payable
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=tax_payable_account,
-                debit=Decimal('0'),
-                credit=tax_decimal,
-                description=f"Pajak terutang dari {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-            )
-            
-            return journal_entry
-            
-    except Exception as e:
-        raise Exception(f"Error creating journal entry for purchase tax invoice: {str(e)}")
+            JournalLine(tax_payable_account, 0, tax_decimal, f"Pajak terutang dari {supplier}"),
+        ],
+        purchase,
+    )
 
 
-def create_purchase_receive_journal_entry(purchase, user):
+def create_purchase_receive_journal_entry(purchase, user, batch=None):
     """
     Create journal entry for Purchase Receive (if needed)
     This might be called when purchase status changes to 'received'
     """
-    try:
-        with transaction.atomic():
-            # Get or create accounts
-            inventory_account = get_or_create_account_by_code(
-                code='1-1200',
-                name='Persediaan Barang',
-                account_type_code='1',
-                balance_type='DEBIT'
-            )
-            
-            accounts_payable_account = get_or_create_account_by_code(
-                code='2-2000',
-                name='Hutang Usaha',
-                account_type_code='2',
-                balance_type='CREDIT'
-            )
-            
-            # Create journal entry
-            journal_entry = JournalEntry.objects.create(
-                entry_number=create_journal_entry_number("PR"),
-                entry_date=purchase.tanggal_purchase or timezone.now().date(),
-                reference=purchase.nomor_purchase,
-                description=f"Penerimaan Purchase {purchase.nomor_purchase}",
-                status='posted',
-                content_type=ContentType.objects.get_for_model(purchase),
-                object_id=purchase.id,
-                created_by=user,
-                posted_by=user,
-                posted_at=timezone.now()
-            )
-            
-            # Create journal entry items
-            total_amount = Decimal(str(purchase.total_amount))
-            
+    total_amount = Decimal(str(purchase.total_amount))
+    supplier = _supplier_name(purchase)
+    return _post(
+        batch, user, 'purchase receive', 'PR',
+        purchase.tanggal_purchase or timezone.localdate(),
+        f"Penerimaan Purchase {purchase.nomor_purchase}",
+        [
             # Debit: Inventory
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=inventory_account,
-                debit=total_amount,
-                credit=Decimal('0'),
-                description=f"Penerimaan barang dari {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-            )
-            
+            JournalLine(_inventory_account(), total_amount, 0, f"Penerimaan barang dari {supplier}"),
             # Credit: Accounts Payable
-            JournalEntryItem.objects.create(
-                journal_entry=journal_entry,
-                account=accounts_payable_account,
-                debit=Decimal('0'),
-                credit=total_amount,
-                description=f"Hutang ke {purchase.supplier.nama_supplier if purchase.supplier else 'Supplier'}"
-            )
-            
-            return journal_entry
-            
-    except Exception as e:
-        raise Exception(f"Error creating journal entry for purchase receive: {str(e)}")
+            JournalLine(_accounts_payable_account(), 0, total_amount, f"Hutang ke {supplier}"),
+        ],
+        purchase,
+    )
+
 
+def commit_journal_batch(batch, label):
+    """
+    Simpan batch (savepoint sendiri). Return (entries, error): gagal posting tidak membatalkan
+    transaksi dokumen pemanggil, error dikembalikan sebagai pesan.
+    """
+    try:
+        return batch.commit(), None
+    except Exception as e:
+        return [], f"Error creating journal entry for {label}: {str(e)}"
@@ -0,0 +1,209 @@
+"""
+Builder export laporan purchasing (lihat erp_alfa/exports.py): purchase report detail / summary
+dan tax invoice. Status payment / tax invoice per purchase diambil sekali (dict per purchase_id),
+bukan .first() per baris.
+"""
+from datetime import datetime, timedelta
+
+from django.db.models import Sum
+
+from erp_alfa.exports import Column, ExportSpec
+from purchasing.models import Purchase, PurchaseItem, PurchasePayment, PurchaseTaxInvoice
+
+PURCHASE_STATUS = dict(Purchase.STATUS_CHOICES)
+PAYMENT_STATUS = dict(PurchasePayment._meta.get_field('status').choices)
+TAX_INVOICE_STATUS = dict(PurchaseTaxInvoice._meta.get_field('status').choices)
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _filter_dates(queryset, field, date_from, date_to):
+    date_from_obj = _parse_date(date_from)
+    if date_from_obj:
+        queryset = queryset.filter(**{f'{field}__gte': date_from_obj})
+    date_to_obj = _parse_date(date_to)
+    if date_to_obj:
+        queryset = queryset.filter(**{f'{field}__lt': date_to_obj + timedelta(days=1)})
+    return queryset
+
+
+def _first_by_purchase(queryset, *fields):
+    """{purchase_id: baris pertama} mengikuti urutan queryset (sama dengan purchase.<relasi>.first())."""
+    first = {}
+    for row in queryset.values('purchase_id', *fields).iterator(chunk_size=2000):
+        first.setdefault(row['purchase_id'], row)
+    return first
+
+
+# ---------------------------------------------------------------------------
+# Purchase report
+# ---------------------------------------------------------------------------
+
+def _payment_text(payment):
+    if not payment:
+        return ''
+    status = PAYMENT_STATUS.get(payment['status'], payment['status'])
+    return f"{status}\nRp {payment['paid_amount']:,} / Rp {payment['total_amount']:,}"
+
+
+def _tax_invoice_text(tax_invoice):
+    if not tax_invoice:
+        return ''
+    status = TAX_INVOICE_STATUS.get(tax_invoice['status'], tax_invoice['status'])
+    return f"{status}\n{tax_invoice['invoice_number'] or 'No Invoice'}"
+
+
+def _received_by(row):
+    if row['purchase__received_by_id'] is None:
+        return '-'
+    return f"{row['purchase__received_by__first_name']} {row['purchase__received_by__last_name']}".strip()
+
+
+def purchase_report(params):
+    """Purchase report (params: date_from, date_to, supplier_id, report_type detail/summary)."""
+    date_from = params.get('date_from', '').strip()
+    date_to = params.get('date_to', '').strip()
+    supplier_id = params.get('supplier_id', '').strip()
+    report_type = params.get('report_type', 'detail')
+
+    purchases = _filter_dates(Purchase.objects.all(), 'tanggal_purchase', date_from, date_to)
+    if supplier_id:
+        purchases = purchases.filter(supplier_id=supplier_id)
+
+    def total_amount():
+        return purchases.aggregate(total=Sum('total_amount'))['total'] or 0
+
+    title_lines = ['PURCHASE REPORT', 'PT. ALFA ERP', f'Periode: {date_from} s/d {date_to}',
+                   f'Report Type: {report_type.upper()}']
+    filename = f"Purchase_Report_{date_from}_{date_to}_{report_type}"
+
+    if report_type != 'detail':
+        summary_rows = purchases.order_by('-tanggal_purchase', '-id').values(
+            'tanggal_purchase', 'nomor_purchase', 'supplier__nama_supplier', 'total_amount', 'status',
+        )
+        return ExportSpec(
+            filename=filename,
+            sheet_name='Purchase Report',
+            columns=[
+                Column('Date', lambda row: row['tanggal_purchase'].strftime('%d %b %Y')),
+                Column('Purchase Number', 'nomor_purchase'),
+                Column('Supplier', 'supplier__nama_supplier'),
+                Column('Total Amount', 'total_amount', 'number'),
+                Column('Status', lambda row: PURCHASE_STATUS.get(row['status'], row['status'])),
+            ],
+            rows=lambda: summary_rows.iterator(chunk_size=2000),
+            count=purchases.count,
+            title_lines=title_lines,
+            footer=lambda: ['', '', 'TOTAL:', total_amount(), ''],
+        )
+
+    items = PurchaseItem.objects.filter(purchase__in=purchases)
+
+    def rows():
+        payments = _first_by_purchase(
+            PurchasePayment.objects.filter(purchase__in=purchases).order_by('purchase_id', '-due_date', 'pk'),
+            'status', 'paid_amount', 'total_amount',
+        )
+        tax_invoices = _first_by_purchase(
+            PurchaseTaxInvoice.objects.filter(purchase__in=purchases).order_by('purchase_id', '-created_at', 'pk'),
+            'status', 'invoice_number',
+        )
+        for row in items.order_by('-purchase__tanggal_purchase', '-purchase_id', 'product__nama_produk').values(
+            'purchase_id', 'purchase__tanggal_purchase', 'purchase__nomor_purchase',
+            'purchase__supplier__nama_supplier', 'purchase__status', 'purchase__received_by_id',
+            'purchase__received_by__first_name', 'purchase__received_by__last_name',
+            'product__nama_produk', 'product__barcode', 'product__sku', 'quantity', 'harga_beli', 'subtotal',
+        ).iterator(chunk_size=2000):
+            row['payment'] = _payment_text(payments.get(row['purchase_id']))
+            row['tax_invoice'] = _tax_invoice_text(tax_invoices.get(row['purchase_id']))
+            yield row
+
+    return ExportSpec(
+        filename=filename,
+        sheet_name='Purchase Report',
+        columns=[
+            Column('Date', lambda row: row['purchase__tanggal_purchase'].strftime('%d %b %Y')),
+            Column('Purchase Number', 'purchase__nomor_purchase'),
+            Column('Supplier', 'purchase__supplier__nama_supplier'),
+            Column('Product', 'product__nama_produk'),
+            Column('Barcode', lambda row: row['product__barcode'] or row['product__sku']),
+            Column('Qty', 'quantity', 'number'),
+            Column('Harga Beli', 'harga_beli', 'number'),
+            Column('Subtotal', 'subtotal', 'number'),
+            Column('Status', lambda row: PURCHASE_STATUS.get(row['purchase__status'], row['purchase__status'])),
+            Column('Received By', _received_by),
+            Column('Payment Status', 'payment'),
+            Column('Tax Invoice Status', 'tax_invoice'),
+        ],
+        rows=rows,
+        count=items.count,
+        title_lines=title_lines,
+        footer=lambda: ['', '', '', '', '', '', 'TOTAL:', total_amount(), '', '', '', ''],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Tax invoice
+# ---------------------------------------------------------------------------
+
+def tax_invoice_report(params):
+    """Daftar tax invoice (params: status, supplier, date_from, date_to)."""
+    status_filter = params.get('status', '').strip()
+    supplier_filter = params.get('supplier', '').strip()
+    date_from = params.get('date_from', '').strip()
+    date_to = params.get('date_to', '').strip()
+
+    queryset = PurchaseTaxInvoice.objects.all()
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    if supplier_filter:
+        queryset = queryset.filter(supplier__nama_supplier__icontains=supplier_filter)
+    queryset = _filter_dates(queryset, 'created_at', date_from, date_to)
+
+    rows = queryset.order_by('-created_at').values(
+        'purchase__nomor_purchase', 'supplier__nama_supplier', 'invoice_number', 'invoice_date',
+        'subtotal', 'tax_amount', 'discount', 'invoice_amount', 'status',
+    )
+
+    title_lines = ['LAPORAN TAX INVOICE', 'Filter:']
+    if status_filter:
+        title_lines.append(f"Status: {status_filter}")
+    if supplier_filter:
+        title_lines.append(f"Supplier: {supplier_filter}")
+    if date_from:
+        title_lines.append(f"From: {date_from}")
+    if date_to:
+        title_lines.append(f"To: {date_to}")
+
+    filename = f"tax_invoices_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if status_filter:
+        filename += f"_{status_filter}"
+    if date_from:
+        filename += f"_from{date_from}"
+    if date_to:
+        filename += f"_to{date_to}"
+
+    return ExportSpec(
+        filename=filename,
+        sheet_name='Tax Invoices',
+        columns=[
+            Column('No', '#', 'number'),
+            Column('Purchase Number', 'purchase__nomor_purchase'),
+            Column('Supplier', 'supplier__nama_supplier'),
+            Column('Tax Invoice Number', lambda row: row['invoice_number'] or '-'),
+            Column('Tax Invoice Date', lambda row: row['invoice_date'].strftime('%Y-%m-%d') if row['invoice_date'] else '-'),
+            Column('Subtotal', 'subtotal', 'number'),
+            Column('Tax (11%)', 'tax_amount', 'number'),
+            Column('Discount', 'discount', 'number'),
+            Column('Total Amount', 'invoice_amount', 'number'),
+            Column('Status', lambda row: TAX_INVOICE_STATUS.get(row['status'], row['status'])),
+        ],
+        rows=lambda: rows.iterator(chunk_size=2000),
+        count=queryset.count,
+        title_lines=title_lines,
+    )
@@ -0,0 +1,154 @@
+"""
+Management command untuk benchmark API list purchase payment.
+
+Seed N payment dummy (purchase, sebagian dengan allocation) di dalam transaksi yang
+di-rollback, lalu ukur latency p50/p99 per request untuk:
+- legacy: sort lewat allocations__..., OFFSET, COUNT + 6 query statistik tiap request
+- keyset: sort key di PurchasePayment, cursor dari halaman sebelumnya, count/statistik cache
+Halaman diambil berurutan dari awal (browsing) dan satu lompatan ke halaman tengah.
+
+Usage: python manage.py benchmark_payment_list --payments 200000 --pages 20
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from erp_alfa.list_queries import cached_value, invalidate_list_cache, keyset_page
+from inventory.models import Supplier
+from purchasing.models import Bank, Purchase, PurchasePayment, PurchasePaymentAllocation
+from purchasing.payment_lists import PAYMENT_NAMESPACE, payment_filters, payment_queryset, payment_stats
+
+PAGE_SIZE = 50
+SORTS = [('payment_date', 'last_allocation_date', 'allocations__allocation_date'), ('due_date', 'due_date', 'due_date')]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency API list purchase payment legacy vs keyset (data dummy, di-rollback)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=200000, help='Jumlah payment dummy')
+        parser.add_argument('--pages', type=int, default=20, help='Jumlah halaman berurutan per sort')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                self._seed(options['payments'])
+                results = self._measure(options['payments'], options['pages'])
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            invalidate_list_cache(PAYMENT_NAMESPACE)
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"{'Mode':<28} {'Requests':>9} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for mode, timings in results:
+            self.stdout.write(
+                f"{mode:<28} {len(timings):>9} {_percentile(timings, 50):>10.2f} {_percentile(timings, 99):>10.2f}"
+            )
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("✓ Benchmark selesai"))
+
+    def _seed(self, count):
+        self.stdout.write(f"Seeding {count} payment dummy...")
+        rng = random.Random(42)
+        suppliers = Supplier.objects.bulk_create([Supplier(nama_supplier=f'Bench Supplier {i}') for i in range(50)])
+        banks = Bank.objects.bulk_create([Bank(nama_bank=f'Bench Bank {i}', nomor_rekening=str(i)) for i in range(5)])
+        start = date.today() - timedelta(days=365)
+        purchases = Purchase.objects.bulk_create([
+            Purchase(
+                nomor_purchase=f'BENCH-PUR-{i:07d}', supplier=suppliers[i % len(suppliers)], status='verified',
+                tanggal_purchase=start + timedelta(days=rng.randint(0, 365)), total_amount=rng.randint(1, 500) * 10000,
+            )
+            for i in range(count)
+        ], batch_size=5000)
+        now = timezone.now()
+        payments = PurchasePayment.objects.bulk_create([
+            PurchasePayment(
+                purchase=purchase, supplier_id=purchase.supplier_id, total_amount=purchase.total_amount,
+                remaining_amount=purchase.total_amount, due_date=now + timedelta(days=rng.randint(-60, 60)),
+                status=rng.choice(['unpaid', 'partial', 'paid', 'overdue']),
+            )
+            for purchase in purchases
+        ], batch_size=5000)
+
+        # Sepertiga payment punya 1-3 allocation; sort key diisi seperti PurchasePayment.save
+        allocations = []
+        for payment in payments:
+            if rng.random() < 0.33:
+                for _ in range(rng.randint(1, 3)):
+                    allocations.append(PurchasePaymentAllocation(
+                        payment=payment, amount=10000, payment_method='transfer', transfer_from=rng.choice(banks),
+                        allocation_date=now - timedelta(minutes=rng.randint(0, 500000)),
+                    ))
+                last = allocations[-1]
+                payment.last_allocation_date = last.allocation_date
+                payment.payment_method = last.payment_method
+                payment.last_transfer_from = last.transfer_from.nama_bank
+        PurchasePaymentAllocation.objects.bulk_create(allocations, batch_size=5000)
+        PurchasePayment.objects.bulk_update(
+            payments, ['last_allocation_date', 'payment_method', 'last_transfer_from'], batch_size=5000,
+        )
+        invalidate_list_cache(PAYMENT_NAMESPACE)
+
+    def _legacy_request(self, sort, page):
+        queryset = PurchasePayment.objects.select_related('purchase', 'supplier').order_by(f'-{sort}')
+        total = queryset.count()
+        rows = list(queryset[(page - 1) * PAGE_SIZE:page * PAGE_SIZE])
+        for status in (['unpaid', 'partial', 'overdue'], ['overdue'], ['paid']):
+            queryset.filter(status__in=status).count()
+            queryset.filter(status__in=status).aggregate(total=Sum('remaining_amount'))
+        return total, rows
+
+    def _keyset_request(self, sort, cursor, page):
+        filters = payment_filters({})
+        queryset = payment_queryset(filters)
+        total = cached_value(PAYMENT_NAMESPACE, 'count', filters, queryset.count)
+        cached_value(PAYMENT_NAMESPACE, 'stats', filters, lambda: payment_stats(queryset))
+        return total, keyset_page(
+            queryset.select_related('purchase', 'supplier'), sort, descending=True,
+            cursor=cursor, length=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE,
+        )
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, (time.perf_counter() - start) * 1000
+
+    def _measure(self, count, pages):
+        results = []
+        middle = max(1, count // PAGE_SIZE // 2)
+        for name, sort, legacy_sort in SORTS:
+            legacy = [self._timed(self._legacy_request, legacy_sort, page)[1] for page in range(1, pages + 1)]
+            legacy_jump = [self._timed(self._legacy_request, legacy_sort, middle)[1]]
+
+            invalidate_list_cache(PAYMENT_NAMESPACE)
+            keyset, cursor = [], None
+            for page in range(1, pages + 1):
+                (_, page_result), elapsed = self._timed(self._keyset_request, sort, cursor, page)
+                keyset.append(elapsed)
+                cursor = page_result.next_cursor
+            keyset_jump = [self._timed(self._keyset_request, sort, None, middle)[1]]
+
+            results += [
+                (f'legacy {name}', legacy), (f'legacy {name} page {middle}', legacy_jump),
+                (f'keyset {name}', keyset), (f'keyset {name} page {middle}', keyset_jump),
+            ]
+        return results
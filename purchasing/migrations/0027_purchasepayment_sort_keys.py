@@ -0,0 +1,79 @@
+# Generated by Django 5.2.2 on 2026-10-18 15:33
+# Backfill sort key dan index trigram ditambahkan manual
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Index GIN trigram untuk filter nomor purchase (icontains) di API payment / tax invoice.
+# Hanya PostgreSQL; database lain dilewati.
+TRGM_INDEXES = [
+    ('purchase_nomor_trgm_idx', 'purchasing_purchase', 'nomor_purchase'),
+]
+
+
+def backfill_sort_keys(apps, schema_editor):
+    PurchasePayment = apps.get_model('purchasing', 'PurchasePayment')
+    PurchasePaymentAllocation = apps.get_model('purchasing', 'PurchasePaymentAllocation')
+    last = PurchasePaymentAllocation.objects.filter(payment=OuterRef('pk')).order_by('-allocation_date')
+    PurchasePayment.objects.update(
+        last_allocation_date=Subquery(last.values('allocation_date')[:1]),
+        last_transfer_from=Coalesce(Subquery(last.values('transfer_from__nama_bank')[:1]), Value('')),
+    )
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRGM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0038_stockbalancesnapshot_stockcard_indexes'),
+        ('purchasing', '0026_alter_purchase_has_tax_invoice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchasepayment',
+            name='last_allocation_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='purchasepayment',
+            name='last_transfer_from',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='purchasepayment',
+            index=models.Index(fields=['due_date', 'id'], name='payment_due_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasepayment',
+            index=models.Index(fields=['last_allocation_date', 'id'], name='payment_last_alloc_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasepayment',
+            index=models.Index(fields=['payment_method', 'id'], name='payment_method_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasepayment',
+            index=models.Index(fields=['last_transfer_from', 'id'], name='payment_transfer_from_id_idx'),
+        ),
+        migrations.RunPython(backfill_sort_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
 
@@ -51,22 +53,9 @@ class PurchaseOrder(models.Model):
     def save(self, *args, **kwargs):
         # Auto-generate nomor_po hanya jika status bukan draft
         if self.pk and not self.nomor_po and self.status != 'draft':
-            from django.utils import timezone
-            from datetime import datetime
-            # Generate nomor PO
-            date_str = datetime.now().strftime('%Y%m%d')
-            # Get next ID
-            last_po = PurchaseOrder.objects.filter(
-                nomor_po__startswith=f'PO-{date_str}'
-            ).order_by('-nomor_po').first()
-            
-            if last_po and last_po.nomor_po:
-                last_id = int(last_po.nomor_po.split('-')[-1])
-                new_id = last_id + 1
-            else:
-                new_id = 1
-            
-            self.nomor_po = f"PO-{date_str}-{new_id:04d}"
+            # Generate nomor PO (counter DocumentSequence per hari)
+            from finance.sequences import document_number
+            self.nomor_po = document_number('PO', PurchaseOrder, 'nomor_po')
         
         # Calculate total amount
         if self.pk:
@@ -187,22 +176,9 @@ class Purchase(models.Model):
     def save(self, *args, **kwargs):
         # Auto-generate nomor_purchase hanya jika status bukan draft
         if self.pk and not self.nomor_purchase and self.status != 'draft':
-            from django.utils import timezone
-            from datetime import datetime
-            # Generate nomor purchase
-            date_str = datetime.now().strftime('%Y%m%d')
-            # Get next ID
-            last_purchase = Purchase.objects.filter(
-                nomor_purchase__startswith=f'PUR-{date_str}'
-            ).order_by('-nomor_purchase').first()
-            
-            if last_purchase and last_purchase.nomor_purchase:
-                last_id = int(last_purchase.nomor_purchase.split('-')[-1])
-                new_id = last_id + 1
-            else:
-                new_id = 1
-            
-            self.nomor_purchase = f"PUR-{date_str}-{new_id:04d}"
+            # Generate nomor purchase (counter DocumentSequence per hari)
+            from finance.sequences import document_number
+            self.nomor_purchase = document_number('PUR', Purchase, 'nomor_purchase')
         
         # Calculate total amount
         if self.pk:
@@ -300,6 +276,11 @@ class PurchasePayment(models.Model):
     ], default='CREDIT', help_text="Tipe transaksi pembayaran")
     
     notes = models.TextField(blank=True, null=True)
+    
+    # Sort key allocation terakhir (diisi save) agar list payment tidak join ke allocations
+    last_allocation_date = models.DateTimeField(null=True, blank=True)
+    last_transfer_from = models.CharField(max_length=100, blank=True, default='')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -309,6 +290,10 @@ class PurchasePayment(models.Model):
         verbose_name_plural = 'Purchase Payments'
         indexes = [
             models.Index(fields=['status', '-due_date']),
+            models.Index(fields=['due_date', 'id'], name='payment_due_date_id_idx'),
+            models.Index(fields=['last_allocation_date', 'id'], name='payment_last_alloc_id_idx'),
+            models.Index(fields=['payment_method', 'id'], name='payment_method_id_idx'),
+            models.Index(fields=['last_transfer_from', 'id'], name='payment_transfer_from_id_idx'),
         ]
     
     def __str__(self):
@@ -321,7 +306,11 @@ class PurchasePayment(models.Model):
             self.paid_amount = total_allocated
             
             # Update payment_date and payment_method from last allocation
-            last_allocation = self.allocations.order_by('-allocation_date').first()
+            last_allocation = self.allocations.select_related('transfer_from').order_by('-allocation_date').first()
+            self.last_allocation_date = last_allocation.allocation_date if last_allocation else None
+            self.last_transfer_from = (
+                last_allocation.transfer_from.nama_bank if last_allocation and last_allocation.transfer_from else ''
+            )
             if last_allocation:
                 # Update payment method from last allocation
                 self.payment_method = last_allocation.payment_method
@@ -488,3 +477,34 @@ class PurchasePaymentAllocation(models.Model):
     
     def __str__(self):
         return f"Allocation {self.amount} to {self.payment.purchase.nomor_purchase} on {self.allocation_date.strftime('%Y-%m-%d')}"
+
+
+@receiver([post_save, post_delete], sender=Purchase)
+@receiver([post_save, post_delete], sender=PurchasePayment)
+@receiver([post_save, post_delete], sender=PurchaseTaxInvoice)
+def invalidate_notification_cache_on_purchasing_change(sender, instance, **kwargs):
+    """
+    Invalidate badge counter purchase verify, payment dan tax invoice ketika datanya berubah
+    """
+    try:
+        from erp_alfa.views import invalidate_notification_cache
+        invalidate_notification_cache(sender)
+    except ImportError:
+        pass  # Ignore if function not available
+
+
+@receiver([post_save, post_delete], sender=Purchase)
+@receiver([post_save, post_delete], sender=PurchasePayment)
+@receiver([post_save, post_delete], sender=PurchasePaymentAllocation)
+@receiver([post_save, post_delete], sender=PurchaseTaxInvoice)
+def invalidate_list_cache_on_purchasing_change(sender, instance, **kwargs):
+    """
+    Invalidate cache count/statistik API list payment dan tax invoice
+    """
+    from erp_alfa.list_queries import invalidate_list_cache
+    if sender is PurchaseTaxInvoice:
+        invalidate_list_cache('purchase_taxinvoice')
+    elif sender is Purchase:
+        invalidate_list_cache('purchase_payment', 'purchase_taxinvoice')
+    else:
+        invalidate_list_cache('purchase_payment')
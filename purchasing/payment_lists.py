@@ -0,0 +1,141 @@
+"""
+Query list purchase payment dan purchase tax invoice (API halaman finance).
+
+- payment_queryset() / taxinvoice_queryset(): filter dari parameter request.
+- PAYMENT_SORT_FIELDS: sort API -> kolom. Sort allocation memakai sort key di PurchasePayment
+  (last_allocation_date, payment_method, last_transfer_from), bukan allocations__..., sehingga
+  tidak ada fan-out baris per allocation dan pagination keyset bisa dipakai.
+- payment_stats() / taxinvoice_stats(): statistik satu query aggregate.
+Count dan statistik di-cache per signature filter lewat erp_alfa.list_queries (namespace
+PAYMENT_NAMESPACE / TAXINVOICE_NAMESPACE, di-invalidate signal purchasing models).
+"""
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q, Sum
+
+from .models import PurchasePayment, PurchaseTaxInvoice
+
+PAYMENT_NAMESPACE = 'purchase_payment'
+TAXINVOICE_NAMESPACE = 'purchase_taxinvoice'
+
+PAYMENT_SORT_FIELDS = {
+    'purchase_number': 'purchase__nomor_purchase',
+    'supplier': 'supplier__nama_supplier',
+    'total_amount': 'total_amount',
+    'discount': 'discount',
+    'paid_amount': 'paid_amount',
+    'remaining_amount': 'remaining_amount',
+    'due_date': 'due_date',
+    'transaction_type': 'transaction_type',
+    'payment_date': 'last_allocation_date',
+    'status': 'status',
+    'payment_method': 'payment_method',
+    'transfer_from': 'last_transfer_from',
+    # Format database lama yang dikirim client
+    'allocations__allocation_date': 'last_allocation_date',
+    'allocations__payment_method': 'payment_method',
+    'allocations__transfer_from__nama_bank': 'last_transfer_from',
+}
+DEFAULT_PAYMENT_SORT = 'purchase_id'
+UNPAID_STATUSES = ['unpaid', 'partial', 'overdue']
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def payment_sort_field(sort_field):
+    """Kolom sort aman untuk keyset: mapping di atas atau lookup purchase__/supplier__ (satu baris)."""
+    if sort_field in PAYMENT_SORT_FIELDS:
+        return PAYMENT_SORT_FIELDS[sort_field]
+    if sort_field.startswith('purchase__') or sort_field.startswith('supplier__'):
+        return sort_field
+    return DEFAULT_PAYMENT_SORT
+
+
+def payment_filters(params):
+    """Dict filter dari request.GET (juga dipakai sebagai signature cache)."""
+    return {
+        key: params.get(key, '').strip()
+        for key in ('status', 'supplier', 'purchase', 'transaction_type', 'date_from', 'date_to')
+    }
+
+
+def payment_queryset(filters):
+    queryset = PurchasePayment.objects.all()
+    if filters['status']:
+        queryset = queryset.filter(status=filters['status'])
+    if filters['supplier']:
+        queryset = queryset.filter(supplier_id=filters['supplier'])
+    if filters['purchase']:
+        queryset = queryset.filter(purchase__nomor_purchase__icontains=filters['purchase'])
+    if filters['transaction_type']:
+        queryset = queryset.filter(transaction_type=filters['transaction_type'])
+    date_from = _parse_date(filters['date_from'])
+    if date_from:
+        queryset = queryset.filter(purchase__tanggal_purchase__gte=date_from)
+    date_to = _parse_date(filters['date_to'])
+    if date_to:
+        queryset = queryset.filter(purchase__tanggal_purchase__lt=date_to + timedelta(days=1))
+    return queryset
+
+
+def payment_stats(queryset):
+    unpaid = Q(status__in=UNPAID_STATUSES)
+    overdue = Q(status='overdue')
+    paid = Q(status='paid')
+    totals = queryset.order_by().aggregate(
+        total_unpaid=Count('id', filter=unpaid),
+        total_unpaid_amount=Sum('remaining_amount', filter=unpaid),
+        total_overdue=Count('id', filter=overdue),
+        total_overdue_amount=Sum('remaining_amount', filter=overdue),
+        total_paid=Count('id', filter=paid),
+        total_paid_amount=Sum('paid_amount', filter=paid),
+    )
+    return {key: float(value or 0) if key.endswith('_amount') else value for key, value in totals.items()}
+
+
+def taxinvoice_filters(params):
+    return {key: params.get(key, '').strip() for key in ('status', 'supplier', 'purchase', 'date_from', 'date_to')}
+
+
+def taxinvoice_queryset(filters):
+    queryset = PurchaseTaxInvoice.objects.all()
+    if filters['status']:
+        queryset = queryset.filter(status=filters['status'])
+    if filters['supplier']:
+        queryset = queryset.filter(supplier__nama_supplier__icontains=filters['supplier'])
+    if filters['purchase']:
+        queryset = queryset.filter(purchase__nomor_purchase__icontains=filters['purchase'])
+    date_from = _parse_date(filters['date_from'])
+    if date_from:
+        queryset = queryset.filter(created_at__gte=date_from)
+    date_to = _parse_date(filters['date_to'])
+    if date_to:
+        queryset = queryset.filter(created_at__lt=date_to + timedelta(days=1))
+    return queryset
+
+
+def taxinvoice_stats(queryset):
+    conditions = {status: Q(status=status) for status in ('pending', 'received', 'verified')}
+    totals = queryset.order_by().aggregate(
+        total_taxinvoice=Count('id'),
+        total_ppn=Sum('tax_amount'),
+        total_invoice_amount=Sum('invoice_amount'),
+        total_subtotal=Sum('subtotal'),
+        **{f'total_{status}_invoice': Count('id', filter=q) for status, q in conditions.items()},
+        **{f'total_{status}_ppn': Sum('tax_amount', filter=q) for status, q in conditions.items()},
+        **{f'total_{status}_amount': Sum('invoice_amount', filter=q) for status, q in conditions.items()},
+    )
+    stats = {
+        key: (value or 0) if key.endswith('_invoice') or key == 'total_taxinvoice' else float(value or 0)
+        for key, value in totals.items()
+    }
+    stats.pop('total_verified_amount', None)
+    # Legacy (for backward compatibility)
+    for status in conditions:
+        stats[f'total_{status}'] = stats[f'total_{status}_invoice']
+    return stats
@@ -4,10 +4,16 @@ from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from django.db.models import Q, Sum
+from django.db.models import Prefetch
 from django.db import transaction
 from datetime import timedelta
+from erp_alfa.exports import export_response
+from erp_alfa.list_queries import MAX_PAGE_SIZE, cached_value, keyset_page
 from purchasing.models import PurchasePayment, PurchaseTaxInvoice, Bank, Purchase
+from purchasing.payment_lists import (
+    PAYMENT_NAMESPACE, TAXINVOICE_NAMESPACE, payment_filters, payment_queryset, payment_sort_field,
+    payment_stats, taxinvoice_filters, taxinvoice_queryset, taxinvoice_stats,
+)
 
 
 # ==================== PURCHASE PAYMENT ====================
@@ -35,221 +41,105 @@ def purchase_payment_list(request):
     })
 
 
+def _due_date_status(payment, today):
+    """(status, display, hari) jatuh tempo payment relatif terhadap today."""
+    days_until_due = (payment.due_date.date() - today).days
+    if days_until_due < 0:
+        return 'overdue', 'Overdue', days_until_due
+    if days_until_due <= 2:
+        return 'warning', f'H-{days_until_due}', days_until_due
+    return 'safe', f'{days_until_due} days', days_until_due
+
+
+def _payment_row(payment, allocation, today):
+    """Satu baris tabel payment: per allocation, atau payment tanpa allocation (allocation None)."""
+    due_date_status, due_date_status_display, days_until_due = _due_date_status(payment, today)
+    paid_amount = allocation.amount if allocation else payment.paid_amount
+    transfer_from_display = '-'
+    if allocation and allocation.transfer_from:
+        transfer_from_display = f"{allocation.transfer_from.nama_bank} - {allocation.transfer_from.nomor_rekening}"
+    payment_method_display = '-'
+    if allocation and allocation.payment_method:
+        payment_method_display = allocation.get_payment_method_display()
+    return {
+        'id': payment.id,
+        'allocation_id': allocation.id if allocation else None,
+        'purchase_number': payment.purchase.nomor_purchase,
+        'purchase_date': payment.purchase.tanggal_purchase.strftime('%d %b %Y') if payment.purchase.tanggal_purchase else '-',
+        'supplier': payment.supplier.nama_supplier,
+        'total_amount': float(payment.total_amount),
+        'total_amount_formatted': f"{payment.total_amount:,.0f}".replace(',', '.'),
+        'discount': float(payment.discount),
+        'discount_formatted': f"{payment.discount:,.0f}".replace(',', '.'),
+        'paid_amount': float(paid_amount),
+        'paid_amount_formatted': f"{paid_amount:,.0f}".replace(',', '.'),
+        'remaining_amount': float(payment.remaining_amount),
+        'remaining_amount_formatted': f"{payment.remaining_amount:,.0f}".replace(',', '.'),
+        'due_date': payment.due_date.strftime('%d %b %Y'),
+        'due_date_status': due_date_status,
+        'due_date_status_display': due_date_status_display,
+        'days_until_due': days_until_due,
+        'payment_date': allocation.allocation_date.strftime('%d %b %Y') if allocation else '-',
+        'status': payment.status,
+        'status_display': payment.get_status_display(),
+        'transaction_type': payment.transaction_type,
+        'transaction_type_display': payment.get_transaction_type_display(),
+        'payment_method': payment_method_display,
+        'transfer_from': transfer_from_display,
+        'notes': (allocation.notes if allocation else payment.notes) or '-',
+        'is_overdue': days_until_due < 0,
+    }
+
+
+def _page_params(request):
+    """(page, page_size, cursor) dari request.GET."""
+    page = max(int(request.GET.get('page', 1)), 1)
+    page_size = min(max(int(request.GET.get('page_size', 25)), 1), MAX_PAGE_SIZE)
+    return page, page_size, request.GET.get('cursor', '')
+
+
 @login_required
 def purchase_payment_api(request):
-    """API endpoint for purchase payments with pagination and filtering"""
+    """
+    API endpoint for purchase payments with pagination and filtering
+
+    Pagination keyset: client mengirim cursor dari response halaman sebelumnya (next_cursor);
+    tanpa cursor (lompat halaman) dipakai OFFSET. Count dan statistik di-cache per filter.
+    """
+    from purchasing.models import PurchasePaymentAllocation
     
     try:
-        # Get pagination parameters
-        page = int(request.GET.get('page', 1))
-        page_size = int(request.GET.get('page_size', 25))
-        
-        # Get filter parameters
-        status_filter = request.GET.get('status', '').strip()
-        supplier_filter = request.GET.get('supplier', '').strip()
-        purchase_filter = request.GET.get('purchase', '').strip()
-        transaction_type_filter = request.GET.get('transaction_type', '').strip()
-        date_from = request.GET.get('date_from', '').strip()
-        date_to = request.GET.get('date_to', '').strip()
-        
-        # Get sort parameters
-        sort_field = request.GET.get('sort_field', 'purchase__id')
-        sort_direction = request.GET.get('sort_direction', 'desc')
-        
-        # Build query
-        queryset = PurchasePayment.objects.select_related(
-            'purchase', 
-            'supplier'
-        ).prefetch_related('allocations__transfer_from')
-        
-        # Apply sorting
-        sort_prefix = '-' if sort_direction == 'desc' else ''
-        
-        # Direct field mapping (jika sudah dalam format database)
-        # Atau gunakan mapping untuk backward compatibility
-        if sort_field.startswith('purchase__') or sort_field.startswith('supplier__'):
-            # Field sudah dalam format database, langsung pakai
-            actual_sort_field = sort_field
-        else:
-            # Legacy mapping untuk backward compatibility
-            sort_field_mapping = {
-                'purchase_number': 'purchase__nomor_purchase',
-                'supplier': 'supplier__nama_supplier',
-                'total_amount': 'total_amount',
-                'discount': 'discount',
-                'paid_amount': 'paid_amount',
-                'remaining_amount': 'remaining_amount',
-                'due_date': 'due_date',
-                'transaction_type': 'transaction_type',
-                'payment_date': 'allocations__allocation_date',
-                'status': 'status',
-                'payment_method': 'allocations__payment_method',
-                'transfer_from': 'allocations__transfer_from__nama_bank',
-            }
-            actual_sort_field = sort_field_mapping.get(sort_field, 'purchase__id')
-        
-        queryset = queryset.order_by(sort_prefix + actual_sort_field)
-        
-        # Apply filters
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        if supplier_filter:
-            queryset = queryset.filter(supplier_id=supplier_filter)
-        
-        if purchase_filter:
-            queryset = queryset.filter(purchase__nomor_purchase__icontains=purchase_filter)
-        
-        if transaction_type_filter:
-            queryset = queryset.filter(transaction_type=transaction_type_filter)
-        
-        if date_from:
-            try:
-                from datetime import datetime
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(purchase__tanggal_purchase__gte=date_from_obj)
-            except:
-                pass
-        
-        if date_to:
-            try:
-                from datetime import datetime
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                end_of_day = date_to_obj + timedelta(days=1)
-                queryset = queryset.filter(purchase__tanggal_purchase__lt=end_of_day)
-            except:
-                pass
-        
-        # Get total count
-        total_count = queryset.count()
-        
-        # Pagination
-        start = (page - 1) * page_size
-        end = start + page_size
-        payments = queryset[start:end]
-        
-        # Calculate total pages
-        total_pages = (total_count + page_size - 1) // page_size
+        page, page_size, cursor = _page_params(request)
+        filters = payment_filters(request.GET)
+        sort_field = payment_sort_field(request.GET.get('sort_field', 'purchase__id'))
+        descending = request.GET.get('sort_direction', 'desc') == 'desc'
+        
+        queryset = payment_queryset(filters)
+        total_count = cached_value(PAYMENT_NAMESPACE, 'count', filters, queryset.count)
+        stats = cached_value(PAYMENT_NAMESPACE, 'stats', filters, lambda: payment_stats(queryset))
+        
+        payments_page = keyset_page(
+            queryset.select_related('purchase', 'supplier').prefetch_related(Prefetch(
+                'allocations',
+                queryset=PurchasePaymentAllocation.objects.select_related('transfer_from').order_by('-allocation_date'),
+            )),
+            sort_field, descending=descending, cursor=cursor, length=page_size, offset=(page - 1) * page_size,
+        )
         
         # Prepare data - show each allocation as separate row
+        today = timezone.now().date()
         data = []
-        for payment in payments:
-            allocations = payment.allocations.order_by('-allocation_date')
-            
-            if allocations.exists():
-                # Show each allocation as separate row
-                for allocation in allocations:
-                    payment_method_display = allocation.get_payment_method_display() if allocation.payment_method else '-'
-                    transfer_from_display = '-'
-                    
-                    if allocation.transfer_from:
-                        transfer_from_display = f"{allocation.transfer_from.nama_bank} - {allocation.transfer_from.nomor_rekening}"
-                    
-                    # Calculate due date status
-                    from datetime import timedelta
-                    today = timezone.now().date()
-                    due_date_obj = payment.due_date.date()
-                    days_until_due = (due_date_obj - today).days
-                    
-                    if days_until_due < 0:
-                        due_date_status = 'overdue'
-                        due_date_status_display = 'Overdue'
-                    elif days_until_due <= 2:
-                        due_date_status = 'warning'
-                        due_date_status_display = f'H-{days_until_due}'
-                    else:
-                        due_date_status = 'safe'
-                        due_date_status_display = f'{days_until_due} days'
-                    
-                    data.append({
-                        'id': payment.id,
-                        'allocation_id': allocation.id,
-                        'purchase_number': payment.purchase.nomor_purchase,
-                        'purchase_date': payment.purchase.tanggal_purchase.strftime('%d %b %Y') if payment.purchase.tanggal_purchase else '-',
-                        'supplier': payment.supplier.nama_supplier,
-                        'total_amount': float(payment.total_amount),
-                        'total_amount_formatted': f"{payment.total_amount:,.0f}".replace(',', '.'),
-                        'discount': float(payment.discount),
-                        'discount_formatted': f"{payment.discount:,.0f}".replace(',', '.'),
-                        'paid_amount': float(allocation.amount),
-                        'paid_amount_formatted': f"{allocation.amount:,.0f}".replace(',', '.'),
-                        'remaining_amount': float(payment.remaining_amount),
-                        'remaining_amount_formatted': f"{payment.remaining_amount:,.0f}".replace(',', '.'),
-                        'due_date': payment.due_date.strftime('%d %b %Y'),
-                        'due_date_status': due_date_status,
-                        'due_date_status_display': due_date_status_display,
-                        'days_until_due': days_until_due,
-                        'payment_date': allocation.allocation_date.strftime('%d %b %Y'),
-                        'status': payment.status,
-                        'status_display': payment.get_status_display(),
-                        'transaction_type': payment.transaction_type,
-                        'transaction_type_display': payment.get_transaction_type_display(),
-                        'payment_method': payment_method_display,
-                        'transfer_from': transfer_from_display,
-                        'notes': allocation.notes or '-',
-                        'is_overdue': days_until_due < 0,
-                    })
-            else:
-                # No allocations yet - show payment record
-                # Calculate due date status
-                from datetime import timedelta
-                today = timezone.now().date()
-                due_date_obj = payment.due_date.date()
-                days_until_due = (due_date_obj - today).days
-                
-                if days_until_due < 0:
-                    due_date_status = 'overdue'
-                    due_date_status_display = 'Overdue'
-                elif days_until_due <= 2:
-                    due_date_status = 'warning'
-                    due_date_status_display = f'H-{days_until_due}'
-                else:
-                    due_date_status = 'safe'
-                    due_date_status_display = f'{days_until_due} days'
-                
-                data.append({
-                    'id': payment.id,
-                    'allocation_id': None,
-                    'purchase_number': payment.purchase.nomor_purchase,
-                    'purchase_date': payment.purchase.tanggal_purchase.strftime('%d %b %Y') if payment.purchase.tanggal_purchase else '-',
-                    'supplier': payment.supplier.nama_supplier,
-                    'total_amount': float(payment.total_amount),
-                    'total_amount_formatted': f"{payment.total_amount:,.0f}".replace(',', '.'),
-                    'discount': float(payment.discount),
-                    'discount_formatted': f"{payment.discount:,.0f}".replace(',', '.'),
-                    'paid_amount': float(payment.paid_amount),
-                    'paid_amount_formatted': f"{payment.paid_amount:,.0f}".replace(',', '.'),
-                    'remaining_amount': float(payment.remaining_amount),
-                    'remaining_amount_formatted': f"{payment.remaining_amount:,.0f}".replace(',', '.'),
-                    'due_date': payment.due_date.strftime('%d %b %Y'),
-                    'due_date_status': due_date_status,
-                    'due_date_status_display': due_date_status_display,
-                    'days_until_due': days_until_due,
-                    'payment_date': '-',
-                    'status': payment.status,
-                    'status_display': payment.get_status_display(),
-                    'transaction_type': payment.transaction_type,
-                    'transaction_type_display': payment.get_transaction_type_display(),
-                    'payment_method': '-',
-                    'transfer_from': '-',
-                    'notes': payment.notes or '-',
-                    'is_overdue': days_until_due < 0,
-                })
-        
-        # Calculate statistics
-        stats = {
-            'total_unpaid': queryset.filter(status__in=['unpaid', 'partial', 'overdue']).count(),
-            'total_unpaid_amount': float(queryset.filter(status__in=['unpaid', 'partial', 'overdue']).aggregate(total=Sum('remaining_amount'))['total'] or 0),
-            'total_overdue': queryset.filter(status='overdue').count(),
-            'total_overdue_amount': float(queryset.filter(status='overdue').aggregate(total=Sum('remaining_amount'))['total'] or 0),
-            'total_paid': queryset.filter(status='paid').count(),
-            'total_paid_amount': float(queryset.filter(status='paid').aggregate(total=Sum('paid_amount'))['total'] or 0),
-        }
+        for payment in payments_page.rows:
+            allocations = list(payment.allocations.all())
+            for allocation in allocations or [None]:
+                data.append(_payment_row(payment, allocation, today))
         
         return JsonResponse({
             'data': data,
-            'total_pages': total_pages,
+            'total_pages': (total_count + page_size - 1) // page_size,
+            'total_count': total_count,
             'current_page': page,
+            'next_cursor': payments_page.next_cursor,
             'stats': stats
         })
     
@@ -350,6 +240,88 @@ def purchase_payment_update(request, payment_id):
         return redirect('purchasing:purchase_payment_list')
 
 
+@login_required
+@require_POST
+def purchase_payment_bulk_update(request):
+    """
+    Payment run (end-of-day): lunasi sisa banyak payment sekaligus dengan satu metode/bank.
+    Allocation di-bulk_create, journal pembayaran seluruh payment disimpan dalam satu JournalBatch.
+    """
+    from datetime import datetime
+    from finance.journal_batch import JournalBatch
+    from purchasing.accounting import commit_journal_batch, create_purchase_payment_journal_entry
+    from purchasing.models import PurchasePaymentAllocation
+    
+    payment_ids = request.POST.getlist('payment_ids[]') or request.POST.getlist('payment_ids')
+    payment_method = request.POST.get('payment_method', '')
+    payment_date = request.POST.get('payment_date', '')
+    reference_number = request.POST.get('reference_number', '')
+    transfer_from_id = request.POST.get('transfer_from', '')
+    notes = request.POST.get('notes', '')
+    
+    if not payment_ids:
+        messages.error(request, 'Pilih minimal satu payment!')
+        return redirect('purchasing:purchase_payment_list')
+    
+    transfer_from = None
+    if payment_method == 'transfer':
+        if not transfer_from_id:
+            messages.error(request, 'Transfer From harus dipilih untuk payment method Transfer!')
+            return redirect('purchasing:purchase_payment_list')
+        transfer_from = get_object_or_404(Bank.objects.select_related('account'), id=transfer_from_id, is_active=True)
+    
+    try:
+        allocation_date = timezone.make_aware(datetime.strptime(payment_date, '%Y-%m-%d')) if payment_date else timezone.now()
+        
+        with transaction.atomic():
+            payments = list(
+                PurchasePayment.objects.select_for_update(of=('self',)).select_related('purchase__supplier')
+                .filter(id__in=payment_ids, remaining_amount__gt=0).order_by('id')
+            )
+            if not payments:
+                messages.warning(request, 'Tidak ada payment dengan sisa pembayaran.')
+                return redirect('purchasing:purchase_payment_list')
+            
+            PurchasePaymentAllocation.objects.bulk_create([
+                PurchasePaymentAllocation(
+                    payment=payment,
+                    amount=payment.remaining_amount,
+                    allocation_date=allocation_date,
+                    payment_method=payment_method,
+                    transfer_from=transfer_from,
+                    reference_number=reference_number,
+                    notes=notes,
+                    created_by=request.user
+                )
+                for payment in payments
+            ])
+            
+            journal_batch = JournalBatch(request.user)
+            for payment in payments:
+                create_purchase_payment_journal_entry(
+                    purchase=payment.purchase,
+                    payment_amount=payment.remaining_amount,
+                    bank_account=transfer_from,
+                    user=request.user,
+                    discount_amount=payment.discount,
+                    batch=journal_batch,
+                    entry_date=timezone.localtime(allocation_date).date()
+                )
+                # Update payment (auto-calculate from allocations)
+                payment.save()
+            journal_entries, journal_error = commit_journal_batch(journal_batch, 'purchase payment')
+        
+        if journal_error:
+            messages.warning(request, f'{len(payments)} payment berhasil dibayar, tapi ada error saat membuat journal entry: {journal_error}')
+        else:
+            messages.success(request, f'{len(payments)} payment berhasil dibayar! {len(journal_entries)} journal entry telah dibuat.')
+    
+    except Exception as e:
+        messages.error(request, f'Error: {str(e)}')
+    
+    return redirect('purchasing:purchase_payment_list')
+
+
 # ==================== PURCHASE TAX INVOICE ====================
 
 @login_required
@@ -366,144 +338,8 @@ def purchase_taxinvoice_list(request):
 
 @login_required
 def purchase_taxinvoice_download_excel(request):
-    """Download tax invoices to Excel with filters"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.utils import get_column_letter
-    from datetime import datetime
-    
-    # Get filter parameters
-    status_filter = request.GET.get('status', '').strip()
-    supplier_filter = request.GET.get('supplier', '').strip()
-    date_from = request.GET.get('date_from', '').strip()
-    date_to = request.GET.get('date_to', '').strip()
-    
-    # Build query
-    queryset = PurchaseTaxInvoice.objects.select_related('purchase', 'supplier').order_by('-created_at')
-    
-    # Apply filters
-    if status_filter:
-        queryset = queryset.filter(status=status_filter)
-    
-    if supplier_filter:
-        queryset = queryset.filter(supplier__nama_supplier__icontains=supplier_filter)
-    
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            queryset = queryset.filter(created_at__gte=date_from_obj)
-        except:
-            pass
-    
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            end_of_day = date_to_obj + timedelta(days=1)
-            queryset = queryset.filter(created_at__lt=end_of_day)
-        except:
-            pass
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Tax Invoices"
-    
-    # Header style
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Title
-    ws['A1'] = "LAPORAN TAX INVOICE"
-    ws.merge_cells('A1:J1')
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    # Filter info
-    row = 3
-    ws[f'A{row}'] = "Filter:"
-    ws[f'A{row}'].font = Font(bold=True)
-    row += 1
-    
-    if status_filter:
-        ws[f'A{row}'] = f"Status: {status_filter}"
-        row += 1
-    if supplier_filter:
-        ws[f'A{row}'] = f"Supplier: {supplier_filter}"
-        row += 1
-    if date_from:
-        ws[f'A{row}'] = f"From: {date_from}"
-        row += 1
-    if date_to:
-        ws[f'A{row}'] = f"To: {date_to}"
-        row += 1
-    
-    row += 1
-    
-    # Headers
-    headers = [
-        'No', 'Purchase Number', 'Supplier', 'Tax Invoice Number', 'Tax Invoice Date',
-        'Subtotal', 'Tax (11%)', 'Discount', 'Total Amount', 'Status'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-    
-    row += 1
-    
-    # Data
-    for idx, invoice in enumerate(queryset, 1):
-        ws.cell(row=row, column=1, value=idx).border = border
-        ws.cell(row=row, column=2, value=invoice.purchase.nomor_purchase).border = border
-        ws.cell(row=row, column=3, value=invoice.supplier.nama_supplier).border = border
-        ws.cell(row=row, column=4, value=invoice.invoice_number or '-').border = border
-        ws.cell(row=row, column=5, value=invoice.invoice_date.strftime('%Y-%m-%d') if invoice.invoice_date else '-').border = border
-        ws.cell(row=row, column=6, value=invoice.subtotal).border = border
-        ws.cell(row=row, column=7, value=invoice.tax_amount).border = border
-        ws.cell(row=row, column=8, value=invoice.discount).border = border
-        ws.cell(row=row, column=9, value=invoice.invoice_amount).border = border
-        ws.cell(row=row, column=10, value=invoice.get_status_display()).border = border
-        
-        # Right align numbers
-        for col in [6, 7, 8, 9]:
-            ws.cell(row=row, column=col).alignment = Alignment(horizontal='right')
-        
-        row += 1
-    
-    # Auto-adjust column widths
-    column_widths = [5, 20, 25, 25, 15, 15, 15, 15, 15, 15]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    
-    # Generate filename with filters
-    filename = f"tax_invoices_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    if status_filter:
-        filename += f"_{status_filter}"
-    if date_from:
-        filename += f"_from{date_from}"
-    if date_to:
-        filename += f"_to{date_to}"
-    filename += ".xlsx"
-    
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
+    """Download tax invoices to Excel with filters (?format=csv untuk CSV)"""
+    return export_response(request, 'purchasing.exports.tax_invoice_report')
 
 
 @login_required
@@ -608,6 +444,12 @@ def purchase_taxinvoice_upload(request):
             error_count = 0
             errors = []
             
+            # Journal pajak seluruh baris disimpan sekaligus di akhir upload
+            from finance.journal_batch import JournalBatch
+            from purchasing.accounting import commit_journal_batch, create_purchase_taxinvoice_journal_entry
+            journal_batch = JournalBatch(request.user)
+            journal_error = None
+            
             with transaction.atomic():
                 for row in range(start_row, ws.max_row + 1):
                     # Get values
@@ -622,7 +464,7 @@ def purchase_taxinvoice_upload(request):
                     
                     try:
                         # Find purchase
-                        purchase = Purchase.objects.get(nomor_purchase=str(purchase_number))
+                        purchase = Purchase.objects.select_related('supplier').get(nomor_purchase=str(purchase_number))
                         
                         # Get or create tax invoice
                         tax_invoice = PurchaseTaxInvoice.objects.get(purchase=purchase)
@@ -642,12 +484,22 @@ def purchase_taxinvoice_upload(request):
                                 invoice_date = invoice_date_str
                         
                         # Update tax invoice
+                        already_received = tax_invoice.status == 'received'
                         tax_invoice.invoice_number = str(invoice_number)
                         tax_invoice.invoice_date = invoice_date
                         tax_invoice.notes = notes
                         tax_invoice.status = 'received'
                         tax_invoice.save()
                         
+                        # Journal hanya untuk faktur yang baru diterima (upload ulang tidak posting dua kali)
+                        if not already_received and tax_invoice.tax_amount:
+                            create_purchase_taxinvoice_journal_entry(
+                                purchase=purchase,
+                                tax_amount=tax_invoice.tax_amount,
+                                user=request.user,
+                                batch=journal_batch
+                            )
+                        
                         success_count += 1
                         
                     except Purchase.DoesNotExist:
@@ -659,12 +511,16 @@ def purchase_taxinvoice_upload(request):
                     except Exception as e:
                         errors.append(f"Row {row}: {str(e)}")
                         error_count += 1
+                
+                journal_entries, journal_error = commit_journal_batch(journal_batch, 'purchase tax invoice')
             
             # Return result
             if error_count == 0:
-                messages.success(request, f'Berhasil upload {success_count} tax invoice!')
+                messages.success(request, f'Berhasil upload {success_count} tax invoice! {len(journal_entries)} journal entry telah dibuat.')
             else:
                 messages.warning(request, f'Berhasil upload {success_count} tax invoice. {error_count} error: ' + '; '.join(errors[:5]))
+            if journal_error:
+                messages.warning(request, f'Tax invoice berhasil diupload, tapi ada error saat membuat journal entry: {journal_error}')
             
             return redirect('purchasing:purchase_taxinvoice_list')
             
@@ -678,66 +534,27 @@ def purchase_taxinvoice_upload(request):
 
 @login_required
 def purchase_taxinvoice_api(request):
-    """API endpoint for purchase tax invoices with pagination and filtering"""
-    
-    # Get pagination parameters
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 25))
-    
-    # Get filter parameters
-    status_filter = request.GET.get('status', '').strip()
-    supplier_filter = request.GET.get('supplier', '').strip()
-    purchase_filter = request.GET.get('purchase', '').strip()
-    date_from = request.GET.get('date_from', '').strip()
-    date_to = request.GET.get('date_to', '').strip()
-    
-    # Build query
-    queryset = PurchaseTaxInvoice.objects.select_related(
-        'purchase', 
-        'supplier'
-    ).order_by('-created_at')
-    
-    # Apply filters
-    if status_filter:
-        queryset = queryset.filter(status=status_filter)
-    
-    if supplier_filter:
-        queryset = queryset.filter(supplier__nama_supplier__icontains=supplier_filter)
-    
-    if purchase_filter:
-        queryset = queryset.filter(purchase__nomor_purchase__icontains=purchase_filter)
-    
-    if date_from:
-        try:
-            from datetime import datetime
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            queryset = queryset.filter(created_at__gte=date_from_obj)
-        except:
-            pass
-    
-    if date_to:
-        try:
-            from datetime import datetime
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            end_of_day = date_to_obj + timedelta(days=1)
-            queryset = queryset.filter(created_at__lt=end_of_day)
-        except:
-            pass
-    
-    # Get total count
-    total_count = queryset.count()
-    
-    # Pagination
-    start = (page - 1) * page_size
-    end = start + page_size
-    invoices = queryset[start:end]
-    
-    # Calculate total pages
-    total_pages = (total_count + page_size - 1) // page_size
+    """
+    API endpoint for purchase tax invoices with pagination and filtering
+
+    Urut created_at terbaru dengan pagination keyset (cursor), count dan statistik di-cache
+    per filter.
+    """
+    page, page_size, cursor = _page_params(request)
+    filters = taxinvoice_filters(request.GET)
+    
+    queryset = taxinvoice_queryset(filters)
+    total_count = cached_value(TAXINVOICE_NAMESPACE, 'count', filters, queryset.count)
+    stats = cached_value(TAXINVOICE_NAMESPACE, 'stats', filters, lambda: taxinvoice_stats(queryset))
+    
+    invoices_page = keyset_page(
+        queryset.select_related('purchase', 'supplier'), 'created_at', descending=True,
+        cursor=cursor, length=page_size, offset=(page - 1) * page_size,
+    )
     
     # Prepare data
     data = []
-    for invoice in invoices:
+    for invoice in invoices_page.rows:
         data.append({
             'id': invoice.id,
             'purchase_number': invoice.purchase.nomor_purchase,
@@ -757,38 +574,12 @@ def purchase_taxinvoice_api(request):
             'notes': invoice.notes or '-',
         })
     
-    # Calculate statistics
-    stats = {
-        # Overall Summary
-        'total_taxinvoice': queryset.count(),
-        'total_ppn': float(queryset.aggregate(total=Sum('tax_amount'))['total'] or 0),
-        'total_invoice_amount': float(queryset.aggregate(total=Sum('invoice_amount'))['total'] or 0),
-        'total_subtotal': float(queryset.aggregate(total=Sum('subtotal'))['total'] or 0),
-        
-        # Pending
-        'total_pending_invoice': queryset.filter(status='pending').count(),
-        'total_pending_ppn': float(queryset.filter(status='pending').aggregate(total=Sum('tax_amount'))['total'] or 0),
-        'total_pending_amount': float(queryset.filter(status='pending').aggregate(total=Sum('invoice_amount'))['total'] or 0),
-        
-        # Received
-        'total_received_invoice': queryset.filter(status='received').count(),
-        'total_received_ppn': float(queryset.filter(status='received').aggregate(total=Sum('tax_amount'))['total'] or 0),
-        'total_received_amount': float(queryset.filter(status='received').aggregate(total=Sum('invoice_amount'))['total'] or 0),
-        
-        # Verified
-        'total_verified_invoice': queryset.filter(status='verified').count(),
-        'total_verified_ppn': float(queryset.filter(status='verified').aggregate(total=Sum('tax_amount'))['total'] or 0),
-        
-        # Legacy (for backward compatibility)
-        'total_pending': queryset.filter(status='pending').count(),
-        'total_received': queryset.filter(status='received').count(),
-        'total_verified': queryset.filter(status='verified').count(),
-    }
-    
     return JsonResponse({
         'data': data,
-        'total_pages': total_pages,
+        'total_pages': (total_count + page_size - 1) // page_size,
+        'total_count': total_count,
         'current_page': page,
+        'next_cursor': invoices_page.next_cursor,
         'stats': stats
     })
 
@@ -5,8 +5,9 @@ from django.http import HttpResponse
 from django.db.models import Q, Sum, Count
 from django.template.loader import render_to_string
 from datetime import datetime, timedelta
-from purchasing.models import Purchase, PurchaseItem
+from purchasing.models import Purchase
 from inventory.models import Supplier
+from erp_alfa.exports import export_response
 
 
 @login_required
@@ -113,170 +114,8 @@ def purchase_report_preview(request):
 
 @login_required
 def purchase_report_excel(request):
-    """Generate Purchase Report as Excel"""
-    date_from = request.GET.get('date_from', '').strip()
-    date_to = request.GET.get('date_to', '').strip()
-    supplier_id = request.GET.get('supplier_id', '').strip()
-    report_type = request.GET.get('report_type', 'detail')  # detail or summary
-    
-    # Build query
-    queryset = Purchase.objects.select_related('supplier', 'created_by', 'received_by').order_by('-tanggal_purchase')
-    
-    # Apply filters
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            queryset = queryset.filter(tanggal_purchase__gte=date_from_obj)
-        except:
-            pass
-    
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            end_of_day = date_to_obj + timedelta(days=1)
-            queryset = queryset.filter(tanggal_purchase__lt=end_of_day)
-        except:
-            pass
-    
-    if supplier_id:
-        queryset = queryset.filter(supplier_id=supplier_id)
-    
-    purchases = queryset.all()
-    
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.utils import get_column_letter
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Purchase Report"
-    
-    # Header
-    ws['A1'] = 'PURCHASE REPORT'
-    ws['A1'].font = Font(size=16, bold=True)
-    ws.merge_cells('A1:E1')
-    ws['A1'].alignment = Alignment(horizontal='center')
-    
-    ws['A2'] = 'PT. ALFA ERP'
-    ws['A2'].font = Font(size=12)
-    ws.merge_cells('A2:E2')
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    # Report Info
-    row = 4
-    ws[f'A{row}'] = f'Periode: {date_from} s/d {date_to}'
-    ws[f'A{row}'].font = Font(bold=True)
-    row += 1
-    ws[f'A{row}'] = f'Report Type: {report_type.upper()}'
-    ws[f'A{row}'].font = Font(bold=True)
-    row += 2
-    
-    if report_type == 'detail':
-        # Detail Report
-        headers = ['Date', 'Purchase Number', 'Supplier', 'Product', 'Barcode', 'Qty', 'Harga Beli', 'Subtotal', 'Status', 'Received By', 'Payment Status', 'Tax Invoice Status']
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=row, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color='1e40af', end_color='1e40af', fill_type='solid')
-            cell.font = Font(bold=True, color='FFFFFF')
-            cell.alignment = Alignment(horizontal='center')
-        
-        row += 1
-        for purchase in purchases:
-            items = PurchaseItem.objects.filter(purchase=purchase).select_related('product')
-            for item in items:
-                ws[f'A{row}'] = purchase.tanggal_purchase.strftime('%d %b %Y')
-                ws[f'B{row}'] = purchase.nomor_purchase
-                ws[f'C{row}'] = purchase.supplier.nama_supplier
-                ws[f'D{row}'] = item.product.nama_produk
-                ws[f'E{row}'] = item.product.barcode or item.product.sku
-                ws[f'F{row}'] = item.quantity
-                ws[f'G{row}'] = item.harga_beli
-                ws[f'H{row}'] = item.subtotal
-                ws[f'I{row}'] = purchase.get_status_display()
-                ws[f'J{row}'] = purchase.received_by.get_full_name() if purchase.received_by else '-'
-                
-                # Payment Status
-                payment = purchase.payment.first()
-                if payment:
-                    payment_status = payment.get_status_display()
-                    payment_amount = f"Rp {payment.paid_amount:,} / Rp {payment.total_amount:,}"
-                    ws[f'K{row}'] = f"{payment_status}\n{payment_amount}"
-                else:
-                    ws[f'K{row}'] = ''
-                
-                # Tax Invoice Status
-                tax_invoice = purchase.tax_invoice.first()
-                if tax_invoice:
-                    tax_status = tax_invoice.get_status_display()
-                    invoice_number = tax_invoice.invoice_number or 'No Invoice'
-                    ws[f'L{row}'] = f"{tax_status}\n{invoice_number}"
-                else:
-                    ws[f'L{row}'] = ''
-                
-                row += 1
-        
-        # Total
-        ws[f'G{row}'] = 'TOTAL:'
-        ws[f'G{row}'].font = Font(bold=True)
-        ws[f'G{row}'].alignment = Alignment(horizontal='right')
-        ws[f'H{row}'] = sum(p.total_amount for p in purchases)
-        ws[f'H{row}'].font = Font(bold=True)
-        
-        # Adjust column widths
-        ws.column_dimensions['A'].width = 12
-        ws.column_dimensions['B'].width = 20
-        ws.column_dimensions['C'].width = 20
-        ws.column_dimensions['D'].width = 35
-        ws.column_dimensions['E'].width = 15
-        ws.column_dimensions['F'].width = 8
-        ws.column_dimensions['G'].width = 12
-        ws.column_dimensions['H'].width = 12
-        ws.column_dimensions['I'].width = 12
-        ws.column_dimensions['J'].width = 20
-        ws.column_dimensions['K'].width = 25
-        ws.column_dimensions['L'].width = 25
-    
-    else:
-        # Summary Report
-        headers = ['Date', 'Purchase Number', 'Supplier', 'Total Amount', 'Status']
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=row, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color='1e40af', end_color='1e40af', fill_type='solid')
-            cell.font = Font(bold=True, color='FFFFFF')
-            cell.alignment = Alignment(horizontal='center')
-        
-        row += 1
-        for purchase in purchases:
-            ws[f'A{row}'] = purchase.tanggal_purchase.strftime('%d %b %Y')
-            ws[f'B{row}'] = purchase.nomor_purchase
-            ws[f'C{row}'] = purchase.supplier.nama_supplier
-            ws[f'D{row}'] = purchase.total_amount
-            ws[f'E{row}'] = purchase.get_status_display()
-            row += 1
-        
-        # Total
-        ws[f'C{row}'] = 'TOTAL:'
-        ws[f'C{row}'].font = Font(bold=True)
-        ws[f'C{row}'].alignment = Alignment(horizontal='right')
-        ws[f'D{row}'] = sum(p.total_amount for p in purchases)
-        ws[f'D{row}'].font = Font(bold=True)
-        
-        # Adjust column widths
-        ws.column_dimensions['A'].width = 12
-        ws.column_dimensions['B'].width = 20
-        ws.column_dimensions['C'].width = 25
-        ws.column_dimensions['D'].width = 15
-        ws.column_dimensions['E'].width = 12
-    
-    # Generate filename
-    filename = f"Purchase_Report_{date_from}_{date_to}_{report_type}.xlsx"
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    """Generate Purchase Report as Excel (?format=csv untuk CSV)"""
+    return export_response(request, 'purchasing.exports.purchase_report')
 
 
 @login_required
@@ -0,0 +1,25 @@
+import logging
+from datetime import datetime
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .verification import verify_purchases
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def verify_purchases_task(purchase_ids, due_date, transaction_type, has_fp=True, user_id=None):
+    """Bulk verify purchase (due_date string YYYY-MM-DD). Return ringkasan VerifyResult."""
+    user = get_user_model().objects.filter(pk=user_id).first() if user_id else None
+    due = timezone.make_aware(datetime.strptime(due_date, '%Y-%m-%d'))
+    result = verify_purchases(purchase_ids, user, due, transaction_type, has_fp)
+    return {
+        'verified': result.verified,
+        'skipped': result.skipped,
+        'lines': result.lines,
+        'journal_entries': [entry.entry_number for entry in result.journal_entries],
+        'journal_errors': [f"{purchase.nomor_purchase}: {error}" for purchase, error in result.journal_errors],
+    }
@@ -37,6 +37,7 @@ urlpatterns = [
     path('purchase/<int:purchase_id>/receive/', views.purchase_receive, name='purchase_receive'),
     path('purchase/<int:purchase_id>/verify/', views.purchase_verify, name='purchase_verify'),
     path('purchase-verify/', views.purchase_verify_list, name='purchase_verify_list'),
+    path('purchase-verify/bulk/', views.purchase_verify_bulk, name='purchase_verify_bulk'),
     path('purchase/<int:purchase_id>/delete/', views.purchase_delete, name='purchase_delete'),
     path('purchase/<int:purchase_id>/cancel/', views.purchase_cancel, name='purchase_cancel'),
     
@@ -50,6 +51,7 @@ urlpatterns = [
     path('purchase-payment/', views.payment_views.purchase_payment_list, name='purchase_payment_list'),
     path('purchase-payment/api/', views.payment_views.purchase_payment_api, name='purchase_payment_api'),
     path('purchase-payment/<int:payment_id>/update/', views.payment_views.purchase_payment_update, name='purchase_payment_update'),
+    path('purchase-payment/bulk-update/', views.payment_views.purchase_payment_bulk_update, name='purchase_payment_bulk_update'),
     
     # Purchase Tax Invoice
     path('purchase-taxinvoice/', views.payment_views.purchase_taxinvoice_list, name='purchase_taxinvoice_list'),
@@ -0,0 +1,340 @@
+"""
+Pipeline verifikasi purchase (satu purchase dari halaman verify, banyak purchase dari bulk
+verify / Celery task verify_purchases_task).
+
+verify_purchases() per chunk purchase dalam satu transaksi:
+1. lock purchase berstatus received (urut tanggal_purchase, id) dan Product yang dibeli
+   (urut pk), ambil seluruh PurchaseItem dan Stock.quantity sekali.
+2. HPP weighted average seluruh baris dihitung sekaligus (replay_hpp, numpy).
+3. status verified (bulk_update), journal entry seluruh purchase (satu JournalBatch),
+   PriceHistory bulk_create, Product bulk_update (harga_beli, last_purchase_price, last_purchase_date, hpp),
+   PurchasePayment dan PurchaseTaxInvoice bulk_create.
+
+Rumus HPP sama dengan verifikasi lama:
+    HPP lama 0                -> harga beli
+    selain itu                -> (HPP lama x stok sebelum + harga beli x qty) / (stok sebelum + qty)
+    stok sebelum = max(0, stok saat verifikasi - qty baris), dibulatkan 2 desimal.
+Baris produk yang sama (antar purchase dalam satu batch) diproses berurutan: baris ke-n
+memakai HPP hasil baris ke-(n-1).
+
+recalculate_hpp() memutar ulang PriceHistory urut waktu verifikasi untuk membangun ulang HPP
+produk (command recalculate_hpp); stok saat verifikasi diambil dari saldo kartu stok.
+"""
+import logging
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from erp_alfa.list_queries import invalidate_list_cache
+from finance.journal_batch import JournalBatch
+from inventory.models import Stock, StockCardEntry
+from products.models import Product
+from .models import PriceHistory, Purchase, PurchaseItem, PurchasePayment, PurchaseTaxInvoice
+from .payment_lists import PAYMENT_NAMESPACE, TAXINVOICE_NAMESPACE
+
+logger = logging.getLogger(__name__)
+
+VERIFY_CHUNK_SIZE = 50
+REPLAY_CHUNK_SIZE = 500
+TAX_RATE = 11  # PPN 11%
+
+VerifyResult = namedtuple('VerifyResult', ['verified', 'skipped', 'lines', 'journal_entries', 'journal_errors'])
+HppReplay = namedtuple('HppReplay', ['products', 'histories', 'changed'])
+
+
+# ---------------------------------------------------------------------------
+# HPP weighted average
+# ---------------------------------------------------------------------------
+
+def weighted_average_hpp(hpp_lama, stock_qty, qty_beli, harga_beli):
+    """HPP baru (array, belum dibulatkan) untuk baris paralel; stock_qty = stok saat verifikasi."""
+    hpp_lama = np.asarray(hpp_lama, dtype=float)
+    qty_beli = np.asarray(qty_beli, dtype=float)
+    harga_beli = np.asarray(harga_beli, dtype=float)
+    stock_before = np.maximum(np.asarray(stock_qty, dtype=float) - qty_beli, 0)
+    total_qty = stock_before + qty_beli
+    weighted = (hpp_lama * stock_before + harga_beli * qty_beli) / np.where(total_qty > 0, total_qty, 1)
+    return np.where((hpp_lama == 0) | (total_qty <= 0), harga_beli, weighted)
+
+
+def _line_ranks(product_ids):
+    """Urutan kemunculan tiap baris di antara baris produk yang sama (0, 1, 2, ...)."""
+    count = len(product_ids)
+    order = np.argsort(product_ids, kind='stable')
+    ordered = product_ids[order]
+    first = np.r_[True, ordered[1:] != ordered[:-1]]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(count), 0))
+    ranks = np.empty(count, dtype=int)
+    ranks[order] = np.arange(count) - group_start
+    return ranks
+
+
+def replay_hpp(product_ids, qtys, prices, stock_qtys, start_hpp):
+    """
+    Hitung HPP baris berurutan. Baris dengan urutan sama di produk berbeda dihitung sekaligus
+    (vectorized); jumlah putaran = baris terbanyak satu produk.
+    start_hpp: {product_id: HPP awal}. Return (HPP per baris [Decimal], {product_id: HPP akhir}).
+    """
+    if not product_ids:
+        return [], dict(start_hpp)
+    product_ids = np.asarray(product_ids)
+    qtys, prices, stock_qtys = (np.asarray(values, dtype=float) for values in (qtys, prices, stock_qtys))
+    ranks = _line_ranks(product_ids)
+    current = {product_id: float(hpp or 0) for product_id, hpp in start_hpp.items()}
+    line_hpp = [None] * len(product_ids)
+    for rank in range(int(ranks.max()) + 1):
+        idx = np.nonzero(ranks == rank)[0]
+        hpp_lama = [current.get(product_id, 0.0) for product_id in product_ids[idx].tolist()]
+        hpp_baru = weighted_average_hpp(hpp_lama, stock_qtys[idx], qtys[idx], prices[idx])
+        for i, value in zip(idx.tolist(), hpp_baru.tolist()):
+            value = round(value, 2)
+            current[product_ids[i].item()] = value
+            line_hpp[i] = Decimal(str(value))
+    return line_hpp, {product_id: Decimal(str(value)) for product_id, value in current.items()}
+
+
+# ---------------------------------------------------------------------------
+# Verifikasi
+# ---------------------------------------------------------------------------
+
+def _new_payment(purchase, due_date, transaction_type, now):
+    # Sama dengan PurchasePayment.save untuk record baru (paid_amount 0, tanpa diskon)
+    remaining = purchase.total_amount
+    if remaining <= 0:
+        status = 'paid'
+    elif due_date and due_date < now:
+        status = 'overdue'
+    else:
+        status = 'unpaid'
+    return PurchasePayment(
+        purchase=purchase, supplier_id=purchase.supplier_id, total_amount=purchase.total_amount,
+        discount=0, paid_amount=0, remaining_amount=remaining, due_date=due_date,
+        transaction_type=transaction_type, status=status,
+    )
+
+
+def _new_tax_invoice(purchase):
+    subtotal = int(purchase.total_amount / (1 + TAX_RATE / 100))
+    return PurchaseTaxInvoice(
+        purchase=purchase, supplier_id=purchase.supplier_id, invoice_number=None,
+        invoice_amount=purchase.total_amount, discount=0, tax_rate=TAX_RATE, subtotal=subtotal,
+        tax_amount=purchase.total_amount - subtotal, status='pending',
+    )
+
+
+def _verify_chunk(purchase_ids, user, due_date, transaction_type, has_fp):
+    from .accounting import commit_journal_batch, create_purchase_verify_journal_entry
+
+    now = timezone.now()
+    with transaction.atomic():
+        purchases = list(
+            Purchase.objects.select_for_update(of=('self',)).select_related('supplier')
+            .filter(id__in=purchase_ids, status='received').order_by('tanggal_purchase', 'id')
+        )
+        if not purchases:
+            return VerifyResult(0, len(purchase_ids), 0, [], [])
+        position = {purchase.id: index for index, purchase in enumerate(purchases)}
+        items = sorted(
+            PurchaseItem.objects.filter(purchase_id__in=position),
+            key=lambda item: (position[item.purchase_id], item.id),
+        )
+        totals = dict(
+            PurchaseItem.objects.filter(purchase_id__in=position).values('purchase_id')
+            .annotate(total=Sum('subtotal')).order_by().values_list('purchase_id', 'total')
+        )
+
+        product_ids = sorted({item.product_id for item in items})
+        products = {
+            product.pk: product
+            for product in Product.objects.select_for_update().filter(pk__in=product_ids).order_by('pk')
+            .only('id', 'sku', 'hpp', 'harga_beli', 'last_purchase_price', 'last_purchase_date')
+        }
+        stock_qty = dict(Stock.objects.filter(product_id__in=product_ids).values_list('product_id', 'quantity'))
+
+        _, final_hpp = replay_hpp(
+            [item.product_id for item in items],
+            [item.quantity for item in items],
+            [item.harga_beli for item in items],
+            [stock_qty.get(item.product_id, 0) for item in items],
+            {pk: product.hpp for pk, product in products.items()},
+        )
+
+        # Status purchase (total_amount dihitung ulang seperti Purchase.save)
+        for purchase in purchases:
+            purchase.status = 'verified'
+            purchase.verified_at = now
+            purchase.verified_by = user
+            purchase.has_tax_invoice = has_fp
+            purchase.total_amount = totals.get(purchase.id) or 0
+            purchase.updated_at = now
+        Purchase.objects.bulk_update(
+            purchases, ['status', 'verified_at', 'verified_by', 'has_tax_invoice', 'total_amount', 'updated_at'],
+        )
+
+        # Journal entry seluruh purchase chunk dalam satu batch; gagal dicatat tanpa membatalkan
+        # verifikasi (commit batch memakai savepoint sendiri)
+        batch = JournalBatch(user)
+        journal_errors = []
+        for purchase in purchases:
+            try:
+                create_purchase_verify_journal_entry(purchase, user, batch=batch)
+            except Exception as e:
+                logger.error("[VERIFY] Journal entry %s gagal: %s", purchase.nomor_purchase, e)
+                journal_errors.append((purchase, str(e)))
+        journal_entries, error = commit_journal_batch(batch, 'purchase verify')
+        if error:
+            logger.error("[VERIFY] Journal batch gagal: %s", error)
+            journal_errors += [(purchase, error) for purchase in purchases]
+
+        purchase_by_id = {purchase.id: purchase for purchase in purchases}
+        PriceHistory.objects.bulk_create([
+            PriceHistory(
+                product_id=item.product_id, purchase_id=item.purchase_id, purchase_item=item,
+                price=item.harga_beli, quantity=item.quantity, subtotal=item.subtotal,
+                supplier_id=purchase_by_id[item.purchase_id].supplier_id,
+                purchase_date=purchase_by_id[item.purchase_id].tanggal_purchase,
+            )
+            for item in items
+        ], batch_size=1000)
+
+        # Harga beli terakhir = baris terakhir produk dalam urutan verifikasi
+        for item in items:
+            product = products[item.product_id]
+            product.harga_beli = item.harga_beli
+            product.last_purchase_price = item.harga_beli
+            product.last_purchase_date = now
+        for pk, product in products.items():
+            product.hpp = final_hpp[pk]
+        Product.objects.bulk_update(
+            list(products.values()), ['harga_beli', 'last_purchase_price', 'last_purchase_date', 'hpp'], batch_size=1000,
+        )
+
+        PurchasePayment.objects.bulk_create([
+            _new_payment(purchase, due_date, transaction_type, now) for purchase in purchases
+        ])
+        if has_fp:
+            existing = set(
+                PurchaseTaxInvoice.objects.filter(purchase_id__in=position).values_list('purchase_id', flat=True)
+            )
+            PurchaseTaxInvoice.objects.bulk_create([
+                _new_tax_invoice(purchase) for purchase in purchases if purchase.id not in existing
+            ])
+
+    return VerifyResult(len(purchases), len(purchase_ids) - len(purchases), len(items), journal_entries, journal_errors)
+
+
+def _invalidate_purchasing_counters():
+    # bulk_update/bulk_create tidak memicu signal badge purchase verify/payment/tax invoice
+    # maupun cache count API list payment/tax invoice
+    invalidate_list_cache(PAYMENT_NAMESPACE, TAXINVOICE_NAMESPACE)
+    try:
+        from erp_alfa.views import invalidate_notification_cache
+        for model in (Purchase, PurchasePayment, PurchaseTaxInvoice):
+            invalidate_notification_cache(model)
+    except ImportError:
+        pass
+
+
+def verify_purchases(purchase_ids, user, due_date, transaction_type, has_fp=True, chunk_size=VERIFY_CHUNK_SIZE):
+    """
+    Verifikasi purchase berstatus received (yang lain dilewati, dihitung skipped) per chunk
+    transaksi. Purchase diproses urut tanggal_purchase agar HPP sama dengan verifikasi satu
+    per satu. Return VerifyResult.
+    """
+    ids = list(dict.fromkeys(int(pk) for pk in purchase_ids))
+    ordered = list(Purchase.objects.filter(id__in=ids).order_by('tanggal_purchase', 'id').values_list('id', flat=True))
+    known = set(ordered)
+    ids = ordered + [pk for pk in ids if pk not in known]
+    verified = skipped = lines = 0
+    journal_entries, journal_errors = [], []
+    step = chunk_size or len(ids) or 1
+    for start in range(0, len(ids), step):
+        result = _verify_chunk(ids[start:start + step], user, due_date, transaction_type, has_fp)
+        verified += result.verified
+        skipped += result.skipped
+        lines += result.lines
+        journal_entries += result.journal_entries
+        journal_errors += result.journal_errors
+    _invalidate_purchasing_counters()
+    logger.info("[VERIFY] %s purchase verified (%s baris, %s dilewati)", verified, lines, skipped)
+    return VerifyResult(verified, skipped, lines, journal_entries, journal_errors)
+
+
+# ---------------------------------------------------------------------------
+# Replay HPP dari PriceHistory
+# ---------------------------------------------------------------------------
+
+def _stock_at(product_ids, histories):
+    """
+    Saldo kartu stok (entri active) tiap produk pada created_at history:
+    {history_id: qty}, satu query entri untuk seluruh produk chunk.
+    """
+    entries = defaultdict(lambda: ([], []))
+    for product_id, waktu, qty in (
+        StockCardEntry.objects.filter(product_id__in=product_ids, status='active')
+        .order_by('product_id', 'waktu', 'id').values_list('product_id', 'waktu', 'qty')
+    ):
+        entries[product_id][0].append(waktu.timestamp())
+        entries[product_id][1].append(qty)
+
+    result = {}
+    by_product = defaultdict(list)
+    for history in histories:
+        by_product[history.product_id].append(history)
+    for product_id, rows in by_product.items():
+        times, qtys = entries.get(product_id, ([], []))
+        if not times:
+            result.update({history.id: 0 for history in rows})
+            continue
+        balance = np.cumsum(np.asarray(qtys))
+        positions = np.searchsorted(np.asarray(times), [history.created_at.timestamp() for history in rows], side='right')
+        for history, position in zip(rows, positions.tolist()):
+            result[history.id] = int(balance[position - 1]) if position else 0
+    return result
+
+
+def recalculate_hpp(product_ids=None, apply=True, chunk_size=REPLAY_CHUNK_SIZE, progress=None):
+    """
+    Bangun ulang HPP dari PriceHistory (urut created_at, id = urutan verifikasi) mulai HPP 0.
+    product_ids None = seluruh produk yang punya PriceHistory. apply False = hanya hitung.
+    Return (HppReplay(products, histories, changed), {product_id: (hpp lama, hpp baru)} yang berubah).
+    """
+    if product_ids is None:
+        product_ids = PriceHistory.objects.order_by('product_id').values_list('product_id', flat=True).distinct()
+    product_ids = sorted(set(product_ids))
+    histories_count = 0
+    changes = {}
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        histories = list(
+            PriceHistory.objects.filter(product_id__in=chunk).order_by('created_at', 'id')
+            .only('id', 'product_id', 'price', 'quantity', 'created_at')
+        )
+        histories_count += len(histories)
+        stock_qty = _stock_at(chunk, histories)
+        _, final_hpp = replay_hpp(
+            [history.product_id for history in histories],
+            [history.quantity for history in histories],
+            [history.price for history in histories],
+            [stock_qty[history.id] for history in histories],
+            {},
+        )
+        with transaction.atomic():
+            products = list(Product.objects.select_for_update().filter(pk__in=final_hpp).order_by('pk').only('id', 'hpp'))
+            changed = []
+            for product in products:
+                hpp = final_hpp[product.pk]
+                if product.hpp != hpp:
+                    changes[product.pk] = (product.hpp, hpp)
+                    product.hpp = hpp
+                    changed.append(product)
+            if apply and changed:
+                Product.objects.bulk_update(changed, ['hpp'], batch_size=1000)
+        if progress:
+            progress(start + len(chunk), len(changes))
+    logger.info("recalculate_hpp: %s produk, %s history, %s HPP berubah", len(product_ids), histories_count, len(changes))
+    return HppReplay(len(product_ids), histories_count, len(changes)), changes
@@ -15,6 +15,8 @@ import re
 from .models import PurchaseOrder, PurchaseOrderItem, PurchaseOrderHistory, PriceHistory, Purchase, PurchaseItem
 from inventory.models import Inbound, InboundItem, Supplier
 from products.models import Product
+from products.search import search_products
+from finance.sequences import document_number
 
 # Import payment views, bank views, and report views
 from . import payment_views, bank_views, report_views
@@ -32,14 +34,6 @@ def create_po_history(po, action, user, notes=None, old_values=None, new_values=
     )
 
 
-def get_next_po_id():
-    """Generate next PO ID"""
-    last = PurchaseOrder.objects.order_by('-id').first()
-    if last:
-        return last.id + 1
-    return 1
-
-
 @login_required
 def po_list(request):
     """List all Purchase Orders"""
@@ -543,9 +537,9 @@ def po_receive(request, pk):
         try:
             with transaction.atomic():
                 # Generate Inbound number
-                next_id = Inbound.objects.count() + 1
-                now = timezone.localtime()
-                nomor_inbound = f"INB/{now.strftime('%d-%m-%Y')}/{next_id}"
+                nomor_inbound = document_number(
+                    'INB', Inbound, 'nomor_inbound', width=1, separator='/', date_format='%d-%m-%Y'
+                )
                 
                 # Create Inbound
                 inbound = Inbound.objects.create(
@@ -929,11 +923,11 @@ def search_product(request):
     """Search product for PO"""
     q = request.GET.get('q', '').strip()
     
-    products = Product.objects.filter(
-        Q(sku__icontains=q) |
-        Q(barcode__icontains=q) |
-        Q(nama_produk__icontains=q)
-    ).order_by('nama_produk')[:20]
+    if q:
+        # Urut relevansi (SKU/barcode persis di atas) lewat products/search.py
+        products = search_products(q, limit=20, queryset=Product.objects.select_related('stock')).products
+    else:
+        products = Product.objects.select_related('stock').order_by('nama_produk')[:20]
     
     data = []
     for p in products:
@@ -1014,14 +1008,6 @@ def add_supplier(request):
 # PURCHASE LIST VIEWS (Goods Receipt)
 # ==========================================
 
-def get_next_purchase_id():
-    """Generate next Purchase ID"""
-    last = Purchase.objects.order_by('-id').first()
-    if last:
-        return last.id + 1
-    return 1
-
-
 @login_required
 def po_detail_json(request, pk):
     """API to get PO detail in JSON format"""
@@ -1899,124 +1885,18 @@ def purchase_verify(request, purchase_id):
                 messages.error(request, 'Format tanggal tidak valid!')
                 return redirect('purchasing:purchase_verify', purchase_id=purchase.id)
             
-            with transaction.atomic():
-                # Update status to verified
-                old_status = purchase.status
-                purchase.status = 'verified'
-                purchase.verified_at = timezone.now()
-                purchase.verified_by = request.user
-                purchase.has_tax_invoice = has_fp
-                purchase.save()
-                logger.info(f"[VERIFY] Status updated: {old_status} -> {purchase.status}")
-                
-                # Create journal entry for purchase verify
-                try:
-                    from .accounting import create_purchase_verify_journal_entry
-                    journal_entry = create_purchase_verify_journal_entry(purchase, request.user)
-                    logger.info(f"[VERIFY] Journal entry created: {journal_entry.entry_number}")
-                    messages.success(request, f'Purchase berhasil di-verify! Journal entry {journal_entry.entry_number} telah dibuat.')
-                except Exception as e:
-                    logger.error(f"[VERIFY] Error creating journal entry: {str(e)}")
-                    messages.warning(request, f'Purchase berhasil di-verify, tapi ada error saat membuat journal entry: {str(e)}')
-                
-                # Update product harga_beli (last purchase price) and calculate HPP for each item
-                from inventory.models import Stock
-                
-                for item in purchase.items.all():
-                    product = item.product
-                    product.harga_beli = item.harga_beli
-                    product.last_purchase_price = item.harga_beli
-                    product.last_purchase_date = timezone.now()
-                    
-                    # Create PriceHistory record
-                    PriceHistory.objects.create(
-                        product=product,
-                        purchase=purchase,
-                        purchase_item=item,
-                        price=item.harga_beli,
-                        quantity=item.quantity,
-                        subtotal=item.subtotal,
-                        supplier=purchase.supplier,
-                        purchase_date=purchase.tanggal_purchase,
-                    )
-                    
-                    # Calculate HPP (Weighted Average) - Simple Method
-                    # Get current stock quantity
-                    stock = Stock.objects.filter(product=product).first()
-                    current_stock_qty = stock.quantity if stock else 0
-                    
-                    # Current HPP and purchase quantity
-                    hpp_lama = float(product.hpp or 0)
-                    qty_beli = item.quantity
-                    harga_beli_baru = float(item.harga_beli)
-                    
-                    # Calculate new HPP
-                    if hpp_lama == 0:
-                        # If HPP is 0, use current purchase price
-                        hpp_baru = harga_beli_baru
-                        logger.info(f"[VERIFY] HPP for {product.sku} is 0, set to purchase price: Rp {hpp_baru:,.0f}")
-                    else:
-                        # Weighted average: (HPP_lama × Stock_Qty + Harga_Beli_Baru × Qty_Beli) / (Stock_Qty + Qty_Beli)
-                        # Note: We use stock qty BEFORE the purchase was received
-                        stock_qty_before = current_stock_qty - qty_beli
-                        if stock_qty_before < 0:
-                            stock_qty_before = 0
-                        
-                        total_cost = (hpp_lama * stock_qty_before) + (harga_beli_baru * qty_beli)
-                        total_qty = stock_qty_before + qty_beli
-                        
-                        if total_qty > 0:
-                            hpp_baru = total_cost / total_qty
-                            logger.info(f"[VERIFY] Calculated HPP for {product.sku}: "
-                                      f"(Rp {hpp_lama:,.0f} × {stock_qty_before} + Rp {harga_beli_baru:,.0f} × {qty_beli}) / {total_qty} "
-                                      f"= Rp {hpp_baru:,.0f}")
-                        else:
-                            hpp_baru = harga_beli_baru
-                            logger.info(f"[VERIFY] Total qty is 0, set HPP to purchase price: Rp {hpp_baru:,.0f}")
-                    
-                    product.hpp = round(hpp_baru, 2)
-                    product.save()
-                    logger.info(f"[VERIFY] Updated {product.sku}: Harga Beli = Rp {item.harga_beli:,.0f}, HPP = Rp {product.hpp:,.0f}")
-                    
-                logger.info(f"[VERIFY] All product prices and HPP updated")
-            
-            # Create PurchasePayment with user input
-            from purchasing.models import PurchasePayment, PurchaseTaxInvoice
-            
-            payment = PurchasePayment.objects.create(
-                purchase=purchase,
-                supplier=purchase.supplier,
-                total_amount=purchase.total_amount,
-                discount=0,  # Default no discount
-                paid_amount=0,
-                remaining_amount=purchase.total_amount,
-                due_date=due_date,
-                transaction_type=transaction_type,
-                status='unpaid',
-            )
-            logger.info(f"[VERIFY] PurchasePayment created: ID={payment.id}, amount={payment.total_amount}, due_date={due_date}, transaction_type={transaction_type}")
-            
-            # Create PurchaseTaxInvoice only if has_fp is True
-            if has_fp:
-                # Calculate tax: invoice_amount = subtotal + tax
-                tax_rate = 11  # 11% PPN
-                subtotal = int(purchase.total_amount / (1 + tax_rate / 100))
-                tax_amount = purchase.total_amount - subtotal
-                
-                tax_invoice, _created = PurchaseTaxInvoice.objects.get_or_create(
-                    purchase=purchase,
-                    supplier=purchase.supplier,
-                    defaults={
-                        'invoice_number': None,
-                        'invoice_amount': purchase.total_amount,
-                        'discount': 0,
-                        'tax_rate': tax_rate,
-                        'subtotal': subtotal,
-                        'tax_amount': tax_amount,
-                        'status': 'pending',
-                    }
-                )
-                logger.info(f"[VERIFY] PurchaseTaxInvoice ensured: ID={tax_invoice.id}, amount={tax_invoice.invoice_amount}")
+            # Status, journal entry, PriceHistory, HPP, payment dan tax invoice dalam satu transaksi
+            from .verification import verify_purchases
+            result = verify_purchases([purchase.id], request.user, due_date, transaction_type, has_fp)
+            if not result.verified:
+                messages.error(request, 'Hanya purchase dengan status "Received" yang bisa di-verify!')
+                return redirect('purchasing:purchase_list')
+            for journal_entry in result.journal_entries:
+                logger.info(f"[VERIFY] Journal entry created: {journal_entry.entry_number}")
+                messages.success(request, f'Purchase berhasil di-verify! Journal entry {journal_entry.entry_number} telah dibuat.')
+            for _, error in result.journal_errors:
+                messages.warning(request, f'Purchase berhasil di-verify, tapi ada error saat membuat journal entry: {error}')
+            logger.info(f"[VERIFY] {result.lines} product prices and HPP updated")
             
             logger.info(f"[VERIFY] Verification completed successfully for {purchase.nomor_purchase}")
             if has_fp:
@@ -2047,6 +1927,53 @@ def purchase_verify(request, purchase_id):
     return render(request, 'purchasing/purchase_verify.html', context)
 
 
+@login_required
+@require_http_methods(["POST"])
+def purchase_verify_bulk(request):
+    """
+    Bulk verify purchase received (purchase_ids[], due_date, transaction_type, has_fp).
+    Sampai VERIFY_CHUNK_SIZE purchase dijalankan langsung, lebih dari itu lewat Celery.
+    """
+    from django.core.exceptions import PermissionDenied
+    from .tasks import verify_purchases_task
+    from .verification import VERIFY_CHUNK_SIZE
+    import logging
+    
+    if not request.user.has_perm('purchasing.purchase_finance'):
+        raise PermissionDenied("You don't have permission to verify purchase.")
+    
+    purchase_ids = [pk for pk in request.POST.getlist('purchase_ids[]') if pk.isdigit()]
+    due_date = request.POST.get('due_date', '').strip()
+    transaction_type = request.POST.get('transaction_type', '').strip()
+    has_fp = request.POST.get('has_fp', 'Y').strip().upper() == 'Y'
+    if not purchase_ids:
+        return JsonResponse({'success': False, 'error': 'Tidak ada purchase yang dipilih'}, status=400)
+    if not due_date or not transaction_type:
+        return JsonResponse({'success': False, 'error': 'Tanggal jatuh tempo dan tipe transaksi wajib diisi!'}, status=400)
+    try:
+        from datetime import datetime
+        datetime.strptime(due_date, '%Y-%m-%d')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Format tanggal tidak valid!'}, status=400)
+    
+    args = (purchase_ids, due_date, transaction_type, has_fp)
+    kwargs = {'user_id': request.user.id}
+    if len(purchase_ids) > VERIFY_CHUNK_SIZE:
+        try:
+            task = verify_purchases_task.delay(*args, **kwargs)
+            return JsonResponse({'success': True, 'status': 'queued', 'task_id': task.id, 'count': len(purchase_ids)})
+        except Exception:
+            # Broker tidak tersedia: jalankan langsung
+            logging.getLogger(__name__).error(
+                "Broker Celery tidak dapat dihubungi (cek CELERY_BROKER_URL), bulk verify dijalankan sinkron", exc_info=True
+            )
+    try:
+        result = verify_purchases_task.apply(args=args, kwargs=kwargs).get()
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    return JsonResponse({'success': True, 'status': 'done', **result})
+
+
 @login_required
 def purchase_receive(request, purchase_id):
     """Receive Purchase (update stock)"""
@@ -367,6 +367,15 @@ document.addEventListener('DOMContentLoaded', function () {
     
     // Panggil fungsi update kartu monitoring saat halaman dimuat
     updateInitialMonitoringCard();
+
+    // === LIVE UPDATE: progres pick dari picker lain di batch yang sama ===
+    if (window.subscribeLiveUpdates) {
+        subscribeLiveUpdates([`batch:${window.NAMA_PICKLIST}`], function (events) {
+            events.forEach(event => {
+                if (event.kind === 'pick') updateItemUI(event.data);
+            });
+        }, { onReconnect: () => window.location.reload() });
+    }
 });
 
 
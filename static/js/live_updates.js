@@ -0,0 +1,107 @@
+/*
+ * Live update client (WebSocket ws/live/, lihat fullfilment/live_updates.py).
+ *
+ *   const live = subscribeLiveUpdates(['batch:B001'], function (events) { ... }, {
+ *       fallback: function () { table.ajax.reload(null, false); },  // polling saat socket putus
+ *       fallbackInterval: 30000,
+ *       onReconnect: function () { ... },  // sinkron ulang setelah koneksi pulih
+ *   });
+ *
+ * Server mengirim event yang sudah digabung per key: handler menerima array
+ * {topic, kind, key, data}. Jika WebSocket tidak tersedia / terputus, fallback dipanggil
+ * berkala sampai koneksi pulih (reconnect dengan backoff sampai 30 detik).
+ */
+(function (window) {
+    'use strict';
+
+    function subscribeLiveUpdates(topics, handler, options) {
+        options = options || {};
+        const fallbackInterval = options.fallbackInterval || 0;
+        let socket = null;
+        let retry = 0;
+        let fallbackTimer = null;
+        let everConnected = false;
+        let closed = false;
+
+        function startFallback() {
+            if (options.fallback && fallbackInterval && !fallbackTimer) {
+                fallbackTimer = setInterval(options.fallback, fallbackInterval);
+            }
+        }
+
+        function stopFallback() {
+            if (fallbackTimer) {
+                clearInterval(fallbackTimer);
+                fallbackTimer = null;
+            }
+        }
+
+        function connect() {
+            if (!('WebSocket' in window)) {
+                startFallback();
+                return;
+            }
+            const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+            const query = topics.map(function (topic) { return 'topic=' + encodeURIComponent(topic); }).join('&');
+            socket = new WebSocket(scheme + '://' + window.location.host + '/ws/live/?' + query);
+
+            socket.onopen = function () {
+                retry = 0;
+                stopFallback();
+                if (everConnected && options.onReconnect) {
+                    options.onReconnect();
+                }
+                everConnected = true;
+            };
+            socket.onmessage = function (message) {
+                let payload;
+                try {
+                    payload = JSON.parse(message.data);
+                } catch (e) {
+                    return;
+                }
+                if (payload.type === 'events' && payload.events.length) {
+                    handler(payload.events);
+                }
+            };
+            socket.onclose = function (event) {
+                socket = null;
+                startFallback();
+                // 4400/4401: topik tidak valid / belum login - tidak perlu reconnect
+                if (closed || event.code === 4400 || event.code === 4401) {
+                    return;
+                }
+                retry += 1;
+                setTimeout(connect, Math.min(30000, 1000 * Math.pow(2, Math.min(retry, 5))));
+            };
+        }
+
+        connect();
+        return {
+            close: function () {
+                closed = true;
+                stopFallback();
+                if (socket) {
+                    socket.close();
+                }
+            },
+        };
+    }
+
+    // Jalankan fn paling banyak sekali per wait ms (event beruntun -> satu reload)
+    function debounceLive(fn, wait) {
+        let timer = null;
+        return function () {
+            if (timer) {
+                return;
+            }
+            timer = setTimeout(function () {
+                timer = null;
+                fn();
+            }, wait);
+        };
+    }
+
+    window.subscribeLiveUpdates = subscribeLiveUpdates;
+    window.debounceLive = debounceLive;
+})(window);